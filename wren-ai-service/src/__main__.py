@@ -1,18 +1,28 @@
+import logging
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse, RedirectResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, RedirectResponse
 from langfuse.decorators import langfuse_context
 
 from src.config import settings
+from src.core.executor import LoopLagMonitor, init_executor
+from src.core.job_scheduler import QueueFullError
+from src.core.metrics import CONTENT_TYPE, REGISTRY
 from src.globals import (
     create_service_container,
     create_service_metadata,
 )
-from src.providers import generate_components
+from src.providers import (
+    close_document_stores,
+    close_embedder_caches,
+    close_engine_sessions,
+    close_llm_caches,
+    generate_components,
+)
 from src.utils import (
     init_langfuse,
     setup_custom_logger,
@@ -22,12 +32,22 @@ from src.web.v1 import routers
 setup_custom_logger(
     "wren-ai-service", level_str=settings.logging_level, is_dev=settings.development
 )
+logger = logging.getLogger("wren-ai-service")
+REGISTRY.set_enabled(settings.enable_metrics)
 
 
 # https://fastapi.tiangolo.com/advanced/events/#lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup events
+    executor = init_executor(
+        thread_workers=settings.executor_thread_workers,
+        process_workers=settings.executor_process_workers,
+    )
+    app.state.loop_lag_monitor = LoopLagMonitor(
+        interval=settings.loop_lag_monitor_interval
+    )
+    app.state.loop_lag_monitor.start()
     pipe_components = generate_components(settings.components)
     app.state.service_container = create_service_container(pipe_components, settings)
     app.state.service_metadata = create_service_metadata(pipe_components)
@@ -37,6 +57,15 @@ async def lifespan(app: FastAPI):
 
     # shutdown events
     langfuse_context.flush()
+    await close_engine_sessions(pipe_components)
+    close_embedder_caches(pipe_components)
+    close_llm_caches(pipe_components)
+    await close_document_stores(pipe_components)
+    await app.state.service_container.job_scheduler.close()
+    await app.state.service_container.result_store.close()
+    await app.state.loop_lag_monitor.stop()
+    logger.info(f"Event loop lag metrics: {app.state.loop_lag_monitor.get_metrics()}")
+    executor.close()
 
 
 app = FastAPI(
@@ -68,6 +97,15 @@ async def exception_handler(_, exc: Exception):
     )
 
 
+@app.exception_handler(QueueFullError)
+async def queue_full_exception_handler(_, exc: QueueFullError):
+    return ORJSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def request_exception_handler(_, exc: Exception):
     return ORJSONResponse(
@@ -86,7 +124,15 @@ def health():
     return {"status": "ok"}
 
 
+if settings.enable_metrics:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
+    settings.check_workers()
     uvicorn.run(
         "src.__main__:app",
         host=settings.host,
@@ -94,7 +140,7 @@ if __name__ == "__main__":
         reload=settings.development,
         reload_includes=["src/**/*.py", ".env.dev", "config.yaml"],
         reload_excludes=["tests/**/*.py", "eval/**/*.py"],
-        workers=1,
+        workers=settings.workers,
         loop="uvloop",
         http="httptools",
     )
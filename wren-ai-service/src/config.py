@@ -1,4 +1,5 @@
 import logging
+from typing import Literal
 
 import yaml
 from dotenv import load_dotenv
@@ -30,11 +31,18 @@ class Settings(BaseSettings):
     table_retrieval_size: int = Field(default=10)
     table_column_retrieval_size: int = Field(default=100)
     enable_column_pruning: bool = Field(default=False)
+    enable_speculative_retrieval: bool = Field(default=True)
     historical_question_retrieval_similarity_threshold: float = Field(default=0.9)
     sql_pairs_similarity_threshold: float = Field(default=0.7)
     sql_pairs_retrieval_max_size: int = Field(default=10)
     instructions_similarity_threshold: float = Field(default=0.7)
     instructions_top_k: int = Field(default=10)
+    enable_db_schema_cache: bool = Field(default=True)
+    db_schema_cache_maxsize: int = Field(default=100)  # unit: projects
+    enable_answer_cache: bool = Field(default=False)
+    answer_cache_maxsize: int = Field(default=1000)  # unit: questions
+    answer_cache_ttl: int = Field(default=86400)  # unit: seconds
+    answer_cache_similarity_threshold: float = Field(default=0.98)
 
     # generation config
     allow_intent_classification: bool = Field(default=True)
@@ -43,6 +51,14 @@ class Settings(BaseSettings):
     allow_sql_diagnosis: bool = Field(default=True)
     max_histories: int = Field(default=5)
     max_sql_correction_retries: int = Field(default=3)
+    # sample several SQL candidates and keep the first one passing validation, the
+    # correction only starts when all fail; sampled with the `n` parameter or with
+    # parallel completions
+    sql_generation_candidates: int = Field(default=1)
+    sql_generation_candidate_sampling: Literal["n", "parallel"] = Field(default="n")
+    sql_generation_candidate_temperature: float = Field(default=0.7)
+    # validate charts against the model of their chart type before the full Vega-Lite schema
+    enable_chart_model_validation: bool = Field(default=True)
 
     # engine config
     engine_timeout: float = Field(default=30.0)
@@ -57,6 +73,25 @@ class Settings(BaseSettings):
         """,
     )
 
+    # "memory" keeps the job results in the process, so it requires a single worker,
+    # "redis" shares them across workers and replicas; the schema and SQL validation caches
+    # and the embedded document store stay per process with either backend, and the answer
+    # cache requires a single worker
+    result_store_backend: str = Field(default="memory")
+    redis_url: str = Field(default="redis://localhost:6379/0")
+    workers: int = Field(default=1)
+    job_max_concurrency: int = Field(default=32)
+    job_max_queue_depth: int = Field(default=200)  # unit: jobs per job type
+    job_concurrency: dict[str, int] = Field(default_factory=dict)
+    # the CPU-heavy pipeline steps run in these pools instead of on the event loop,
+    # 0 process workers runs the pure-Python steps in the thread pool too
+    executor_thread_workers: int = Field(default=8)
+    executor_process_workers: int = Field(default=0)
+    loop_lag_monitor_interval: float = Field(default=0.1)  # unit: seconds
+    # per-stage latency histograms served at /metrics in the Prometheus text format,
+    # independent of langfuse; each worker process keeps its own metrics
+    enable_metrics: bool = Field(default=True)
+
     # user guide config
     is_oss: bool = Field(default=True)
     doc_endpoint: str = Field(default="https://docs.getwren.ai")
@@ -112,6 +147,24 @@ class Settings(BaseSettings):
                 message = f"Warning: Unknown configuration key '{key}' in YAML file."
                 logger.warning(message)
 
+    def check_workers(self) -> None:
+        """
+        Raises ValueError when several workers can't serve the polls of each other's jobs,
+        or would serve answers cached before a change handled by another worker.
+        """
+        if self.workers > 1 and self.result_store_backend != "redis":
+            raise ValueError(
+                f"workers: {self.workers} requires result_store_backend: redis, "
+                f"the {self.result_store_backend} result store keeps the job results in "
+                "the worker running the job"
+            )
+        if self.workers > 1 and self.enable_answer_cache:
+            raise ValueError(
+                f"workers: {self.workers} requires enable_answer_cache: false, the answer "
+                "cache of a worker isn't invalidated by the SQL pairs, instructions and "
+                "deployments handled by the other workers"
+            )
+
     @property
     def components(self) -> list[dict]:
         return self._components
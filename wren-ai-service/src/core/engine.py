@@ -1,11 +1,19 @@
+import asyncio
+import functools
+import inspect
 import logging
 import re
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import aiohttp
+from cachetools import TTLCache
 from pydantic import BaseModel
 
+from src.core.metrics import ENGINE_DURATION, current_pipeline
+
 logger = logging.getLogger("wren-ai-service")
 
 
@@ -14,7 +22,234 @@ class EngineConfig(BaseModel):
     config: dict = {}
 
 
+@dataclass
+class EngineSessionMetrics:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    queued_requests: int = 0
+    total_wait_time: float = 0.0  # unit: seconds
+    max_wait_time: float = 0.0  # unit: seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        acquired = self.connections_created + self.connections_reused
+        return {
+            **asdict(self),
+            "reuse_ratio": self.connections_reused / acquired if acquired else 0.0,
+            "avg_wait_time": (
+                self.total_wait_time / self.queued_requests
+                if self.queued_requests
+                else 0.0
+            ),
+        }
+
+
+class EngineSessionPool:
+    """
+    A lazily created aiohttp session shared by every call to the same engine.
+
+    Reusing one session keeps the TCP/TLS connections and the DNS cache alive across
+    dry-runs, previews and function list lookups instead of paying for them on each call.
+    The session is bound to the running event loop, so it is created on first use and
+    must be closed in the application lifespan via `close`.
+    """
+
+    def __init__(
+        self,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 0,
+        keepalive_timeout: float = 15.0,
+        dns_cache_ttl: int = 300,
+    ):
+        self._connection_limit = connection_limit
+        self._connection_limit_per_host = connection_limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._metrics = EngineSessionMetrics()
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        async def on_request_start(session, context, params):
+            self._metrics.requests += 1
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, context, params):
+            wait_time = time.perf_counter() - context.queued_at
+            self._metrics.queued_requests += 1
+            self._metrics.total_wait_time += wait_time
+            self._metrics.max_wait_time = max(self._metrics.max_wait_time, wait_time)
+
+        async def on_connection_create_end(session, context, params):
+            self._metrics.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self._metrics.connections_reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self._connection_limit,
+                    limit_per_host=self._connection_limit_per_host,
+                    keepalive_timeout=self._keepalive_timeout,
+                    ttl_dns_cache=self._dns_cache_ttl,
+                    use_dns_cache=self._dns_cache_ttl > 0,
+                ),
+                trace_configs=[self._trace_config()],
+            )
+
+        return self._session
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+@dataclass
+class SqlValidationCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **asdict(self),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SqlValidationCache:
+    """
+    A short-lived cache of the dry-run and dry-plan outcomes of generated SQL.
+
+    The same SQL is often validated several times, e.g. a recommended question is validated
+    and then asked, or a correction loop produces a SQL seen before. Outcomes are keyed by
+    project id, MDL hash when the caller knows it, data source, validation mode and the exact
+    SQL, since the outcomes hold the SQL verbatim. Failed outcomes are kept with their error
+    messages too. Timeouts are not cached since they say nothing about the SQL.
+    A `ttl` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: int = 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self._metrics = SqlValidationCacheMetrics()
+
+    @staticmethod
+    def key(
+        sql: str,
+        project_id: Optional[str],
+        data_source: str,
+        mode: str,
+        mdl_hash: Optional[str] = None,
+    ) -> Tuple[str, str, str, str, str]:
+        return (project_id or "", mdl_hash or "", data_source, mode, sql)
+
+    def get(self, key: Tuple[str, str, str, str, str]) -> Optional[Any]:
+        if self._cache is None:
+            return None
+
+        if (outcome := self._cache.get(key)) is None:
+            self._metrics.misses += 1
+        else:
+            self._metrics.hits += 1
+        return outcome
+
+    def put(self, key: Tuple[str, str, str, str, str], outcome: Any) -> None:
+        if self._cache is not None:
+            self._cache[key] = outcome
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+
+def _instrumented(method: Callable, engine: str, operation: str):
+    signature = inspect.signature(method)
+    dry_run_parameter = signature.parameters.get("dry_run")
+    dry_run_default = dry_run_parameter.default if dry_run_parameter else True
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        _operation = operation
+        if operation == "execute_sql":
+            dry_run = signature.bind_partial(*args, **kwargs).arguments.get(
+                "dry_run", dry_run_default
+            )
+            _operation = "dry_run" if dry_run else "execute"
+
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await method(*args, **kwargs)
+            # execute_sql and dry_plan report a failure in the first item of their result
+            status = "ok" if not isinstance(result, tuple) or result[0] else "failed"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            ENGINE_DURATION.observe(
+                time.perf_counter() - start,
+                pipeline=current_pipeline.get(),
+                engine=engine,
+                operation=_operation,
+                status=status,
+            )
+
+    return wrapper
+
+
 class Engine(metaclass=ABCMeta):
+    _session_pool: Optional[EngineSessionPool] = None
+    _validation_cache: Optional[SqlValidationCache] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # record the duration of the requests of every engine provider
+        for name in ("execute_sql", "dry_plan", "get_func_list"):
+            method = cls.__dict__.get(name)
+            if method is not None and inspect.iscoroutinefunction(method):
+                setattr(cls, name, _instrumented(method, cls.__name__, name))
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the session shared by all calls to this engine.
+        Callers must not close it, it's closed in the application lifespan.
+        """
+        if self._session_pool is None:
+            self._session_pool = EngineSessionPool()
+        return self._session_pool.get_session()
+
+    def get_session_metrics(self) -> Dict[str, Any]:
+        if self._session_pool is None:
+            return EngineSessionMetrics().to_dict()
+        return self._session_pool.get_metrics()
+
+    def get_validation_cache(self) -> SqlValidationCache:
+        """
+        Returns the cache of SQL validation outcomes shared by all pipelines using this engine.
+        """
+        if self._validation_cache is None:
+            self._validation_cache = SqlValidationCache()
+        return self._validation_cache
+
+    async def close(self) -> None:
+        if self._session_pool is not None:
+            await self._session_pool.close()
+
     @abstractmethod
     async def execute_sql(
         self,
@@ -0,0 +1,134 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from src.core.metrics import EVENT_LOOP_LAG
+
+T = TypeVar("T")
+
+
+@dataclass
+class LoopLagMetrics:
+    samples: int = 0
+    total_lag: float = 0.0  # unit: seconds
+    max_lag: float = 0.0  # unit: seconds
+    stalls: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "avg_lag": self.total_lag / self.samples if self.samples else 0.0,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task sleeping for `interval` seconds.
+
+    The lag is the time the loop was blocked by synchronous code, during which no SSE
+    stream or status poll is served. A lag above `stall_threshold` counts as a stall.
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.1):
+        self._interval = interval
+        self._stall_threshold = stall_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._metrics = LoopLagMetrics()
+
+    async def _monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - start - self._interval, 0.0)
+            EVENT_LOOP_LAG.observe(lag)
+
+            self._metrics.samples += 1
+            self._metrics.total_lag += lag
+            self._metrics.max_lag = max(self._metrics.max_lag, lag)
+            if lag > self._stall_threshold:
+                self._metrics.stalls += 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+
+class CPUExecutor:
+    """
+    Runs the CPU-heavy steps of the pipelines off the event loop.
+
+    Work releasing the GIL, e.g. tiktoken encoding or pandas, runs in a thread pool.
+    Pure-Python work, e.g. parsing schema chunks, runs in a process pool when
+    `process_workers` is positive, and in the thread pool otherwise; its function and
+    arguments must be picklable. Both pools are created on first use.
+    """
+
+    def __init__(self, thread_workers: int = 8, process_workers: int = 0):
+        self._thread_workers = thread_workers
+        self._process_workers = process_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    async def run_in_thread(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self._thread_workers, thread_name_prefix="cpu-executor"
+            )
+
+        # like asyncio.to_thread, keep the context, e.g. the current trace
+        return await asyncio.get_running_loop().run_in_executor(
+            self._thread_pool,
+            functools.partial(contextvars.copy_context().run, fn, *args, **kwargs),
+        )
+
+    async def run_in_process(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if self._process_workers <= 0:
+            return await self.run_in_thread(fn, *args, **kwargs)
+
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self._process_workers)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._process_pool, functools.partial(fn, *args, **kwargs)
+        )
+
+    def close(self) -> None:
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+_executor = CPUExecutor()
+
+
+def init_executor(thread_workers: int = 8, process_workers: int = 0) -> CPUExecutor:
+    global _executor
+
+    _executor.close()
+    _executor = CPUExecutor(
+        thread_workers=thread_workers, process_workers=process_workers
+    )
+    return _executor
+
+
+def get_executor() -> CPUExecutor:
+    """
+    Returns the executor shared by the pipelines, configured at startup by `init_executor`.
+    """
+    return _executor
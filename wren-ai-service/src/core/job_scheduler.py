@@ -0,0 +1,218 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.core.metrics import JOB_DURATION, JOB_QUEUE_DEPTH, JOB_QUEUE_WAIT
+
+logger = logging.getLogger("wren-ai-service")
+
+
+class JobPriority(IntEnum):
+    INTERACTIVE = 0
+    CHART = 1
+    BACKGROUND = 2
+
+
+@dataclass(frozen=True)
+class JobType:
+    priority: JobPriority
+    max_concurrency: int
+
+
+# the default limits of the jobs started by the routers, can be overridden with the job_concurrency setting
+JOB_TYPES: Dict[str, JobType] = {
+    "ask": JobType(JobPriority.INTERACTIVE, 32),
+    "ask_feedback": JobType(JobPriority.INTERACTIVE, 8),
+    "sql_answer": JobType(JobPriority.INTERACTIVE, 16),
+    "sql_question": JobType(JobPriority.INTERACTIVE, 8),
+    "sql_correction": JobType(JobPriority.INTERACTIVE, 8),
+    "chart": JobType(JobPriority.CHART, 8),
+    "chart_adjustment": JobType(JobPriority.CHART, 8),
+    "question_recommendation": JobType(JobPriority.BACKGROUND, 2),
+    "relationship_recommendation": JobType(JobPriority.BACKGROUND, 2),
+    "semantics_description": JobType(JobPriority.BACKGROUND, 2),
+    "semantics_preparation": JobType(JobPriority.BACKGROUND, 2),
+    "sql_pairs": JobType(JobPriority.BACKGROUND, 2),
+    "instructions": JobType(JobPriority.BACKGROUND, 2),
+}
+
+
+class QueueFullError(Exception):
+    def __init__(self, job_type: str, retry_after: int):
+        super().__init__(
+            f"Too many pending {job_type} jobs, retry after {retry_after}s"
+        )
+        self.job_type = job_type
+        self.retry_after = retry_after
+
+
+@dataclass
+class JobTypeMetrics:
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    queued: int = 0
+    running: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        started = self.completed + self.failed + self.running
+        finished = self.completed + self.failed
+        return {
+            **asdict(self),
+            "avg_wait_seconds": self.wait_seconds / started if started else 0.0,
+            "avg_run_seconds": self.run_seconds / finished if finished else 0.0,
+        }
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    sequence: int
+    job_type: str = field(compare=False)
+    fn: Callable[..., Awaitable] = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: dict = field(compare=False)
+    submitted_at: float = field(compare=False)
+
+
+class JobScheduler:
+    """
+    Runs the long-running jobs of the routers, e.g. asks, charts and indexing, in the background.
+
+    Jobs start in the order of their priority class and then of their submission, while both
+    the total `max_concurrency` and the limit of their job type allow it; the others wait in the
+    queue. Each job type queues at most `max_queue_depth` jobs, so a burst of indexing doesn't
+    reject asks. A job submitted to a full queue is rejected with QueueFullError, which the app
+    turns into a 429 with a Retry-After header.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 32,
+        max_queue_depth: int = 200,
+        job_types: Optional[Dict[str, JobType]] = None,
+        job_concurrency: Optional[Dict[str, int]] = None,
+    ):
+        self._max_concurrency = max_concurrency
+        self._max_queue_depth = max_queue_depth
+        self._job_types = {
+            name: JobType(
+                job_type.priority,
+                (job_concurrency or {}).get(name, job_type.max_concurrency),
+            )
+            for name, job_type in (job_types or JOB_TYPES).items()
+        }
+        self._queue: List[_Job] = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._metrics = {name: JobTypeMetrics() for name in self._job_types}
+
+    def submit(
+        self, job_type: str, fn: Callable[..., Awaitable], *args, **kwargs
+    ) -> None:
+        metrics = self._metrics[job_type]
+
+        if metrics.queued >= self._max_queue_depth:
+            metrics.rejected += 1
+            raise QueueFullError(job_type, self._retry_after(job_type))
+
+        metrics.submitted += 1
+        metrics.queued += 1
+        JOB_QUEUE_DEPTH.set(metrics.queued, job_type=job_type)
+        self._queue.append(
+            _Job(
+                priority=self._job_types[job_type].priority,
+                sequence=next(self._sequence),
+                job_type=job_type,
+                fn=fn,
+                args=args,
+                kwargs=kwargs,
+                submitted_at=time.perf_counter(),
+            )
+        )
+        self._queue.sort()
+        self._dispatch()
+
+    def _retry_after(self, job_type: str) -> int:
+        # the time for the job type to drain its queue, from its average run time
+        metrics = self._metrics[job_type].to_dict()
+        return max(
+            1,
+            math.ceil(
+                (metrics["avg_run_seconds"] or 1.0)
+                * metrics["queued"]
+                / self._job_types[job_type].max_concurrency
+            ),
+        )
+
+    def _dispatch(self) -> None:
+        for job in list(self._queue):
+            if self._running >= self._max_concurrency:
+                return
+
+            metrics = self._metrics[job.job_type]
+            if metrics.running >= self._job_types[job.job_type].max_concurrency:
+                continue
+
+            self._queue.remove(job)
+            self._running += 1
+            metrics.queued -= 1
+            metrics.running += 1
+            JOB_QUEUE_DEPTH.set(metrics.queued, job_type=job.job_type)
+
+            wait_seconds = time.perf_counter() - job.submitted_at
+            metrics.wait_seconds += wait_seconds
+            metrics.max_wait_seconds = max(metrics.max_wait_seconds, wait_seconds)
+            JOB_QUEUE_WAIT.observe(wait_seconds, job_type=job.job_type)
+
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job) -> None:
+        metrics = self._metrics[job.job_type]
+        start = time.perf_counter()
+        status = "cancelled"
+        try:
+            await job.fn(*job.args, **job.kwargs)
+            metrics.completed += 1
+            status = "ok"
+        except Exception as e:
+            metrics.failed += 1
+            status = "error"
+            logger.exception(f"{job.job_type} job failed: {e}")
+        finally:
+            run_seconds = time.perf_counter() - start
+            metrics.run_seconds += run_seconds
+            JOB_DURATION.observe(run_seconds, job_type=job.job_type, status=status)
+            metrics.running -= 1
+            self._running -= 1
+            self._dispatch()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._queue),
+            "running": self._running,
+            "job_types": {
+                name: metrics.to_dict() for name, metrics in self._metrics.items()
+            },
+        }
+
+    async def close(self) -> None:
+        logger.info(f"Job scheduler metrics: {self.get_metrics()}")
+
+        # queued jobs are dropped and running jobs cancelled, their results expire with the result store
+        self._queue.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,313 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# unit: seconds, from a cached lookup to a slow LLM call
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+# the pipeline being run, so the provider calls it makes are labelled with it
+current_pipeline: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_pipeline", default=""
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._enabled = True
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self._enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self._enabled:
+            return
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # per label values: the count of each bucket (not cumulative), then the sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self._enabled:
+            return
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self._buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = [
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            ]
+
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self._buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            samples.append(f"{self.name}_count{labels} {cumulative}")
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Keeps the metrics of the service and renders them in the Prometheus text format.
+
+    Recording a sample is a dict update under a lock, cheap enough for every pipeline
+    and provider call. When disabled, recording does nothing.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._enabled = True
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            return self._metrics[metric.name]
+        metric._enabled = self._enabled
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self._register(
+            Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS)
+        )
+
+    def set_enabled(self, enabled: bool) -> None:
+        self._enabled = enabled
+        for metric in self._metrics.values():
+            metric._enabled = enabled
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PIPELINE_DURATION = REGISTRY.histogram(
+    "wren_pipeline_duration_seconds",
+    "Duration of the pipeline runs",
+    ["pipeline", "status"],
+)
+EMBEDDING_DURATION = REGISTRY.histogram(
+    "wren_embedding_duration_seconds",
+    "Duration of the embedding requests, cache hits excluded",
+    ["pipeline", "model", "kind"],
+)
+EMBEDDING_TEXTS = REGISTRY.counter(
+    "wren_embedding_texts_total",
+    "Texts sent to the embedding model",
+    ["pipeline", "model", "kind"],
+)
+LLM_TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "wren_llm_time_to_first_token_seconds",
+    "Time to the first token of the streamed LLM completions",
+    ["pipeline", "model"],
+)
+LLM_DURATION = REGISTRY.histogram(
+    "wren_llm_duration_seconds",
+    "Duration of the LLM completions",
+    ["pipeline", "model", "status"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "wren_llm_tokens_total",
+    "Tokens of the LLM completions by type: prompt, completion, and the prompt tokens "
+    "read from (cached_prompt) or written to (cache_write) the prompt cache of the model",
+    ["pipeline", "model", "type"],
+)
+LLM_CACHE_LOOKUPS = REGISTRY.counter(
+    "wren_llm_cache_lookups_total",
+    "Lookups of the LLM completion cache by result: hit or miss",
+    ["pipeline", "model", "result"],
+)
+LLM_CACHE_TOKENS_SAVED = REGISTRY.counter(
+    "wren_llm_cache_tokens_saved_total",
+    "Prompt and completion tokens of the completions served by the LLM completion cache",
+    ["pipeline", "model", "type"],
+)
+DOCUMENT_STORE_DURATION = REGISTRY.histogram(
+    "wren_document_store_duration_seconds",
+    "Duration of the document store requests",
+    ["pipeline", "collection", "operation"],
+)
+ENGINE_DURATION = REGISTRY.histogram(
+    "wren_engine_request_duration_seconds",
+    "Duration of the engine requests",
+    ["pipeline", "engine", "operation", "status"],
+)
+SQL_GENERATION_OUTCOMES = REGISTRY.counter(
+    "wren_sql_generation_outcomes_total",
+    "Multi-candidate SQL generations by outcome: valid, rescued from a failed "
+    "candidate without the correction loop, or all_invalid",
+    ["pipeline", "outcome"],
+)
+SQL_CORRECTION_LOOP_DURATION = REGISTRY.histogram(
+    "wren_sql_correction_loop_duration_seconds",
+    "Duration of the SQL diagnosis and correction rounds of the asks",
+)
+JOB_QUEUE_WAIT = REGISTRY.histogram(
+    "wren_job_queue_wait_seconds",
+    "Time the jobs waited in the queue of the job scheduler",
+    ["job_type"],
+)
+JOB_DURATION = REGISTRY.histogram(
+    "wren_job_duration_seconds",
+    "Duration of the jobs run by the job scheduler",
+    ["job_type", "status"],
+)
+JOB_QUEUE_DEPTH = REGISTRY.gauge(
+    "wren_job_queue_depth",
+    "Jobs waiting in the queue of the job scheduler",
+    ["job_type"],
+)
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "wren_event_loop_lag_seconds",
+    "How late the event loop woke up the lag monitor",
+)
@@ -1,24 +1,157 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import time
 from abc import ABCMeta, abstractmethod
 from collections.abc import Mapping
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, TypeVar
 
+import orjson
 from hamilton.async_driver import AsyncDriver
 from hamilton.driver import Driver
 from haystack import Pipeline
+from pydantic import BaseModel
 
 from src.core.engine import Engine
+from src.core.metrics import PIPELINE_DURATION, current_pipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
 
+T = TypeVar("T")
+
+
+@dataclass
+class SingleflightMetrics:
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "coalesce_ratio": self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+class Singleflight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first call of a key runs it in its own task and the calls arriving while it's in
+    flight await the same task, so they all get the same result object or exception.
+    A caller being cancelled, e.g. a cancelled speculative retrieval, doesn't cancel the
+    others; the execution is only cancelled once every caller is gone.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, tuple[asyncio.Task, list[int]]] = {}
+        self._metrics = SingleflightMetrics()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        self._metrics.calls += 1
+        if key in self._in_flight:
+            self._metrics.coalesced += 1
+            task, waiters = self._in_flight[key]
+        else:
+            self._metrics.executions += 1
+            task, waiters = asyncio.ensure_future(fn()), [0]
+            self._in_flight[key] = (task, waiters)
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if waiters[0] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    # the identity of other objects, e.g. a retriever, tells the calls apart
+    return f"{type(value).__name__}@{id(value)}"
+
+
+def canonical_key(*parts: Any) -> str:
+    return hashlib.sha256(
+        orjson.dumps(parts, default=_canonical, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def singleflight(run: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Opts the run method of a pipeline into coalescing concurrent identical calls.
+
+    Calls are keyed on the pipeline class and the canonicalized inputs, no matter if they are
+    passed positionally or by keyword. Concurrent duplicates share one result, so callers must
+    not mutate it.
+    """
+    signature = inspect.signature(run)
+
+    @functools.wraps(run)
+    async def wrapper(self: "BasicPipeline", *args, **kwargs) -> T:
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        inputs = dict(bound.arguments)
+        inputs.pop(next(iter(signature.parameters)))
+
+        return await self._singleflight.do(
+            canonical_key(type(self).__name__, inputs),
+            lambda: run(self, *args, **kwargs),
+        )
+
+    return wrapper
+
+
+def _instrumented(run: Callable[..., Awaitable[T]], pipeline: str):
+    @functools.wraps(run)
+    async def wrapper(*args, **kwargs) -> T:
+        token = current_pipeline.set(pipeline)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await run(*args, **kwargs)
+            status = "ok"
+            return result
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            PIPELINE_DURATION.observe(
+                time.perf_counter() - start, pipeline=pipeline, status=status
+            )
+            current_pipeline.reset(token)
+
+    return wrapper
+
 
 class BasicPipeline(metaclass=ABCMeta):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # record the duration of every run, and label the provider calls made during it
+        run = cls.__dict__.get("run")
+        if run is not None and inspect.iscoroutinefunction(run):
+            cls.run = _instrumented(run, cls.__name__)
+
     def __init__(self, pipe: Pipeline | AsyncDriver | Driver):
         self._pipe = pipe
+        self._singleflight = Singleflight()
 
     @abstractmethod
     def run(self, *args, **kwargs) -> Dict[str, Any]:
         ...
 
+    def get_coalescing_metrics(self) -> Dict[str, Any]:
+        return self._singleflight.get_metrics()
+
 
 @dataclass
 class PipelineComponent(Mapping):
@@ -1,9 +1,32 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
 from abc import ABCMeta, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
 
+import numpy as np
+import orjson
+from cachetools import LRUCache, TTLCache
 from haystack.document_stores.types import DocumentStore
 
+logger = logging.getLogger("wren-ai-service")
+
+
+# splits a prompt into the part shared by the calls on a project, e.g. the schema and the
+# SQL functions, and the part of each call, e.g. the question; the LLM providers mark the
+# former for the prompt caching of the models supporting explicit cache control
+PROMPT_CACHE_BREAKPOINT = "<|prompt_cache_breakpoint|>"
+
 
 class LLMProvider(metaclass=ABCMeta):
+    _completion_cache: Optional["CompletionCache"] = None
+
     @abstractmethod
     def get_generator(self, *args, **kwargs):
         ...
@@ -17,8 +40,509 @@ class LLMProvider(metaclass=ABCMeta):
     def get_context_window_size(self):
         return self._context_window_size
 
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        if self._completion_cache is None:
+            return CompletionCacheMetrics().to_dict()
+        return self._completion_cache.get_metrics()
+
+    def close(self) -> None:
+        if self._completion_cache is not None:
+            self._completion_cache.close()
+
+
+@dataclass
+class EmbeddingCacheMetrics:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **asdict(self),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class _EmbeddingAbandoned(Exception):
+    """
+    Set on the in-flight embeddings of a cancelled caller, so the callers waiting for them
+    embed the texts themselves.
+    """
+
+
+class EmbeddingCache:
+    """
+    A content-addressed cache of embeddings keyed by the model name and the hash of the embedded text.
+
+    Embeddings are kept in an in-memory LRU tier and, when `path` is set, in a SQLite file
+    that survives restarts, so redeploying an unchanged MDL doesn't embed the same chunks again.
+    Concurrent lookups of a text that is being embedded wait for that call instead of issuing
+    another one, so a question shared by several pipelines of one ask is embedded once.
+
+    Embeddings are kept as float32 arrays, and the in-memory tier is bounded by `max_bytes`,
+    e.g. 64 MiB holds about 10k embeddings of 1536 dimensions.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        path: Optional[str] = None,
+        maxsize: Optional[int] = None,
+    ):
+        if maxsize is not None:
+            logger.warning(
+                "embedding_cache.maxsize is deprecated, the in-memory tier is bounded by max_bytes"
+            )
+            max_bytes = max_bytes if maxsize > 0 else 0
+        self._memory = (
+            LRUCache(maxsize=max_bytes, getsizeof=lambda embedding: embedding.nbytes)
+            if max_bytes > 0
+            else None
+        )
+        self._path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._metrics = EmbeddingCacheMetrics()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self._path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding BLOB NOT NULL)"
+            )
+        return self._db
+
+    def _disk_get(
+        self, keys: List[str], batch_size: int = 500
+    ) -> Dict[str, List[float]]:
+        rows = []
+        with self._db_lock:
+            db = self._connection()
+            # stay below the SQLite limit of host parameters per statement
+            for i in range(0, len(keys), batch_size):
+                batch = keys[i : i + batch_size]
+                rows += db.execute(
+                    f"SELECT key, embedding FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+        return {
+            key: (
+                # embeddings written before they were stored as float32 bytes
+                np.asarray(orjson.loads(embedding), dtype=np.float32)
+                if embedding[:1] == b"["
+                else np.frombuffer(embedding, dtype=np.float32)
+            )
+            for key, embedding in rows
+        }
+
+    def _disk_put(self, items: Dict[str, np.ndarray]) -> None:
+        with self._db_lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)",
+                [(key, embedding.tobytes()) for key, embedding in items.items()],
+            )
+            db.commit()
+
+    def _remember(self, items: Dict[str, np.ndarray]) -> None:
+        if self._memory is None:
+            return
+        for key, embedding in items.items():
+            if embedding.nbytes <= self._memory.maxsize:
+                self._memory[key] = embedding
+
+    async def _get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        if self._memory is not None:
+            found = {key: self._memory[key] for key in keys if key in self._memory}
+
+        missing = [key for key in keys if key not in found]
+        if self._path and missing:
+            from_disk = await asyncio.to_thread(self._disk_get, missing)
+            self._metrics.disk_hits += len(from_disk)
+            self._remember(from_disk)
+            found.update(from_disk)
+
+        return found
+
+    async def _put(self, items: Dict[str, np.ndarray]) -> None:
+        self._remember(items)
+        if self._path and items:
+            await asyncio.to_thread(self._disk_put, items)
+
+    async def embed(
+        self,
+        model: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        Returns the embeddings of `texts` in order, calling `embed` only with the texts
+        that are neither cached nor being embedded by another caller.
+        """
+        keys = [self.key(model, text) for text in texts]
+        texts_by_key = dict(zip(keys, texts))
+        unique_keys = list(dict.fromkeys(keys))
+        found = await self._get(unique_keys)
+
+        waiting = {
+            key: self._inflight[key]
+            for key in unique_keys
+            if key not in found and key in self._inflight
+        }
+        to_embed = {
+            key: text
+            for key, text in zip(keys, texts)
+            if key not in found and key not in waiting
+        }
+
+        self._metrics.hits += len(keys) - len(to_embed)
+        self._metrics.misses += len(to_embed)
+
+        if to_embed:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in to_embed}
+            self._inflight.update(futures)
+            try:
+                embeddings = {
+                    key: np.asarray(embedding, dtype=np.float32)
+                    for key, embedding in zip(
+                        to_embed, await embed(list(to_embed.values()))
+                    )
+                }
+                await self._put(embeddings)
+                for key, future in futures.items():
+                    if not future.done():
+                        future.set_result(embeddings[key])
+                found.update(embeddings)
+            except BaseException as e:
+                for future in futures.values():
+                    if future.done():
+                        continue
+                    # the waiting callers weren't cancelled, they embed the texts instead
+                    future.set_exception(
+                        _EmbeddingAbandoned()
+                        if isinstance(e, asyncio.CancelledError)
+                        else e
+                    )
+                    # mark as retrieved, the error is raised to this caller
+                    future.exception()
+                raise
+            finally:
+                for key in futures:
+                    self._inflight.pop(key, None)
+
+        abandoned = []
+        for key, future in waiting.items():
+            try:
+                # a cancelled waiter must not cancel the embedding the others wait for
+                found[key] = await asyncio.shield(future)
+            except _EmbeddingAbandoned:
+                abandoned.append(key)
+
+        if abandoned:
+            texts_to_retry = [texts_by_key[key] for key in abandoned]
+            retried = await self.embed(model, texts_to_retry, embed)
+            found.update(
+                (key, np.asarray(embedding, dtype=np.float32))
+                for key, embedding in zip(abandoned, retried)
+            )
+
+        return [found[key].tolist() for key in keys]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+
+
+@dataclass
+class CompletionCacheMetrics:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    prompt_tokens_saved: int = 0
+    completion_tokens_saved: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **asdict(self),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", "_", name).lower()
+
+
+class CompletionCache:
+    """
+    A cache of LLM completions keyed by the hash of the model, the messages, including the
+    system prompt, and the generation kwargs.
+
+    Only deterministic calls are cached: temperature 0 and no streaming. `pipelines` limits
+    the cache to the calls of these pipelines, by pipe name, e.g. `intent_classification`;
+    all pipelines when it's None. Completions are kept in an in-memory LRU tier and, when
+    `path` is set, in a SQLite file that survives restarts; both expire them after `ttl`
+    seconds, never when it's 0.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1_000,
+        ttl: int = 86400,  # unit: seconds
+        path: Optional[str] = None,
+        pipelines: Optional[List[str]] = None,
+    ):
+        if maxsize <= 0:
+            self._memory = None
+        elif ttl > 0:
+            self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        else:
+            self._memory = LRUCache(maxsize=maxsize)
+        self._ttl = ttl
+        self._path = path
+        self._pipelines = set(pipelines) if pipelines is not None else None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._metrics = CompletionCacheMetrics()
+
+    @staticmethod
+    def key(
+        model: str, messages: List[Dict[str, Any]], generation_kwargs: Dict[str, Any]
+    ) -> str:
+        payload = orjson.dumps(
+            [model, messages, generation_kwargs],
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    def is_cacheable(
+        self, pipeline: str, generation_kwargs: Dict[str, Any], streaming: bool
+    ) -> bool:
+        if streaming or generation_kwargs.get("temperature", 1) != 0:
+            return False
+        return self._pipelines is None or bool(
+            {pipeline, _snake_case(pipeline)} & self._pipelines
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self._path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, completion BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        with self._db_lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT completion, created_at FROM completions WHERE key = ?",
+                    (key,),
+                )
+                .fetchone()
+            )
+        if row is None or (self._ttl > 0 and time.time() - row[1] > self._ttl):
+            return None
+        return row[0]
+
+    def _disk_put(self, key: str, completion: bytes) -> None:
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, created_at) VALUES (?, ?, ?)",
+                (key, completion, time.time()),
+            )
+            db.commit()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of the cached completion of `key`, or None.
+        """
+        completion = None
+        if self._memory is not None:
+            completion = self._memory.get(key)
+        if completion is None and self._path:
+            completion = await asyncio.to_thread(self._disk_get, key)
+            if completion is not None:
+                self._metrics.disk_hits += 1
+                if self._memory is not None:
+                    self._memory[key] = completion
+
+        if completion is None:
+            self._metrics.misses += 1
+            return None
+
+        self._metrics.hits += 1
+        result = orjson.loads(completion)
+        if result.get("meta"):
+            usage = result["meta"][0].get("usage") or {}
+            self._metrics.prompt_tokens_saved += usage.get("prompt_tokens") or 0
+            self._metrics.completion_tokens_saved += usage.get("completion_tokens") or 0
+        return result
+
+    async def put(self, key: str, result: Dict[str, Any]) -> None:
+        completion = orjson.dumps(result, default=str)
+        if self._memory is not None:
+            self._memory[key] = completion
+        if self._path:
+            await asyncio.to_thread(self._disk_put, key, completion)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+            self._db = None
+
+
+@dataclass
+class EmbeddingSchedulerMetrics:
+    batches: int = 0
+    texts: int = 0
+    tokens: int = 0
+    retries: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "texts_per_second": self.texts / self.seconds if self.seconds else 0.0,
+            "tokens_per_second": self.tokens / self.seconds if self.seconds else 0.0,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    # roughly 4 characters per token for English text with the OpenAI tokenizers,
+    # close enough to size batches without loading a tokenizer
+    return len(text) // 4 + 1
+
+
+class EmbeddingScheduler:
+    """
+    Splits texts into batches bounded by their estimated token count and embeds them with
+    at most `max_in_flight` requests at a time, shared by every embedder of a provider.
+
+    A failed batch is retried on its own with exponential backoff and full jitter, so a
+    rate-limited request doesn't retry the whole document set.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        max_batch_tokens: int = 8_000,
+        max_retries: int = 3,
+        retry_base_delay: float = 1.0,  # unit: seconds
+        retry_max_delay: float = 30.0,  # unit: seconds
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        self._semaphore = asyncio.Semaphore(max(max_in_flight, 1))
+        self._max_batch_tokens = max_batch_tokens
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._retry_on = retry_on
+        self._metrics = EmbeddingSchedulerMetrics()
+
+    def batches(
+        self, texts: List[str], max_batch_size: int
+    ) -> List[Tuple[List[str], int]]:
+        """
+        Greedily packs consecutive texts into batches of at most `max_batch_size` texts and
+        `max_batch_tokens` tokens. A text over the token limit is sent in a batch of its own.
+        """
+        batches = []
+        batch: List[str] = []
+        batch_tokens = 0
+
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if batch and (
+                len(batch) >= max_batch_size
+                or batch_tokens + tokens > self._max_batch_tokens
+            ):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append((batch, batch_tokens))
+
+        return batches
+
+    async def _run_batch(
+        self, batch: List[str], tokens: int, embed_fn: Callable[[List[str]], Awaitable]
+    ) -> Any:
+        for attempt in range(self._max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await embed_fn(batch)
+            except self._retry_on as e:
+                if attempt == self._max_retries:
+                    self._metrics.failures += 1
+                    raise
+
+                delay = random.uniform(
+                    0, min(self._retry_max_delay, self._retry_base_delay * 2**attempt)
+                )
+                logger.warning(
+                    f"Embedding batch of {len(batch)} texts failed: {e}, retrying in {delay:.2f}s"
+                )
+                self._metrics.retries += 1
+                await asyncio.sleep(delay)
+            else:
+                self._metrics.batches += 1
+                self._metrics.texts += len(batch)
+                self._metrics.tokens += tokens
+                return response
+
+    async def run(
+        self,
+        texts: List[str],
+        embed_fn: Callable[[List[str]], Awaitable],
+        max_batch_size: int = 2048,
+    ) -> List[Any]:
+        """
+        Returns the responses of `embed_fn` in the order of the batches, which keep the order of `texts`.
+        """
+        start = time.perf_counter()
+        try:
+            return await asyncio.gather(
+                *[
+                    self._run_batch(batch, tokens, embed_fn)
+                    for batch, tokens in self.batches(texts, max_batch_size)
+                ]
+            )
+        finally:
+            self._metrics.seconds += time.perf_counter() - start
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._metrics.to_dict()
+
 
 class EmbedderProvider(metaclass=ABCMeta):
+    _embedding_cache: Optional[EmbeddingCache] = None
+    _embedding_scheduler: Optional[EmbeddingScheduler] = None
+
     @abstractmethod
     def get_text_embedder(self, *args, **kwargs):
         ...
@@ -30,6 +554,20 @@ class EmbedderProvider(metaclass=ABCMeta):
     def get_model(self):
         return self._embedding_model
 
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        if self._embedding_cache is None:
+            return EmbeddingCacheMetrics().to_dict()
+        return self._embedding_cache.get_metrics()
+
+    def get_scheduler_metrics(self) -> Dict[str, Any]:
+        if self._embedding_scheduler is None:
+            return EmbeddingSchedulerMetrics().to_dict()
+        return self._embedding_scheduler.get_metrics()
+
+    def close(self) -> None:
+        if self._embedding_cache is not None:
+            self._embedding_cache.close()
+
 
 class DocumentStoreProvider(metaclass=ABCMeta):
     @abstractmethod
@@ -39,3 +577,8 @@ class DocumentStoreProvider(metaclass=ABCMeta):
     @abstractmethod
     def get_retriever(self, *args, **kwargs):
         ...
+
+    async def close(self) -> None:
+        """
+        Releases the connections held by the provider, called on shutdown.
+        """
@@ -0,0 +1,223 @@
+import asyncio
+import math
+from abc import ABCMeta, abstractmethod
+from typing import Any, Dict, Optional, Type
+
+from cachetools import TTLCache
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class StreamStore(metaclass=ABCMeta):
+    """
+    Queues of streamed chunks keyed by a stream id, e.g. the query id of an ask.
+    The producer and the consumer of a stream may live in different processes.
+    """
+
+    @abstractmethod
+    async def put(self, stream_id: str, chunk: str) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, stream_id: str, timeout: float) -> str:
+        """
+        Pops the next chunk of the stream, raises TimeoutError if none arrives within timeout seconds.
+        """
+        ...
+
+    @abstractmethod
+    async def delete(self, stream_id: str) -> None:
+        ...
+
+
+class InMemoryStreamStore(StreamStore):
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    def _queue(self, stream_id: str) -> asyncio.Queue:
+        if stream_id not in self._queues:
+            self._queues[stream_id] = asyncio.Queue()
+        return self._queues[stream_id]
+
+    async def put(self, stream_id: str, chunk: str) -> None:
+        await self._queue(stream_id).put(chunk)
+
+    async def get(self, stream_id: str, timeout: float) -> str:
+        return await asyncio.wait_for(self._queue(stream_id).get(), timeout=timeout)
+
+    async def delete(self, stream_id: str) -> None:
+        self._queues.pop(stream_id, None)
+
+
+class Results(metaclass=ABCMeta):
+    """
+    Job statuses and results keyed by a query id, e.g. the AskResultResponse of an ask.
+    The job and the requests polling its status may be served by different processes.
+    """
+
+    @abstractmethod
+    async def get(self, key: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class InMemoryResults(Results):
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return self._cache.get(key, default)
+
+    async def set(self, key: str, value: Any) -> None:
+        self._cache[key] = value
+
+    async def delete(self, key: str) -> None:
+        self._cache.pop(key, None)
+
+
+class RedisResults(Results):
+    """
+    Values are stored as the JSON of their pydantic model and rebuilt as `model` when read,
+    so a value read from the results is a copy; it has to be set again after being modified.
+    """
+
+    def __init__(self, client: Any, namespace: str, ttl: int, model: Type[BaseModel]):
+        self._client = client
+        self._prefix = f"wren-ai-service:results:{namespace}:"
+        self._ttl = ttl
+        self._model = model
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        if (value := await self._client.get(self._key(key))) is None:
+            return default
+        return self._model.model_validate_json(value)
+
+    async def set(self, key: str, value: BaseModel) -> None:
+        # the fields excluded from the API responses, e.g. is_followup of an ask, are kept too
+        data = to_json(
+            {name: getattr(value, name) for name in type(value).model_fields}
+        )
+        await self._client.set(self._key(key), data, ex=self._ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+
+class RedisStreamStore(StreamStore):
+    def __init__(self, client: Any, namespace: str, ttl: int):
+        self._client = client
+        self._prefix = f"wren-ai-service:streams:{namespace}:"
+        self._ttl = ttl
+        # the streaming callbacks schedule one task per chunk, pushing them one at a time
+        # keeps the chunks in order
+        self._lock = asyncio.Lock()
+
+    def _key(self, stream_id: str) -> str:
+        return f"{self._prefix}{stream_id}"
+
+    async def put(self, stream_id: str, chunk: str) -> None:
+        async with self._lock:
+            await self._client.rpush(self._key(stream_id), chunk)
+            await self._client.expire(self._key(stream_id), self._ttl)
+
+    async def get(self, stream_id: str, timeout: float) -> str:
+        # BLPOP takes whole seconds, 0 means blocking forever
+        if (
+            popped := await self._client.blpop(
+                [self._key(stream_id)], timeout=max(math.ceil(timeout), 1)
+            )
+        ) is None:
+            raise TimeoutError(f"No chunk of stream {stream_id} in {timeout} seconds")
+
+        _, chunk = popped
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    async def delete(self, stream_id: str) -> None:
+        await self._client.delete(self._key(stream_id))
+
+
+class ResultStore(metaclass=ABCMeta):
+    """
+    Creates the stores holding the job statuses, results and streamed chunks of the services.
+
+    The in-memory store keeps them in the process, so a request and its follow-up polls must be
+    served by the same worker. The Redis store shares them across workers and replicas.
+    """
+
+    @abstractmethod
+    def results(
+        self, namespace: str, maxsize: int, ttl: int, model: Type[BaseModel]
+    ) -> Results:
+        ...
+
+    @abstractmethod
+    def streams(self, namespace: str) -> StreamStore:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryResultStore(ResultStore):
+    def results(
+        self, namespace: str, maxsize: int, ttl: int, model: Type[BaseModel]
+    ) -> Results:
+        return InMemoryResults(maxsize=maxsize, ttl=ttl)
+
+    def streams(self, namespace: str) -> StreamStore:
+        return InMemoryStreamStore()
+
+
+class RedisResultStore(ResultStore):
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        stream_ttl: int = 600,  # unit: seconds
+        client: Optional[Any] = None,
+    ):
+        if client is None:
+            try:
+                import redis.asyncio
+            except ImportError as e:
+                raise ImportError(
+                    "The redis result store requires the redis package, install it with `poetry install --extras redis`"
+                ) from e
+
+            client = redis.asyncio.Redis.from_url(url)
+
+        # the results and streams are read and written on the event loop of the services,
+        # so the async client is used to not block it on a Redis round trip
+        self._client = client
+        self._stream_ttl = stream_ttl
+
+    def results(
+        self, namespace: str, maxsize: int, ttl: int, model: Type[BaseModel]
+    ) -> Results:
+        return RedisResults(self._client, namespace, ttl, model)
+
+    def streams(self, namespace: str) -> StreamStore:
+        return RedisStreamStore(self._client, namespace, self._stream_ttl)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_result_store(
+    backend: str = "memory", redis_url: Optional[str] = None
+) -> ResultStore:
+    if backend == "memory":
+        return InMemoryResultStore()
+    if backend == "redis":
+        return RedisResultStore(url=redis_url)
+
+    raise ValueError(f"Unknown result store backend: {backend}")
@@ -1,12 +1,19 @@
 import logging
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 
 import toml
 
 from src.config import Settings
+from src.core.job_scheduler import JobScheduler
 from src.core.pipeline import PipelineComponent
 from src.core.provider import EmbedderProvider, LLMProvider
+from src.core.result_store import (
+    InMemoryResultStore,
+    ResultStore,
+    create_result_store,
+)
 from src.pipelines import generation, indexing, retrieval
+from src.pipelines.common import AnswerCache, DbSchemaCache
 from src.utils import fetch_wren_ai_docs
 from src.web.v1 import services
 
@@ -28,6 +35,8 @@ class ServiceContainer:
     sql_question_service: services.SqlQuestionService
     instructions_service: services.InstructionsService
     sql_correction_service: services.SqlCorrectionService
+    result_store: ResultStore = field(default_factory=InMemoryResultStore)
+    job_scheduler: JobScheduler = field(default_factory=JobScheduler)
 
 
 @dataclass
@@ -40,18 +49,61 @@ def create_service_container(
     pipe_components: dict[str, PipelineComponent],
     settings: Settings,
 ) -> ServiceContainer:
+    result_store = create_result_store(
+        backend=settings.result_store_backend,
+        redis_url=settings.redis_url,
+    )
     query_cache = {
         "maxsize": settings.query_cache_maxsize,
         "ttl": settings.query_cache_ttl,
+        "result_store": result_store,
+    }
+    sql_generation_candidates = {
+        "candidates": settings.sql_generation_candidates,
+        "candidate_sampling": settings.sql_generation_candidate_sampling,
+        "candidate_temperature": settings.sql_generation_candidate_temperature,
     }
     wren_ai_docs = fetch_wren_ai_docs(settings.doc_endpoint, settings.is_oss)
     if not wren_ai_docs:
         logger.warning("Failed to fetch Wren AI docs or response was empty.")
 
+    db_schema_cache = (
+        DbSchemaCache(maxsize=settings.db_schema_cache_maxsize)
+        if settings.enable_db_schema_cache
+        else None
+    )
+    answer_cache = (
+        AnswerCache(
+            maxsize=settings.answer_cache_maxsize,
+            ttl=settings.answer_cache_ttl,
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+        )
+        if settings.enable_answer_cache
+        else None
+    )
+
+    # the question of an ask is embedded once, with the embedder of the db schema
+    # retrieval, and only the pipelines embedding it with the same model reuse that vector
+    query_embedding_model = pipe_components[
+        "db_schema_retrieval"
+    ].embedder_provider.get_model()
+    query_embedding_pipelines = {
+        pipeline
+        for pipeline, component in {
+            "historical_question": "historical_question_retrieval",
+            "sql_pairs_retrieval": "sql_pairs_retrieval",
+            "instructions_retrieval": "instructions_retrieval",
+            "intent_classification": "intent_classification",
+        }.items()
+        if pipe_components[component].embedder_provider.get_model()
+        == query_embedding_model
+    }
+
     _db_schema_retrieval_pipeline = retrieval.DbSchemaRetrieval(
         **pipe_components["db_schema_retrieval"],
         table_retrieval_size=settings.table_retrieval_size,
         table_column_retrieval_size=settings.table_column_retrieval_size,
+        db_schema_cache=db_schema_cache,
     )
     _sql_pair_indexing_pipeline = indexing.SqlPairs(
         **pipe_components["sql_pairs_indexing"],
@@ -97,6 +149,7 @@ def create_service_container(
                 "db_schema": indexing.DBSchema(
                     **pipe_components["db_schema_indexing"],
                     column_batch_size=settings.column_indexing_batch_size,
+                    db_schema_cache=db_schema_cache,
                 ),
                 "historical_question": indexing.HistoricalQuestion(
                     **pipe_components["historical_question_indexing"],
@@ -110,6 +163,8 @@ def create_service_container(
                     **pipe_components["project_meta_indexing"],
                 ),
             },
+            db_schema_cache=db_schema_cache,
+            answer_cache=answer_cache,
             **query_cache,
         ),
         ask_service=services.AskService(
@@ -120,14 +175,20 @@ def create_service_container(
                 ),
                 "misleading_assistance": generation.MisleadingAssistance(
                     **pipe_components["misleading_assistance"],
+                    stream_store=result_store.streams("misleading_assistance"),
                 ),
                 "data_assistance": generation.DataAssistance(
-                    **pipe_components["data_assistance"]
+                    **pipe_components["data_assistance"],
+                    stream_store=result_store.streams("data_assistance"),
                 ),
                 "user_guide_assistance": generation.UserGuideAssistance(
                     **pipe_components["user_guide_assistance"],
+                    stream_store=result_store.streams("user_guide_assistance"),
                     wren_ai_docs=wren_ai_docs,
                 ),
+                "query_embedding": retrieval.QueryEmbedding(
+                    **pipe_components["db_schema_retrieval"],
+                ),
                 "db_schema_retrieval": _db_schema_retrieval_pipeline,
                 "historical_question": retrieval.HistoricalQuestionRetrieval(
                     **pipe_components["historical_question_retrieval"],
@@ -137,16 +198,22 @@ def create_service_container(
                 "instructions_retrieval": _instructions_retrieval_pipeline,
                 "sql_generation": generation.SQLGeneration(
                     **pipe_components["sql_generation"],
+                    **sql_generation_candidates,
                 ),
                 "sql_generation_reasoning": generation.SQLGenerationReasoning(
                     **pipe_components["sql_generation_reasoning"],
+                    stream_store=result_store.streams("sql_generation_reasoning"),
                 ),
                 "followup_sql_generation_reasoning": generation.FollowUpSQLGenerationReasoning(
                     **pipe_components["followup_sql_generation_reasoning"],
+                    stream_store=result_store.streams(
+                        "followup_sql_generation_reasoning"
+                    ),
                 ),
                 "sql_correction": _sql_correction_pipeline,
                 "followup_sql_generation": generation.FollowUpSQLGeneration(
                     **pipe_components["followup_sql_generation"],
+                    **sql_generation_candidates,
                 ),
                 "sql_functions_retrieval": _sql_functions_retrieval_pipeline,
                 "sql_diagnosis": _sql_diagnosis_pipeline,
@@ -157,7 +224,10 @@ def create_service_container(
             allow_sql_diagnosis=settings.allow_sql_diagnosis,
             max_histories=settings.max_histories,
             enable_column_pruning=settings.enable_column_pruning,
+            enable_speculative_retrieval=settings.enable_speculative_retrieval,
             max_sql_correction_retries=settings.max_sql_correction_retries,
+            answer_cache=answer_cache,
+            query_embedding_pipelines=query_embedding_pipelines,
             **query_cache,
         ),
         ask_feedback_service=services.AskFeedbackService(
@@ -181,6 +251,7 @@ def create_service_container(
                 "sql_executor": _sql_executor_pipeline,
                 "chart_generation": generation.ChartGeneration(
                     **pipe_components["chart_generation"],
+                    use_chart_models=settings.enable_chart_model_validation,
                 ),
             },
             **query_cache,
@@ -190,6 +261,7 @@ def create_service_container(
                 "sql_executor": _sql_executor_pipeline,
                 "chart_adjustment": generation.ChartAdjustment(
                     **pipe_components["chart_adjustment"],
+                    use_chart_models=settings.enable_chart_model_validation,
                 ),
             },
             **query_cache,
@@ -201,6 +273,7 @@ def create_service_container(
                 ),
                 "sql_answer": generation.SQLAnswer(
                     **pipe_components["sql_answer"],
+                    stream_store=result_store.streams("sql_answer"),
                 ),
             },
             **query_cache,
@@ -233,6 +306,7 @@ def create_service_container(
             pipelines={
                 "sql_pairs": _sql_pair_indexing_pipeline,
             },
+            answer_cache=answer_cache,
             **query_cache,
         ),
         sql_question_service=services.SqlQuestionService(
@@ -247,6 +321,7 @@ def create_service_container(
             pipelines={
                 "instructions_indexing": _instructions_indexing_pipeline,
             },
+            answer_cache=answer_cache,
             **query_cache,
         ),
         sql_correction_service=services.SqlCorrectionService(
@@ -259,6 +334,12 @@ def create_service_container(
             },
             **query_cache,
         ),
+        result_store=result_store,
+        job_scheduler=JobScheduler(
+            max_concurrency=settings.job_max_concurrency,
+            max_queue_depth=settings.job_max_queue_depth,
+            job_concurrency=settings.job_concurrency,
+        ),
     )
 
 
@@ -1,8 +1,20 @@
+import ast
 import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Any, List, Optional, Tuple
 
+import numpy as np
+import orjson
+from cachetools import LRUCache
 from haystack import Document, component
 
+from src.core.pipeline import Singleflight, canonical_key
+
+# version 1: Python repr of the payload dict, version 2: JSON
+DDL_PAYLOAD_VERSION = 2
+
 
 def get_engine_supported_data_type(data_type: str) -> str:
     """
@@ -64,7 +76,328 @@ def build_table_ddl(
     )
 
 
+def build_metric_ddl(content: dict) -> str:
+    columns_ddl = [
+        f"{column['comment']}{column['name']} {get_engine_supported_data_type(column['data_type'])}"
+        for column in content["columns"]
+        if column["data_type"].lower()
+        != "unknown"  # quick fix: filtering out UNKNOWN column type
+    ]
+
+    return (
+        f"{content['comment']}CREATE TABLE {content['name']} (\n  "
+        + ",\n  ".join(columns_ddl)
+        + "\n);"
+    )
+
+
+def build_view_ddl(content: dict) -> str:
+    return (
+        f"{content['comment']}CREATE VIEW {content['name']}\nAS {content['statement']}"
+    )
+
+
+def dump_ddl_payload(payload: dict) -> str:
+    return orjson.dumps(payload).decode("utf-8")
+
+
+def load_ddl_payload(content: str) -> dict:
+    """
+    Decodes the content of a db schema document written by DDLChunker, or of a table
+    description document written by TableDescriptionChunker. Documents indexed before
+    DDL_PAYLOAD_VERSION 2 hold a Python repr instead of JSON, they are decoded with
+    ast.literal_eval until the project is deployed again.
+    """
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return ast.literal_eval(content)
+
+
+def construct_table_schemas(documents: List[Document]) -> dict[str, dict]:
+    """
+    Merges the TABLE and TABLE_COLUMNS chunks of the db schema documents into one schema per table.
+    Tables missing either the TABLE chunk or the TABLE_COLUMNS chunks are dropped.
+    """
+    db_schemas = {}
+    for document in documents:
+        content = load_ddl_payload(document.content)
+        if content["type"] == "TABLE":
+            if document.meta["name"] not in db_schemas:
+                db_schemas[document.meta["name"]] = content
+            else:
+                db_schemas[document.meta["name"]] = {
+                    **content,
+                    "columns": db_schemas[document.meta["name"]].get("columns", []),
+                }
+        elif content["type"] == "TABLE_COLUMNS":
+            if document.meta["name"] not in db_schemas:
+                db_schemas[document.meta["name"]] = {"columns": content["columns"]}
+            else:
+                if "columns" not in db_schemas[document.meta["name"]]:
+                    db_schemas[document.meta["name"]]["columns"] = content["columns"]
+                else:
+                    db_schemas[document.meta["name"]]["columns"] += content["columns"]
+
+    # remove incomplete schemas
+    return {k: v for k, v in db_schemas.items() if "type" in v and "columns" in v}
+
+
+@dataclass
+class DbSchemaCacheEntry:
+    """
+    The parsed db schema of one deployed MDL.
+
+    :param mdl_hash: The hash of the MDL the entry is built from.
+    :param table_schemas: The merged TABLE schemas keyed by table name.
+    :param ddls: The rendered DDL of every TABLE, METRIC and VIEW keyed by name.
+    :param token_counts: The token count of a DDL keyed by (encoding name, name), filled lazily.
+    """
+
+    mdl_hash: Optional[str]
+    table_schemas: dict[str, dict]
+    ddls: dict[str, dict]
+    token_counts: dict[tuple[str, str], int] = field(default_factory=dict)
+
+    def retrieval_results(self, names: List[str]) -> List[dict]:
+        # keep the same order as the document store path: tables first, then metrics and views
+        tables = [
+            self.ddls[name]
+            for name in names
+            if name in self.ddls and self.ddls[name]["type"] == "TABLE"
+        ]
+        others = [
+            self.ddls[name]
+            for name in names
+            if name in self.ddls and self.ddls[name]["type"] != "TABLE"
+        ]
+        return tables + others
+
+    def count_tokens(self, encoding: Any, names: List[str]) -> int:
+        tokens = 0
+        for name in names:
+            if (key := (encoding.name, name)) not in self.token_counts:
+                self.token_counts[key] = len(
+                    encoding.encode(self.ddls[name]["table_ddl"])
+                )
+            tokens += self.token_counts[key]
+        return tokens
+
+
+class DbSchemaCache:
+    """
+    An in-process cache of the parsed db schema documents of each project.
+
+    It is filled once the semantics of a project are prepared, so the db schema retrieval
+    only needs the vector search for table names and reads the schemas and DDLs from memory.
+    An entry only serves requests for the MDL hash it is built from, so a request without
+    an MDL hash always reads the document store.
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self._cache: dict[str, DbSchemaCacheEntry] = LRUCache(maxsize=maxsize)
+
+    def put(
+        self,
+        documents: List[Document],
+        project_id: Optional[str] = None,
+        mdl_hash: Optional[str] = None,
+    ) -> DbSchemaCacheEntry:
+        table_schemas = construct_table_schemas(documents)
+        ddls = {}
+        for name, table_schema in table_schemas.items():
+            ddl, has_calculated_field, has_json_field = build_table_ddl(table_schema)
+            ddls[name] = {
+                "type": "TABLE",
+                "table_name": name,
+                "table_ddl": ddl,
+                "has_calculated_field": has_calculated_field,
+                "has_json_field": has_json_field,
+            }
+
+        for document in documents:
+            content = load_ddl_payload(document.content)
+            if content["type"] == "METRIC":
+                ddl = build_metric_ddl(content)
+            elif content["type"] == "VIEW":
+                ddl = build_view_ddl(content)
+            else:
+                continue
+
+            ddls[content["name"]] = {
+                "type": content["type"],
+                "table_name": content["name"],
+                "table_ddl": ddl,
+                "has_calculated_field": False,
+                "has_json_field": False,
+            }
+
+        entry = DbSchemaCacheEntry(
+            mdl_hash=mdl_hash,
+            table_schemas=table_schemas,
+            ddls=ddls,
+        )
+        self._cache[project_id or ""] = entry
+        return entry
+
+    def get(
+        self, project_id: Optional[str] = None, mdl_hash: Optional[str] = None
+    ) -> Optional[DbSchemaCacheEntry]:
+        entry = self._cache.get(project_id or "")
+        if entry is None or mdl_hash is None or entry.mdl_hash != mdl_hash:
+            return None
+        return entry
+
+    def invalidate(self, project_id: Optional[str] = None) -> None:
+        self._cache.pop(project_id or "", None)
+
+
+@dataclass
+class AnswerCacheEntry:
+    embedding: np.ndarray
+    sql: str
+    expires_at: float
+
+
+class AnswerCache:
+    """
+    An in-process cache of the SQL answered for the questions of each deployed MDL.
+
+    Entries are keyed by project id, MDL hash, the ask configurations (language and timezone,
+    serialized by the caller) and the normalized question, and also match questions of the
+    same configurations whose normalized embedding has a cosine similarity of at least
+    `similarity_threshold` with the cached one. Asks without an MDL hash are neither cached
+    nor answered. Entries expire after `ttl` seconds, checked when they are looked up, and
+    the least recently used ones are evicted beyond `maxsize`. Re-deploying a project, or
+    changing its SQL pairs or instructions, invalidates its entries, so a cached SQL is only
+    served against the MDL and the examples it was generated with.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        ttl: int = 86400,  # unit: seconds
+        similarity_threshold: float = 0.98,
+    ):
+        # ordered from the least to the most recently used
+        self._cache: OrderedDict[
+            tuple[str, str, str, str], AnswerCacheEntry
+        ] = OrderedDict()
+        # the keys of each (project id, MDL hash, configurations), so a similarity search
+        # only scans the questions it may match
+        self._scopes: dict[tuple[str, str, str], set[tuple[str, str, str, str]]] = {}
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._similarity_threshold = similarity_threshold
+
+    @staticmethod
+    def _normalize_question(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    @staticmethod
+    def _normalize_embedding(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _delete(self, key: tuple[str, str, str, str]) -> None:
+        del self._cache[key]
+        keys = self._scopes[key[:3]]
+        keys.discard(key)
+        if not keys:
+            del self._scopes[key[:3]]
+
+    def _live(self, key: tuple[str, str, str, str], now: float) -> bool:
+        if self._cache[key].expires_at > now:
+            return True
+        self._delete(key)
+        return False
+
+    def get(
+        self,
+        question: str,
+        embedding: Optional[List[float]],
+        project_id: Optional[str] = None,
+        mdl_hash: Optional[str] = None,
+        configurations: Optional[str] = None,
+    ) -> Optional[str]:
+        if mdl_hash is None:
+            return None
+
+        now = time.monotonic()
+        scope = (project_id or "", mdl_hash, configurations or "")
+        key = (*scope, self._normalize_question(question))
+        if key not in self._cache or not self._live(key, now):
+            if not embedding:
+                return None
+
+            candidates = [
+                candidate
+                for candidate in list(self._scopes.get(scope, ()))
+                if self._live(candidate, now)
+            ]
+            if not candidates:
+                return None
+
+            similarities = np.stack(
+                [self._cache[candidate].embedding for candidate in candidates]
+            ) @ self._normalize_embedding(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self._similarity_threshold:
+                return None
+            key = candidates[best]
+
+        self._cache.move_to_end(key)
+        return self._cache[key].sql
+
+    def put(
+        self,
+        question: str,
+        embedding: Optional[List[float]],
+        sql: str,
+        project_id: Optional[str] = None,
+        mdl_hash: Optional[str] = None,
+        configurations: Optional[str] = None,
+    ) -> None:
+        if not embedding or mdl_hash is None:
+            return
+
+        key = (
+            project_id or "",
+            mdl_hash,
+            configurations or "",
+            self._normalize_question(question),
+        )
+        self._cache[key] = AnswerCacheEntry(
+            embedding=self._normalize_embedding(embedding),
+            sql=sql,
+            expires_at=time.monotonic() + self._ttl,
+        )
+        self._cache.move_to_end(key)
+        self._scopes.setdefault(key[:3], set()).add(key)
+        while len(self._cache) > self._maxsize:
+            self._delete(next(iter(self._cache)))
+
+    def invalidate(self, project_id: Optional[str] = None) -> None:
+        for scope in [
+            scope for scope in self._scopes if scope[0] == (project_id or "")
+        ]:
+            for key in list(self._scopes[scope]):
+                self._delete(key)
+
+
+_metadata_singleflight = Singleflight()
+
+
 async def retrieve_metadata(project_id: str, retriever) -> dict[str, Any]:
+    # concurrent requests of a project share one scroll of the project meta
+    return await _metadata_singleflight.do(
+        canonical_key("retrieve_metadata", project_id, retriever),
+        lambda: _retrieve_metadata(project_id, retriever),
+    )
+
+
+async def _retrieve_metadata(project_id: str, retriever) -> dict[str, Any]:
     filters = None
     if project_id:
         filters = {
@@ -110,3 +443,7 @@ MULTIPLE_NEW_LINE_REGEX = re.compile(r"\n{3,}")
 
 def clean_up_new_lines(text: str) -> str:
     return MULTIPLE_NEW_LINE_REGEX.sub("\n\n\n", text)
+
+
+def query_with_histories(query: str, histories: list) -> str:
+    return "\n".join([history.question for history in histories] + [query])
@@ -2,12 +2,12 @@ import logging
 import sys
 from typing import Any, Dict
 
-import orjson
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from haystack.components.builders.prompt_builder import PromptBuilder
 from langfuse.decorators import observe
 
+from src.core.executor import get_executor
 from src.core.pipeline import BasicPipeline
 from src.core.provider import LLMProvider
 from src.pipelines.common import clean_up_new_lines
@@ -79,10 +79,10 @@ Please think step by step
 
 ## Start of Pipeline
 @observe(capture_input=False)
-def preprocess_data(
+async def preprocess_data(
     data: Dict[str, Any], chart_data_preprocessor: ChartDataPreprocessor
 ) -> dict:
-    return chart_data_preprocessor.run(data)
+    return await get_executor().run_in_thread(chart_data_preprocessor.run, data)
 
 
 @observe(capture_input=False)
@@ -121,15 +121,15 @@ async def generate_chart_adjustment(
 
 
 @observe(capture_input=False)
-def post_process(
+async def post_process(
     generate_chart_adjustment: dict,
-    vega_schema: Dict[str, Any],
     preprocess_data: dict,
     post_processor: ChartGenerationPostProcessor,
 ) -> dict:
-    return post_processor.run(
+    # validating against the Vega-Lite schema would block the event loop
+    return await get_executor().run_in_thread(
+        post_processor.run,
         generate_chart_adjustment.get("replies"),
-        vega_schema,
         preprocess_data["sample_data"],
     )
 
@@ -150,6 +150,7 @@ class ChartAdjustment(BasicPipeline):
     def __init__(
         self,
         llm_provider: LLMProvider,
+        use_chart_models: bool = True,
         **kwargs,
     ):
         self._components = {
@@ -162,15 +163,11 @@ class ChartAdjustment(BasicPipeline):
             ),
             "generator_name": llm_provider.get_model(),
             "chart_data_preprocessor": ChartDataPreprocessor(),
-            "post_processor": ChartGenerationPostProcessor(),
+            "post_processor": ChartGenerationPostProcessor(
+                use_chart_models=use_chart_models
+            ),
         }
 
-        with open("src/pipelines/generation/utils/vega-lite-schema-v5.json", "r") as f:
-            _vega_schema = orjson.loads(f.read())
-
-        self._configs = {
-            "vega_schema": _vega_schema,
-        }
         super().__init__(
             AsyncDriver({}, sys.modules[__name__], result_builder=base.DictResult())
         )
@@ -197,6 +194,5 @@ class ChartAdjustment(BasicPipeline):
                 "data": data,
                 "language": language,
                 **self._components,
-                **self._configs,
             },
         )
@@ -2,13 +2,13 @@ import logging
 import sys
 from typing import Any, Dict, Optional
 
-import orjson
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from haystack.components.builders.prompt_builder import PromptBuilder
 from langfuse.decorators import observe
 
-from src.core.pipeline import BasicPipeline
+from src.core.executor import get_executor
+from src.core.pipeline import BasicPipeline, singleflight
 from src.core.provider import LLMProvider
 from src.pipelines.common import clean_up_new_lines
 from src.pipelines.generation.utils.chart import (
@@ -56,10 +56,10 @@ Please think step by step
 
 ## Start of Pipeline
 @observe(capture_input=False)
-def preprocess_data(
+async def preprocess_data(
     data: Dict[str, Any], chart_data_preprocessor: ChartDataPreprocessor
 ) -> dict:
-    return chart_data_preprocessor.run(data)
+    return await get_executor().run_in_thread(chart_data_preprocessor.run, data)
 
 
 @observe(capture_input=False)
@@ -92,16 +92,16 @@ async def generate_chart(prompt: dict, generator: Any, generator_name: str) -> d
 
 
 @observe(capture_input=False)
-def post_process(
+async def post_process(
     generate_chart: dict,
-    vega_schema: Dict[str, Any],
     remove_data_from_chart_schema: bool,
     preprocess_data: dict,
     post_processor: ChartGenerationPostProcessor,
 ) -> dict:
-    return post_processor.run(
+    # validating against the Vega-Lite schema would block the event loop
+    return await get_executor().run_in_thread(
+        post_processor.run,
         generate_chart.get("replies"),
-        vega_schema,
         preprocess_data["sample_data"],
         remove_data_from_chart_schema,
     )
@@ -123,6 +123,7 @@ class ChartGeneration(BasicPipeline):
     def __init__(
         self,
         llm_provider: LLMProvider,
+        use_chart_models: bool = True,
         **kwargs,
     ):
         self._components = {
@@ -135,14 +136,9 @@ class ChartGeneration(BasicPipeline):
             ),
             "generator_name": llm_provider.get_model(),
             "chart_data_preprocessor": ChartDataPreprocessor(),
-            "post_processor": ChartGenerationPostProcessor(),
-        }
-
-        with open("src/pipelines/generation/utils/vega-lite-schema-v5.json", "r") as f:
-            _vega_schema = orjson.loads(f.read())
-
-        self._configs = {
-            "vega_schema": _vega_schema,
+            "post_processor": ChartGenerationPostProcessor(
+                use_chart_models=use_chart_models
+            ),
         }
 
         super().__init__(
@@ -150,6 +146,7 @@ class ChartGeneration(BasicPipeline):
         )
 
     @observe(name="Chart Generation")
+    @singleflight
     async def run(
         self,
         query: str,
@@ -170,6 +167,5 @@ class ChartGeneration(BasicPipeline):
                 "remove_data_from_chart_schema": remove_data_from_chart_schema,
                 "custom_instruction": custom_instruction or "",
                 **self._components,
-                **self._configs,
             },
         )
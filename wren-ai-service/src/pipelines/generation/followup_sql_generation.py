@@ -1,6 +1,6 @@
 import logging
 import sys
-from typing import Any
+from typing import Any, Literal
 
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
@@ -9,7 +9,11 @@ from langfuse.decorators import observe
 
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
-from src.core.provider import DocumentStoreProvider, LLMProvider
+from src.core.provider import (
+    PROMPT_CACHE_BREAKPOINT,
+    DocumentStoreProvider,
+    LLMProvider,
+)
 from src.pipelines.common import clean_up_new_lines, retrieve_metadata
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
@@ -17,6 +21,7 @@ from src.pipelines.generation.utils.sql import (
     calculated_field_instructions,
     construct_ask_history_messages,
     construct_instructions,
+    generate_sql_candidates,
     json_field_instructions,
     metric_instructions,
     sql_generation_system_prompt,
@@ -28,11 +33,19 @@ from src.web.v1.services.ask import AskHistory
 logger = logging.getLogger("wren-ai-service")
 
 
-text_to_sql_with_followup_user_prompt_template = """
+text_to_sql_with_followup_user_prompt_template = (
+    """
 ### TASK ###
 Given the following user's follow-up question and previous SQL query and summary,
 generate one SQL query to best answer user's question.
 
+{% if sql_functions %}
+### SQL FUNCTIONS ###
+{% for function in sql_functions %}
+{{ function }}
+{% endfor %}
+{% endif %}
+
 ### DATABASE SCHEMA ###
 {% for document in documents %}
     {{ document }}
@@ -49,14 +62,9 @@ generate one SQL query to best answer user's question.
 {% if json_field_instructions %}
 {{ json_field_instructions }}
 {% endif %}
-
-{% if sql_functions %}
-### SQL FUNCTIONS ###
-{% for function in sql_functions %}
-{{ function }}
-{% endfor %}
-{% endif %}
-
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 {% if sql_samples %}
 ### SQL SAMPLES ###
 {% for sample in sql_samples %}
@@ -82,6 +90,7 @@ User's Follow-up Question: {{ query }}
 
 Let's think step by step.
 """
+)
 
 
 ## Start of Pipeline
@@ -119,11 +128,22 @@ def prompt(
 @observe(as_type="generation", capture_input=False)
 @trace_cost
 async def generate_sql_in_followup(
-    prompt: dict, generator: Any, histories: list[AskHistory], generator_name: str
+    prompt: dict,
+    generator: Any,
+    histories: list[AskHistory],
+    generator_name: str,
+    candidates: int = 1,
+    candidate_sampling: str = "n",
+    candidate_temperature: float = 0.7,
 ) -> dict:
     history_messages = construct_ask_history_messages(histories)
-    return await generator(
-        prompt=prompt.get("prompt"), history_messages=history_messages
+    return await generate_sql_candidates(
+        generator,
+        candidates=candidates,
+        sampling=candidate_sampling,
+        temperature=candidate_temperature,
+        prompt=prompt.get("prompt"),
+        history_messages=history_messages,
     ), generator_name
 
 
@@ -133,12 +153,14 @@ async def post_process(
     post_processor: SQLGenPostProcessor,
     data_source: str,
     project_id: str | None = None,
+    mdl_hash: str | None = None,
     use_dry_plan: bool = False,
     allow_dry_plan_fallback: bool = True,
 ) -> dict:
     return await post_processor.run(
         generate_sql_in_followup.get("replies"),
         project_id=project_id,
+        mdl_hash=mdl_hash,
         use_dry_plan=use_dry_plan,
         data_source=data_source,
         allow_dry_plan_fallback=allow_dry_plan_fallback,
@@ -154,6 +176,9 @@ class FollowUpSQLGeneration(BasicPipeline):
         llm_provider: LLMProvider,
         document_store_provider: DocumentStoreProvider,
         engine: Engine,
+        candidates: int = 1,
+        candidate_sampling: Literal["n", "parallel"] = "n",
+        candidate_temperature: float = 0.7,
         **kwargs,
     ):
         self._retriever = document_store_provider.get_retriever(
@@ -170,6 +195,9 @@ class FollowUpSQLGeneration(BasicPipeline):
                 template=text_to_sql_with_followup_user_prompt_template
             ),
             "post_processor": SQLGenPostProcessor(engine=engine),
+            "candidates": candidates,
+            "candidate_sampling": candidate_sampling,
+            "candidate_temperature": candidate_temperature,
         }
 
         super().__init__(
@@ -186,6 +214,7 @@ class FollowUpSQLGeneration(BasicPipeline):
         sql_samples: list[dict] | None = None,
         instructions: list[dict] | None = None,
         project_id: str | None = None,
+        mdl_hash: str | None = None,
         has_calculated_field: bool = False,
         has_metric: bool = False,
         has_json_field: bool = False,
@@ -208,6 +237,7 @@ class FollowUpSQLGeneration(BasicPipeline):
                 "sql_generation_reasoning": sql_generation_reasoning,
                 "histories": histories,
                 "project_id": project_id,
+                "mdl_hash": mdl_hash,
                 "sql_samples": sql_samples,
                 "instructions": instructions,
                 "has_calculated_field": has_calculated_field,
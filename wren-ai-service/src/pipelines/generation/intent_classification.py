@@ -1,4 +1,3 @@
-import ast
 import logging
 import sys
 from typing import Any, Literal, Optional
@@ -13,7 +12,12 @@ from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
-from src.pipelines.common import build_table_ddl, clean_up_new_lines
+from src.pipelines.common import (
+    build_table_ddl,
+    clean_up_new_lines,
+    load_ddl_payload,
+    query_with_histories,
+)
 from src.pipelines.generation.utils.sql import construct_instructions
 from src.utils import trace_cost
 from src.web.v1.services import Configuration
@@ -163,14 +167,16 @@ Let's think step by step
 
 ## Start of Pipeline
 @observe(capture_input=False, capture_output=False)
-async def embedding(query: str, embedder: Any, histories: list[AskHistory]) -> dict:
-    previous_query_summaries = (
-        [history.question for history in histories] if histories else []
-    )
-
-    query = "\n".join(previous_query_summaries) + "\n" + query
+async def embedding(
+    query: str,
+    embedder: Any,
+    histories: list[AskHistory],
+    query_embedding: Optional[list[float]] = None,
+) -> dict:
+    if query_embedding is not None:
+        return {"embedding": query_embedding}
 
-    return await embedder.run(query)
+    return await embedder.run(query_with_histories(query, histories))
 
 
 @observe(capture_input=False)
@@ -202,7 +208,7 @@ async def dbschema_retrieval(
     tables = table_retrieval.get("documents", [])
     table_names = []
     for table in tables:
-        content = ast.literal_eval(table.content)
+        content = load_ddl_payload(table.content)
         table_names.append(content["name"])
 
     logger.info(f"dbschema_retrieval with table_names: {table_names}")
@@ -235,7 +241,7 @@ async def dbschema_retrieval(
 def construct_db_schemas(dbschema_retrieval: list[Document]) -> list[str]:
     db_schemas = {}
     for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
+        content = load_ddl_payload(document.content)
         if content["type"] == "TABLE":
             if document.meta["name"] not in db_schemas:
                 db_schemas[document.meta["name"]] = content
@@ -383,6 +389,7 @@ class IntentClassification(BasicPipeline):
         sql_samples: Optional[list[dict]] = None,
         instructions: Optional[list[dict]] = None,
         configuration: Configuration = Configuration(),
+        query_embedding: Optional[list[float]] = None,
     ):
         logger.info("Intent Classification pipeline is running...")
         return await self._pipe.execute(
@@ -394,6 +401,7 @@ class IntentClassification(BasicPipeline):
                 "sql_samples": sql_samples or [],
                 "instructions": instructions or [],
                 "configuration": configuration,
+                "query_embedding": query_embedding,
                 **self._components,
                 **self._configs,
             },
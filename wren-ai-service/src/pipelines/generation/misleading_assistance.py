@@ -10,6 +10,7 @@ from langfuse.decorators import observe
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import LLMProvider
+from src.core.result_store import InMemoryStreamStore, StreamStore
 from src.pipelines.common import clean_up_new_lines
 from src.utils import trace_cost
 from src.web.v1.services.ask import AskHistory
@@ -93,9 +94,10 @@ class MisleadingAssistance(BasicPipeline):
     def __init__(
         self,
         llm_provider: LLMProvider,
+        stream_store: Optional[StreamStore] = None,
         **kwargs,
     ):
-        self._user_queues = {}
+        self._user_queues = stream_store or InMemoryStreamStore()
         self._components = {
             "generator": llm_provider.get_generator(
                 system_prompt=misleading_assistance_system_prompt,
@@ -112,33 +114,22 @@ class MisleadingAssistance(BasicPipeline):
         )
 
     def _streaming_callback(self, chunk, query_id):
-        if query_id not in self._user_queues:
-            self._user_queues[
-                query_id
-            ] = asyncio.Queue()  # Create a new queue for the user if it doesn't exist
         # Put the chunk content into the user's queue
-        asyncio.create_task(self._user_queues[query_id].put(chunk.content))
+        asyncio.create_task(self._user_queues.put(query_id, chunk.content))
         if chunk.meta.get("finish_reason"):
-            asyncio.create_task(self._user_queues[query_id].put("<DONE>"))
+            asyncio.create_task(self._user_queues.put(query_id, "<DONE>"))
 
     async def get_streaming_results(self, query_id):
-        async def _get_streaming_results(query_id):
-            return await self._user_queues[query_id].get()
-
-        if query_id not in self._user_queues:
-            self._user_queues[
-                query_id
-            ] = asyncio.Queue()  # Ensure the user's queue exists
         while True:
             try:
                 # Wait for an item from the user's queue
-                self._streaming_results = await asyncio.wait_for(
-                    _get_streaming_results(query_id), timeout=120
+                self._streaming_results = await self._user_queues.get(
+                    query_id, timeout=120
                 )
                 if (
                     self._streaming_results == "<DONE>"
                 ):  # Check for end-of-stream signal
-                    del self._user_queues[query_id]
+                    await self._user_queues.delete(query_id)
                     break
                 if self._streaming_results:  # Check if there are results to yield
                     yield self._streaming_results
@@ -10,7 +10,11 @@ from langfuse.decorators import observe
 
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
-from src.core.provider import DocumentStoreProvider, LLMProvider
+from src.core.provider import (
+    PROMPT_CACHE_BREAKPOINT,
+    DocumentStoreProvider,
+    LLMProvider,
+)
 from src.pipelines.common import clean_up_new_lines, retrieve_metadata
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
@@ -46,14 +50,8 @@ The final answer must be in JSON format:
 }}
 """
 
-sql_correction_user_prompt_template = """
-{% if documents %}
-### DATABASE SCHEMA ###
-{% for document in documents %}
-    {{ document }}
-{% endfor %}
-{% endif %}
-
+sql_correction_user_prompt_template = (
+    """
 {% if sql_functions %}
 ### SQL FUNCTIONS ###
 {% for function in sql_functions %}
@@ -61,6 +59,15 @@ sql_correction_user_prompt_template = """
 {% endfor %}
 {% endif %}
 
+{% if documents %}
+### DATABASE SCHEMA ###
+{% for document in documents %}
+    {{ document }}
+{% endfor %}
+{% endif %}
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 {% if instructions %}
 ### USER INSTRUCTIONS ###
 {% for instruction in instructions %}
@@ -74,6 +81,7 @@ Error Message: {{ invalid_generation_result.error }}
 
 Let's think step by step.
 """
+)
 
 
 ## Start of Pipeline
@@ -110,12 +118,14 @@ async def post_process(
     post_processor: SQLGenPostProcessor,
     data_source: str,
     project_id: str | None = None,
+    mdl_hash: str | None = None,
     use_dry_plan: bool = False,
     allow_dry_plan_fallback: bool = True,
 ) -> dict:
     return await post_processor.run(
         generate_sql_correction.get("replies"),
         project_id=project_id,
+        mdl_hash=mdl_hash,
         use_dry_plan=use_dry_plan,
         data_source=data_source,
         allow_dry_plan_fallback=allow_dry_plan_fallback,
@@ -161,6 +171,7 @@ class SQLCorrection(BasicPipeline):
         instructions: list[dict] | None = None,
         sql_functions: list[SqlFunction] | None = None,
         project_id: str | None = None,
+        mdl_hash: str | None = None,
         use_dry_plan: bool = False,
         allow_dry_plan_fallback: bool = True,
     ):
@@ -179,6 +190,7 @@ class SQLCorrection(BasicPipeline):
                 "instructions": instructions,
                 "sql_functions": sql_functions,
                 "project_id": project_id,
+                "mdl_hash": mdl_hash,
                 "use_dry_plan": use_dry_plan,
                 "allow_dry_plan_fallback": allow_dry_plan_fallback,
                 "data_source": metadata.get("data_source", "local_file"),
@@ -11,7 +11,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
-from src.core.provider import LLMProvider
+from src.core.provider import PROMPT_CACHE_BREAKPOINT, LLMProvider
 from src.pipelines.common import clean_up_new_lines
 from src.utils import trace_cost
 
@@ -38,12 +38,15 @@ The final answer must be in JSON format:
 }
 """
 
-sql_diagnosis_user_prompt_template = """
+sql_diagnosis_user_prompt_template = (
+    """
 ### DATABASE SCHEMA ###
 {% for document in documents %}
     {{ document }}
 {% endfor %}
-
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 ### INPUTS ###
 Original SQL:
 {{ original_sql }}
@@ -58,6 +61,7 @@ Language: {{ language }}
 
 Please think step by step.
 """
+)
 
 
 ## Start of Pipeline
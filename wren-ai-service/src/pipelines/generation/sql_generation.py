@@ -1,6 +1,6 @@
 import logging
 import sys
-from typing import Any
+from typing import Any, Literal
 
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
@@ -9,13 +9,18 @@ from langfuse.decorators import observe
 
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
-from src.core.provider import DocumentStoreProvider, LLMProvider
+from src.core.provider import (
+    PROMPT_CACHE_BREAKPOINT,
+    DocumentStoreProvider,
+    LLMProvider,
+)
 from src.pipelines.common import clean_up_new_lines, retrieve_metadata
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
     SQLGenPostProcessor,
     calculated_field_instructions,
     construct_instructions,
+    generate_sql_candidates,
     json_field_instructions,
     metric_instructions,
     sql_generation_system_prompt,
@@ -26,7 +31,15 @@ from src.utils import trace_cost
 logger = logging.getLogger("wren-ai-service")
 
 
-sql_generation_user_prompt_template = """
+sql_generation_user_prompt_template = (
+    """
+{% if sql_functions %}
+### SQL FUNCTIONS ###
+{% for function in sql_functions %}
+{{ function }}
+{% endfor %}
+{% endif %}
+
 ### DATABASE SCHEMA ###
 {% for document in documents %}
     {{ document }}
@@ -43,14 +56,9 @@ sql_generation_user_prompt_template = """
 {% if json_field_instructions %}
 {{ json_field_instructions }}
 {% endif %}
-
-{% if sql_functions %}
-### SQL FUNCTIONS ###
-{% for function in sql_functions %}
-{{ function }}
-{% endfor %}
-{% endif %}
-
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 {% if sql_samples %}
 ### SQL SAMPLES ###
 {% for sample in sql_samples %}
@@ -78,6 +86,7 @@ User's Question: {{ query }}
 
 Let's think step by step.
 """
+)
 
 
 ## Start of Pipeline
@@ -118,8 +127,17 @@ async def generate_sql(
     prompt: dict,
     generator: Any,
     generator_name: str,
+    candidates: int = 1,
+    candidate_sampling: str = "n",
+    candidate_temperature: float = 0.7,
 ) -> dict:
-    return await generator(prompt=prompt.get("prompt")), generator_name
+    return await generate_sql_candidates(
+        generator,
+        candidates=candidates,
+        sampling=candidate_sampling,
+        temperature=candidate_temperature,
+        prompt=prompt.get("prompt"),
+    ), generator_name
 
 
 @observe(capture_input=False)
@@ -128,6 +146,7 @@ async def post_process(
     post_processor: SQLGenPostProcessor,
     data_source: str,
     project_id: str | None = None,
+    mdl_hash: str | None = None,
     use_dry_plan: bool = False,
     allow_dry_plan_fallback: bool = True,
     allow_data_preview: bool = False,
@@ -135,6 +154,7 @@ async def post_process(
     return await post_processor.run(
         generate_sql.get("replies"),
         project_id=project_id,
+        mdl_hash=mdl_hash,
         use_dry_plan=use_dry_plan,
         data_source=data_source,
         allow_dry_plan_fallback=allow_dry_plan_fallback,
@@ -151,6 +171,9 @@ class SQLGeneration(BasicPipeline):
         llm_provider: LLMProvider,
         document_store_provider: DocumentStoreProvider,
         engine: Engine,
+        candidates: int = 1,
+        candidate_sampling: Literal["n", "parallel"] = "n",
+        candidate_temperature: float = 0.7,
         **kwargs,
     ):
         self._retriever = document_store_provider.get_retriever(
@@ -167,6 +190,9 @@ class SQLGeneration(BasicPipeline):
                 template=sql_generation_user_prompt_template
             ),
             "post_processor": SQLGenPostProcessor(engine=engine),
+            "candidates": candidates,
+            "candidate_sampling": candidate_sampling,
+            "candidate_temperature": candidate_temperature,
         }
 
         super().__init__(
@@ -182,6 +208,7 @@ class SQLGeneration(BasicPipeline):
         sql_samples: list[dict] | None = None,
         instructions: list[dict] | None = None,
         project_id: str | None = None,
+        mdl_hash: str | None = None,
         has_calculated_field: bool = False,
         has_metric: bool = False,
         has_json_field: bool = False,
@@ -206,6 +233,7 @@ class SQLGeneration(BasicPipeline):
                 "sql_samples": sql_samples,
                 "instructions": instructions,
                 "project_id": project_id,
+                "mdl_hash": mdl_hash,
                 "has_calculated_field": has_calculated_field,
                 "has_metric": has_metric,
                 "has_json_field": has_json_field,
@@ -9,7 +9,8 @@ from haystack.components.builders.prompt_builder import PromptBuilder
 from langfuse.decorators import observe
 
 from src.core.pipeline import BasicPipeline
-from src.core.provider import LLMProvider
+from src.core.provider import PROMPT_CACHE_BREAKPOINT, LLMProvider
+from src.core.result_store import InMemoryStreamStore, StreamStore
 from src.pipelines.common import clean_up_new_lines
 from src.pipelines.generation.utils.sql import (
     construct_instructions,
@@ -21,12 +22,15 @@ from src.web.v1.services import Configuration
 logger = logging.getLogger("wren-ai-service")
 
 
-sql_generation_reasoning_user_prompt_template = """
+sql_generation_reasoning_user_prompt_template = (
+    """
 ### DATABASE SCHEMA ###
 {% for document in documents %}
     {{ document }}
 {% endfor %}
-
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 {% if sql_samples %}
 ### SQL SAMPLES ###
 {% for sql_sample in sql_samples %}
@@ -51,6 +55,7 @@ Current Time: {{ current_time }}
 
 Let's think step by step.
 """
+)
 
 
 ## Start of Pipeline
@@ -100,9 +105,10 @@ class SQLGenerationReasoning(BasicPipeline):
     def __init__(
         self,
         llm_provider: LLMProvider,
+        stream_store: Optional[StreamStore] = None,
         **kwargs,
     ):
-        self._user_queues = {}
+        self._user_queues = stream_store or InMemoryStreamStore()
         self._components = {
             "generator": llm_provider.get_generator(
                 system_prompt=sql_generation_reasoning_system_prompt,
@@ -119,31 +125,22 @@ class SQLGenerationReasoning(BasicPipeline):
         )
 
     def _streaming_callback(self, chunk, query_id):
-        if query_id not in self._user_queues:
-            self._user_queues[query_id] = asyncio.Queue()
-
         # Put the chunk content into the user's queue
-        asyncio.create_task(self._user_queues[query_id].put(chunk.content))
+        asyncio.create_task(self._user_queues.put(query_id, chunk.content))
         if chunk.meta.get("finish_reason"):
-            asyncio.create_task(self._user_queues[query_id].put("<DONE>"))
+            asyncio.create_task(self._user_queues.put(query_id, "<DONE>"))
 
     async def get_streaming_results(self, query_id):
-        async def _get_streaming_results(query_id):
-            return await self._user_queues[query_id].get()
-
-        if query_id not in self._user_queues:
-            self._user_queues[query_id] = asyncio.Queue()
-
         while True:
             try:
                 # Wait for an item from the user's queue
-                self._streaming_results = await asyncio.wait_for(
-                    _get_streaming_results(query_id), timeout=120
+                self._streaming_results = await self._user_queues.get(
+                    query_id, timeout=120
                 )
                 if (
                     self._streaming_results == "<DONE>"
                 ):  # Check for end-of-stream signal
-                    del self._user_queues[query_id]
+                    await self._user_queues.delete(query_id)
                     break
                 if self._streaming_results:  # Check if there are results to yield
                     yield self._streaming_results
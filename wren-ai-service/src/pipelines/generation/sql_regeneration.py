@@ -9,7 +9,7 @@ from langfuse.decorators import observe
 
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
-from src.core.provider import LLMProvider
+from src.core.provider import PROMPT_CACHE_BREAKPOINT, LLMProvider
 from src.pipelines.common import clean_up_new_lines
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
@@ -43,7 +43,15 @@ The final answer must be a ANSI SQL query in JSON format:
 }}
 """
 
-sql_regeneration_user_prompt_template = """
+sql_regeneration_user_prompt_template = (
+    """
+{% if sql_functions %}
+### SQL FUNCTIONS ###
+{% for function in sql_functions %}
+{{ function }}
+{% endfor %}
+{% endif %}
+
 ### DATABASE SCHEMA ###
 {% for document in documents %}
     {{ document }}
@@ -60,14 +68,9 @@ sql_regeneration_user_prompt_template = """
 {% if json_field_instructions %}
 {{ json_field_instructions }}
 {% endif %}
-
-{% if sql_functions %}
-### SQL FUNCTIONS ###
-{% for function in sql_functions %}
-{{ function }}
-{% endfor %}
-{% endif %}
-
+"""
+    + PROMPT_CACHE_BREAKPOINT
+    + """
 {% if sql_samples %}
 ### SQL SAMPLES ###
 {% for sample in sql_samples %}
@@ -91,6 +94,7 @@ Original SQL query: {{ sql }}
 
 Let's think step by step.
 """
+)
 
 
 ## Start of Pipeline
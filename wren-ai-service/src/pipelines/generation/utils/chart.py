@@ -1,15 +1,20 @@
+import functools
 import logging
+import time
 from typing import Any, Dict, Literal, Optional
 
 import orjson
 import pandas as pd
 from haystack import component
-from jsonschema import validate
 from jsonschema.exceptions import ValidationError
+from jsonschema.validators import validator_for
 from pydantic import BaseModel, Field
+from pydantic import ValidationError as PydanticValidationError
 
 logger = logging.getLogger("wren-ai-service")
 
+VEGA_LITE_SCHEMA_PATH = "src/pipelines/generation/utils/vega-lite-schema-v5.json"
+
 
 chart_generation_instructions = """
 ### INSTRUCTIONS ###
@@ -278,15 +283,84 @@ class ChartDataPreprocessor:
         }
 
 
+class VegaLiteValidator:
+    """
+    Validates chart schemas against the Vega-Lite v5 JSON schema, compiled once.
+
+    Building a validator over the large Vega-Lite schema is the bulk of the cost of
+    `jsonschema.validate`, so the validator is built once and shared by the chart pipelines.
+    With `use_chart_models`, a chart schema is first validated against the model of its
+    chart type, and only one failing that is validated against the full schema. The models
+    ignore the keys they don't declare, so a chart schema with such keys is validated against
+    the full schema as well. The data values are sample rows filled by the post processor, so
+    they're not validated.
+    """
+
+    def __init__(self, schema_path: str = VEGA_LITE_SCHEMA_PATH):
+        with open(schema_path, "r") as f:
+            schema = orjson.loads(f.read())
+
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        self._validator = validator_class(schema)
+
+    def validate(
+        self,
+        chart_schema: Dict[str, Any],
+        chart_type: str = "",
+        use_chart_models: bool = True,
+    ) -> Dict[str, float]:
+        """
+        Raises jsonschema's ValidationError for an invalid chart schema and returns the
+        time spent in each validation stage.
+        """
+        timings = {}  # unit: seconds
+        chart_schema = {**chart_schema, "data": {"values": []}}
+
+        if use_chart_models and (model := CHART_SCHEMA_MODELS.get(chart_type)):
+            start = time.perf_counter()
+            try:
+                chart = model.model_validate(chart_schema)
+                if _declares_all_keys(chart, chart_schema):
+                    return timings
+            except PydanticValidationError:
+                pass
+            finally:
+                timings["chart_model"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            self._validator.validate(chart_schema)
+        finally:
+            timings["vega_lite_schema"] = time.perf_counter() - start
+
+        return timings
+
+
+def _declares_all_keys(chart: BaseModel, chart_schema: Dict[str, Any]) -> bool:
+    # "$schema" and "data" are set by the post processor and validate() respectively
+    given = {k: v for k, v in chart_schema.items() if k not in ("$schema", "data")}
+    return chart.model_dump(by_alias=True, exclude_unset=True) == given
+
+
+@functools.cache
+def get_vega_lite_validator() -> VegaLiteValidator:
+    return VegaLiteValidator()
+
+
 @component
 class ChartGenerationPostProcessor:
+    def __init__(self, use_chart_models: bool = True):
+        self._validator = get_vega_lite_validator()
+        self._use_chart_models = use_chart_models
+
     @component.output_types(
         results=Dict[str, Any],
+        validation_timings=Dict[str, float],
     )
     def run(
         self,
         replies: str,
-        vega_schema: Dict[str, Any],
         sample_data: list[dict],
         remove_data_from_chart_schema: Optional[bool] = True,
     ):
@@ -302,10 +376,11 @@ class ChartGenerationPostProcessor:
                 chart_schema[
                     "$schema"
                 ] = "https://vega.github.io/schema/vega-lite/v5.json"
+                validation_timings = self._validator.validate(
+                    chart_schema, chart_type, self._use_chart_models
+                )
                 chart_schema["data"] = {"values": sample_data}
 
-                validate(chart_schema, schema=vega_schema)
-
                 if remove_data_from_chart_schema:
                     chart_schema["data"]["values"] = []
 
@@ -314,7 +389,8 @@ class ChartGenerationPostProcessor:
                         "chart_schema": chart_schema,
                         "reasoning": reasoning,
                         "chart_type": chart_type,
-                    }
+                    },
+                    "validation_timings": validation_timings,
                 }
 
             return {
@@ -464,6 +540,17 @@ class AreaChartSchema(ChartSchema):
     encoding: AreaChartEncoding
 
 
+CHART_SCHEMA_MODELS: Dict[str, type[ChartSchema]] = {
+    "line": LineChartSchema,
+    "multi_line": MultiLineChartSchema,
+    "bar": BarChartSchema,
+    "grouped_bar": GroupedBarChartSchema,
+    "stacked_bar": StackedBarChartSchema,
+    "pie": PieChartSchema,
+    "area": AreaChartSchema,
+}
+
+
 class ChartGenerationResults(BaseModel):
     reasoning: str
     chart_type: Literal[
@@ -1,7 +1,8 @@
+import asyncio
+import copy
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal
 
-import aiohttp
 import orjson
 from haystack import component
 from haystack.dataclasses import ChatMessage
@@ -11,11 +12,53 @@ from src.core.engine import (
     Engine,
     clean_generation_result,
 )
+from src.core.metrics import SQL_GENERATION_OUTCOMES, current_pipeline
 from src.web.v1.services.ask import AskHistory
 
 logger = logging.getLogger("wren-ai-service")
 
 
+def _parse_sql(reply: str) -> str:
+    sql = clean_generation_result(reply)
+
+    # test if the reply in string format is actually a dictionary with key 'sql'
+    if sql.startswith("{"):
+        sql = orjson.loads(sql)["sql"]
+
+    return sql
+
+
+async def generate_sql_candidates(
+    generator: Any,
+    candidates: int = 1,
+    sampling: Literal["n", "parallel"] = "n",
+    temperature: float = 0.7,
+    **kwargs,
+) -> dict:
+    """
+    Samples `candidates` replies of the generator at `temperature`, with the `n` parameter
+    of one completion, or with parallel completions for the models not supporting it.
+    """
+    if candidates <= 1:
+        return await generator(**kwargs)
+
+    if sampling == "n":
+        return await generator(
+            **kwargs, generation_kwargs={"n": candidates, "temperature": temperature}
+        )
+
+    results = await asyncio.gather(
+        *[
+            generator(**kwargs, generation_kwargs={"temperature": temperature})
+            for _ in range(candidates)
+        ]
+    )
+    return {
+        "replies": [reply for result in results for reply in result["replies"]],
+        "meta": [meta for result in results for meta in result["meta"]],
+    }
+
+
 @component
 class SQLGenPostProcessor:
     def __init__(self, engine: Engine):
@@ -33,27 +76,30 @@ class SQLGenPostProcessor:
         allow_dry_plan_fallback: bool = True,
         data_source: str = "",
         allow_data_preview: bool = False,
+        mdl_hash: str | None = None,
     ) -> dict:
+        validation_kwargs = {
+            "project_id": project_id,
+            "mdl_hash": mdl_hash,
+            "use_dry_plan": use_dry_plan,
+            "allow_dry_plan_fallback": allow_dry_plan_fallback,
+            "data_source": data_source,
+            "allow_data_preview": allow_data_preview,
+        }
+
         try:
-            cleaned_generation_result = clean_generation_result(replies[0])
-
-            # test if cleaned_generation_result in string format is actually a dictionary with key 'sql'
-            if cleaned_generation_result.startswith("{"):
-                cleaned_generation_result = orjson.loads(cleaned_generation_result)[
-                    "sql"
-                ]
-
-            (
-                valid_generation_result,
-                invalid_generation_result,
-            ) = await self._classify_generation_result(
-                cleaned_generation_result,
-                project_id=project_id,
-                use_dry_plan=use_dry_plan,
-                allow_dry_plan_fallback=allow_dry_plan_fallback,
-                data_source=data_source,
-                allow_data_preview=allow_data_preview,
-            )
+            if len(replies) > 1:
+                (
+                    valid_generation_result,
+                    invalid_generation_result,
+                ) = await self._classify_candidates(replies, **validation_kwargs)
+            else:
+                (
+                    valid_generation_result,
+                    invalid_generation_result,
+                ) = await self._classify_generation_result(
+                    _parse_sql(replies[0]), **validation_kwargs
+                )
 
             return {
                 "valid_generation_result": valid_generation_result,
@@ -67,6 +113,62 @@ class SQLGenPostProcessor:
                 "invalid_generation_result": {},
             }
 
+    async def _classify_candidates(
+        self, replies: List[str], **validation_kwargs
+    ) -> Dict[str, str]:
+        """
+        Validates the distinct SQL candidates concurrently and returns the outcome of the
+        first valid one, cancelling the others. When none is valid, returns the outcome of
+        the first candidate, so the correction starts from it as with a single reply.
+        """
+        candidates = []
+        for reply in replies:
+            try:
+                candidates.append(_parse_sql(reply))
+            except Exception as e:
+                logger.warning(f"Skipping an unparsable SQL candidate: {e}")
+        candidates = list(dict.fromkeys(candidates))
+        if not candidates:
+            raise ValueError("None of the SQL candidates could be parsed")
+
+        async def _classify(candidate: str) -> Dict[str, str]:
+            try:
+                return await self._classify_generation_result(
+                    candidate, **validation_kwargs
+                )
+            except Exception as e:
+                logger.warning(f"Failed to validate an SQL candidate: {e}")
+                return {}, {}
+
+        pipeline = current_pipeline.get()
+        tasks = [asyncio.create_task(_classify(candidate)) for candidate in candidates]
+        pending = set(tasks)
+        failed = 0
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # of the candidates finishing together, the earlier ranked one wins
+                for task in sorted(done, key=tasks.index):
+                    if task.result()[0]:
+                        # a candidate failing before the winner would have needed the
+                        # correction loop on its own
+                        SQL_GENERATION_OUTCOMES.inc(
+                            pipeline=pipeline, outcome="rescued" if failed else "valid"
+                        )
+                        return task.result()
+                    failed += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+        SQL_GENERATION_OUTCOMES.inc(pipeline=pipeline, outcome="all_invalid")
+        return next(
+            (outcome for outcome in (task.result() for task in tasks) if outcome[1]),
+            tasks[0].result(),
+        )
+
     async def _classify_generation_result(
         self,
         generation_result: str,
@@ -75,89 +177,137 @@ class SQLGenPostProcessor:
         allow_dry_plan_fallback: bool = True,
         data_source: str = "",
         allow_data_preview: bool = False,
+        mdl_hash: str | None = None,
+    ) -> Dict[str, str]:
+        # a data preview depends on the data rather than the SQL, so it's never cached
+        if not use_dry_plan and allow_data_preview:
+            return await self._validate_generation_result(
+                generation_result,
+                project_id=project_id,
+                use_dry_plan=use_dry_plan,
+                allow_dry_plan_fallback=allow_dry_plan_fallback,
+                data_source=data_source,
+                allow_data_preview=allow_data_preview,
+            )
+
+        validation_cache = self._engine.get_validation_cache()
+        key = validation_cache.key(
+            generation_result,
+            project_id=project_id,
+            mdl_hash=mdl_hash,
+            data_source=data_source,
+            mode=(
+                f"dry_plan:{'fallback' if allow_dry_plan_fallback else 'no_fallback'}"
+                if use_dry_plan
+                else "dry_run"
+            ),
+        )
+        if (outcome := validation_cache.get(key)) is not None:
+            return copy.deepcopy(outcome)
+
+        outcome = await self._validate_generation_result(
+            generation_result,
+            project_id=project_id,
+            use_dry_plan=use_dry_plan,
+            allow_dry_plan_fallback=allow_dry_plan_fallback,
+            data_source=data_source,
+            allow_data_preview=allow_data_preview,
+        )
+        _, invalid_generation_result = outcome
+        if invalid_generation_result.get("type") != "TIME_OUT":
+            validation_cache.put(key, copy.deepcopy(outcome))
+
+        return outcome
+
+    async def _validate_generation_result(
+        self,
+        generation_result: str,
+        project_id: str | None = None,
+        use_dry_plan: bool = False,
+        allow_dry_plan_fallback: bool = True,
+        data_source: str = "",
+        allow_data_preview: bool = False,
     ) -> Dict[str, str]:
         valid_generation_result = {}
         invalid_generation_result = {}
         use_dry_run = not allow_data_preview
 
-        async with aiohttp.ClientSession() as session:
-            if use_dry_plan:
-                dry_plan_result, error_message = await self._engine.dry_plan(
-                    session,
-                    generation_result,
-                    data_source,
-                    allow_fallback=allow_dry_plan_fallback,
-                )
+        session = self._engine.get_session()
+        if use_dry_plan:
+            dry_plan_result, error_message = await self._engine.dry_plan(
+                session,
+                generation_result,
+                data_source,
+                allow_fallback=allow_dry_plan_fallback,
+            )
 
-                if dry_plan_result:
-                    valid_generation_result = {
-                        "sql": generation_result,
-                        "correlation_id": "",
-                    }
-                else:
-                    invalid_generation_result = {
-                        "sql": generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else "DRY_PLAN",
-                        "error": error_message,
-                        "correlation_id": "",
-                    }
-            elif use_dry_run:
-                success, _, addition = await self._engine.execute_sql(
-                    generation_result,
-                    session,
-                    project_id=project_id,
-                    limit=1,
-                    dry_run=True,
-                )
+            if dry_plan_result:
+                valid_generation_result = {
+                    "sql": generation_result,
+                    "correlation_id": "",
+                }
+            else:
+                invalid_generation_result = {
+                    "sql": generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else "DRY_PLAN",
+                    "error": error_message,
+                    "correlation_id": "",
+                }
+        elif use_dry_run:
+            success, _, addition = await self._engine.execute_sql(
+                generation_result,
+                session,
+                project_id=project_id,
+                limit=1,
+                dry_run=True,
+            )
 
-                if success:
-                    valid_generation_result = {
-                        "sql": generation_result,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
-                else:
-                    error_message = addition.get("error_message", "")
-                    invalid_generation_result = {
-                        "sql": addition.get("error_sql", generation_result),
-                        "original_sql": generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else "DRY_RUN",
-                        "error": error_message,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
+            if success:
+                valid_generation_result = {
+                    "sql": generation_result,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
             else:
-                has_data, _, addition = await self._engine.execute_sql(
-                    generation_result,
-                    session,
-                    project_id=project_id,
-                    limit=1,
-                    dry_run=False,
-                )
+                error_message = addition.get("error_message", "")
+                invalid_generation_result = {
+                    "sql": addition.get("error_sql", generation_result),
+                    "original_sql": generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else "DRY_RUN",
+                    "error": error_message,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
+        else:
+            has_data, _, addition = await self._engine.execute_sql(
+                generation_result,
+                session,
+                project_id=project_id,
+                limit=1,
+                dry_run=False,
+            )
 
-                if has_data:
-                    valid_generation_result = {
-                        "sql": generation_result,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
-                else:
-                    error_message = addition.get("error_message", "")
-                    preview_data_status = (
-                        "PREVIEW_EMPTY_DATA"
-                        if error_message == ""
-                        else "PREVIEW_FAILED"
-                    )
-                    invalid_generation_result = {
-                        "sql": addition.get("error_sql", generation_result),
-                        "original_sql": generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else preview_data_status,
-                        "error": error_message,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
+            if has_data:
+                valid_generation_result = {
+                    "sql": generation_result,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
+            else:
+                error_message = addition.get("error_message", "")
+                preview_data_status = (
+                    "PREVIEW_EMPTY_DATA" if error_message == "" else "PREVIEW_FAILED"
+                )
+                invalid_generation_result = {
+                    "sql": addition.get("error_sql", generation_result),
+                    "original_sql": generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else preview_data_status,
+                    "error": error_message,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
 
         return valid_generation_result, invalid_generation_result
 
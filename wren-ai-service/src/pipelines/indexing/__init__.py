@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import json
 import logging
 import re
@@ -12,10 +13,28 @@ from haystack.document_stores.types import DocumentStore, DuplicatePolicy
 logger = logging.getLogger("wren-ai-service")
 
 
+def content_hash_id(
+    content: str, meta: Dict[str, Any], embedding_model: Optional[str] = None
+) -> str:
+    """
+    A deterministic document id, an unchanged chunk gets the same id every time it's indexed.
+    The project id is part of the meta, so the same chunk in two projects gets different ids,
+    and the embedding model is hashed too, so the chunks are embedded again after a switch
+    to another model, even one of the same dimension.
+    """
+    return hashlib.sha256(
+        orjson.dumps(
+            {"content": content, "meta": meta, "embedding_model": embedding_model},
+            option=orjson.OPT_SORT_KEYS,
+        )
+    ).hexdigest()
+
+
 @component
 class DocumentCleaner:
     """
     This component is used to clear all the documents in the specified document store(s).
+    If document_ids is given, only these documents are deleted.
 
     """
 
@@ -23,13 +42,28 @@ class DocumentCleaner:
         self._stores = stores
 
     @component.output_types()
-    async def run(self, project_id: Optional[str] = None) -> None:
+    async def run(
+        self,
+        project_id: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+    ) -> None:
         async def _clear_documents(
             store: DocumentStore, project_id: Optional[str] = None
         ) -> None:
             store_name = (
                 store.to_dict().get("init_parameters", {}).get("index", "unknown")
             )
+
+            if document_ids is not None:
+                if not document_ids:
+                    return
+
+                logger.info(
+                    f"Project ID: {project_id}, Deleting {len(document_ids)} stale documents in {store_name}"
+                )
+                await store.delete_documents_by_ids(document_ids)
+                return
+
             logger.info(f"Project ID: {project_id}, Cleaning documents in {store_name}")
             filters = (
                 {
@@ -48,6 +82,51 @@ class DocumentCleaner:
         )
 
 
+@component
+class DocumentDiffer:
+    """
+    Compares the chunked documents with the documents already stored for the project.
+
+    Chunk ids are content hashes (see content_hash_id), so a chunk whose id is already stored
+    is unchanged, and embedded by the same model, and is neither embedded nor written again. Stored ids that are no longer
+    produced by the MDL are returned as stale so they can be deleted.
+    """
+
+    def __init__(self, store: DocumentStore) -> None:
+        self._store = store
+
+    @component.output_types(
+        documents=List[Document], stale_ids=List[str], documents_reused=int
+    )
+    async def run(
+        self, documents: List[Document], project_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        filters = (
+            {
+                "operator": "AND",
+                "conditions": [
+                    {"field": "project_id", "operator": "==", "value": project_id},
+                ],
+            }
+            if project_id
+            else None
+        )
+        stored_ids = set(await self._store.get_document_ids(filters))
+        document_ids = {document.id for document in documents}
+
+        return {
+            "documents": [
+                document for document in documents if document.id not in stored_ids
+            ],
+            "stale_ids": [
+                document_id
+                for document_id in stored_ids
+                if document_id not in document_ids
+            ],
+            "documents_reused": len(document_ids & stored_ids),
+        }
+
+
 @component
 class MDLValidator:
     """
@@ -1,7 +1,6 @@
 import asyncio
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
 from hamilton import base
@@ -15,11 +14,18 @@ from tqdm import tqdm
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
+from src.pipelines.common import (
+    DDL_PAYLOAD_VERSION,
+    DbSchemaCache,
+    dump_ddl_payload,
+)
 from src.pipelines.indexing import (
     AsyncDocumentWriter,
     DocumentCleaner,
+    DocumentDiffer,
     MDLValidator,
     clean_display_name,
+    content_hash_id,
 )
 from src.pipelines.indexing.utils import helper
 
@@ -28,6 +34,10 @@ logger = logging.getLogger("wren-ai-service")
 
 @component
 class DDLChunker:
+    def __init__(self, embedding_model: Optional[str] = None) -> None:
+        # the model embedding the documents, part of their ids
+        self._embedding_model = embedding_model
+
     @component.output_types(documents=List[Document])
     async def run(
         self,
@@ -40,10 +50,10 @@ class DDLChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "meta": {
                     "type": "TABLE_SCHEMA",
                     "name": chunk["name"],
+                    "payload_version": DDL_PAYLOAD_VERSION,
                     **_additional_meta(),
                 },
                 "content": chunk["payload"],
@@ -55,7 +65,12 @@ class DDLChunker:
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(
+                    id=content_hash_id(
+                        chunk["content"], chunk["meta"], self._embedding_model
+                    ),
+                    **chunk,
+                )
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking DDL commands into documents",
@@ -144,7 +159,7 @@ class DDLChunker:
                 "comment": comment,
                 "name": table_name,
             }
-            return {"name": table_name, "payload": str(payload)}
+            return {"name": table_name, "payload": dump_ddl_payload(payload)}
 
         def _column_command(column: Dict[str, Any], model: Dict[str, Any]) -> dict:
             if column.get("relationship"):
@@ -213,7 +228,7 @@ class DDLChunker:
             return [
                 {
                     "name": model["name"],
-                    "payload": str(
+                    "payload": dump_ddl_payload(
                         {
                             "type": "TABLE_COLUMNS",
                             "columns": filtered[i : i + column_batch_size],
@@ -245,7 +260,8 @@ class DDLChunker:
             }
 
         return [
-            {"name": view["name"], "payload": str(_payload(view))} for view in views
+            {"name": view["name"], "payload": dump_ddl_payload(_payload(view))}
+            for view in views
         ]
 
     def _convert_metrics(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, str]]:
@@ -286,7 +302,7 @@ class DDLChunker:
             }
 
         return [
-            {"name": metric["name"], "payload": str(_payload(metric))}
+            {"name": metric["name"], "payload": dump_ddl_payload(_payload(metric))}
             for metric in metrics
         ]
 
@@ -314,8 +330,17 @@ async def chunk(
 
 
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
+@observe(capture_input=False, capture_output=False)
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return {**diff, **await embedder.run(documents=diff["documents"])}
 
 
 @observe(capture_input=False, capture_output=False)
@@ -324,13 +349,18 @@ async def clean(
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
+    await cleaner.run(project_id=project_id, document_ids=embedding.get("stale_ids"))
     return embedding
 
 
 @observe(capture_input=False)
-async def write(clean: Dict[str, Any], writer: DocumentWriter) -> None:
-    return await writer.run(documents=clean["documents"])
+async def write(clean: Dict[str, Any], writer: DocumentWriter) -> Dict[str, Any]:
+    result = await writer.run(documents=clean["documents"])
+    return {
+        **result,
+        "documents_reused": clean.get("documents_reused", 0),
+        "documents_deleted": len(clean.get("stale_ids") or []),
+    }
 
 
 ## End of Pipeline
@@ -342,15 +372,18 @@ class DBSchema(BasicPipeline):
         embedder_provider: EmbedderProvider,
         document_store_provider: DocumentStoreProvider,
         column_batch_size: int = 50,
+        db_schema_cache: Optional[DbSchemaCache] = None,
         **kwargs,
     ) -> None:
         dbschema_store = document_store_provider.get_store()
+        self._db_schema_cache = db_schema_cache
 
         self._components = {
             "cleaner": DocumentCleaner([dbschema_store]),
+            "differ": DocumentDiffer(dbschema_store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
-            "chunker": DDLChunker(),
+            "chunker": DDLChunker(embedding_model=embedder_provider.get_model()),
             "writer": AsyncDocumentWriter(
                 document_store=dbschema_store,
                 policy=DuplicatePolicy.OVERWRITE,
@@ -368,13 +401,16 @@ class DBSchema(BasicPipeline):
 
     @observe(name="DB Schema Indexing")
     async def run(
-        self, mdl_str: str, project_id: Optional[str] = None
+        self,
+        mdl_str: str,
+        project_id: Optional[str] = None,
+        mdl_hash: Optional[str] = None,
     ) -> Dict[str, Any]:
         logger.info(
             f"Project ID: {project_id}, DB Schema Indexing pipeline is running..."
         )
-        return await self._pipe.execute(
-            [self._final],
+        result = await self._pipe.execute(
+            [self._final, "chunk"],
             inputs={
                 "mdl_str": mdl_str,
                 "project_id": project_id,
@@ -383,8 +419,20 @@ class DBSchema(BasicPipeline):
             },
         )
 
+        if self._db_schema_cache is not None:
+            self._db_schema_cache.put(
+                result["chunk"]["documents"],
+                project_id=project_id,
+                mdl_hash=mdl_hash,
+            )
+
+        return {self._final: result[self._final]}
+
     @observe(name="Clean Documents for DB Schema")
     async def clean(self, project_id: Optional[str] = None) -> None:
+        if self._db_schema_cache is not None:
+            self._db_schema_cache.invalidate(project_id)
+
         await clean(
             embedding={"documents": []},
             cleaner=self._components["cleaner"],
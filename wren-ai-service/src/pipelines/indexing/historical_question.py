@@ -1,6 +1,5 @@
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
 from hamilton import base
@@ -14,7 +13,13 @@ from tqdm import tqdm
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.indexing import AsyncDocumentWriter, DocumentCleaner, MDLValidator
+from src.pipelines.indexing import (
+    AsyncDocumentWriter,
+    DocumentCleaner,
+    DocumentDiffer,
+    MDLValidator,
+    content_hash_id,
+)
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -52,6 +57,10 @@ class ViewChunker:
     The Documents are then stored in the document store for later retrieval.
     """
 
+    def __init__(self, embedding_model: Optional[str] = None) -> None:
+        # the model embedding the documents, part of their ids
+        self._embedding_model = embedding_model
+
     @component.output_types(documents=List[Document])
     def run(self, mdl: Dict[str, Any], project_id: Optional[str] = None) -> None:
         def _get_content(view: Dict[str, Any]) -> str:
@@ -74,7 +83,6 @@ class ViewChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "content": _get_content(view),
                 "meta": {**_get_meta(view), **_additional_meta()},
             }
@@ -83,7 +91,12 @@ class ViewChunker:
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(
+                    id=content_hash_id(
+                        chunk["content"], chunk["meta"], self._embedding_model
+                    ),
+                    **chunk,
+                )
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking views into documents",
@@ -110,8 +123,17 @@ def chunk(
 
 
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
+@observe(capture_input=False, capture_output=False)
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return {**diff, **await embedder.run(documents=diff["documents"])}
 
 
 @observe(capture_input=False, capture_output=False)
@@ -120,13 +142,18 @@ async def clean(
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
+    await cleaner.run(project_id=project_id, document_ids=embedding.get("stale_ids"))
     return embedding
 
 
 @observe(capture_input=False)
-async def write(clean: Dict[str, Any], writer: DocumentWriter) -> None:
-    return await writer.run(documents=clean["documents"])
+async def write(clean: Dict[str, Any], writer: DocumentWriter) -> Dict[str, Any]:
+    result = await writer.run(documents=clean["documents"])
+    return {
+        **result,
+        "documents_reused": clean.get("documents_reused", 0),
+        "documents_deleted": len(clean.get("stale_ids") or []),
+    }
 
 
 ## End of Pipeline
@@ -144,9 +171,10 @@ class HistoricalQuestion(BasicPipeline):
 
         self._components = {
             "cleaner": DocumentCleaner([store]),
+            "differ": DocumentDiffer(store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
-            "chunker": ViewChunker(),
+            "chunker": ViewChunker(embedding_model=embedder_provider.get_model()),
             "writer": AsyncDocumentWriter(
                 document_store=store,
                 policy=DuplicatePolicy.OVERWRITE,
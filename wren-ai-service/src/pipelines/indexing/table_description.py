@@ -1,6 +1,5 @@
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
 from hamilton import base
@@ -14,13 +13,24 @@ from tqdm import tqdm
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.indexing import AsyncDocumentWriter, DocumentCleaner, MDLValidator
+from src.pipelines.common import dump_ddl_payload
+from src.pipelines.indexing import (
+    AsyncDocumentWriter,
+    DocumentCleaner,
+    DocumentDiffer,
+    MDLValidator,
+    content_hash_id,
+)
 
 logger = logging.getLogger("wren-ai-service")
 
 
 @component
 class TableDescriptionChunker:
+    def __init__(self, embedding_model: Optional[str] = None) -> None:
+        # the model embedding the documents, part of their ids
+        self._embedding_model = embedding_model
+
     @component.output_types(documents=List[Document])
     def run(self, mdl: Dict[str, Any], project_id: Optional[str] = None):
         def _additional_meta() -> Dict[str, Any]:
@@ -28,20 +38,24 @@ class TableDescriptionChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "meta": {
                     "type": "TABLE_DESCRIPTION",
                     "name": chunk["name"],
                     **_additional_meta(),
                 },
-                "content": str(chunk),
+                "content": dump_ddl_payload(chunk),
             }
             for chunk in self._get_table_descriptions(mdl)
         ]
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(
+                    id=content_hash_id(
+                        chunk["content"], chunk["meta"], self._embedding_model
+                    ),
+                    **chunk,
+                )
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking table descriptions into documents",
@@ -93,8 +107,17 @@ def chunk(
 
 
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
+@observe(capture_input=False, capture_output=False)
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return {**diff, **await embedder.run(documents=diff["documents"])}
 
 
 @observe(capture_input=False, capture_output=False)
@@ -103,13 +126,18 @@ async def clean(
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
+    await cleaner.run(project_id=project_id, document_ids=embedding.get("stale_ids"))
     return embedding
 
 
 @observe(capture_input=False)
-async def write(clean: Dict[str, Any], writer: DocumentWriter) -> None:
-    return await writer.run(documents=clean["documents"])
+async def write(clean: Dict[str, Any], writer: DocumentWriter) -> Dict[str, Any]:
+    result = await writer.run(documents=clean["documents"])
+    return {
+        **result,
+        "documents_reused": clean.get("documents_reused", 0),
+        "documents_deleted": len(clean.get("stale_ids") or []),
+    }
 
 
 ## End of Pipeline
@@ -128,9 +156,12 @@ class TableDescription(BasicPipeline):
 
         self._components = {
             "cleaner": DocumentCleaner([table_description_store]),
+            "differ": DocumentDiffer(table_description_store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
-            "chunker": TableDescriptionChunker(),
+            "chunker": TableDescriptionChunker(
+                embedding_model=embedder_provider.get_model()
+            ),
             "writer": AsyncDocumentWriter(
                 document_store=table_description_store,
                 policy=DuplicatePolicy.OVERWRITE,
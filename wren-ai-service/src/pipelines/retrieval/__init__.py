@@ -2,6 +2,7 @@ from .db_schema_retrieval import DbSchemaRetrieval
 from .historical_question_retrieval import HistoricalQuestionRetrieval
 from .instructions import Instructions
 from .preprocess_sql_data import PreprocessSqlData
+from .query_embedding import QueryEmbedding
 from .sql_executor import SQLExecutor
 from .sql_functions import SqlFunctions
 from .sql_pairs_retrieval import SqlPairsRetrieval
@@ -14,4 +15,5 @@ __all__ = [
     "SqlPairsRetrieval",
     "Instructions",
     "SqlFunctions",
+    "QueryEmbedding",
 ]
@@ -1,4 +1,3 @@
-import ast
 import logging
 import sys
 from typing import Any, Optional
@@ -12,12 +11,19 @@ from haystack.components.builders.prompt_builder import PromptBuilder
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
-from src.core.pipeline import BasicPipeline
+from src.core.executor import get_executor
+from src.core.pipeline import BasicPipeline, singleflight
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
 from src.pipelines.common import (
+    DbSchemaCache,
+    DbSchemaCacheEntry,
+    build_metric_ddl,
     build_table_ddl,
+    build_view_ddl,
     clean_up_new_lines,
-    get_engine_supported_data_type,
+    construct_table_schemas,
+    load_ddl_payload,
+    query_with_histories,
 )
 from src.utils import trace_cost
 from src.web.v1.services.ask import AskHistory
@@ -99,39 +105,19 @@ table_columns_selection_user_prompt_template = """
 """
 
 
-def _build_metric_ddl(content: dict) -> str:
-    columns_ddl = [
-        f"{column['comment']}{column['name']} {get_engine_supported_data_type(column['data_type'])}"
-        for column in content["columns"]
-        if column["data_type"].lower()
-        != "unknown"  # quick fix: filtering out UNKNOWN column type
-    ]
-
-    return (
-        f"{content['comment']}CREATE TABLE {content['name']} (\n  "
-        + ",\n  ".join(columns_ddl)
-        + "\n);"
-    )
-
-
-def _build_view_ddl(content: dict) -> str:
-    return (
-        f"{content['comment']}CREATE VIEW {content['name']}\nAS {content['statement']}"
-    )
-
-
 ## Start of Pipeline
 @observe(capture_input=False, capture_output=False)
-async def embedding(query: str, embedder: Any, histories: list[AskHistory]) -> dict:
+async def embedding(
+    query: str,
+    embedder: Any,
+    histories: list[AskHistory],
+    query_embedding: Optional[list[float]] = None,
+) -> dict:
     if query:
-        if histories:
-            previous_query_summaries = [history.question for history in histories]
-        else:
-            previous_query_summaries = []
+        if query_embedding is not None:
+            return {"embedding": query_embedding}
 
-        query = "\n".join(previous_query_summaries) + "\n" + query
-
-        return await embedder.run(query)
+        return await embedder.run(query_with_histories(query, histories))
     else:
         return {}
 
@@ -168,15 +154,34 @@ async def table_retrieval(
         )
 
 
+@observe(capture_input=False)
+def cached_db_schema(
+    project_id: str, mdl_hash: Optional[str], db_schema_cache: Any
+) -> Optional[DbSchemaCacheEntry]:
+    if db_schema_cache is None:
+        return None
+
+    return db_schema_cache.get(project_id=project_id, mdl_hash=mdl_hash)
+
+
+@observe(capture_input=False)
+def table_names(table_retrieval: dict) -> list[str]:
+    return [
+        load_ddl_payload(table.content)["name"]
+        for table in table_retrieval.get("documents", [])
+    ]
+
+
 @observe(capture_input=False)
 async def dbschema_retrieval(
-    table_retrieval: dict, project_id: str, dbschema_retriever: Any
+    table_names: list[str],
+    project_id: str,
+    dbschema_retriever: Any,
+    cached_db_schema: Optional[DbSchemaCacheEntry],
 ) -> list[Document]:
-    tables = table_retrieval.get("documents", [])
-    table_names = []
-    for table in tables:
-        content = ast.literal_eval(table.content)
-        table_names.append(content["name"])
+    # the schemas are read from memory, no need to scroll the document store
+    if cached_db_schema is not None:
+        return []
 
     table_name_conditions = [
         {"field": "name", "operator": "==", "value": table_name}
@@ -204,37 +209,30 @@ async def dbschema_retrieval(
 
 
 @observe()
-def construct_db_schemas(dbschema_retrieval: list[Document]) -> list[dict]:
-    db_schemas = {}
-    for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
-        if content["type"] == "TABLE":
-            if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = content
-            else:
-                db_schemas[document.meta["name"]] = {
-                    **content,
-                    "columns": db_schemas[document.meta["name"]].get("columns", []),
-                }
-        elif content["type"] == "TABLE_COLUMNS":
-            if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = {"columns": content["columns"]}
-            else:
-                if "columns" not in db_schemas[document.meta["name"]]:
-                    db_schemas[document.meta["name"]]["columns"] = content["columns"]
-                else:
-                    db_schemas[document.meta["name"]]["columns"] += content["columns"]
-
-    # remove incomplete schemas
-    db_schemas = {k: v for k, v in db_schemas.items() if "type" in v and "columns" in v}
+async def construct_db_schemas(
+    dbschema_retrieval: list[Document],
+    table_names: list[str],
+    cached_db_schema: Optional[DbSchemaCacheEntry],
+) -> list[dict]:
+    if cached_db_schema is not None:
+        return [
+            cached_db_schema.table_schemas[table_name]
+            for table_name in table_names
+            if table_name in cached_db_schema.table_schemas
+        ]
 
-    return list(db_schemas.values())
+    # parsing the chunks is pure Python, it can run in a worker process
+    table_schemas = await get_executor().run_in_process(
+        construct_table_schemas, dbschema_retrieval
+    )
+    return list(table_schemas.values())
 
 
-@observe(capture_input=False)
-def check_using_db_schemas_without_pruning(
+def _check_using_db_schemas_without_pruning(
     construct_db_schemas: list[dict],
     dbschema_retrieval: list[Document],
+    table_names: list[str],
+    cached_db_schema: Optional[DbSchemaCacheEntry],
     encoding: tiktoken.Encoding,
     enable_column_pruning: bool,
     context_window_size: int,
@@ -244,6 +242,38 @@ def check_using_db_schemas_without_pruning(
     has_metric = False
     has_json_field = False
 
+    if cached_db_schema is not None:
+        cached_results = cached_db_schema.retrieval_results(table_names)
+        for cached_result in cached_results:
+            retrieval_results.append(
+                {
+                    "table_name": cached_result["table_name"],
+                    "table_ddl": cached_result["table_ddl"],
+                }
+            )
+            if cached_result["has_calculated_field"]:
+                has_calculated_field = True
+            if cached_result["has_json_field"]:
+                has_json_field = True
+            if cached_result["type"] == "METRIC":
+                has_metric = True
+
+        _token_count = cached_db_schema.count_tokens(
+            encoding,
+            [cached_result["table_name"] for cached_result in cached_results],
+        )
+        return {
+            "db_schemas": (
+                []
+                if _token_count > context_window_size or enable_column_pruning
+                else retrieval_results
+            ),
+            "tokens": _token_count,
+            "has_calculated_field": has_calculated_field,
+            "has_metric": has_metric,
+            "has_json_field": has_json_field,
+        }
+
     for table_schema in construct_db_schemas:
         if table_schema["type"] == "TABLE":
             ddl, _has_calculated_field, _has_json_field = build_table_ddl(table_schema)
@@ -259,13 +289,13 @@ def check_using_db_schemas_without_pruning(
                 has_json_field = True
 
     for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
+        content = load_ddl_payload(document.content)
 
         if content["type"] == "METRIC":
             retrieval_results.append(
                 {
                     "table_name": content["name"],
-                    "table_ddl": _build_metric_ddl(content),
+                    "table_ddl": build_metric_ddl(content),
                 }
             )
             has_metric = True
@@ -273,7 +303,7 @@ def check_using_db_schemas_without_pruning(
             retrieval_results.append(
                 {
                     "table_name": content["name"],
-                    "table_ddl": _build_view_ddl(content),
+                    "table_ddl": build_view_ddl(content),
                 }
             )
 
@@ -299,6 +329,29 @@ def check_using_db_schemas_without_pruning(
     }
 
 
+@observe(capture_input=False)
+async def check_using_db_schemas_without_pruning(
+    construct_db_schemas: list[dict],
+    dbschema_retrieval: list[Document],
+    table_names: list[str],
+    cached_db_schema: Optional[DbSchemaCacheEntry],
+    encoding: tiktoken.Encoding,
+    enable_column_pruning: bool,
+    context_window_size: int,
+) -> dict:
+    # building the DDLs and counting their tokens would block the event loop
+    return await get_executor().run_in_thread(
+        _check_using_db_schemas_without_pruning,
+        construct_db_schemas,
+        dbschema_retrieval,
+        table_names,
+        cached_db_schema,
+        encoding,
+        enable_column_pruning,
+        context_window_size,
+    )
+
+
 @observe(capture_input=False)
 def prompt(
     query: str,
@@ -344,6 +397,7 @@ def construct_retrieval_results(
     filter_columns_in_tables: dict,
     construct_db_schemas: list[dict],
     dbschema_retrieval: list[Document],
+    cached_db_schema: Optional[DbSchemaCacheEntry],
 ) -> dict[str, Any]:
     if filter_columns_in_tables:
         columns_and_tables_needed = orjson.loads(
@@ -383,15 +437,31 @@ def construct_retrieval_results(
                     }
                 )
 
+        if cached_db_schema is not None:
+            for cached_result in cached_db_schema.retrieval_results(
+                list(columns_and_tables_needed.keys())
+            ):
+                if cached_result["type"] == "TABLE":
+                    continue
+
+                retrieval_results.append(
+                    {
+                        "table_name": cached_result["table_name"],
+                        "table_ddl": cached_result["table_ddl"],
+                    }
+                )
+                if cached_result["type"] == "METRIC":
+                    has_metric = True
+
         for document in dbschema_retrieval:
             if document.meta["name"] in columns_and_tables_needed:
-                content = ast.literal_eval(document.content)
+                content = load_ddl_payload(document.content)
 
                 if content["type"] == "METRIC":
                     retrieval_results.append(
                         {
                             "table_name": content["name"],
-                            "table_ddl": _build_metric_ddl(content),
+                            "table_ddl": build_metric_ddl(content),
                         }
                     )
                     has_metric = True
@@ -399,7 +469,7 @@ def construct_retrieval_results(
                     retrieval_results.append(
                         {
                             "table_name": content["name"],
-                            "table_ddl": _build_view_ddl(content),
+                            "table_ddl": build_view_ddl(content),
                         }
                     )
 
@@ -457,6 +527,7 @@ class DbSchemaRetrieval(BasicPipeline):
         document_store_provider: DocumentStoreProvider,
         table_retrieval_size: int = 10,
         table_column_retrieval_size: int = 100,
+        db_schema_cache: Optional[DbSchemaCache] = None,
         **kwargs,
     ):
         self._components = {
@@ -477,6 +548,7 @@ class DbSchemaRetrieval(BasicPipeline):
             "prompt_builder": PromptBuilder(
                 template=table_columns_selection_user_prompt_template
             ),
+            "db_schema_cache": db_schema_cache,
         }
 
         # for the first time, we need to load the encodings
@@ -496,6 +568,7 @@ class DbSchemaRetrieval(BasicPipeline):
         )
 
     @observe(name="Ask Retrieval")
+    @singleflight
     async def run(
         self,
         query: str = "",
@@ -503,6 +576,8 @@ class DbSchemaRetrieval(BasicPipeline):
         project_id: Optional[str] = None,
         histories: Optional[list[AskHistory]] = None,
         enable_column_pruning: bool = False,
+        mdl_hash: Optional[str] = None,
+        query_embedding: Optional[list[float]] = None,
     ):
         logger.info("Ask Retrieval pipeline is running...")
         return await self._pipe.execute(
@@ -513,6 +588,8 @@ class DbSchemaRetrieval(BasicPipeline):
                 "project_id": project_id or "",
                 "histories": histories or [],
                 "enable_column_pruning": enable_column_pruning,
+                "mdl_hash": mdl_hash,
+                "query_embedding": query_embedding,
                 **self._components,
                 **self._configs,
             },
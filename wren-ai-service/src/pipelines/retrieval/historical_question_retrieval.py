@@ -55,8 +55,16 @@ async def count_documents(
 
 
 @observe(capture_input=False, capture_output=False)
-async def embedding(count_documents: int, query: str, embedder: Any) -> dict:
+async def embedding(
+    count_documents: int,
+    query: str,
+    embedder: Any,
+    query_embedding: Optional[list[float]] = None,
+) -> dict:
     if count_documents:
+        if query_embedding is not None:
+            return {"embedding": query_embedding}
+
         return await embedder.run(query)
 
     return {}
@@ -148,13 +156,19 @@ class HistoricalQuestionRetrieval(BasicPipeline):
         )
 
     @observe(name="Historical Question")
-    async def run(self, query: str, project_id: Optional[str] = None):
+    async def run(
+        self,
+        query: str,
+        project_id: Optional[str] = None,
+        query_embedding: Optional[list[float]] = None,
+    ):
         logger.info("HistoricalQuestion Retrieval pipeline is running...")
         return await self._pipe.execute(
             ["formatted_output"],
             inputs={
                 "query": query,
                 "project_id": project_id or "",
+                "query_embedding": query_embedding,
                 **self._components,
                 **self._configs,
             },
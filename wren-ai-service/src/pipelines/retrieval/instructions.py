@@ -74,8 +74,16 @@ async def count_documents(
 
 
 @observe(capture_input=False, capture_output=False)
-async def embedding(count_documents: int, query: str, embedder: Any) -> dict:
+async def embedding(
+    count_documents: int,
+    query: str,
+    embedder: Any,
+    query_embedding: Optional[list[float]] = None,
+) -> dict:
     if count_documents:
+        if query_embedding is not None:
+            return {"embedding": query_embedding}
+
         return await embedder.run(query)
 
     return {}
@@ -213,7 +221,11 @@ class Instructions(BasicPipeline):
 
     @observe(name="Instructions Retrieval")
     async def run(
-        self, query: str, project_id: Optional[str] = None, scope: str = "sql"
+        self,
+        query: str,
+        project_id: Optional[str] = None,
+        scope: str = "sql",
+        query_embedding: Optional[list[float]] = None,
     ):
         logger.info("Instructions Retrieval pipeline is running...")
         return await self._pipe.execute(
@@ -222,6 +234,7 @@ class Instructions(BasicPipeline):
                 "query": query,
                 "project_id": project_id or "",
                 "scope": scope,
+                "query_embedding": query_embedding,
                 **self._components,
                 **self._configs,
             },
@@ -1,3 +1,5 @@
+import bisect
+import itertools
 import logging
 import sys
 from typing import Dict
@@ -7,6 +9,7 @@ from hamilton import base
 from hamilton.driver import Driver
 from langfuse.decorators import observe
 
+from src.core.executor import get_executor
 from src.core.pipeline import BasicPipeline
 from src.core.provider import LLMProvider
 
@@ -14,61 +17,65 @@ logger = logging.getLogger("wren-ai-service")
 
 
 ## Start of Pipeline
+def _count_tokens(sql_data: Dict, encoding: tiktoken.Encoding) -> int:
+    return len(encoding.encode(str(sql_data)))
+
+
+def _max_rows(
+    sql_data: Dict,
+    encoding: tiktoken.Encoding,
+    context_window_size: int,
+) -> int:
+    """
+    Estimates the number of leading rows fitting in the context window.
+
+    Every row is encoded once as it appears in `str(sql_data)`, so the token count of the
+    first n rows is a prefix sum and the cutoff is found by binary search instead of
+    re-encoding the whole result after each reduction.
+    """
+    rows = sql_data.get("data", [])
+    # the tokens of everything but the rows, e.g. the columns and dtypes
+    overhead = _count_tokens({**sql_data, "data": []}, encoding)
+    prefix_sums = list(
+        itertools.accumulate(
+            (len(encoding.encode(f"{row!r}, ")) for row in rows), initial=0
+        )
+    )
+    return max(bisect.bisect_right(prefix_sums, context_window_size - overhead) - 1, 0)
+
+
 @observe(capture_input=False, capture_output=False)
 def preprocess(
     sql_data: Dict,
     encoding: tiktoken.Encoding,
     context_window_size: int,
 ) -> Dict:
-    def reduce_data_size(data: list, reduction_step: int = 50) -> list:
-        """Reduce the size of data by removing elements from the end.
-
-        Args:
-            data: The input list to reduce
-            reduction_step: Number of elements to remove (must be positive)
-
-        Returns:
-            list: A list with reduced size
-
-        Raises:
-            ValueError: If reduction_step is not positive
-        """
-        if reduction_step <= 0:
-            raise ValueError("reduction_step must be positive")
-
-        elements_to_keep = max(0, len(data) - reduction_step)
-        returned_data = data[:elements_to_keep]
+    _token_count = _count_tokens(sql_data, encoding)
+    rows = sql_data.get("data", [])
+
+    if _token_count > context_window_size:
+        num_rows = _max_rows(sql_data, encoding, context_window_size)
+        sql_data["data"] = rows[:num_rows]
+        _token_count = _count_tokens(sql_data, encoding)
+
+        # tokens can merge across row boundaries, so the estimate may be slightly off;
+        # shrink proportionally to the overflow until the result fits
+        while _token_count > context_window_size and num_rows > 0:
+            num_rows = min(
+                num_rows - 1,
+                num_rows * context_window_size // _token_count,
+            )
+            sql_data["data"] = rows[:num_rows]
+            _token_count = _count_tokens(sql_data, encoding)
 
         logger.info(
-            f"Reducing data size by {reduction_step} rows. "
-            f"Original size: {len(data)}, New size: {len(returned_data)}"
+            f"Reduced data size from {len(rows)} to {num_rows} rows, "
+            f"token count: {_token_count}"
         )
 
-        return returned_data
-
-    _token_count = len(encoding.encode(str(sql_data)))
-    num_rows_used_in_llm = len(sql_data.get("data", []))
-    iteration = 0
-
-    while _token_count > context_window_size:
-        if iteration > 1000:
-            """
-            Avoid infinite loop
-            If the token count is still too high after 1000 iterations, break
-            """
-            break
-
-        iteration += 1
-
-        data = sql_data.get("data", [])
-        sql_data["data"] = reduce_data_size(data)
-        num_rows_used_in_llm = len(sql_data.get("data", []))
-        _token_count = len(encoding.encode(str(sql_data)))
-        logger.info(f"Token count: {_token_count}")
-
     return {
         "sql_data": sql_data,
-        "num_rows_used_in_llm": num_rows_used_in_llm,
+        "num_rows_used_in_llm": len(sql_data.get("data", [])),
         "tokens": _token_count,
     }
 
@@ -96,12 +103,14 @@ class PreprocessSqlData(BasicPipeline):
         super().__init__(Driver({}, sys.modules[__name__], adapter=base.DictResult()))
 
     @observe(name="Preprocess SQL Data")
-    def run(
+    async def run(
         self,
         sql_data: Dict,
     ):
         logger.info("Preprocess SQL Data pipeline is running...")
-        return self._pipe.execute(
+        # tokenizing a large result is CPU bound, keep it off the event loop
+        return await get_executor().run_in_thread(
+            self._pipe.execute,
             ["preprocess"],
             inputs={
                 "sql_data": sql_data,
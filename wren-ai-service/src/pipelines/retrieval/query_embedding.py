@@ -0,0 +1,68 @@
+import logging
+import sys
+from typing import Any, Optional
+
+from hamilton import base
+from hamilton.async_driver import AsyncDriver
+from langfuse.decorators import observe
+
+from src.core.pipeline import BasicPipeline
+from src.core.provider import EmbedderProvider
+from src.pipelines.common import query_with_histories
+from src.web.v1.services.ask import AskHistory
+
+logger = logging.getLogger("wren-ai-service")
+
+
+## Start of Pipeline
+@observe(capture_input=False, capture_output=False)
+async def embedding(query: str, embedder: Any) -> dict:
+    return await embedder.run(query)
+
+
+@observe(capture_input=False, capture_output=False)
+async def histories_embedding(
+    embedding: dict, query: str, histories: list[AskHistory], embedder: Any
+) -> dict:
+    if not histories:
+        return embedding
+
+    return await embedder.run(query_with_histories(query, histories))
+
+
+## End of Pipeline
+
+
+class QueryEmbedding(BasicPipeline):
+    """
+    Embeds the user query once so the retrieval pipelines of an ask can share it.
+
+    `embedding` is the embedding of the query itself, used by the historical question, sql pairs
+    and instructions retrievals. `histories_embedding` is the embedding of the query joined with
+    the previous questions, used by the intent classification and db schema retrieval.
+    """
+
+    def __init__(
+        self,
+        embedder_provider: EmbedderProvider,
+        **kwargs,
+    ):
+        self._components = {
+            "embedder": embedder_provider.get_text_embedder(),
+        }
+
+        super().__init__(
+            AsyncDriver({}, sys.modules[__name__], result_builder=base.DictResult())
+        )
+
+    @observe(name="Query Embedding")
+    async def run(self, query: str, histories: Optional[list[AskHistory]] = None):
+        logger.info("Query Embedding pipeline is running...")
+        return await self._pipe.execute(
+            ["embedding", "histories_embedding"],
+            inputs={
+                "query": query,
+                "histories": histories or [],
+                **self._components,
+            },
+        )
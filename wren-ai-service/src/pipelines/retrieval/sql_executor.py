@@ -2,7 +2,6 @@ import logging
 import sys
 from typing import Any, Dict, Optional
 
-import aiohttp
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from haystack import component
@@ -28,18 +27,17 @@ class DataFetcher:
         project_id: str | None = None,
         limit: int = 500,
     ):
-        async with aiohttp.ClientSession() as session:
-            _, data, addition = await self._engine.execute_sql(
-                sql,
-                session,
-                project_id=project_id,
-                dry_run=False,
-                limit=limit,
-            )
+        _, data, addition = await self._engine.execute_sql(
+            sql,
+            self._engine.get_session(),
+            project_id=project_id,
+            dry_run=False,
+            limit=limit,
+        )
 
-            if addition.get("error_message"):
-                return {"results": data, "error_message": addition.get("error_message")}
-            return {"results": data}
+        if addition.get("error_message"):
+            return {"results": data, "error_message": addition.get("error_message")}
+        return {"results": data}
 
 
 ## Start of Pipeline
@@ -2,14 +2,13 @@ import logging
 import sys
 from typing import List, Optional
 
-import aiohttp
 from cachetools import TTLCache
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from langfuse.decorators import observe
 
 from src.core.engine import Engine
-from src.core.pipeline import BasicPipeline
+from src.core.pipeline import BasicPipeline, singleflight
 from src.core.provider import DocumentStoreProvider
 from src.pipelines.common import retrieve_metadata
 from src.providers.engine.wren import WrenIbis
@@ -53,17 +52,16 @@ async def get_functions(
     engine: WrenIbis,
     data_source: str,
 ) -> List[SqlFunction]:
-    async with aiohttp.ClientSession() as session:
-        func_list = await engine.get_func_list(
-            session=session,
-            data_source=data_source,
-        )
+    func_list = await engine.get_func_list(
+        session=engine.get_session(),
+        data_source=data_source,
+    )
 
-        return [
-            SqlFunction(definition=func)
-            for func in func_list
-            if not SqlFunction.empty(func)
-        ]
+    return [
+        SqlFunction(definition=func)
+        for func in func_list
+        if not SqlFunction.empty(func)
+    ]
 
 
 @observe(capture_input=False)
@@ -101,6 +99,7 @@ class SqlFunctions(BasicPipeline):
         )
 
     @observe(name="SQL Functions Retrieval")
+    @singleflight
     async def run(
         self,
         project_id: Optional[str] = None,
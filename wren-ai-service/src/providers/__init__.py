@@ -393,3 +393,89 @@ def generate_components(configs: list[dict]) -> dict[str, PipelineComponent]:
         pipe_name: componentize(components, instantiated_providers)
         for pipe_name, components in config.pipelines.items()
     }
+
+
+async def close_engine_sessions(pipe_components: dict[str, PipelineComponent]) -> None:
+    """
+    Close the shared HTTP sessions owned by the engine providers.
+
+    Engines are shared across pipelines, so each instance is closed only once.
+    The connection pool and SQL validation cache metrics are logged before closing
+    for capacity tuning.
+    """
+    engines = {
+        id(component.engine): component.engine
+        for component in pipe_components.values()
+        if component.engine
+    }
+
+    for engine in engines.values():
+        logger.info(
+            f"{type(engine).__name__} session metrics: {engine.get_session_metrics()}"
+        )
+        logger.info(
+            f"{type(engine).__name__} SQL validation cache metrics: {engine.get_validation_cache().get_metrics()}"
+        )
+        await engine.close()
+
+
+async def close_document_stores(
+    pipe_components: dict[str, PipelineComponent],
+) -> None:
+    """
+    Close the clients owned by the document store providers.
+
+    Document store providers are shared across pipelines, so each instance is closed
+    only once.
+    """
+    document_store_providers = {
+        id(component.document_store_provider): component.document_store_provider
+        for component in pipe_components.values()
+        if component.document_store_provider
+    }
+
+    for document_store_provider in document_store_providers.values():
+        await document_store_provider.close()
+
+
+def close_llm_caches(pipe_components: dict[str, PipelineComponent]) -> None:
+    """
+    Close the completion caches owned by the LLM providers.
+
+    The cache hit rates and the tokens they saved are logged before closing.
+    """
+    llm_providers = {
+        id(component.llm_provider): component.llm_provider
+        for component in pipe_components.values()
+        if component.llm_provider
+    }
+
+    for llm_provider in llm_providers.values():
+        if llm_provider._completion_cache is None:
+            continue
+        logger.info(
+            f"{llm_provider.get_model()} completion cache metrics: {llm_provider.get_cache_metrics()}"
+        )
+        llm_provider.close()
+
+
+def close_embedder_caches(pipe_components: dict[str, PipelineComponent]) -> None:
+    """
+    Close the embedding caches owned by the embedder providers.
+
+    The cache hit rates are logged before closing to help size the cache.
+    """
+    embedder_providers = {
+        id(component.embedder_provider): component.embedder_provider
+        for component in pipe_components.values()
+        if component.embedder_provider
+    }
+
+    for embedder_provider in embedder_providers.values():
+        logger.info(
+            f"{embedder_provider.get_model()} embedding cache metrics: {embedder_provider.get_cache_metrics()}"
+        )
+        logger.info(
+            f"{embedder_provider.get_model()} embedding scheduler metrics: {embedder_provider.get_scheduler_metrics()}"
+        )
+        embedder_provider.close()
@@ -0,0 +1,23 @@
+import functools
+
+from src.core.metrics import DOCUMENT_STORE_DURATION, current_pipeline
+
+
+def timed(operation: str):
+    """
+    Records the duration of the decorated store method as `operation` on its collection.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            with DOCUMENT_STORE_DURATION.time(
+                pipeline=current_pipeline.get(),
+                collection=self.index,
+                operation=operation,
+            ):
+                return await method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
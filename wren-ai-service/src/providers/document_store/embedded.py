@@ -0,0 +1,702 @@
+import asyncio
+import fcntl
+import logging
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import orjson
+from haystack import Document, component, default_to_dict
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from haystack.utils.filters import COMPARISON_OPERATORS, FilterError
+
+from src.core.provider import DocumentStoreProvider
+from src.providers.document_store import timed
+from src.providers.loader import provider
+
+logger = logging.getLogger("wren-ai-service")
+
+# the fields the pipelines filter on, so their conditions are answered by an index
+INDEXED_FIELDS = ("project_id", "type", "name")
+
+
+def _field(condition: Dict[str, Any]) -> str:
+    field = condition["field"]
+    return field[len("meta.") :] if field.startswith("meta.") else field
+
+
+def _matches(filters: Dict[str, Any], payload: Dict[str, Any]) -> bool:
+    operator = filters.get("operator")
+    if operator is None:
+        raise FilterError("Operator not found in filters")
+
+    if operator in ("AND", "OR", "NOT"):
+        if "conditions" not in filters:
+            raise FilterError(f"'conditions' not found for '{operator}'")
+        results = (_matches(condition, payload) for condition in filters["conditions"])
+        if operator == "AND":
+            return all(results)
+        if operator == "OR":
+            return any(results)
+        return not all(results)
+
+    if operator not in COMPARISON_OPERATORS:
+        raise FilterError(f"Unknown operator '{operator}'")
+    if "field" not in filters or "value" not in filters:
+        raise FilterError(f"'field' or 'value' not found for '{operator}'")
+    return COMPARISON_OPERATORS[operator](
+        payload.get(_field(filters)), filters["value"]
+    )
+
+
+class _Collection:
+    """
+    The documents of a collection: their vectors as the rows of a contiguous float32
+    matrix, normalized so a matrix-vector product scores them all by cosine similarity,
+    and their payloads with an index of the row ids by the value of each INDEXED_FIELDS.
+
+    Rows are only appended: a deleted document leaves a tombstone, a None payload, and an
+    overwritten one is appended again. The tombstones are dropped when the collection is
+    compacted, once they outnumber the documents.
+
+    With a `path`, the matrix is a memory-mapped `vectors.<n>.npy` and the payloads are kept
+    in a `documents.json` snapshot of generation `n`, so a restarted service reads the
+    collection back. The writes and deletes since the snapshot are appended to a journal,
+    `documents.<n>.log`, and replayed on load. As the rows the snapshot and the journal refer
+    to are never written again, a crash can't pair a document with the vector of another.
+    The snapshot is rewritten, along with a compacted matrix, once the journal outgrows it or
+    the tombstones outnumber the documents, so saving costs the size of the changes rather
+    than the collection.
+    """
+
+    def __init__(self, name: str, embedding_dim: int, path: Optional[str] = None):
+        self.name = name
+        self._dim = embedding_dim
+        self._path = path
+        self.payloads: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {}
+        self._embedded = np.zeros(0, dtype=bool)
+        self._vectors = np.zeros((0, embedding_dim), dtype=np.float32)
+        self._vectors_file = "vectors.npy"
+        self._index: Dict[str, Dict[Any, Set[int]]] = {}
+        self._journal: List[Dict[str, Any]] = []
+        self._generation = 0
+        self._snapshot_bytes: Optional[int] = None
+        self._journal_bytes = 0
+
+        if path and os.path.exists(os.path.join(path, "documents.json")):
+            self._load()
+        self._reindex()
+
+    @property
+    def size(self) -> int:
+        return len(self.payloads)
+
+    @property
+    def _tombstones(self) -> int:
+        return self.size - len(self.rows)
+
+    def _journal_path(self) -> str:
+        return os.path.join(self._path, f"documents.{self._generation}.log")
+
+    def _load(self) -> None:
+        with open(os.path.join(self._path, "documents.json"), "rb") as f:
+            snapshot = f.read()
+        state = orjson.loads(snapshot)
+        self._generation = state.get("generation", 0)
+        self._snapshot_bytes = len(snapshot)
+        self.payloads = state["documents"]
+        self._vectors_file = state.get("vectors", "vectors.npy")
+        self._vectors = np.load(
+            os.path.join(self._path, self._vectors_file), mmap_mode="r+"
+        )
+        # the dimension may have been set by embeddings written after the snapshot
+        self._dim = self._vectors.shape[1]
+        self._embedded = np.zeros(self._vectors.shape[0], dtype=bool)
+        self._embedded[: self.size] = state["embedded"]
+        self.rows = {payload["id"]: row for row, payload in enumerate(self.payloads)}
+
+        if not os.path.exists(self._journal_path()):
+            return
+
+        # the vectors are already in their rows, only the payloads are replayed
+        with open(self._journal_path(), "rb") as f:
+            for line in f:
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # an entry cut short by a crash, it's the last one
+                    self._write_snapshot()
+                    return
+                if "delete" in entry:
+                    self._tombstone([self.rows[id] for id in entry["delete"]])
+                else:
+                    self._append_payloads(entry["upsert"], entry["embedded"])
+                self._journal_bytes += len(line)
+
+    def _reindex(self) -> None:
+        self._index = {field: {} for field in INDEXED_FIELDS}
+        for row, payload in enumerate(self.payloads):
+            if payload is not None:
+                self._index_row(row, payload)
+
+    def _index_row(self, row: int, payload: Dict[str, Any]) -> None:
+        for field, index in self._index.items():
+            value = payload.get(field)
+            # only hashable values are indexed, which are the only ones == and in match
+            if isinstance(value, (str, int, float, bool, type(None))):
+                index.setdefault(value, set()).add(row)
+
+    def _unindex_row(self, row: int, payload: Dict[str, Any]) -> None:
+        for field, index in self._index.items():
+            rows = index.get(payload.get(field))
+            if rows is not None:
+                rows.discard(row)
+
+    def _reserve(self, size: int) -> None:
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+
+        # grow geometrically, so appending a document is amortized O(1)
+        capacity = max(size, capacity * 2, 64)
+        if self._path:
+            os.makedirs(self._path, exist_ok=True)
+            tmp_path = os.path.join(self._path, f"{self._vectors_file}.tmp")
+            vectors = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self._dim)
+            )
+            vectors[: len(self._vectors)] = self._vectors
+            vectors.flush()
+            os.replace(tmp_path, os.path.join(self._path, self._vectors_file))
+        else:
+            vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+            vectors[: len(self._vectors)] = self._vectors
+        self._vectors = vectors
+        self._embedded = np.concatenate(
+            [self._embedded, np.zeros(capacity - len(self._embedded), dtype=bool)]
+        )
+
+    def upsert(self, documents: List[Document]) -> None:
+        embeddings = [document.embedding for document in documents]
+        dims = {len(embedding) for embedding in embeddings if embedding}
+        if not self._dim and len(dims) == 1:
+            # the dimension isn't configured, it's the one of the first embeddings, and
+            # the matrix without any vector yet is reserved again with it
+            (self._dim,) = dims
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        if dims - {self._dim}:
+            raise ValueError(
+                f"Expected embeddings of dimension {self._dim} in collection {self.name}, got {sorted(dims)}"
+            )
+
+        payloads = []
+        for document in documents:
+            payload = document.to_dict(flatten=True)
+            for key in ("embedding", "sparse_embedding", "score"):
+                payload.pop(key, None)
+            payloads.append(payload)
+
+        embedded = [bool(embedding) for embedding in embeddings]
+        rows = self._append_payloads(payloads, embedded)
+        if self._path:
+            self._journal.append({"upsert": payloads, "embedded": embedded})
+
+        embedded = np.asarray(embedded)
+        if embedded.any():
+            vectors = np.asarray(
+                [embedding for embedding in embeddings if embedding], dtype=np.float32
+            )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._vectors[rows[embedded]] = vectors / np.where(norms > 0, norms, 1.0)
+
+    def _append_payloads(
+        self, payloads: List[Dict[str, Any]], embedded: List[bool]
+    ) -> np.ndarray:
+        # an overwritten document is appended, so the rows already saved stay untouched
+        self._tombstone(
+            [
+                self.rows[payload["id"]]
+                for payload in payloads
+                if payload["id"] in self.rows
+            ]
+        )
+
+        rows = np.arange(self.size, self.size + len(payloads), dtype=np.int64)
+        for row, payload in zip(rows, payloads):
+            self.rows[payload["id"]] = int(row)
+            self.payloads.append(payload)
+            self._index_row(int(row), payload)
+
+        self._reserve(self.size)
+        self._embedded[rows] = embedded
+        return rows
+
+    def _tombstone(self, rows: List[int]) -> None:
+        for row in rows:
+            payload = self.payloads[row]
+            self._unindex_row(row, payload)
+            del self.rows[payload["id"]]
+            self.payloads[row] = None
+            self._embedded[row] = False
+
+    def delete(self, rows: Iterable[int]) -> None:
+        rows = [int(row) for row in rows]
+        if not rows:
+            return
+
+        if self._path:
+            self._journal.append({"delete": [self.payloads[row]["id"] for row in rows]})
+        self._tombstone(rows)
+        if not self._path and self._tombstones > len(self.rows):
+            self._compact(self._vectors)
+
+    def _compact(self, vectors: np.ndarray) -> None:
+        """
+        Drops the tombstones, the vectors of the documents are copied to the first rows of
+        `vectors`, which may be the current matrix.
+        """
+        live = np.asarray(
+            [row for row, payload in enumerate(self.payloads) if payload is not None],
+            dtype=np.int64,
+        )
+        vectors[: len(live)] = self._vectors[live]
+        embedded = np.zeros(len(vectors), dtype=bool)
+        embedded[: len(live)] = self._embedded[live]
+
+        self._vectors = vectors
+        self._embedded = embedded
+        self.payloads = [self.payloads[row] for row in live]
+        self.rows = {payload["id"]: row for row, payload in enumerate(self.payloads)}
+        self._reindex()
+
+    def _indexed_rows(self, filters: Dict[str, Any]) -> Tuple[Optional[Set[int]], bool]:
+        """
+        Returns the rows the index narrows the filters down to, None if it can't, and
+        whether those rows match the filters without evaluating them.
+        """
+        conditions = (
+            filters["conditions"] if filters.get("operator") == "AND" else [filters]
+        )
+        rows = None
+        covered = True
+        for condition in conditions:
+            operator = condition.get("operator")
+            field = _field(condition) if "field" in condition else None
+            values = condition.get("value")
+            if operator == "==":
+                values = [values]
+            if field not in self._index or operator not in ("==", "in"):
+                covered = False
+                continue
+            if not isinstance(values, list):
+                raise FilterError(
+                    f"Filter value must be a `list` when using operator 'in', received type '{type(values)}'"
+                )
+
+            try:
+                matched = set().union(
+                    *(self._index[field].get(value, ()) for value in values)
+                )
+            except TypeError:
+                # unhashable filter values never match an indexed value
+                matched = set()
+            rows = matched if rows is None else rows & matched
+        return rows, covered
+
+    def match(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """
+        Returns the rows matching the filters in the order the documents were written.
+        """
+        if not filters:
+            return np.asarray(sorted(self.rows.values()), dtype=np.int64)
+
+        rows, covered = self._indexed_rows(filters)
+        candidates = sorted(rows) if rows is not None else sorted(self.rows.values())
+        if not covered:
+            candidates = [
+                row for row in candidates if _matches(filters, self.payloads[row])
+            ]
+        return np.asarray(candidates, dtype=np.int64)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns the rows and cosine similarities of the `top_k` documents most similar
+        to the query embedding, among those matching the filters.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not self.rows or not norm or len(query) != self._dim:
+            return []
+
+        if filters:
+            rows = self.match(filters)
+            rows = rows[self._embedded[rows]]
+            scores = self._vectors[rows] @ (query / norm)
+        else:
+            # the tombstones aren't embedded
+            rows = np.flatnonzero(self._embedded[: self.size])
+            scores = self._vectors[: self.size] @ (query / norm)
+            scores = scores[rows]
+
+        if top_k < len(scores):
+            # partial sort, only the top_k scores are ordered
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def document(
+        self, row: int, score: Optional[float] = None, return_embedding: bool = False
+    ) -> Document:
+        embedding = (
+            self._vectors[row].tolist()
+            if return_embedding and self._embedded[row]
+            else None
+        )
+        return Document.from_dict(
+            {**self.payloads[row], "score": score, "embedding": embedding}
+        )
+
+    def save(self) -> None:
+        if not self._path:
+            return
+
+        os.makedirs(self._path, exist_ok=True)
+        entries = b"".join(
+            orjson.dumps(entry, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+            for entry in self._journal
+        )
+        self._journal = []
+        if (
+            self._snapshot_bytes is None
+            or self._journal_bytes + len(entries) > self._snapshot_bytes
+            or self._tombstones > len(self.rows)
+        ):
+            self._write_snapshot()
+        elif entries:
+            # the vectors of the appended rows are on disk before the entries refer to them
+            self._vectors.flush()
+            with open(self._journal_path(), "ab") as f:
+                f.write(entries)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_bytes += len(entries)
+
+    def _write_snapshot(self) -> None:
+        # the compacted matrix is a new file, the current one stays as the snapshot and the
+        # journal on disk refer to it until the new snapshot replaces them
+        generation = self._generation + 1
+        vectors_file = f"vectors.{generation}.npy"
+        vectors = np.lib.format.open_memmap(
+            os.path.join(self._path, vectors_file),
+            mode="w+",
+            dtype=np.float32,
+            shape=(max(len(self.rows), 64), self._dim),
+        )
+        self._compact(vectors)
+        vectors.flush()
+
+        snapshot = orjson.dumps(
+            {
+                "embedding_dim": self._dim,
+                "generation": generation,
+                "vectors": vectors_file,
+                "documents": self.payloads,
+                "embedded": self._embedded[: self.size].tolist(),
+            },
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+        tmp_path = os.path.join(self._path, "documents.json.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self._path, "documents.json"))
+
+        # the new snapshot replays the journal of its own generation only
+        previous = [self._journal_path(), os.path.join(self._path, self._vectors_file)]
+        self._generation = generation
+        self._vectors_file = vectors_file
+        self._snapshot_bytes = len(snapshot)
+        self._journal_bytes = 0
+        for path in previous:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class EmbeddedDocumentStore:
+    """
+    An in-process document store, for single-node deployments and local development.
+
+    Searches score the documents of the collection with one NumPy matrix-vector product,
+    without a round-trip to a vector database. Writes and deletes are serialized per
+    collection and persisted, when the store has a `path`, before they return. Only one
+    process may use a `path`, as the collections are kept in the memory of the process.
+    """
+
+    def __init__(
+        self,
+        index: str = "Document",
+        embedding_dim: int = 0,
+        path: Optional[str] = None,
+        recreate_index: bool = False,
+    ):
+        self.index = index
+        self.embedding_dim = embedding_dim
+        self.path = path
+
+        collection_path = os.path.join(path, index) if path else None
+        if recreate_index and collection_path and os.path.exists(collection_path):
+            shutil.rmtree(collection_path)
+        self._collection = _Collection(index, embedding_dim, collection_path)
+        self._lock = asyncio.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            index=self.index,
+            embedding_dim=self.embedding_dim,
+            path=self.path,
+        )
+
+    @timed("search")
+    async def _query_by_embedding(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+    ) -> List[Document]:
+        results = self._collection.search(query_embedding, filters, top_k)
+        return [
+            self._collection.document(
+                row,
+                score=(score + 1) / 2 if scale_score else score,
+                return_embedding=return_embedding,
+            )
+            for row, score in results
+        ]
+
+    @timed("scroll")
+    async def _query_by_filters(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+    ) -> List[Document]:
+        rows = self._collection.match(filters)
+        return [self._collection.document(int(row)) for row in rows[:top_k]]
+
+    @timed("scroll_ids")
+    async def get_document_ids(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        payloads = self._collection.payloads
+        return [payloads[row]["id"] for row in self._collection.match(filters)]
+
+    @timed("count")
+    async def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        return len(self._collection.match(filters))
+
+    async def _persist(self) -> None:
+        # the files are written off the event loop, and no other write or delete of the
+        # collection runs until they are
+        await asyncio.to_thread(self._collection.save)
+
+    @timed("delete")
+    async def delete_documents_by_ids(self, document_ids: List[str]):
+        if not document_ids:
+            return
+
+        async with self._lock:
+            rows = self._collection.rows
+            self._collection.delete(
+                rows[document_id] for document_id in document_ids if document_id in rows
+            )
+            await self._persist()
+
+    @timed("delete")
+    async def delete_documents(self, filters: Optional[Dict[str, Any]] = None):
+        async with self._lock:
+            self._collection.delete(self._collection.match(filters))
+            await self._persist()
+
+    @timed("write")
+    async def write_documents(
+        self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.FAIL
+    ):
+        for doc in documents:
+            if not isinstance(doc, Document):
+                msg = f"DocumentStore.write_documents() expects a list of Documents but got an element of {type(doc)}."
+                raise ValueError(msg)
+
+        if len(documents) == 0:
+            logger.warning(
+                "Calling EmbeddedDocumentStore.write_documents() with empty list"
+            )
+            return
+
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        async with self._lock:
+            # the last of the documents sharing an id is kept, as with an upsert
+            documents = list({document.id: document for document in documents}.values())
+            existing = [
+                document
+                for document in documents
+                if document.id in self._collection.rows
+            ]
+            if existing and policy == DuplicatePolicy.FAIL:
+                raise DuplicateDocumentError(
+                    f"ID '{existing[0].id}' already exists in the document store"
+                )
+            if policy == DuplicatePolicy.SKIP:
+                documents = [
+                    document
+                    for document in documents
+                    if document.id not in self._collection.rows
+                ]
+
+            if documents:
+                self._collection.upsert(documents)
+                await self._persist()
+
+        return len(documents)
+
+    def close(self) -> None:
+        self._collection.save()
+
+
+@component
+class EmbeddedEmbeddingRetriever:
+    def __init__(
+        self,
+        document_store: EmbeddedDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+    ):
+        self._document_store = document_store
+        self._filters = filters
+        self._top_k = top_k
+        self._scale_score = scale_score
+        self._return_embedding = return_embedding
+
+    @component.output_types(documents=List[Document])
+    async def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        scale_score: Optional[bool] = None,
+        return_embedding: Optional[bool] = None,
+    ):
+        if query_embedding:
+            docs = await self._document_store._query_by_embedding(
+                query_embedding=query_embedding,
+                filters=filters or self._filters,
+                top_k=top_k or self._top_k,
+                scale_score=scale_score or self._scale_score,
+                return_embedding=return_embedding or self._return_embedding,
+            )
+        else:
+            docs = await self._document_store._query_by_filters(
+                filters=filters,
+                top_k=top_k,
+            )
+
+        return {"documents": docs}
+
+
+def _lock(path: str):
+    # another process writing to the path would overwrite the files with its own copy
+    # of the collections, so the path is locked until the provider is closed
+    os.makedirs(path, exist_ok=True)
+    lock_file = open(os.path.join(path, "LOCK"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise RuntimeError(
+            f"The embedded document store at {path} is used by another process, run a single worker or use the qdrant document store"
+        ) from None
+    return lock_file
+
+
+@provider("embedded")
+class EmbeddedProvider(DocumentStoreProvider):
+    def __init__(
+        self,
+        path: Optional[str] = os.getenv("EMBEDDED_DOCUMENT_STORE_PATH"),
+        embedding_model_dim: int = (
+            int(os.getenv("EMBEDDING_MODEL_DIMENSION"))
+            if os.getenv("EMBEDDING_MODEL_DIMENSION")
+            else 0
+        ),
+        recreate_index: bool = (
+            bool(os.getenv("SHOULD_FORCE_DEPLOY"))
+            if os.getenv("SHOULD_FORCE_DEPLOY")
+            else False
+        ),
+        **_,
+    ):
+        self._path = path
+        self._lock_file = _lock(path) if path else None
+        self._embedding_model_dim = embedding_model_dim
+        self._stores: Dict[str, EmbeddedDocumentStore] = {}
+        self._reset_document_store(recreate_index)
+
+    def _reset_document_store(self, recreate_index: bool):
+        self.get_store(recreate_index=recreate_index)
+        self.get_store(dataset_name="table_descriptions", recreate_index=recreate_index)
+        self.get_store(dataset_name="view_questions", recreate_index=recreate_index)
+        self.get_store(dataset_name="sql_pairs", recreate_index=recreate_index)
+        self.get_store(dataset_name="instructions", recreate_index=recreate_index)
+        self.get_store(dataset_name="project_meta", recreate_index=recreate_index)
+
+    def get_store(
+        self,
+        dataset_name: Optional[str] = None,
+        recreate_index: bool = False,
+    ):
+        index = dataset_name or "Document"
+        # every store of a collection must share its documents, so there is one per
+        # collection, unless the collection is to be recreated
+        if index in self._stores and not recreate_index:
+            return self._stores[index]
+
+        self._stores[index] = EmbeddedDocumentStore(
+            index=index,
+            embedding_dim=self._embedding_model_dim,
+            path=self._path,
+            recreate_index=recreate_index,
+        )
+        return self._stores[index]
+
+    def get_retriever(
+        self,
+        document_store: EmbeddedDocumentStore,
+        top_k: int = 10,
+    ):
+        return EmbeddedEmbeddingRetriever(
+            document_store=document_store,
+            top_k=top_k,
+        )
+
+    async def close(self) -> None:
+        for store in self._stores.values():
+            store.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
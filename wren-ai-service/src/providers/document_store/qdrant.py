@@ -1,10 +1,13 @@
+import asyncio
+import inspect
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import httpx
 import numpy as np
 import qdrant_client
-from haystack import Document, component
+from haystack import Document, component, default_to_dict
 from haystack.document_stores.types import DuplicatePolicy
 from haystack.utils import Secret
 from haystack_integrations.components.retrievers.qdrant import QdrantEmbeddingRetriever
@@ -25,6 +28,7 @@ from qdrant_client.http import models as rest
 from tqdm import tqdm
 
 from src.core.provider import DocumentStoreProvider
+from src.providers.document_store import timed
 from src.providers.loader import provider
 
 logger = logging.getLogger("wren-ai-service")
@@ -63,6 +67,93 @@ def convert_haystack_documents_to_qdrant_points(
     return points
 
 
+class SearchBatcher:
+    """
+    Coalesces the searches issued to one collection into a single `search_batch` call.
+
+    Searches arriving within `window` seconds of the first pending one share one round-trip,
+    e.g. the intent classification and the db schema retrieval of an ask both searching
+    the table descriptions. A batch is sent right away once it reaches `max_batch_size`.
+    When a batch fails, its searches are retried one by one, so a single bad search only
+    fails its own caller.
+    """
+
+    def __init__(
+        self,
+        async_client: qdrant_client.AsyncQdrantClient,
+        collection_name: str,
+        window: float = 0.002,
+        max_batch_size: int = 64,
+    ):
+        self._async_client = async_client
+        self._collection_name = collection_name
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._pending: List[Tuple[rest.SearchRequest, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # the event loop only keeps weak references to the tasks
+        self._tasks: set[asyncio.Task] = set()
+
+    async def search(self, request: rest.SearchRequest) -> List[rest.ScoredPoint]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.create_task(self._execute(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _search_batch(
+        self, requests: List[rest.SearchRequest]
+    ) -> List[List[rest.ScoredPoint]]:
+        return await self._async_client.search_batch(
+            collection_name=self._collection_name, requests=requests
+        )
+
+    async def _execute(
+        self, pending: List[Tuple[rest.SearchRequest, asyncio.Future]]
+    ) -> None:
+        try:
+            results = await self._search_batch([request for request, _ in pending])
+        except Exception as e:
+            if len(pending) == 1:
+                results = [e]
+            else:
+                logger.warning(
+                    f"Batch of {len(pending)} searches in {self._collection_name} failed, retrying them one by one: {e}"
+                )
+                results = await asyncio.gather(
+                    *[self._search_batch([request]) for request, _ in pending],
+                    return_exceptions=True,
+                )
+                results = [
+                    result if isinstance(result, Exception) else result[0]
+                    for result in results
+                ]
+
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
 class AsyncQdrantDocumentStore(QdrantDocumentStore):
     def __init__(
         self,
@@ -101,6 +192,10 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         write_batch_size: int = 100,
         scroll_size: int = 10_000,
         payload_fields_to_index: Optional[List[dict]] = None,
+        search_batcher: Optional[SearchBatcher] = None,
+        write_concurrency: int = 4,
+        client: Optional[qdrant_client.QdrantClient] = None,
+        async_client: Optional[qdrant_client.AsyncQdrantClient] = None,
     ):
         super(AsyncQdrantDocumentStore, self).__init__(
             location=location,
@@ -140,7 +235,21 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             payload_fields_to_index=payload_fields_to_index,
         )
 
-        self.async_client = qdrant_client.AsyncQdrantClient(
+        # the clients are shared when given, e.g. by all the stores of a provider
+        if client is not None:
+            self._client = client
+            self._set_up_collection(
+                index,
+                embedding_dim,
+                recreate_index,
+                similarity,
+                use_sparse_embeddings,
+                sparse_idf,
+                on_disk,
+                payload_fields_to_index,
+            )
+
+        self.async_client = async_client or qdrant_client.AsyncQdrantClient(
             location=location,
             url=url,
             port=port,
@@ -155,6 +264,10 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             force_disable_check_same_thread=force_disable_check_same_thread,
             metadata=metadata or {},
         )
+        self._search_batcher = search_batcher
+        self._write_concurrency = max(write_concurrency, 1)
+        self._collection_set_up = False
+        self._collection_set_up_lock = asyncio.Lock()
 
         # to improve the indexing performance
         # see https://qdrant.tech/documentation/guides/multiple-partitions/?q=mul#calibrate-performance
@@ -162,23 +275,30 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             collection_name=index, field_name="project_id", field_schema="keyword"
         )
 
-    async def _query_by_embedding(
+    def to_dict(self) -> Dict[str, Any]:
+        # the search batcher and the write concurrency aren't kept as attributes named
+        # after their init parameters, which the parent's to_dict expects
+        init_params = {
+            name: getattr(self, name)
+            for name in inspect.signature(QdrantDocumentStore.__init__).parameters
+            if name != "self"
+        }
+        init_params["api_key"] = self.api_key.to_dict() if self.api_key else None
+        return default_to_dict(self, **init_params)
+
+    def _search_request(
         self,
         query_embedding: List[float],
         filters: Optional[Dict[str, Any]] = None,
         top_k: int = 10,
-        scale_score: bool = True,
         return_embedding: bool = False,
-    ) -> List[Document]:
-        qdrant_filters = convert_filters_to_qdrant(filters)
-
-        points = await self.async_client.search(
-            collection_name=self.index,
-            query_vector=rest.NamedVector(
+    ) -> rest.SearchRequest:
+        return rest.SearchRequest(
+            vector=rest.NamedVector(
                 name=DENSE_VECTORS_NAME if self.use_sparse_embeddings else "",
                 vector=query_embedding,
             ),
-            search_params=(
+            params=(
                 rest.SearchParams(
                     quantization=rest.QuantizationSearchParams(
                         rescore=True,
@@ -189,10 +309,15 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 >= 1024  # reference: https://qdrant.tech/articles/binary-quantization/#when-should-you-not-use-bq
                 else None
             ),
-            query_filter=qdrant_filters,
+            filter=convert_filters_to_qdrant(filters),
             limit=top_k,
-            with_vectors=return_embedding,
+            with_payload=True,
+            with_vector=return_embedding,
         )
+
+    def _convert_points(
+        self, points: List[rest.ScoredPoint], scale_score: bool = True
+    ) -> List[Document]:
         results = [
             convert_qdrant_point_to_haystack_document(
                 point, use_sparse_embeddings=self.use_sparse_embeddings
@@ -209,6 +334,34 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 document.score = score
         return results
 
+    @timed("search")
+    async def _query_by_embedding(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+    ) -> List[Document]:
+        request = self._search_request(
+            query_embedding=query_embedding,
+            filters=filters,
+            top_k=top_k,
+            return_embedding=return_embedding,
+        )
+
+        if self._search_batcher is not None:
+            points = await self._search_batcher.search(request)
+        else:
+            points = (
+                await self.async_client.search_batch(
+                    collection_name=self.index, requests=[request]
+                )
+            )[0]
+
+        return self._convert_points(points, scale_score=scale_score)
+
+    @timed("scroll")
     async def _query_by_filters(
         self,
         filters: Optional[Dict[str, Any]] = None,
@@ -222,7 +375,8 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 collection_name=self.index,
                 offset=offset,
                 scroll_filter=qdrant_filters,
-                limit=top_k,
+                # the local mode doesn't accept a limit of None, unlike the server
+                **({"limit": top_k} if top_k else {}),
             )
             points_list.extend(points[0])
             if points[1] is None:
@@ -239,6 +393,45 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         else:
             return []
 
+    @timed("scroll_ids")
+    async def get_document_ids(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """
+        Returns the ids of the documents matching the filters without fetching their payloads or vectors.
+        """
+        qdrant_filters = convert_filters_to_qdrant(filters)
+        document_ids = []
+        offset = None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self.index,
+                offset=offset,
+                scroll_filter=qdrant_filters,
+                limit=self.scroll_size,
+                with_payload=["id"],
+                with_vectors=False,
+            )
+            document_ids.extend(point.payload["id"] for point in points)
+            if offset is None:
+                break
+
+        return document_ids
+
+    @timed("delete")
+    async def delete_documents_by_ids(self, document_ids: List[str]):
+        if not document_ids:
+            return
+
+        await self.async_client.delete(
+            collection_name=self.index,
+            points_selector=rest.PointIdsList(
+                points=[convert_id(document_id) for document_id in document_ids]
+            ),
+            wait=self.wait_result_from_api,
+        )
+
+    @timed("delete")
     async def delete_documents(self, filters: Optional[Dict[str, Any]] = None):
         if not filters:
             qdrant_filters = rest.Filter()
@@ -256,6 +449,7 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 "Called QdrantDocumentStore.delete_documents() on a non-existing ID",
             )
 
+    @timed("count")
     async def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
         if not filters:
             qdrant_filters = rest.Filter()
@@ -268,6 +462,7 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             )
         ).count
 
+    @timed("write")
     async def write_documents(
         self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.FAIL
     ):
@@ -276,16 +471,7 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 msg = f"DocumentStore.write_documents() expects a list of Documents but got an element of {type(doc)}."
                 raise ValueError(msg)
 
-        self._set_up_collection(
-            self.index,
-            self.embedding_dim,
-            False,
-            self.similarity,
-            self.use_sparse_embeddings,
-            self.sparse_idf,
-            self.on_disk,
-            self.payload_fields_to_index,
-        )
+        await self._ensure_collection()
 
         if len(documents) == 0:
             logger.warning(
@@ -298,27 +484,64 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             policy=policy,
         )
 
-        batched_documents = document_store.get_batches_from_generator(
-            document_objects, self.write_batch_size
-        )
+        batches = [
+            convert_haystack_documents_to_qdrant_points(
+                document_batch,
+                use_sparse_embeddings=self.use_sparse_embeddings,
+            )
+            for document_batch in document_store.get_batches_from_generator(
+                document_objects, self.write_batch_size
+            )
+        ]
+        semaphore = asyncio.Semaphore(self._write_concurrency)
+
         with tqdm(
             total=len(document_objects), disable=not self.progress_bar
         ) as progress_bar:
-            for document_batch in batched_documents:
-                batch = convert_haystack_documents_to_qdrant_points(
-                    document_batch,
-                    use_sparse_embeddings=self.use_sparse_embeddings,
-                )
 
-                await self.async_client.upsert(
-                    collection_name=self.index,
-                    points=batch,
-                    wait=self.wait_result_from_api,
+            async def _upsert(batch: List[rest.PointStruct], wait: bool) -> None:
+                async with semaphore:
+                    await self.async_client.upsert(
+                        collection_name=self.index,
+                        points=batch,
+                        wait=wait,
+                    )
+                progress_bar.update(len(batch))
+
+            if self.wait_result_from_api:
+                await asyncio.gather(*[_upsert(batch, wait=True) for batch in batches])
+            else:
+                # updates of a collection are applied in order, so waiting for the last batch
+                # is a consistency barrier for all the batches queued before it
+                await asyncio.gather(
+                    *[_upsert(batch, wait=False) for batch in batches[:-1]]
                 )
+                await _upsert(batches[-1], wait=True)
 
-                progress_bar.update(self.write_batch_size)
         return len(document_objects)
 
+    async def _ensure_collection(self) -> None:
+        if self._collection_set_up:
+            return
+
+        async with self._collection_set_up_lock:
+            if self._collection_set_up:
+                return
+
+            # the collection is set up with the sync client, keep it off the event loop
+            await asyncio.to_thread(
+                self._set_up_collection,
+                self.index,
+                self.embedding_dim,
+                False,
+                self.similarity,
+                self.use_sparse_embeddings,
+                self.sparse_idf,
+                self.on_disk,
+                self.payload_fields_to_index,
+            )
+            self._collection_set_up = True
+
 
 class AsyncQdrantEmbeddingRetriever(QdrantEmbeddingRetriever):
     def __init__(
@@ -383,12 +606,43 @@ class QdrantProvider(DocumentStoreProvider):
             if os.getenv("SHOULD_FORCE_DEPLOY")
             else False
         ),
+        search_batch_window: float = 0.002,  # unit: seconds
+        write_concurrency: int = 4,
+        write_wait_result: bool = True,
+        prefer_grpc: bool = False,
+        grpc_port: int = 6334,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
         **_,
     ):
         self._location = location
         self._api_key = Secret.from_token(api_key) if api_key else None
         self._timeout = timeout
         self._embedding_model_dim = embedding_model_dim
+        self._search_batch_window = search_batch_window
+        self._write_concurrency = write_concurrency
+        self._write_wait_result = write_wait_result
+        self._prefer_grpc = prefer_grpc
+        self._grpc_port = grpc_port
+
+        # one sync and one async client, and so one connection pool each, are shared
+        # by the stores of all collections
+        client_kwargs = {
+            "location": location,
+            "api_key": api_key,
+            "timeout": timeout,
+            "prefer_grpc": prefer_grpc,
+            "grpc_port": grpc_port,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        }
+        self._client = qdrant_client.QdrantClient(**client_kwargs)
+        self._async_client = qdrant_client.AsyncQdrantClient(**client_kwargs)
+
+        self._search_batchers: Dict[str, SearchBatcher] = {}
+        self._stores: Dict[str, AsyncQdrantDocumentStore] = {}
         self._reset_document_store(recreate_index)
 
     def _reset_document_store(self, recreate_index: bool):
@@ -404,11 +658,27 @@ class QdrantProvider(DocumentStoreProvider):
         dataset_name: Optional[str] = None,
         recreate_index: bool = False,
     ):
-        return AsyncQdrantDocumentStore(
+        index = dataset_name or "Document"
+        # pipelines get the store of their collection on construction, so the stores
+        # are built once per collection, unless the collection is to be recreated
+        if index in self._stores and not recreate_index:
+            return self._stores[index]
+
+        # searches to the same collection share one batcher across all pipelines
+        if index not in self._search_batchers:
+            self._search_batchers[index] = SearchBatcher(
+                async_client=self._async_client,
+                collection_name=index,
+                window=self._search_batch_window,
+            )
+
+        store = AsyncQdrantDocumentStore(
             location=self._location,
             api_key=self._api_key,
+            prefer_grpc=self._prefer_grpc,
+            grpc_port=self._grpc_port,
             embedding_dim=self._embedding_model_dim,
-            index=dataset_name or "Document",
+            index=index,
             recreate_index=recreate_index,
             on_disk=True,
             timeout=self._timeout,
@@ -427,7 +697,19 @@ class QdrantProvider(DocumentStoreProvider):
                 payload_m=16,
                 m=0,
             ),
+            search_batcher=self._search_batchers[index],
+            write_concurrency=self._write_concurrency,
+            wait_result_from_api=self._write_wait_result,
+            client=self._client,
+            async_client=self._async_client,
         )
+        self._stores[index] = store
+
+        return store
+
+    async def close(self) -> None:
+        self._client.close()
+        await self._async_client.close()
 
     def get_retriever(
         self,
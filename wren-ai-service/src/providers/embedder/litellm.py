@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import os
 from typing import Any, Dict, List, Optional, Tuple
@@ -8,7 +7,8 @@ import openai
 from haystack import Document, component
 from litellm import aembedding
 
-from src.core.provider import EmbedderProvider
+from src.core.metrics import EMBEDDING_DURATION, EMBEDDING_TEXTS, current_pipeline
+from src.core.provider import EmbedderProvider, EmbeddingCache, EmbeddingScheduler
 from src.providers.loader import provider
 from src.utils import remove_trailing_slash
 
@@ -38,12 +38,14 @@ class AsyncTextEmbedder:
         api_key: Optional[str] = None,
         api_base_url: Optional[str] = None,
         timeout: Optional[float] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
         **kwargs,
     ):
         self._api_key = api_key
         self._model = model
         self._api_base_url = api_base_url
         self._timeout = timeout
+        self._embedding_cache = embedding_cache
         self._kwargs = kwargs
 
     @component.output_types(embedding=List[float], meta=Dict[str, Any])
@@ -59,21 +61,35 @@ class AsyncTextEmbedder:
         # replace newlines, which can negatively affect performance.
         text_to_embed = text.replace("\n", " ")
 
-        response = await aembedding(
-            model=self._model,
-            input=[text_to_embed],
-            api_key=self._api_key,
-            api_base=self._api_base_url,
-            timeout=self._timeout,
-            **self._kwargs,
-        )
+        meta = {"model": self._model, "usage": {}}
+        pipeline = current_pipeline.get()
+
+        async def _embed(texts: List[str]) -> List[List[float]]:
+            labels = {"pipeline": pipeline, "model": self._model, "kind": "text"}
+            EMBEDDING_TEXTS.inc(len(texts), **labels)
+            with EMBEDDING_DURATION.time(**labels):
+                response = await aembedding(
+                    model=self._model,
+                    input=texts,
+                    api_key=self._api_key,
+                    api_base=self._api_base_url,
+                    timeout=self._timeout,
+                    **self._kwargs,
+                )
 
-        meta = {
-            "model": response.model,
-            "usage": dict(response.usage) if hasattr(response, "usage") else {},
-        }
+            meta["model"] = response.model
+            meta["usage"] = dict(response.usage) if hasattr(response, "usage") else {}
 
-        return {"embedding": response.data[0]["embedding"], "meta": meta}
+            return [el["embedding"] for el in response.data]
+
+        if self._embedding_cache is None:
+            embeddings = await _embed([text_to_embed])
+        else:
+            embeddings = await self._embedding_cache.embed(
+                self._model, [text_to_embed], _embed
+            )
+
+        return {"embedding": embeddings[0], "meta": meta}
 
 
 @component
@@ -85,6 +101,8 @@ class AsyncDocumentEmbedder:
         api_key: Optional[str] = None,
         api_base_url: Optional[str] = None,
         timeout: Optional[float] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embedding_scheduler: Optional[EmbeddingScheduler] = None,
         **kwargs,
     ):
         self._api_key = api_key
@@ -92,28 +110,32 @@ class AsyncDocumentEmbedder:
         self._batch_size = batch_size
         self._api_base_url = api_base_url
         self._timeout = timeout
+        self._embedding_cache = embedding_cache
+        self._embedding_scheduler = embedding_scheduler or EmbeddingScheduler(
+            retry_on=(openai.APIError,)
+        )
         self._kwargs = kwargs
 
     async def _embed_batch(
         self, texts_to_embed: List[str], batch_size: int
     ) -> Tuple[List[List[float]], Dict[str, Any]]:
-        async def embed_single_batch(batch: List[str]) -> Any:
-            return await aembedding(
-                model=self._model,
-                input=batch,
-                api_key=self._api_key,
-                api_base=self._api_base_url,
-                timeout=self._timeout,
-                **self._kwargs,
-            )
+        pipeline = current_pipeline.get()
 
-        batches = [
-            texts_to_embed[i : i + batch_size]
-            for i in range(0, len(texts_to_embed), batch_size)
-        ]
+        async def embed_single_batch(batch: List[str]) -> Any:
+            labels = {"pipeline": pipeline, "model": self._model, "kind": "document"}
+            EMBEDDING_TEXTS.inc(len(batch), **labels)
+            with EMBEDDING_DURATION.time(**labels):
+                return await aembedding(
+                    model=self._model,
+                    input=batch,
+                    api_key=self._api_key,
+                    api_base=self._api_base_url,
+                    timeout=self._timeout,
+                    **self._kwargs,
+                )
 
-        responses = await asyncio.gather(
-            *[embed_single_batch(batch) for batch in batches]
+        responses = await self._embedding_scheduler.run(
+            texts_to_embed, embed_single_batch, max_batch_size=batch_size
         )
 
         all_embeddings = []
@@ -137,7 +159,6 @@ class AsyncDocumentEmbedder:
         return all_embeddings, meta
 
     @component.output_types(documents=List[Document], meta=Dict[str, Any])
-    @backoff.on_exception(backoff.expo, openai.APIError, max_time=60.0, max_tries=3)
     async def run(self, documents: List[Document]):
         if (
             not isinstance(documents, list)
@@ -151,10 +172,25 @@ class AsyncDocumentEmbedder:
 
         texts_to_embed = _prepare_texts_to_embed(documents=documents)
 
-        embeddings, meta = await self._embed_batch(
-            texts_to_embed=texts_to_embed,
-            batch_size=self._batch_size,
-        )
+        if self._embedding_cache is None:
+            embeddings, meta = await self._embed_batch(
+                texts_to_embed=texts_to_embed,
+                batch_size=self._batch_size,
+            )
+        else:
+            meta = {}
+
+            async def _embed(texts: List[str]) -> List[List[float]]:
+                embeddings, batch_meta = await self._embed_batch(
+                    texts_to_embed=texts,
+                    batch_size=self._batch_size,
+                )
+                meta.update(batch_meta)
+                return embeddings
+
+            embeddings = await self._embedding_cache.embed(
+                self._model, texts_to_embed, _embed
+            )
 
         for doc, emb in zip(documents, embeddings):
             doc.embedding = emb
@@ -172,12 +208,18 @@ class LitellmEmbedderProvider(EmbedderProvider):
         ] = None,  # e.g. EMBEDDER_OPENAI_API_KEY, EMBEDDER_ANTHROPIC_API_KEY, etc.
         api_base: Optional[str] = None,
         timeout: float = 120.0,
+        embedding_cache: Optional[Dict[str, Any]] = None,
+        embedding_scheduler: Optional[Dict[str, Any]] = None,
         **kwargs,
     ):
         self._api_key = os.getenv(api_key_name) if api_key_name else None
         self._api_base = remove_trailing_slash(api_base) if api_base else None
         self._embedding_model = model
         self._timeout = timeout
+        self._embedding_cache = EmbeddingCache(**(embedding_cache or {}))
+        self._embedding_scheduler = EmbeddingScheduler(
+            **(embedding_scheduler or {}), retry_on=(openai.APIError,)
+        )
         if "provider" in kwargs:
             del kwargs["provider"]
         self._kwargs = kwargs
@@ -188,6 +230,7 @@ class LitellmEmbedderProvider(EmbedderProvider):
             api_base_url=self._api_base,
             model=self._embedding_model,
             timeout=self._timeout,
+            embedding_cache=self._embedding_cache,
             **self._kwargs,
         )
 
@@ -197,5 +240,7 @@ class LitellmEmbedderProvider(EmbedderProvider):
             api_base_url=self._api_base,
             model=self._embedding_model,
             timeout=self._timeout,
+            embedding_cache=self._embedding_cache,
+            embedding_scheduler=self._embedding_scheduler,
             **self._kwargs,
         )
@@ -8,7 +8,12 @@ import aiohttp
 import orjson
 
 from src.config import settings
-from src.core.engine import Engine, remove_limit_statement
+from src.core.engine import (
+    Engine,
+    EngineSessionPool,
+    SqlValidationCache,
+    remove_limit_statement,
+)
 from src.providers.loader import provider
 
 logger = logging.getLogger("wren-ai-service")
@@ -19,9 +24,13 @@ class WrenUI(Engine):
     def __init__(
         self,
         endpoint: str = os.getenv("WREN_UI_ENDPOINT"),
+        session_pool: Optional[Dict[str, Any]] = None,
+        validation_cache: Optional[Dict[str, Any]] = None,
         **_,
     ):
         self._endpoint = endpoint
+        self._session_pool = EngineSessionPool(**(session_pool or {}))
+        self._validation_cache = SqlValidationCache(**(validation_cache or {}))
 
     async def execute_sql(
         self,
@@ -147,9 +156,13 @@ class WrenIbis(Engine):
         source: str = os.getenv("WREN_IBIS_SOURCE"),
         manifest: str = os.getenv("WREN_IBIS_MANIFEST"),
         connection_info: str = os.getenv("WREN_IBIS_CONNECTION_INFO"),
+        session_pool: Optional[Dict[str, Any]] = None,
+        validation_cache: Optional[Dict[str, Any]] = None,
         **_,
     ):
         self._endpoint = endpoint
+        self._session_pool = EngineSessionPool(**(session_pool or {}))
+        self._validation_cache = SqlValidationCache(**(validation_cache or {}))
         self._source = source
         self._manifest = manifest
         self._connection_info = (
@@ -270,9 +283,13 @@ class WrenEngine(Engine):
         self,
         endpoint: str = os.getenv("WREN_ENGINE_ENDPOINT"),
         manifest: str = os.getenv("WREN_ENGINE_MANIFEST"),
+        session_pool: Optional[Dict[str, Any]] = None,
+        validation_cache: Optional[Dict[str, Any]] = None,
         **_,
     ):
         self._endpoint = endpoint
+        self._session_pool = EngineSessionPool(**(session_pool or {}))
+        self._validation_cache = SqlValidationCache(**(validation_cache or {}))
         self._manifest = manifest
 
     async def execute_sql(
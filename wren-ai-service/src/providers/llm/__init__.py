@@ -3,6 +3,8 @@ from dataclasses import asdict, dataclass, field
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from src.core.provider import PROMPT_CACHE_BREAKPOINT
+
 logger = logging.getLogger("wren-ai-service")
 
 
@@ -250,3 +252,66 @@ def convert_message_to_openai_format(message: ChatMessage) -> Dict[str, str]:
         openai_msg["name"] = message.name
 
     return openai_msg
+
+
+def apply_prompt_cache_breakpoints(
+    messages: List[Dict[str, Any]], cache_control: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Removes the prompt cache breakpoints from the messages in the OpenAI format.
+
+    With `cache_control`, for the models caching prompt prefixes on explicit markers, the
+    system prompt and the text before the breakpoint of a message are marked as cacheable.
+    Other models, e.g. OpenAI's, cache the longest shared prefix on their own.
+    """
+    formatted = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str) and PROMPT_CACHE_BREAKPOINT in content:
+            prefix, suffix = content.split(PROMPT_CACHE_BREAKPOINT, 1)
+            suffix = suffix.replace(PROMPT_CACHE_BREAKPOINT, "")
+            if cache_control:
+                content = [
+                    {
+                        "type": "text",
+                        "text": prefix,
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": suffix},
+                ]
+            else:
+                content = prefix + suffix
+        elif isinstance(content, str) and cache_control and message["role"] == "system":
+            content = [
+                {
+                    "type": "text",
+                    "text": content,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        elif isinstance(content, list):
+            content = [
+                {**block, "text": block["text"].replace(PROMPT_CACHE_BREAKPOINT, "")}
+                if block.get("type") == "text"
+                else block
+                for block in content
+            ]
+        formatted.append({**message, "content": content} if content else message)
+    return formatted
+
+
+def get_prompt_cache_usage(usage: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Returns the prompt tokens read from and written to the prompt cache of the model,
+    from the usage of a completion.
+    """
+    details = usage.get("prompt_tokens_details") or {}
+    cached_tokens = (
+        details.get("cached_tokens")
+        if isinstance(details, dict)
+        else getattr(details, "cached_tokens", None)
+    )
+    return {
+        "cached_prompt": cached_tokens or usage.get("cache_read_input_tokens") or 0,
+        "cache_write": usage.get("cache_creation_input_tokens") or 0,
+    }
@@ -1,19 +1,30 @@
 import os
+import time
 from typing import Any, Callable, Dict, List, Optional
 
 import backoff
 import openai
 from litellm import Router, acompletion
 
-from src.core.provider import LLMProvider
+from src.core.metrics import (
+    LLM_CACHE_LOOKUPS,
+    LLM_CACHE_TOKENS_SAVED,
+    LLM_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS,
+    current_pipeline,
+)
+from src.core.provider import CompletionCache, LLMProvider
 from src.providers.llm import (
     ChatMessage,
     StreamingChunk,
+    apply_prompt_cache_breakpoints,
     build_chunk,
     build_message,
     check_finish_reason,
     connect_chunks,
     convert_message_to_openai_format,
+    get_prompt_cache_usage,
 )
 from src.providers.loader import provider
 from src.utils import extract_braces_content, remove_trailing_slash
@@ -34,6 +45,8 @@ class LitellmLLMProvider(LLMProvider):
         context_window_size: int = 100000,
         fallback_model_list: Optional[List[Dict[str, Any]]] = None,
         fallback_testing: bool = False,
+        completion_cache: Optional[Dict[str, Any]] = None,
+        prompt_cache_control: Optional[bool] = None,
         **_,
     ):
         self._model = model
@@ -58,6 +71,19 @@ class LitellmLLMProvider(LLMProvider):
             fallbacks=fallbacks,
         )
         self._enable_fallback_testing = fallback_testing and self._has_fallbacks
+        # mark the cacheable prompt prefixes for the models needing explicit markers,
+        # Anthropic's by default
+        self._prompt_cache_control = (
+            prompt_cache_control
+            if prompt_cache_control is not None
+            else model.startswith("anthropic/") or "claude" in model.lower()
+        )
+        # opt-in, deterministic calls with the same messages get the same completion
+        self._completion_cache = (
+            CompletionCache(**completion_cache)
+            if completion_cache is not None
+            else None
+        )
 
     def get_generator(
         self,
@@ -90,9 +116,10 @@ class LitellmLLMProvider(LLMProvider):
                 else:
                     messages = [message]
 
-            openai_formatted_messages = [
-                convert_message_to_openai_format(message) for message in messages
-            ]
+            openai_formatted_messages = apply_prompt_cache_breakpoints(
+                [convert_message_to_openai_format(message) for message in messages],
+                cache_control=self._prompt_cache_control,
+            )
 
             generation_kwargs = {
                 **combined_generation_kwargs,
@@ -103,6 +130,96 @@ class LitellmLLMProvider(LLMProvider):
                 "allowed_openai_params", []
             ) + (["reasoning_effort"] if self._model.startswith("gpt-5") else [])
 
+            pipeline = current_pipeline.get()
+            cache_key = None
+            if (
+                self._completion_cache is not None
+                and self._completion_cache.is_cacheable(
+                    pipeline,
+                    generation_kwargs,
+                    streaming=streaming_callback is not None,
+                )
+            ):
+                cache_key = self._completion_cache.key(
+                    self._model, openai_formatted_messages, generation_kwargs
+                )
+                cached = await self._completion_cache.get(cache_key)
+                LLM_CACHE_LOOKUPS.inc(
+                    pipeline=pipeline,
+                    model=self._model,
+                    result="miss" if cached is None else "hit",
+                )
+                if cached is not None:
+                    usage = (cached["meta"] or [{}])[0].get("usage") or {}
+                    for token_type in ("prompt_tokens", "completion_tokens"):
+                        LLM_CACHE_TOKENS_SAVED.inc(
+                            usage.get(token_type) or 0,
+                            pipeline=pipeline,
+                            model=self._model,
+                            type=token_type.removesuffix("_tokens"),
+                        )
+                    return cached
+
+            start = time.perf_counter()
+            try:
+                completions = await _complete(
+                    openai_formatted_messages,
+                    generation_kwargs,
+                    allowed_openai_params,
+                    query_id,
+                    pipeline,
+                    start,
+                )
+            except BaseException:
+                LLM_DURATION.observe(
+                    time.perf_counter() - start,
+                    pipeline=pipeline,
+                    model=self._model,
+                    status="error",
+                )
+                raise
+
+            LLM_DURATION.observe(
+                time.perf_counter() - start,
+                pipeline=pipeline,
+                model=self._model,
+                status="ok",
+            )
+            if completions:
+                usage = completions[0].meta.get("usage") or {}
+                tokens = {
+                    "prompt": usage.get("prompt_tokens") or 0,
+                    "completion": usage.get("completion_tokens") or 0,
+                    **get_prompt_cache_usage(usage),
+                }
+                for token_type, count in tokens.items():
+                    LLM_TOKENS.inc(
+                        count, pipeline=pipeline, model=self._model, type=token_type
+                    )
+
+            # before returning, do post-processing of the completions
+            for response in completions:
+                check_finish_reason(response)
+
+            result = {
+                "replies": [
+                    extract_braces_content(message.content) for message in completions
+                ],
+                "meta": [message.meta for message in completions],
+            }
+            if cache_key is not None:
+                await self._completion_cache.put(cache_key, result)
+
+            return result
+
+        async def _complete(
+            openai_formatted_messages: List[Dict[str, Any]],
+            generation_kwargs: Dict[str, Any],
+            allowed_openai_params: List[str],
+            query_id: Optional[str],
+            pipeline: str,
+            start: float,
+        ) -> List[ChatMessage]:
             if self._has_fallbacks:
                 completion = await self._router.acompletion(
                     model=self._model,
@@ -136,6 +253,12 @@ class LitellmLLMProvider(LLMProvider):
 
                 async for chunk in completion:
                     if chunk.choices and streaming_callback:
+                        if not chunks:
+                            LLM_TIME_TO_FIRST_TOKEN.observe(
+                                time.perf_counter() - start,
+                                pipeline=pipeline,
+                                model=self._model,
+                            )
                         chunk_delta: StreamingChunk = build_chunk(chunk)
                         chunks.append(chunk_delta)
                         streaming_callback(
@@ -147,15 +270,6 @@ class LitellmLLMProvider(LLMProvider):
                     build_message(completion, choice) for choice in completion.choices
                 ]
 
-            # before returning, do post-processing of the completions
-            for response in completions:
-                check_finish_reason(response)
-
-            return {
-                "replies": [
-                    extract_braces_content(message.content) for message in completions
-                ],
-                "meta": [message.meta for message in completions],
-            }
+            return completions
 
         return _run
@@ -4,6 +4,7 @@ from dataclasses import asdict
 from fastapi import APIRouter, BackgroundTasks, Depends
 from fastapi.responses import StreamingResponse
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -25,21 +26,27 @@ router = APIRouter()
 @router.post("/asks")
 async def ask(
     ask_request: AskRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> AskResponse:
     query_id = str(uuid.uuid4())
     ask_request.query_id = query_id
-    service_container.ask_service._ask_results[query_id] = AskResultResponse(
-        status="understanding",
+    await service_container.ask_service._ask_results.set(
+        query_id,
+        AskResultResponse(status="understanding"),
     )
 
-    background_tasks.add_task(
-        service_container.ask_service.ask,
-        ask_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "ask",
+            service_container.ask_service.ask,
+            ask_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service_container.ask_service._ask_results.delete(query_id)
+        raise
     return AskResponse(query_id=query_id)
 
 
@@ -63,7 +70,7 @@ async def get_ask_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> AskResultResponse:
-    return service_container.ask_service.get_ask_result(
+    return await service_container.ask_service.get_ask_result(
         AskResultRequest(query_id=query_id)
     )
 
@@ -3,6 +3,7 @@ from dataclasses import asdict
 
 from fastapi import APIRouter, BackgroundTasks, Depends
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -24,23 +25,29 @@ router = APIRouter()
 @router.post("/ask-feedbacks")
 async def ask_feedback(
     ask_feedback_request: AskFeedbackRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> AskFeedbackResponse:
     query_id = str(uuid.uuid4())
     ask_feedback_request.query_id = query_id
-    service_container.ask_feedback_service._ask_feedback_results[
-        query_id
-    ] = AskFeedbackResultResponse(
-        status="searching",
+    await service_container.ask_feedback_service._ask_feedback_results.set(
+        query_id,
+        AskFeedbackResultResponse(status="searching"),
     )
 
-    background_tasks.add_task(
-        service_container.ask_feedback_service.ask_feedback,
-        ask_feedback_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "ask_feedback",
+            service_container.ask_feedback_service.ask_feedback,
+            ask_feedback_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service_container.ask_feedback_service._ask_feedback_results.delete(
+            query_id
+        )
+        raise
     return AskFeedbackResponse(query_id=query_id)
 
 
@@ -64,6 +71,6 @@ async def get_ask_feedback_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> AskFeedbackResultResponse:
-    return service_container.ask_feedback_service.get_ask_feedback_result(
+    return await service_container.ask_feedback_service.get_ask_feedback_result(
         AskFeedbackResultRequest(query_id=query_id)
     )
@@ -3,6 +3,7 @@ from dataclasses import asdict
 
 from fastapi import APIRouter, BackgroundTasks, Depends
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -24,21 +25,27 @@ router = APIRouter()
 @router.post("/charts")
 async def chart(
     chart_request: ChartRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> ChartResponse:
     query_id = str(uuid.uuid4())
     chart_request.query_id = query_id
-    service_container.chart_service._chart_results[query_id] = ChartResultResponse(
-        status="fetching",
+    await service_container.chart_service._chart_results.set(
+        query_id,
+        ChartResultResponse(status="fetching"),
     )
 
-    background_tasks.add_task(
-        service_container.chart_service.chart,
-        chart_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "chart",
+            service_container.chart_service.chart,
+            chart_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service_container.chart_service._chart_results.delete(query_id)
+        raise
     return ChartResponse(query_id=query_id)
 
 
@@ -62,6 +69,6 @@ async def get_chart_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> ChartResultResponse:
-    return service_container.chart_service.get_chart_result(
+    return await service_container.chart_service.get_chart_result(
         ChartResultRequest(query_id=query_id)
     )
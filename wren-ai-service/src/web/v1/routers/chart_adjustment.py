@@ -3,6 +3,7 @@ from dataclasses import asdict
 
 from fastapi import APIRouter, BackgroundTasks, Depends
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -24,23 +25,31 @@ router = APIRouter()
 @router.post("/chart-adjustments")
 async def chart_adjustment(
     chart_adjustment_request: ChartAdjustmentRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> ChartAdjustmentResponse:
     query_id = str(uuid.uuid4())
     chart_adjustment_request.query_id = query_id
-    service_container.chart_adjustment_service._chart_adjustment_results[
-        query_id
-    ] = ChartAdjustmentResultResponse(
-        status="fetching",
+    await service_container.chart_adjustment_service._chart_adjustment_results.set(
+        query_id,
+        ChartAdjustmentResultResponse(status="fetching"),
     )
 
-    background_tasks.add_task(
-        service_container.chart_adjustment_service.chart_adjustment,
-        chart_adjustment_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "chart_adjustment",
+            service_container.chart_adjustment_service.chart_adjustment,
+            chart_adjustment_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await (
+            service_container.chart_adjustment_service._chart_adjustment_results.delete(
+                query_id
+            )
+        )
+        raise
     return ChartAdjustmentResponse(query_id=query_id)
 
 
@@ -64,6 +73,7 @@ async def get_chart_adjustment_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> ChartAdjustmentResultResponse:
-    return service_container.chart_adjustment_service.get_chart_adjustment_result(
+    service = service_container.chart_adjustment_service
+    return await service.get_chart_adjustment_result(
         ChartAdjustmentResultRequest(query_id=query_id)
     )
@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import List, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Response
+from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -27,23 +28,28 @@ class PostResponse(BaseModel):
 @router.post("/instructions")
 async def index(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     event_id = str(uuid.uuid4())
     service = service_container.instructions_service
-    service[event_id] = InstructionsService.Event(event_id=event_id)
+    await service.set(event_id, InstructionsService.Event(event_id=event_id))
 
     index_request = InstructionsService.IndexRequest(
         event_id=event_id, **request.model_dump()
     )
 
-    background_tasks.add_task(
-        service.index,
-        index_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "instructions",
+            service.index,
+            index_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(event_id)
+        raise
     return PostResponse(event_id=event_id)
 
 
@@ -60,7 +66,9 @@ async def delete(
 ) -> None | InstructionsService.Error:
     event_id = str(uuid.uuid4())
     service = service_container.instructions_service
-    service[event_id] = InstructionsService.Event(event_id=event_id, status="deleting")
+    await service.set(
+        event_id, InstructionsService.Event(event_id=event_id, status="deleting")
+    )
 
     delete_request = InstructionsService.DeleteRequest(
         event_id=event_id,
@@ -69,7 +77,7 @@ async def delete(
 
     await service.delete(delete_request, service_metadata=asdict(service_metadata))
 
-    event: InstructionsService.Event = service[event_id]
+    event: InstructionsService.Event = await service.get(event_id)
 
     if event.status == "failed":
         response.status_code = 500
@@ -88,5 +96,7 @@ async def get(
     event_id: str,
     container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    event: InstructionsService.Event = container.instructions_service[event_id]
+    event: InstructionsService.Event = await container.instructions_service.get(
+        event_id
+    )
     return GetResponse(**event.model_dump())
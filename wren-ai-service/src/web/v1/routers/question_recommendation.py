@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -35,21 +36,26 @@ class PostResponse(BaseModel):
 )
 async def recommend(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     event_id = str(uuid.uuid4())
     service = service_container.question_recommendation
-    service[event_id] = QuestionRecommendation.Event(event_id=event_id)
+    await service.set(event_id, QuestionRecommendation.Event(event_id=event_id))
 
     _request = QuestionRecommendation.Request(event_id=event_id, **request.model_dump())
 
-    background_tasks.add_task(
-        service.recommend,
-        _request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "question_recommendation",
+            service.recommend,
+            _request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(event_id)
+        raise
 
     return PostResponse(id=event_id)
 
@@ -70,9 +76,9 @@ async def get(
     event_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    event: QuestionRecommendation.Event = service_container.question_recommendation[
-        event_id
-    ]
+    event: QuestionRecommendation.Event = (
+        await service_container.question_recommendation.get(event_id)
+    )
 
     def _formatter(response: dict) -> dict:
         questions = [
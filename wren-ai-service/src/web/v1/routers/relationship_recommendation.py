@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -30,14 +31,13 @@ class PostResponse(BaseModel):
 )
 async def recommend(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     id = str(uuid.uuid4())
     service = service_container.relationship_recommendation
 
-    service[id] = RelationshipRecommendation.Resource(id=id)
+    await service.set(id, RelationshipRecommendation.Resource(id=id))
     input = RelationshipRecommendation.Input(
         id=id,
         mdl=request.mdl,
@@ -45,9 +45,17 @@ async def recommend(
         configuration=request.configurations,
     )
 
-    background_tasks.add_task(
-        service.recommend, input, service_metadata=asdict(service_metadata)
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "relationship_recommendation",
+            service.recommend,
+            input,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(id)
+        raise
 
     return PostResponse(id=id)
 
@@ -68,7 +76,7 @@ async def get(
     id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    resource = service_container.relationship_recommendation[id]
+    resource = await service_container.relationship_recommendation.get(id)
 
     return GetResponse(
         id=resource.id,
@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -32,23 +33,28 @@ class PostResponse(BaseModel):
 )
 async def generate(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     id = str(uuid.uuid4())
     service = service_container.semantics_description
-    service[id] = SemanticsDescription.Resource(id=id)
+    await service.set(id, SemanticsDescription.Resource(id=id))
 
     generate_request = SemanticsDescription.GenerateRequest(
         id=id, **request.model_dump()
     )
 
-    background_tasks.add_task(
-        service.generate,
-        generate_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "semantics_description",
+            service.generate,
+            generate_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(id)
+        raise
     return PostResponse(id=id)
 
 
@@ -68,7 +74,7 @@ async def get(
     id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    resource = service_container.semantics_description[id]
+    resource = await service_container.semantics_description.get(id)
 
     def _formatter(response: Optional[dict]) -> Optional[list[dict]]:
         if response is None:
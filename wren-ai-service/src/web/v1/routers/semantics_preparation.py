@@ -1,7 +1,8 @@
 from dataclasses import asdict
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -21,21 +22,28 @@ router = APIRouter()
 @router.post("/semantics-preparations")
 async def prepare_semantics(
     prepare_semantics_request: SemanticsPreparationRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> SemanticsPreparationResponse:
-    service_container.semantics_preparation_service._prepare_semantics_statuses[
-        prepare_semantics_request.mdl_hash
-    ] = SemanticsPreparationStatusResponse(
-        status="indexing",
+    service = service_container.semantics_preparation_service
+    await service._prepare_semantics_statuses.set(
+        prepare_semantics_request.mdl_hash,
+        SemanticsPreparationStatusResponse(status="indexing"),
     )
 
-    background_tasks.add_task(
-        service_container.semantics_preparation_service.prepare_semantics,
-        prepare_semantics_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "semantics_preparation",
+            service.prepare_semantics,
+            prepare_semantics_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._prepare_semantics_statuses.delete(
+            prepare_semantics_request.mdl_hash
+        )
+        raise
     return SemanticsPreparationResponse(mdl_hash=prepare_semantics_request.mdl_hash)
 
 
@@ -44,7 +52,8 @@ async def get_prepare_semantics_status(
     mdl_hash: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> SemanticsPreparationStatusResponse:
-    return service_container.semantics_preparation_service.get_prepare_semantics_status(
+    service = service_container.semantics_preparation_service
+    return await service.get_prepare_semantics_status(
         SemanticsPreparationStatusRequest(mdl_hash=mdl_hash)
     )
 
@@ -1,9 +1,10 @@
 import uuid
 from dataclasses import asdict
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -23,23 +24,27 @@ router = APIRouter()
 @router.post("/sql-answers")
 async def sql_answer(
     sql_answer_request: SqlAnswerRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> SqlAnswerResponse:
     query_id = str(uuid.uuid4())
     sql_answer_request.query_id = query_id
-    service_container.sql_answer_service._sql_answer_results[
-        query_id
-    ] = SqlAnswerResultResponse(
-        status="preprocessing",
+    await service_container.sql_answer_service._sql_answer_results.set(
+        query_id,
+        SqlAnswerResultResponse(status="preprocessing"),
     )
 
-    background_tasks.add_task(
-        service_container.sql_answer_service.sql_answer,
-        sql_answer_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "sql_answer",
+            service_container.sql_answer_service.sql_answer,
+            sql_answer_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service_container.sql_answer_service._sql_answer_results.delete(query_id)
+        raise
     return SqlAnswerResponse(query_id=query_id)
 
 
@@ -48,7 +53,7 @@ async def get_sql_answer_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> SqlAnswerResultResponse:
-    return service_container.sql_answer_service.get_sql_answer_result(
+    return await service_container.sql_answer_service.get_sql_answer_result(
         SqlAnswerResultRequest(query_id=query_id)
     )
 
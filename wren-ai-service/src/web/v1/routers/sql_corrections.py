@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import List, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -31,23 +32,28 @@ class PostResponse(BaseModel):
 @router.post("/sql-corrections")
 async def correct(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     event_id = str(uuid.uuid4())
     service = service_container.sql_correction_service
-    service[event_id] = SqlCorrectionService.Event(event_id=event_id)
+    await service.set(event_id, SqlCorrectionService.Event(event_id=event_id))
 
     _request = SqlCorrectionService.CorrectionRequest(
         event_id=event_id, **request.model_dump()
     )
 
-    background_tasks.add_task(
-        service.correct,
-        _request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "sql_correction",
+            service.correct,
+            _request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(event_id)
+        raise
     return PostResponse(event_id=event_id)
 
 
@@ -65,5 +71,7 @@ async def get(
     event_id: str,
     container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    event: SqlCorrectionService.Event = container.sql_correction_service[event_id]
+    event: SqlCorrectionService.Event = await container.sql_correction_service.get(
+        event_id
+    )
     return GetResponse(**event.model_dump())
@@ -2,9 +2,10 @@ import uuid
 from dataclasses import asdict
 from typing import List, Literal, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, Response
+from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -28,21 +29,26 @@ class PostResponse(BaseModel):
 @router.post("/sql-pairs")
 async def prepare(
     request: PostRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> PostResponse:
     event_id = str(uuid.uuid4())
     service = service_container.sql_pairs_service
-    service[event_id] = SqlPairsService.Event(id=event_id, status="indexing")
+    await service.set(event_id, SqlPairsService.Event(id=event_id, status="indexing"))
 
     index_request = SqlPairsService.IndexRequest(id=event_id, **request.model_dump())
 
-    background_tasks.add_task(
-        service.index,
-        index_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "sql_pairs",
+            service.index,
+            index_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service._cache.delete(event_id)
+        raise
     return PostResponse(event_id=event_id)
 
 
@@ -59,7 +65,7 @@ async def delete(
 ) -> None | SqlPairsService.Event.Error:
     event_id = str(uuid.uuid4())
     service = service_container.sql_pairs_service
-    service[event_id] = SqlPairsService.Event(id=event_id, status="deleting")
+    await service.set(event_id, SqlPairsService.Event(id=event_id, status="deleting"))
 
     delete_request = SqlPairsService.DeleteRequest(
         id=event_id,
@@ -68,7 +74,7 @@ async def delete(
 
     await service.delete(delete_request, service_metadata=asdict(service_metadata))
 
-    event: SqlPairsService.Event = service[event_id]
+    event: SqlPairsService.Event = await service.get(event_id)
 
     if event.status == "failed":
         response.status_code = 500
@@ -87,7 +93,7 @@ async def get(
     event_id: str,
     container: ServiceContainer = Depends(get_service_container),
 ) -> GetResponse:
-    event: SqlPairsService.Event = container.sql_pairs_service[event_id]
+    event: SqlPairsService.Event = await container.sql_pairs_service.get(event_id)
     return GetResponse(
         event_id=event.id,
         status=event.status,
@@ -1,8 +1,9 @@
 import uuid
 from dataclasses import asdict
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 
+from src.core.job_scheduler import QueueFullError
 from src.globals import (
     ServiceContainer,
     ServiceMetadata,
@@ -22,23 +23,29 @@ router = APIRouter()
 @router.post("/sql-questions")
 async def sql_question(
     sql_question_request: SqlQuestionRequest,
-    background_tasks: BackgroundTasks,
     service_container: ServiceContainer = Depends(get_service_container),
     service_metadata: ServiceMetadata = Depends(get_service_metadata),
 ) -> SqlQuestionResponse:
     query_id = str(uuid.uuid4())
     sql_question_request.query_id = query_id
-    service_container.sql_question_service._sql_question_results[
-        query_id
-    ] = SqlQuestionResultResponse(
-        status="generating",
+    await service_container.sql_question_service._sql_question_results.set(
+        query_id,
+        SqlQuestionResultResponse(status="generating"),
     )
 
-    background_tasks.add_task(
-        service_container.sql_question_service.sql_question,
-        sql_question_request,
-        service_metadata=asdict(service_metadata),
-    )
+    try:
+        service_container.job_scheduler.submit(
+            "sql_question",
+            service_container.sql_question_service.sql_question,
+            sql_question_request,
+            service_metadata=asdict(service_metadata),
+        )
+    except QueueFullError:
+        # no job will update the status, so it would stay pending until it expires
+        await service_container.sql_question_service._sql_question_results.delete(
+            query_id
+        )
+        raise
     return SqlQuestionResponse(query_id=query_id)
 
 
@@ -47,6 +54,6 @@ async def get_sql_question_result(
     query_id: str,
     service_container: ServiceContainer = Depends(get_service_container),
 ) -> SqlQuestionResultResponse:
-    return service_container.sql_question_service.get_sql_question_result(
+    return await service_container.sql_question_service.get_sql_question_result(
         SqlQuestionResultRequest(query_id=query_id)
     )
@@ -1,17 +1,46 @@
 import asyncio
 import logging
-from typing import Dict, List, Literal, Optional
+import time
+from typing import Awaitable, Dict, List, Literal, Optional, Set, TypeVar
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import AliasChoices, BaseModel, Field
 
+from src.core.metrics import SQL_CORRECTION_LOOP_DURATION
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
+from src.pipelines.common import AnswerCache
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, SSEEvent
 
 logger = logging.getLogger("wren-ai-service")
 
+T = TypeVar("T")
+
+
+async def _timed(
+    stage_timings: Dict[str, float], stage: str, awaitable: Awaitable[T]
+) -> T:
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        # stages such as sql correction can run several times in one ask
+        stage_timings[stage] = round(
+            stage_timings.get(stage, 0.0) + time.perf_counter() - start, 3
+        )
+
+
+def _cancel(task: Optional[asyncio.Task]) -> None:
+    if task is None:
+        return
+
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        # retrieve the exception of a discarded task so it isn't reported as never retrieved
+        task.exception()
+
 
 class AskHistory(BaseModel):
     sql: str
@@ -103,26 +132,46 @@ class AskService:
         allow_sql_functions_retrieval: bool = True,
         allow_sql_diagnosis: bool = True,
         enable_column_pruning: bool = False,
+        enable_speculative_retrieval: bool = True,
         max_sql_correction_retries: int = 3,
         max_histories: int = 5,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
+        answer_cache: Optional[AnswerCache] = None,
+        query_embedding_pipelines: Optional[Set[str]] = None,
     ):
         self._pipelines = pipelines
-        self._ask_results: Dict[str, AskResultResponse] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._answer_cache = answer_cache
+        # the pipelines embedding the question with the model of query_embedding, all of
+        # them when None, the others embed it themselves
+        self._query_embedding_pipelines = query_embedding_pipelines
+        self._ask_results: Results = (result_store or InMemoryResultStore()).results(
+            "ask", maxsize=maxsize, ttl=ttl, model=AskResultResponse
         )
         self._allow_sql_generation_reasoning = allow_sql_generation_reasoning
         self._allow_sql_functions_retrieval = allow_sql_functions_retrieval
         self._allow_intent_classification = allow_intent_classification
         self._allow_sql_diagnosis = allow_sql_diagnosis
         self._enable_column_pruning = enable_column_pruning
+        self._enable_speculative_retrieval = enable_speculative_retrieval
         self._max_histories = max_histories
         self._max_sql_correction_retries = max_sql_correction_retries
 
-    def _is_stopped(self, query_id: str, container: dict):
+    def _shared_embedding(
+        self, pipeline: str, embedding: Optional[List[float]]
+    ) -> Optional[List[float]]:
+        if (
+            self._query_embedding_pipelines is None
+            or pipeline in self._query_embedding_pipelines
+        ):
+            return embedding
+
+        return None
+
+    async def _is_stopped(self, query_id: str, container: Results):
         if (
-            result := container.get(query_id)
+            result := await container.get(query_id)
         ) is not None and result.status == "stopped":
             return True
 
@@ -143,14 +192,19 @@ class AskService:
                 "error_type": "",
                 "error_message": "",
                 "request_from": ask_request.request_from,
+                "stage_timings": {},  # unit: seconds
             },
         }
+        stage_timings = results["metadata"]["stage_timings"]
 
         query_id = ask_request.query_id
         histories = ask_request.histories[: self._max_histories][
             ::-1
         ]  # reverse the order of histories
         rephrased_question = None
+        embedding = None
+        histories_embedding = None
+        speculative_retrieval = None
         intent_reasoning = None
         sql_generation_reasoning = None
         sql_samples = []
@@ -172,22 +226,122 @@ class AskService:
         current_sql_correction_retries = 0
         use_dry_plan = ask_request.use_dry_plan
         allow_dry_plan_fallback = ask_request.allow_dry_plan_fallback
+        # the sql of a follow-up or custom-instructed ask depends on more than the question,
+        # and the one of an ask without an mdl hash may be for another deployment
+        use_answer_cache = (
+            self._answer_cache is not None
+            and ask_request.mdl_hash is not None
+            and not histories
+            and not ask_request.custom_instruction
+        )
+        # the sql generated for a question depends on the language and timezone of the ask
+        answer_cache_configurations = ask_request.configurations.model_dump_json()
 
         try:
             user_query = ask_request.query
 
             # ask status can be understanding, searching, generating, finished, failed, stopped
             # we will need to handle business logic for each status
-            if not self._is_stopped(query_id, self._ask_results):
-                self._ask_results[query_id] = AskResultResponse(
-                    status="understanding",
-                    trace_id=trace_id,
-                    is_followup=True if histories else False,
+            if not await self._is_stopped(query_id, self._ask_results):
+                await self._ask_results.set(
+                    query_id,
+                    AskResultResponse(
+                        status="understanding",
+                        trace_id=trace_id,
+                        is_followup=True if histories else False,
+                    ),
                 )
 
-                historical_question = await self._pipelines["historical_question"].run(
-                    query=user_query,
-                    project_id=ask_request.project_id,
+                # embed the question once and share it with the retrievals using the same model
+                query_embedding = await _timed(
+                    stage_timings,
+                    "query_embedding",
+                    self._pipelines["query_embedding"].run(
+                        query=user_query,
+                        histories=histories,
+                    ),
+                )
+                embedding = query_embedding["embedding"].get("embedding")
+                histories_embedding = query_embedding["histories_embedding"].get(
+                    "embedding"
+                )
+
+                if use_answer_cache and (
+                    cached_sql := self._answer_cache.get(
+                        question=user_query,
+                        embedding=embedding,
+                        project_id=ask_request.project_id,
+                        mdl_hash=ask_request.mdl_hash,
+                        configurations=answer_cache_configurations,
+                    )
+                ):
+                    api_results = [AskResult(sql=cached_sql, type="llm")]
+                    await self._ask_results.set(
+                        query_id,
+                        AskResultResponse(
+                            status="finished",
+                            type="TEXT_TO_SQL",
+                            response=api_results,
+                            sql_generation_reasoning="",
+                            trace_id=trace_id,
+                        ),
+                    )
+                    results["ask_result"] = api_results
+                    results["metadata"]["type"] = "TEXT_TO_SQL"
+                    results["metadata"]["answer_cache_hit"] = True
+                    return results
+
+                # without histories the question is not rephrased, so the db schema
+                # retrieval doesn't depend on the intent and can start right away.
+                # it's cancelled if the ask turns out not to be TEXT_TO_SQL
+                if self._enable_speculative_retrieval and not histories:
+                    speculative_retrieval = asyncio.create_task(
+                        _timed(
+                            stage_timings,
+                            "speculative_db_schema_retrieval",
+                            self._pipelines["db_schema_retrieval"].run(
+                                query=user_query,
+                                histories=histories,
+                                project_id=ask_request.project_id,
+                                enable_column_pruning=enable_column_pruning,
+                                mdl_hash=ask_request.mdl_hash,
+                                query_embedding=histories_embedding,
+                            ),
+                        )
+                    )
+
+                # the vector searches are independent, so run them concurrently
+                (
+                    historical_question,
+                    sql_samples_task,
+                    instructions_task,
+                ) = await _timed(
+                    stage_timings,
+                    "retrieval",
+                    asyncio.gather(
+                        self._pipelines["historical_question"].run(
+                            query=user_query,
+                            project_id=ask_request.project_id,
+                            query_embedding=self._shared_embedding(
+                                "historical_question", embedding
+                            ),
+                        ),
+                        self._pipelines["sql_pairs_retrieval"].run(
+                            query=user_query,
+                            project_id=ask_request.project_id,
+                            query_embedding=self._shared_embedding(
+                                "sql_pairs_retrieval", embedding
+                            ),
+                        ),
+                        self._pipelines["instructions_retrieval"].run(
+                            query=user_query,
+                            project_id=ask_request.project_id,
+                            scope="sql",
+                            query_embedding=self._shared_embedding(
+                                "instructions_retrieval", embedding
+                            ),
+                        ),
+                    ),
                 )
 
                 # we only return top 1 result
@@ -207,20 +361,9 @@ class AskService:
                         for result in historical_question_result
                     ]
                     sql_generation_reasoning = ""
+                    use_answer_cache = False
+                    _cancel(speculative_retrieval)
                 else:
-                    # Run both pipeline operations concurrently
-                    sql_samples_task, instructions_task = await asyncio.gather(
-                        self._pipelines["sql_pairs_retrieval"].run(
-                            query=user_query,
-                            project_id=ask_request.project_id,
-                        ),
-                        self._pipelines["instructions_retrieval"].run(
-                            query=user_query,
-                            project_id=ask_request.project_id,
-                            scope="sql",
-                        ),
-                    )
-
                     # Extract results from completed tasks
                     sql_samples = sql_samples_task["formatted_output"].get(
                         "documents", []
@@ -231,13 +374,20 @@ class AskService:
 
                     if self._allow_intent_classification:
                         intent_classification_result = (
-                            await self._pipelines["intent_classification"].run(
-                                query=user_query,
-                                histories=histories,
-                                sql_samples=sql_samples,
-                                instructions=instructions,
-                                project_id=ask_request.project_id,
-                                configuration=ask_request.configurations,
+                            await _timed(
+                                stage_timings,
+                                "intent_classification",
+                                self._pipelines["intent_classification"].run(
+                                    query=user_query,
+                                    histories=histories,
+                                    sql_samples=sql_samples,
+                                    instructions=instructions,
+                                    project_id=ask_request.project_id,
+                                    configuration=ask_request.configurations,
+                                    query_embedding=self._shared_embedding(
+                                        "intent_classification", histories_embedding
+                                    ),
+                                ),
                             )
                         ).get("post_process", {})
                         intent = intent_classification_result.get("intent")
@@ -249,6 +399,18 @@ class AskService:
                         if rephrased_question:
                             user_query = rephrased_question
 
+                        if (
+                            intent
+                            in (
+                                "MISLEADING_QUERY",
+                                "GENERAL",
+                                "USER_GUIDE",
+                            )
+                            or user_query.strip() != ask_request.query.strip()
+                        ):
+                            _cancel(speculative_retrieval)
+                            speculative_retrieval = None
+
                         if intent == "MISLEADING_QUERY":
                             asyncio.create_task(
                                 self._pipelines["misleading_assistance"].run(
@@ -263,14 +425,17 @@ class AskService:
                                 )
                             )
 
-                            self._ask_results[query_id] = AskResultResponse(
-                                status="finished",
-                                type="GENERAL",
-                                rephrased_question=rephrased_question,
-                                intent_reasoning=intent_reasoning,
-                                trace_id=trace_id,
-                                is_followup=True if histories else False,
-                                general_type="MISLEADING_QUERY",
+                            await self._ask_results.set(
+                                query_id,
+                                AskResultResponse(
+                                    status="finished",
+                                    type="GENERAL",
+                                    rephrased_question=rephrased_question,
+                                    intent_reasoning=intent_reasoning,
+                                    trace_id=trace_id,
+                                    is_followup=True if histories else False,
+                                    general_type="MISLEADING_QUERY",
+                                ),
                             )
                             results["metadata"]["type"] = "MISLEADING_QUERY"
                             return results
@@ -288,14 +453,17 @@ class AskService:
                                 )
                             )
 
-                            self._ask_results[query_id] = AskResultResponse(
-                                status="finished",
-                                type="GENERAL",
-                                rephrased_question=rephrased_question,
-                                intent_reasoning=intent_reasoning,
-                                trace_id=trace_id,
-                                is_followup=True if histories else False,
-                                general_type="DATA_ASSISTANCE",
+                            await self._ask_results.set(
+                                query_id,
+                                AskResultResponse(
+                                    status="finished",
+                                    type="GENERAL",
+                                    rephrased_question=rephrased_question,
+                                    intent_reasoning=intent_reasoning,
+                                    trace_id=trace_id,
+                                    is_followup=True if histories else False,
+                                    general_type="DATA_ASSISTANCE",
+                                ),
                             )
                             results["metadata"]["type"] = "GENERAL"
                             return results
@@ -309,42 +477,68 @@ class AskService:
                                 )
                             )
 
-                            self._ask_results[query_id] = AskResultResponse(
-                                status="finished",
-                                type="GENERAL",
-                                rephrased_question=rephrased_question,
-                                intent_reasoning=intent_reasoning,
-                                trace_id=trace_id,
-                                is_followup=True if histories else False,
-                                general_type="USER_GUIDE",
+                            await self._ask_results.set(
+                                query_id,
+                                AskResultResponse(
+                                    status="finished",
+                                    type="GENERAL",
+                                    rephrased_question=rephrased_question,
+                                    intent_reasoning=intent_reasoning,
+                                    trace_id=trace_id,
+                                    is_followup=True if histories else False,
+                                    general_type="USER_GUIDE",
+                                ),
                             )
                             results["metadata"]["type"] = "GENERAL"
                             return results
                         else:
-                            self._ask_results[query_id] = AskResultResponse(
-                                status="understanding",
-                                type="TEXT_TO_SQL",
-                                rephrased_question=rephrased_question,
-                                intent_reasoning=intent_reasoning,
-                                trace_id=trace_id,
-                                is_followup=True if histories else False,
+                            await self._ask_results.set(
+                                query_id,
+                                AskResultResponse(
+                                    status="understanding",
+                                    type="TEXT_TO_SQL",
+                                    rephrased_question=rephrased_question,
+                                    intent_reasoning=intent_reasoning,
+                                    trace_id=trace_id,
+                                    is_followup=True if histories else False,
+                                ),
                             )
-            if not self._is_stopped(query_id, self._ask_results) and not api_results:
-                self._ask_results[query_id] = AskResultResponse(
-                    status="searching",
-                    type="TEXT_TO_SQL",
-                    rephrased_question=rephrased_question,
-                    intent_reasoning=intent_reasoning,
-                    trace_id=trace_id,
-                    is_followup=True if histories else False,
+            if (
+                not await self._is_stopped(query_id, self._ask_results)
+                and not api_results
+            ):
+                await self._ask_results.set(
+                    query_id,
+                    AskResultResponse(
+                        status="searching",
+                        type="TEXT_TO_SQL",
+                        rephrased_question=rephrased_question,
+                        intent_reasoning=intent_reasoning,
+                        trace_id=trace_id,
+                        is_followup=True if histories else False,
+                    ),
                 )
 
-                retrieval_result = await self._pipelines["db_schema_retrieval"].run(
-                    query=user_query,
-                    histories=histories,
-                    project_id=ask_request.project_id,
-                    enable_column_pruning=enable_column_pruning,
-                )
+                if speculative_retrieval is not None:
+                    retrieval_result = await speculative_retrieval
+                else:
+                    retrieval_result = await _timed(
+                        stage_timings,
+                        "db_schema_retrieval",
+                        self._pipelines["db_schema_retrieval"].run(
+                            query=user_query,
+                            histories=histories,
+                            project_id=ask_request.project_id,
+                            enable_column_pruning=enable_column_pruning,
+                            mdl_hash=ask_request.mdl_hash,
+                            # the rephrased question needs its own embedding
+                            query_embedding=(
+                                histories_embedding
+                                if user_query == ask_request.query
+                                else None
+                            ),
+                        ),
+                    )
                 _retrieval_result = retrieval_result.get(
                     "construct_retrieval_results", {}
                 )
@@ -354,90 +548,115 @@ class AskService:
 
                 if not documents:
                     logger.exception(f"ask pipeline - NO_RELEVANT_DATA: {user_query}")
-                    if not self._is_stopped(query_id, self._ask_results):
-                        self._ask_results[query_id] = AskResultResponse(
-                            status="failed",
-                            type="TEXT_TO_SQL",
-                            error=AskError(
-                                code="NO_RELEVANT_DATA",
-                                message="No relevant data",
+                    if not await self._is_stopped(query_id, self._ask_results):
+                        await self._ask_results.set(
+                            query_id,
+                            AskResultResponse(
+                                status="failed",
+                                type="TEXT_TO_SQL",
+                                error=AskError(
+                                    code="NO_RELEVANT_DATA",
+                                    message="No relevant data",
+                                ),
+                                rephrased_question=rephrased_question,
+                                intent_reasoning=intent_reasoning,
+                                trace_id=trace_id,
+                                is_followup=True if histories else False,
                             ),
-                            rephrased_question=rephrased_question,
-                            intent_reasoning=intent_reasoning,
-                            trace_id=trace_id,
-                            is_followup=True if histories else False,
                         )
                     results["metadata"]["error_type"] = "NO_RELEVANT_DATA"
                     results["metadata"]["type"] = "TEXT_TO_SQL"
                     return results
 
             if (
-                not self._is_stopped(query_id, self._ask_results)
+                not await self._is_stopped(query_id, self._ask_results)
                 and not api_results
                 and allow_sql_generation_reasoning
             ):
-                self._ask_results[query_id] = AskResultResponse(
-                    status="planning",
-                    type="TEXT_TO_SQL",
-                    rephrased_question=rephrased_question,
-                    intent_reasoning=intent_reasoning,
-                    retrieved_tables=table_names,
-                    trace_id=trace_id,
-                    is_followup=True if histories else False,
+                await self._ask_results.set(
+                    query_id,
+                    AskResultResponse(
+                        status="planning",
+                        type="TEXT_TO_SQL",
+                        rephrased_question=rephrased_question,
+                        intent_reasoning=intent_reasoning,
+                        retrieved_tables=table_names,
+                        trace_id=trace_id,
+                        is_followup=True if histories else False,
+                    ),
                 )
 
                 if histories:
                     sql_generation_reasoning = (
-                        await self._pipelines["followup_sql_generation_reasoning"].run(
-                            query=user_query,
-                            contexts=table_ddls,
-                            histories=histories,
-                            sql_samples=sql_samples,
-                            instructions=instructions,
-                            configuration=ask_request.configurations,
-                            query_id=query_id,
+                        await _timed(
+                            stage_timings,
+                            "sql_generation_reasoning",
+                            self._pipelines["followup_sql_generation_reasoning"].run(
+                                query=user_query,
+                                contexts=table_ddls,
+                                histories=histories,
+                                sql_samples=sql_samples,
+                                instructions=instructions,
+                                configuration=ask_request.configurations,
+                                query_id=query_id,
+                            ),
                         )
                     ).get("post_process", {})
                 else:
                     sql_generation_reasoning = (
-                        await self._pipelines["sql_generation_reasoning"].run(
-                            query=user_query,
-                            contexts=table_ddls,
-                            sql_samples=sql_samples,
-                            instructions=instructions,
-                            configuration=ask_request.configurations,
-                            query_id=query_id,
+                        await _timed(
+                            stage_timings,
+                            "sql_generation_reasoning",
+                            self._pipelines["sql_generation_reasoning"].run(
+                                query=user_query,
+                                contexts=table_ddls,
+                                sql_samples=sql_samples,
+                                instructions=instructions,
+                                configuration=ask_request.configurations,
+                                query_id=query_id,
+                            ),
                         )
                     ).get("post_process", {})
 
-                self._ask_results[query_id] = AskResultResponse(
-                    status="planning",
-                    type="TEXT_TO_SQL",
-                    rephrased_question=rephrased_question,
-                    intent_reasoning=intent_reasoning,
-                    retrieved_tables=table_names,
-                    sql_generation_reasoning=sql_generation_reasoning,
-                    trace_id=trace_id,
-                    is_followup=True if histories else False,
+                await self._ask_results.set(
+                    query_id,
+                    AskResultResponse(
+                        status="planning",
+                        type="TEXT_TO_SQL",
+                        rephrased_question=rephrased_question,
+                        intent_reasoning=intent_reasoning,
+                        retrieved_tables=table_names,
+                        sql_generation_reasoning=sql_generation_reasoning,
+                        trace_id=trace_id,
+                        is_followup=True if histories else False,
+                    ),
                 )
 
-            if not self._is_stopped(query_id, self._ask_results) and not api_results:
-                self._ask_results[query_id] = AskResultResponse(
-                    status="generating",
-                    type="TEXT_TO_SQL",
-                    rephrased_question=rephrased_question,
-                    intent_reasoning=intent_reasoning,
-                    retrieved_tables=table_names,
-                    sql_generation_reasoning=sql_generation_reasoning,
-                    trace_id=trace_id,
-                    is_followup=True if histories else False,
+            if (
+                not await self._is_stopped(query_id, self._ask_results)
+                and not api_results
+            ):
+                await self._ask_results.set(
+                    query_id,
+                    AskResultResponse(
+                        status="generating",
+                        type="TEXT_TO_SQL",
+                        rephrased_question=rephrased_question,
+                        intent_reasoning=intent_reasoning,
+                        retrieved_tables=table_names,
+                        sql_generation_reasoning=sql_generation_reasoning,
+                        trace_id=trace_id,
+                        is_followup=True if histories else False,
+                    ),
                 )
 
                 if allow_sql_functions_retrieval:
-                    sql_functions = await self._pipelines[
-                        "sql_functions_retrieval"
-                    ].run(
-                        project_id=ask_request.project_id,
+                    sql_functions = await _timed(
+                        stage_timings,
+                        "sql_functions_retrieval",
+                        self._pipelines["sql_functions_retrieval"].run(
+                            project_id=ask_request.project_id,
+                        ),
                     )
                 else:
                     sql_functions = []
@@ -449,39 +668,45 @@ class AskService:
                 has_json_field = _retrieval_result.get("has_json_field", False)
 
                 if histories:
-                    text_to_sql_generation_results = await self._pipelines[
-                        "followup_sql_generation"
-                    ].run(
-                        query=user_query,
-                        contexts=table_ddls,
-                        sql_generation_reasoning=sql_generation_reasoning,
-                        histories=histories,
-                        project_id=ask_request.project_id,
-                        sql_samples=sql_samples,
-                        instructions=instructions,
-                        has_calculated_field=has_calculated_field,
-                        has_metric=has_metric,
-                        has_json_field=has_json_field,
-                        sql_functions=sql_functions,
-                        use_dry_plan=use_dry_plan,
-                        allow_dry_plan_fallback=allow_dry_plan_fallback,
+                    text_to_sql_generation_results = await _timed(
+                        stage_timings,
+                        "sql_generation",
+                        self._pipelines["followup_sql_generation"].run(
+                            query=user_query,
+                            contexts=table_ddls,
+                            sql_generation_reasoning=sql_generation_reasoning,
+                            histories=histories,
+                            project_id=ask_request.project_id,
+                            mdl_hash=ask_request.mdl_hash,
+                            sql_samples=sql_samples,
+                            instructions=instructions,
+                            has_calculated_field=has_calculated_field,
+                            has_metric=has_metric,
+                            has_json_field=has_json_field,
+                            sql_functions=sql_functions,
+                            use_dry_plan=use_dry_plan,
+                            allow_dry_plan_fallback=allow_dry_plan_fallback,
+                        ),
                     )
                 else:
-                    text_to_sql_generation_results = await self._pipelines[
-                        "sql_generation"
-                    ].run(
-                        query=user_query,
-                        contexts=table_ddls,
-                        sql_generation_reasoning=sql_generation_reasoning,
-                        project_id=ask_request.project_id,
-                        sql_samples=sql_samples,
-                        instructions=instructions,
-                        has_calculated_field=has_calculated_field,
-                        has_metric=has_metric,
-                        has_json_field=has_json_field,
-                        sql_functions=sql_functions,
-                        use_dry_plan=use_dry_plan,
-                        allow_dry_plan_fallback=allow_dry_plan_fallback,
+                    text_to_sql_generation_results = await _timed(
+                        stage_timings,
+                        "sql_generation",
+                        self._pipelines["sql_generation"].run(
+                            query=user_query,
+                            contexts=table_ddls,
+                            sql_generation_reasoning=sql_generation_reasoning,
+                            project_id=ask_request.project_id,
+                            mdl_hash=ask_request.mdl_hash,
+                            sql_samples=sql_samples,
+                            instructions=instructions,
+                            has_calculated_field=has_calculated_field,
+                            has_metric=has_metric,
+                            has_json_field=has_json_field,
+                            sql_functions=sql_functions,
+                            use_dry_plan=use_dry_plan,
+                            allow_dry_plan_fallback=allow_dry_plan_fallback,
+                        ),
                     )
 
                 if sql_valid_result := text_to_sql_generation_results["post_process"][
@@ -507,46 +732,54 @@ class AskService:
                         error_message = failed_dry_run_result["error"]
                         current_sql_correction_retries += 1
 
-                        self._ask_results[query_id] = AskResultResponse(
-                            status="correcting",
-                            type="TEXT_TO_SQL",
-                            rephrased_question=rephrased_question,
-                            intent_reasoning=intent_reasoning,
-                            retrieved_tables=table_names,
-                            sql_generation_reasoning=sql_generation_reasoning,
-                            trace_id=trace_id,
-                            is_followup=True if histories else False,
+                        await self._ask_results.set(
+                            query_id,
+                            AskResultResponse(
+                                status="correcting",
+                                type="TEXT_TO_SQL",
+                                rephrased_question=rephrased_question,
+                                intent_reasoning=intent_reasoning,
+                                retrieved_tables=table_names,
+                                sql_generation_reasoning=sql_generation_reasoning,
+                                trace_id=trace_id,
+                                is_followup=True if histories else False,
+                            ),
                         )
 
                         if allow_sql_diagnosis:
-                            sql_diagnosis_results = await self._pipelines[
-                                "sql_diagnosis"
-                            ].run(
-                                contexts=table_ddls,
-                                original_sql=original_sql,
-                                invalid_sql=invalid_sql,
-                                error_message=error_message,
-                                language=ask_request.configurations.language,
+                            sql_diagnosis_results = await _timed(
+                                stage_timings,
+                                "sql_diagnosis",
+                                self._pipelines["sql_diagnosis"].run(
+                                    contexts=table_ddls,
+                                    original_sql=original_sql,
+                                    invalid_sql=invalid_sql,
+                                    error_message=error_message,
+                                    language=ask_request.configurations.language,
+                                ),
                             )
                             sql_diagnosis_reasoning = sql_diagnosis_results[
                                 "post_process"
                             ].get("reasoning")
 
-                        sql_correction_results = await self._pipelines[
-                            "sql_correction"
-                        ].run(
-                            contexts=table_ddls,
-                            instructions=instructions,
-                            invalid_generation_result={
-                                "sql": original_sql,
-                                "error": sql_diagnosis_reasoning
-                                if allow_sql_diagnosis
-                                else error_message,
-                            },
-                            project_id=ask_request.project_id,
-                            use_dry_plan=use_dry_plan,
-                            allow_dry_plan_fallback=allow_dry_plan_fallback,
-                            sql_functions=sql_functions,
+                        sql_correction_results = await _timed(
+                            stage_timings,
+                            "sql_correction",
+                            self._pipelines["sql_correction"].run(
+                                contexts=table_ddls,
+                                instructions=instructions,
+                                invalid_generation_result={
+                                    "sql": original_sql,
+                                    "error": sql_diagnosis_reasoning
+                                    if allow_sql_diagnosis
+                                    else error_message,
+                                },
+                                project_id=ask_request.project_id,
+                                mdl_hash=ask_request.mdl_hash,
+                                use_dry_plan=use_dry_plan,
+                                allow_dry_plan_fallback=allow_dry_plan_fallback,
+                                sql_functions=sql_functions,
+                            ),
                         )
 
                         if valid_generation_result := sql_correction_results[
@@ -566,38 +799,61 @@ class AskService:
                             "invalid_generation_result"
                         ]
 
+                    # the latency a valid SQL candidate saves, see sql_generation_candidates
+                    if current_sql_correction_retries:
+                        SQL_CORRECTION_LOOP_DURATION.observe(
+                            stage_timings.get("sql_diagnosis", 0.0)
+                            + stage_timings.get("sql_correction", 0.0)
+                        )
+
             if api_results:
-                if not self._is_stopped(query_id, self._ask_results):
-                    self._ask_results[query_id] = AskResultResponse(
-                        status="finished",
-                        type="TEXT_TO_SQL",
-                        response=api_results,
-                        rephrased_question=rephrased_question,
-                        intent_reasoning=intent_reasoning,
-                        retrieved_tables=table_names,
-                        sql_generation_reasoning=sql_generation_reasoning,
-                        trace_id=trace_id,
-                        is_followup=True if histories else False,
+                if not await self._is_stopped(query_id, self._ask_results):
+                    await self._ask_results.set(
+                        query_id,
+                        AskResultResponse(
+                            status="finished",
+                            type="TEXT_TO_SQL",
+                            response=api_results,
+                            rephrased_question=rephrased_question,
+                            intent_reasoning=intent_reasoning,
+                            retrieved_tables=table_names,
+                            sql_generation_reasoning=sql_generation_reasoning,
+                            trace_id=trace_id,
+                            is_followup=True if histories else False,
+                        ),
                     )
                 results["ask_result"] = api_results
                 results["metadata"]["type"] = "TEXT_TO_SQL"
+
+                if use_answer_cache:
+                    self._answer_cache.put(
+                        question=ask_request.query,
+                        embedding=embedding,
+                        sql=api_results[0].sql,
+                        project_id=ask_request.project_id,
+                        mdl_hash=ask_request.mdl_hash,
+                        configurations=answer_cache_configurations,
+                    )
             else:
                 logger.exception(f"ask pipeline - NO_RELEVANT_SQL: {user_query}")
-                if not self._is_stopped(query_id, self._ask_results):
-                    self._ask_results[query_id] = AskResultResponse(
-                        status="failed",
-                        type="TEXT_TO_SQL",
-                        error=AskError(
-                            code="NO_RELEVANT_SQL",
-                            message=error_message or "No relevant SQL",
+                if not await self._is_stopped(query_id, self._ask_results):
+                    await self._ask_results.set(
+                        query_id,
+                        AskResultResponse(
+                            status="failed",
+                            type="TEXT_TO_SQL",
+                            error=AskError(
+                                code="NO_RELEVANT_SQL",
+                                message=error_message or "No relevant SQL",
+                            ),
+                            rephrased_question=rephrased_question,
+                            intent_reasoning=intent_reasoning,
+                            retrieved_tables=table_names,
+                            sql_generation_reasoning=sql_generation_reasoning,
+                            invalid_sql=invalid_sql,
+                            trace_id=trace_id,
+                            is_followup=True if histories else False,
                         ),
-                        rephrased_question=rephrased_question,
-                        intent_reasoning=intent_reasoning,
-                        retrieved_tables=table_names,
-                        sql_generation_reasoning=sql_generation_reasoning,
-                        invalid_sql=invalid_sql,
-                        trace_id=trace_id,
-                        is_followup=True if histories else False,
                     )
                 results["metadata"]["error_type"] = "NO_RELEVANT_SQL"
                 results["metadata"]["error_message"] = error_message
@@ -607,35 +863,44 @@ class AskService:
         except Exception as e:
             logger.exception(f"ask pipeline - OTHERS: {e}")
 
-            self._ask_results[query_id] = AskResultResponse(
-                status="failed",
-                type="TEXT_TO_SQL",
-                error=AskError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._ask_results.set(
+                query_id,
+                AskResultResponse(
+                    status="failed",
+                    type="TEXT_TO_SQL",
+                    error=AskError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
+                    is_followup=True if histories else False,
                 ),
-                trace_id=trace_id,
-                is_followup=True if histories else False,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             results["metadata"]["type"] = "TEXT_TO_SQL"
             return results
+        finally:
+            _cancel(speculative_retrieval)
+            logger.info(f"ask pipeline - stage timings: {stage_timings}")
 
-    def stop_ask(
+    async def stop_ask(
         self,
         stop_ask_request: StopAskRequest,
     ):
-        self._ask_results[stop_ask_request.query_id] = AskResultResponse(
-            status="stopped",
+        await self._ask_results.set(
+            stop_ask_request.query_id,
+            AskResultResponse(
+                status="stopped",
+            ),
         )
 
-    def get_ask_result(
+    async def get_ask_result(
         self,
         ask_result_request: AskResultRequest,
     ) -> AskResultResponse:
-        if (result := self._ask_results.get(ask_result_request.query_id)) is None:
+        if (result := await self._ask_results.get(ask_result_request.query_id)) is None:
             logger.exception(
                 f"ask pipeline - OTHERS: {ask_result_request.query_id} is not found"
             )
@@ -654,17 +919,17 @@ class AskService:
         self,
         query_id: str,
     ):
-        if self._ask_results.get(query_id):
+        if result := await self._ask_results.get(query_id):
             _pipeline_name = ""
-            if self._ask_results.get(query_id).type == "GENERAL":
-                if self._ask_results.get(query_id).general_type == "USER_GUIDE":
+            if result.type == "GENERAL":
+                if result.general_type == "USER_GUIDE":
                     _pipeline_name = "user_guide_assistance"
-                elif self._ask_results.get(query_id).general_type == "DATA_ASSISTANCE":
+                elif result.general_type == "DATA_ASSISTANCE":
                     _pipeline_name = "data_assistance"
-                elif self._ask_results.get(query_id).general_type == "MISLEADING_QUERY":
+                elif result.general_type == "MISLEADING_QUERY":
                     _pipeline_name = "misleading_assistance"
-            elif self._ask_results.get(query_id).status == "planning":
-                if self._ask_results.get(query_id).is_followup:
+            elif result.status == "planning":
+                if result.is_followup:
                     _pipeline_name = "followup_sql_generation_reasoning"
                 else:
                     _pipeline_name = "sql_generation_reasoning"
@@ -2,11 +2,11 @@ import asyncio
 import logging
 from typing import Dict, List, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 from src.web.v1.services.ask import AskError, AskResult
@@ -63,17 +63,20 @@ class AskFeedbackService:
         allow_sql_diagnosis: bool = True,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._ask_feedback_results: Dict[str, AskFeedbackResultResponse] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._ask_feedback_results: Results = (
+            result_store or InMemoryResultStore()
+        ).results(
+            "ask_feedback", maxsize=maxsize, ttl=ttl, model=AskFeedbackResultResponse
         )
         self._allow_sql_functions_retrieval = allow_sql_functions_retrieval
         self._allow_sql_diagnosis = allow_sql_diagnosis
 
-    def _is_stopped(self, query_id: str, container: dict):
+    async def _is_stopped(self, query_id: str, container: Results):
         if (
-            result := container.get(query_id)
+            result := await container.get(query_id)
         ) is not None and result.status == "stopped":
             return True
 
@@ -104,10 +107,13 @@ class AskFeedbackService:
         invalid_sql = None
 
         try:
-            if not self._is_stopped(query_id, self._ask_feedback_results):
-                self._ask_feedback_results[query_id] = AskFeedbackResultResponse(
-                    status="searching",
-                    trace_id=trace_id,
+            if not await self._is_stopped(query_id, self._ask_feedback_results):
+                await self._ask_feedback_results.set(
+                    query_id,
+                    AskFeedbackResultResponse(
+                        status="searching",
+                        trace_id=trace_id,
+                    ),
                 )
 
                 (
@@ -155,10 +161,13 @@ class AskFeedbackService:
                     "documents", []
                 )
 
-            if not self._is_stopped(query_id, self._ask_feedback_results):
-                self._ask_feedback_results[query_id] = AskFeedbackResultResponse(
-                    status="generating",
-                    trace_id=trace_id,
+            if not await self._is_stopped(query_id, self._ask_feedback_results):
+                await self._ask_feedback_results.set(
+                    query_id,
+                    AskFeedbackResultResponse(
+                        status="generating",
+                        trace_id=trace_id,
+                    ),
                 )
 
                 text_to_sql_generation_results = await self._pipelines[
@@ -195,11 +204,12 @@ class AskFeedbackService:
                         invalid_sql = failed_dry_run_result["sql"]
                         error_message = failed_dry_run_result["error"]
 
-                        self._ask_feedback_results[
-                            query_id
-                        ] = AskFeedbackResultResponse(
-                            status="correcting",
-                            trace_id=trace_id,
+                        await self._ask_feedback_results.set(
+                            query_id,
+                            AskFeedbackResultResponse(
+                                status="correcting",
+                                trace_id=trace_id,
+                            ),
                         )
 
                         if allow_sql_diagnosis:
@@ -251,24 +261,30 @@ class AskFeedbackService:
                         error_message = failed_dry_run_result["error"]
 
             if api_results:
-                if not self._is_stopped(query_id, self._ask_feedback_results):
-                    self._ask_feedback_results[query_id] = AskFeedbackResultResponse(
-                        status="finished",
-                        response=api_results,
-                        trace_id=trace_id,
+                if not await self._is_stopped(query_id, self._ask_feedback_results):
+                    await self._ask_feedback_results.set(
+                        query_id,
+                        AskFeedbackResultResponse(
+                            status="finished",
+                            response=api_results,
+                            trace_id=trace_id,
+                        ),
                     )
                 results["ask_feedback_result"] = api_results
             else:
                 logger.exception("ask feedback pipeline - NO_RELEVANT_SQL")
-                if not self._is_stopped(query_id, self._ask_feedback_results):
-                    self._ask_feedback_results[query_id] = AskFeedbackResultResponse(
-                        status="failed",
-                        error=AskError(
-                            code="NO_RELEVANT_SQL",
-                            message=error_message or "No relevant SQL",
+                if not await self._is_stopped(query_id, self._ask_feedback_results):
+                    await self._ask_feedback_results.set(
+                        query_id,
+                        AskFeedbackResultResponse(
+                            status="failed",
+                            error=AskError(
+                                code="NO_RELEVANT_SQL",
+                                message=error_message or "No relevant SQL",
+                            ),
+                            invalid_sql=invalid_sql,
+                            trace_id=trace_id,
                         ),
-                        invalid_sql=invalid_sql,
-                        trace_id=trace_id,
                     )
                 results["metadata"]["error_type"] = "NO_RELEVANT_SQL"
                 results["metadata"]["error_message"] = error_message
@@ -278,35 +294,39 @@ class AskFeedbackService:
         except Exception as e:
             logger.exception(f"ask feedback pipeline - OTHERS: {e}")
 
-            self._ask_feedback_results[query_id] = AskFeedbackResultResponse(
-                status="failed",
-                error=AskError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._ask_feedback_results.set(
+                query_id,
+                AskFeedbackResultResponse(
+                    status="failed",
+                    error=AskError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
                 ),
-                trace_id=trace_id,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             return results
 
-    def stop_ask_feedback(
+    async def stop_ask_feedback(
         self,
         stop_ask_feedback_request: StopAskFeedbackRequest,
     ):
-        self._ask_feedback_results[
-            stop_ask_feedback_request.query_id
-        ] = AskFeedbackResultResponse(
-            status="stopped",
+        await self._ask_feedback_results.set(
+            stop_ask_feedback_request.query_id,
+            AskFeedbackResultResponse(
+                status="stopped",
+            ),
         )
 
-    def get_ask_feedback_result(
+    async def get_ask_feedback_result(
         self,
         ask_feedback_result_request: AskFeedbackResultRequest,
     ) -> AskFeedbackResultResponse:
         if (
-            result := self._ask_feedback_results.get(
+            result := await self._ask_feedback_results.get(
                 ask_feedback_result_request.query_id
             )
         ) is None:
@@ -1,11 +1,11 @@
 import logging
 from typing import Any, Dict, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -65,15 +65,16 @@ class ChartService:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._chart_results: Dict[str, ChartResultResponse] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._chart_results: Results = (result_store or InMemoryResultStore()).results(
+            "chart", maxsize=maxsize, ttl=ttl, model=ChartResultResponse
         )
 
-    def _is_stopped(self, query_id: str):
+    async def _is_stopped(self, query_id: str):
         if (
-            result := self._chart_results.get(query_id)
+            result := await self._chart_results.get(query_id)
         ) is not None and result.status == "stopped":
             return True
 
@@ -101,9 +102,12 @@ class ChartService:
             execute_sql_error_message = None
 
             if not chart_request.data:
-                self._chart_results[query_id] = ChartResultResponse(
-                    status="fetching",
-                    trace_id=trace_id,
+                await self._chart_results.set(
+                    query_id,
+                    ChartResultResponse(
+                        status="fetching",
+                        trace_id=trace_id,
+                    ),
                 )
 
                 execute_sql_result = (
@@ -122,21 +126,27 @@ class ChartService:
                 execute_sql_error_message = None
 
             if execute_sql_error_message:
-                self._chart_results[query_id] = ChartResultResponse(
-                    status="failed",
-                    error=ChartError(
-                        code="OTHERS",
-                        message=execute_sql_error_message,
+                await self._chart_results.set(
+                    query_id,
+                    ChartResultResponse(
+                        status="failed",
+                        error=ChartError(
+                            code="OTHERS",
+                            message=execute_sql_error_message,
+                        ),
+                        trace_id=trace_id,
                     ),
-                    trace_id=trace_id,
                 )
                 results["metadata"]["error_type"] = "OTHERS"
                 results["metadata"]["error_message"] = execute_sql_error_message
                 return results
 
-            self._chart_results[query_id] = ChartResultResponse(
-                status="generating",
-                trace_id=trace_id,
+            await self._chart_results.set(
+                query_id,
+                ChartResultResponse(
+                    status="generating",
+                    trace_id=trace_id,
+                ),
             )
 
             chart_generation_result = await self._pipelines["chart_generation"].run(
@@ -148,24 +158,33 @@ class ChartService:
                 custom_instruction=chart_request.custom_instruction,
             )
             chart_result = chart_generation_result["post_process"]["results"]
+            results["metadata"]["validation_timings"] = chart_generation_result[
+                "post_process"
+            ].get("validation_timings", {})
 
             if not chart_result.get("chart_schema", {}) and not chart_result.get(
                 "reasoning", ""
             ):
-                self._chart_results[query_id] = ChartResultResponse(
-                    status="failed",
-                    error=ChartError(
-                        code="NO_CHART", message="chart generation failed"
+                await self._chart_results.set(
+                    query_id,
+                    ChartResultResponse(
+                        status="failed",
+                        error=ChartError(
+                            code="NO_CHART", message="chart generation failed"
+                        ),
+                        trace_id=trace_id,
                     ),
-                    trace_id=trace_id,
                 )
                 results["metadata"]["error_type"] = "NO_CHART"
                 results["metadata"]["error_message"] = "chart generation failed"
             else:
-                self._chart_results[query_id] = ChartResultResponse(
-                    status="finished",
-                    response=ChartResult(**chart_result),
-                    trace_id=trace_id,
+                await self._chart_results.set(
+                    query_id,
+                    ChartResultResponse(
+                        status="finished",
+                        response=ChartResult(**chart_result),
+                        trace_id=trace_id,
+                    ),
                 )
                 results["chart_result"] = chart_result
 
@@ -173,32 +192,40 @@ class ChartService:
         except Exception as e:
             logger.exception(f"chart pipeline - OTHERS: {e}")
 
-            self._chart_results[chart_request.query_id] = ChartResultResponse(
-                status="failed",
-                error=ChartError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._chart_results.set(
+                chart_request.query_id,
+                ChartResultResponse(
+                    status="failed",
+                    error=ChartError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
                 ),
-                trace_id=trace_id,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             return results
 
-    def stop_chart(
+    async def stop_chart(
         self,
         stop_chart_request: StopChartRequest,
     ):
-        self._chart_results[stop_chart_request.query_id] = ChartResultResponse(
-            status="stopped",
+        await self._chart_results.set(
+            stop_chart_request.query_id,
+            ChartResultResponse(
+                status="stopped",
+            ),
         )
 
-    def get_chart_result(
+    async def get_chart_result(
         self,
         chart_result_request: ChartResultRequest,
     ) -> ChartResultResponse:
-        if (result := self._chart_results.get(chart_result_request.query_id)) is None:
+        if (
+            result := await self._chart_results.get(chart_result_request.query_id)
+        ) is None:
             logger.exception(
                 f"chart pipeline - OTHERS: {chart_result_request.query_id} is not found"
             )
@@ -1,11 +1,11 @@
 import logging
 from typing import Dict, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -77,15 +77,21 @@ class ChartAdjustmentService:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._chart_adjustment_results: Dict[
-            str, ChartAdjustmentResultResponse
-        ] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._chart_adjustment_results: Results = (
+            result_store or InMemoryResultStore()
+        ).results(
+            "chart_adjustment",
+            maxsize=maxsize,
+            ttl=ttl,
+            model=ChartAdjustmentResultResponse,
+        )
 
-    def _is_stopped(self, query_id: str):
+    async def _is_stopped(self, query_id: str):
         if (
-            result := self._chart_adjustment_results.get(query_id)
+            result := await self._chart_adjustment_results.get(query_id)
         ) is not None and result.status == "stopped":
             return True
 
@@ -112,9 +118,12 @@ class ChartAdjustmentService:
             query_id = chart_adjustment_request.query_id
             execute_sql_error_message = None
 
-            self._chart_adjustment_results[query_id] = ChartAdjustmentResultResponse(
-                status="fetching",
-                trace_id=trace_id,
+            await self._chart_adjustment_results.set(
+                query_id,
+                ChartAdjustmentResultResponse(
+                    status="fetching",
+                    trace_id=trace_id,
+                ),
             )
 
             execute_sql_result = (
@@ -128,22 +137,26 @@ class ChartAdjustmentService:
             execute_sql_error_message = execute_sql_result.get("error_message", None)
 
             if execute_sql_error_message:
-                self._chart_adjustment_results[
-                    query_id
-                ] = ChartAdjustmentResultResponse(
-                    status="failed",
-                    error=ChartAdjustmentError(
-                        code="OTHERS",
-                        message=execute_sql_error_message,
+                await self._chart_adjustment_results.set(
+                    query_id,
+                    ChartAdjustmentResultResponse(
+                        status="failed",
+                        error=ChartAdjustmentError(
+                            code="OTHERS",
+                            message=execute_sql_error_message,
+                        ),
                     ),
                 )
                 results["metadata"]["error_type"] = "OTHERS"
                 results["metadata"]["error_message"] = execute_sql_error_message
                 return results
 
-            self._chart_adjustment_results[query_id] = ChartAdjustmentResultResponse(
-                status="generating",
-                trace_id=trace_id,
+            await self._chart_adjustment_results.set(
+                query_id,
+                ChartAdjustmentResultResponse(
+                    status="generating",
+                    trace_id=trace_id,
+                ),
             )
 
             chart_adjustment_result = await self._pipelines["chart_adjustment"].run(
@@ -155,28 +168,33 @@ class ChartAdjustmentService:
                 language=chart_adjustment_request.configurations.language,
             )
             chart_result = chart_adjustment_result["post_process"]["results"]
+            results["metadata"]["validation_timings"] = chart_adjustment_result[
+                "post_process"
+            ].get("validation_timings", {})
 
             if not chart_result.get("chart_schema", {}) and not chart_result.get(
                 "reasoning", ""
             ):
-                self._chart_adjustment_results[
-                    query_id
-                ] = ChartAdjustmentResultResponse(
-                    status="failed",
-                    error=ChartAdjustmentError(
-                        code="NO_CHART", message="chart generation failed"
+                await self._chart_adjustment_results.set(
+                    query_id,
+                    ChartAdjustmentResultResponse(
+                        status="failed",
+                        error=ChartAdjustmentError(
+                            code="NO_CHART", message="chart generation failed"
+                        ),
+                        trace_id=trace_id,
                     ),
-                    trace_id=trace_id,
                 )
                 results["metadata"]["error_type"] = "NO_CHART"
                 results["metadata"]["error_message"] = "chart generation failed"
             else:
-                self._chart_adjustment_results[
-                    query_id
-                ] = ChartAdjustmentResultResponse(
-                    status="finished",
-                    response=ChartAdjustmentResult(**chart_result),
-                    trace_id=trace_id,
+                await self._chart_adjustment_results.set(
+                    query_id,
+                    ChartAdjustmentResultResponse(
+                        status="finished",
+                        response=ChartAdjustmentResult(**chart_result),
+                        trace_id=trace_id,
+                    ),
                 )
                 results["chart_adjustment_result"] = chart_result
 
@@ -184,37 +202,39 @@ class ChartAdjustmentService:
         except Exception as e:
             logger.exception(f"chart adjustment pipeline - OTHERS: {e}")
 
-            self._chart_adjustment_results[
-                chart_adjustment_request.query_id
-            ] = ChartAdjustmentResultResponse(
-                status="failed",
-                error=ChartAdjustmentError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._chart_adjustment_results.set(
+                chart_adjustment_request.query_id,
+                ChartAdjustmentResultResponse(
+                    status="failed",
+                    error=ChartAdjustmentError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
                 ),
-                trace_id=trace_id,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             return results
 
-    def stop_chart_adjustment(
+    async def stop_chart_adjustment(
         self,
         stop_chart_adjustment_request: StopChartAdjustmentRequest,
     ):
-        self._chart_adjustment_results[
-            stop_chart_adjustment_request.query_id
-        ] = ChartAdjustmentResultResponse(
-            status="stopped",
+        await self._chart_adjustment_results.set(
+            stop_chart_adjustment_request.query_id,
+            ChartAdjustmentResultResponse(
+                status="stopped",
+            ),
         )
 
-    def get_chart_adjustment_result(
+    async def get_chart_adjustment_result(
         self,
         chart_adjustment_result_request: ChartAdjustmentResultRequest,
     ) -> ChartAdjustmentResultResponse:
         if (
-            result := self._chart_adjustment_results.get(
+            result := await self._chart_adjustment_results.get(
                 chart_adjustment_result_request.query_id
             )
         ) is None:
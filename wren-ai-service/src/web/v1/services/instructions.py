@@ -1,11 +1,12 @@
 import logging
 from typing import Dict, List, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
+from src.pipelines.common import AnswerCache
 from src.pipelines.indexing.instructions import Instruction
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
@@ -36,14 +37,19 @@ class InstructionsService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        answer_cache: Optional[AnswerCache] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: Dict[str, self.Event] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._answer_cache = answer_cache
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "instructions", maxsize=maxsize, ttl=ttl, model=self.Event
+        )
 
     # todo: move it to utils for super class?
-    def _handle_exception(
+    async def _handle_exception(
         self,
         id: str,
         error_message: str,
@@ -51,12 +57,15 @@ class InstructionsService:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self._cache[id] = self.Event(
-            event_id=id,
-            status="failed",
-            error=self.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            request_from=request_from,
+        await self._cache.set(
+            id,
+            self.Event(
+                event_id=id,
+                status="failed",
+                error=self.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -106,22 +115,29 @@ class InstructionsService:
                 instructions=instructions,
             )
 
-            self._cache[request.event_id] = self.Event(
-                event_id=request.event_id,
-                status="finished",
-                trace_id=trace_id,
-                request_from=request.request_from,
+            await self._cache.set(
+                request.event_id,
+                self.Event(
+                    event_id=request.event_id,
+                    status="finished",
+                    trace_id=trace_id,
+                    request_from=request.request_from,
+                ),
             )
 
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.event_id,
                 f"An error occurred during instructions indexing: {str(e)}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self._cache[request.event_id].with_metadata()
+        # the answers cached for the project were generated with the previous instructions
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(request.project_id)
+
+        return (await self._cache.get(request.event_id)).with_metadata()
 
     class DeleteRequest(BaseRequest):
         event_id: str
@@ -145,24 +161,31 @@ class InstructionsService:
                 instructions=instructions, project_id=request.project_id
             )
 
-            self._cache[request.event_id] = self.Event(
-                event_id=request.event_id,
-                status="finished",
-                trace_id=trace_id,
-                request_from=request.request_from,
+            await self._cache.set(
+                request.event_id,
+                self.Event(
+                    event_id=request.event_id,
+                    status="finished",
+                    trace_id=trace_id,
+                    request_from=request.request_from,
+                ),
             )
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.event_id,
                 f"Failed to delete instructions: {e}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self._cache[request.event_id].with_metadata()
+        # the answers cached for the project were generated with the previous instructions
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(request.project_id)
+
+        return (await self._cache.get(request.event_id)).with_metadata()
 
-    def __getitem__(self, event_id: str) -> Event:
-        response = self._cache.get(event_id)
+    async def get(self, event_id: str) -> Event:
+        response = await self._cache.get(event_id)
 
         if response is None:
             message = f"Instructions Event with ID '{event_id}' not found."
@@ -175,5 +198,5 @@ class InstructionsService:
 
         return response
 
-    def __setitem__(self, event_id: str, value: Event):
-        self._cache[event_id] = value
+    async def set(self, event_id: str, value: Event):
+        await self._cache.set(event_id, value)
@@ -3,11 +3,11 @@ import logging
 from typing import Dict, Literal, Optional
 
 import orjson
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -33,14 +33,16 @@ class QuestionRecommendation:
         allow_sql_functions_retrieval: bool = True,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: Dict[str, QuestionRecommendation.Event] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "question_recommendation", maxsize=maxsize, ttl=ttl, model=self.Event
         )
         self._allow_sql_functions_retrieval = allow_sql_functions_retrieval
+        self._lock = asyncio.Lock()
 
-    def _handle_exception(
+    async def _handle_exception(
         self,
         event_id: str,
         error_message: str,
@@ -48,12 +50,15 @@ class QuestionRecommendation:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self._cache[event_id] = self.Event(
-            event_id=event_id,
-            status="failed",
-            error=self.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            request_from=request_from,
+        await self._cache.set(
+            event_id,
+            self.Event(
+                event_id=event_id,
+                status="failed",
+                error=self.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -132,25 +137,28 @@ class QuestionRecommendation:
 
             valid_sql = post_process["valid_generation_result"]["sql"]
 
-            # Partial update the resource
-            current = self._cache[request_id]
-            questions = current.response["questions"]
+            # Partial update the resource, the result store may hold a copy, so the questions
+            # are added one at a time to not lose the update of a question validated in between
+            async with self._lock:
+                current = await self._cache.get(request_id)
+                questions = current.response["questions"]
 
-            if (
-                candidate["category"] not in questions
-                and len(questions) >= max_categories
-            ):
-                # Skip to update the question dictionary if it is already full
-                return post_process
+                if (
+                    candidate["category"] not in questions
+                    and len(questions) >= max_categories
+                ):
+                    # Skip to update the question dictionary if it is already full
+                    return post_process
 
-            currnet_category = questions.setdefault(candidate["category"], [])
+                currnet_category = questions.setdefault(candidate["category"], [])
 
-            if len(currnet_category) >= max_questions:
-                # Skip to update the questions for the category if it is already full
-                return post_process
+                if len(currnet_category) >= max_questions:
+                    # Skip to update the questions for the category if it is already full
+                    return post_process
 
-            currnet_category.append({**candidate, "sql": valid_sql})
-            return post_process
+                currnet_category.append({**candidate, "sql": valid_sql})
+                await self._cache.set(request_id, current)
+                return post_process
 
         except Exception as e:
             logger.error(f"Request {request_id}: Error validating question: {str(e)}")
@@ -212,7 +220,7 @@ class QuestionRecommendation:
 
             await self._recommend(request)
 
-            resource = self._cache[input.event_id]
+            resource = await self._cache.get(input.event_id)
             resource.trace_id = trace_id
             response = resource.response
 
@@ -225,6 +233,7 @@ class QuestionRecommendation:
             need_regenerate = len(categories) > 0 and input.regenerate
 
             resource.status = "generating" if need_regenerate else "finished"
+            await self._cache.set(input.event_id, resource)
 
             if resource.status == "finished":
                 return resource.with_metadata()
@@ -237,11 +246,13 @@ class QuestionRecommendation:
                 },
             )
 
-            self._cache[input.event_id].status = "finished"
-            self._cache[input.event_id].request_from = input.request_from
+            resource = await self._cache.get(input.event_id)
+            resource.status = "finished"
+            resource.request_from = input.request_from
+            await self._cache.set(input.event_id, resource)
 
         except orjson.JSONDecodeError as e:
-            self._handle_exception(
+            await self._handle_exception(
                 input.event_id,
                 f"Failed to parse MDL: {str(e)}",
                 code="MDL_PARSE_ERROR",
@@ -249,17 +260,17 @@ class QuestionRecommendation:
                 request_from=input.request_from,
             )
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 input.event_id,
                 f"An error occurred during question recommendation generation: {str(e)}",
                 trace_id=trace_id,
                 request_from=input.request_from,
             )
 
-        return self._cache[input.event_id].with_metadata()
+        return (await self._cache.get(input.event_id)).with_metadata()
 
-    def __getitem__(self, id: str) -> Event:
-        response = self._cache.get(id)
+    async def get(self, id: str) -> Event:
+        response = await self._cache.get(id)
 
         if response is None:
             message = f"Question Recommendation Resource with ID '{id}' not found."
@@ -272,5 +283,5 @@ class QuestionRecommendation:
 
         return response
 
-    def __setitem__(self, id: str, value: Event):
-        self._cache[id] = value
+    async def set(self, id: str, value: Event):
+        await self._cache.set(id, value)
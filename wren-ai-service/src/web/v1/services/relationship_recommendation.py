@@ -2,11 +2,11 @@ import logging
 from typing import Dict, Literal, Optional
 
 import orjson
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -35,13 +35,14 @@ class RelationshipRecommendation:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: Dict[str, RelationshipRecommendation.Resource] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "relationship_recommendation", maxsize=maxsize, ttl=ttl, model=self.Resource
         )
 
-    def _handle_exception(
+    async def _handle_exception(
         self,
         input: Input,
         error_message: str,
@@ -49,12 +50,15 @@ class RelationshipRecommendation:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self._cache[input.id] = self.Resource(
-            id=input.id,
-            status="failed",
-            error=self.Resource.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            request_from=request_from,
+        await self._cache.set(
+            input.id,
+            self.Resource(
+                id=input.id,
+                status="failed",
+                error=self.Resource.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -74,15 +78,18 @@ class RelationshipRecommendation:
 
             resp = await self._pipelines["relationship_recommendation"].run(**input)
 
-            self._cache[request.id] = self.Resource(
-                id=request.id,
-                status="finished",
-                response=resp.get("validated"),
-                trace_id=trace_id,
-                request_from=request.request_from,
+            await self._cache.set(
+                request.id,
+                self.Resource(
+                    id=request.id,
+                    status="finished",
+                    response=resp.get("validated"),
+                    trace_id=trace_id,
+                    request_from=request.request_from,
+                ),
             )
         except orjson.JSONDecodeError as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request,
                 f"Failed to parse MDL: {str(e)}",
                 code="MDL_PARSE_ERROR",
@@ -90,17 +97,17 @@ class RelationshipRecommendation:
                 request_from=request.request_from,
             )
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request,
                 f"An error occurred during relationship recommendation generation: {str(e)}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self._cache[request.id].with_metadata()
+        return (await self._cache.get(request.id)).with_metadata()
 
-    def __getitem__(self, id: str) -> Resource:
-        response = self._cache.get(id)
+    async def get(self, id: str) -> Resource:
+        response = await self._cache.get(id)
 
         if response is None:
             message = f"Relationship Recommendation Resource with ID '{id}' not found."
@@ -113,5 +120,5 @@ class RelationshipRecommendation:
 
         return response
 
-    def __setitem__(self, id: str, value: Resource):
-        self._cache[id] = value
+    async def set(self, id: str, value: Resource):
+        await self._cache.set(id, value)
@@ -3,11 +3,11 @@ import logging
 from typing import Dict, Literal, Optional
 
 import orjson
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -32,11 +32,15 @@ class SemanticsDescription:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: Dict[str, self.Resource] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "semantics_description", maxsize=maxsize, ttl=ttl, model=self.Resource
+        )
+        self._lock = asyncio.Lock()
 
-    def _handle_exception(
+    async def _handle_exception(
         self,
         id: str,
         error_message: str,
@@ -44,12 +48,15 @@ class SemanticsDescription:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self[id] = self.Resource(
-            id=id,
-            status="failed",
-            error=self.Resource.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            request_from=request_from,
+        await self.set(
+            id,
+            self.Resource(
+                id=id,
+                status="failed",
+                error=self.Resource.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -90,15 +97,20 @@ class SemanticsDescription:
         resp = await self._pipelines["semantics_description"].run(**chunk)
         output = resp.get("output")
 
-        current = self[request_id]
-        current.response = current.response or {}
+        # the result store may hold a copy, so the chunks of a request are merged one at a time
+        # to not lose the update of a chunk finishing in between
+        async with self._lock:
+            current = await self.get(request_id)
+            current.response = current.response or {}
+
+            for key in output.keys():
+                if key not in current.response:
+                    current.response[key] = output[key]
+                    continue
 
-        for key in output.keys():
-            if key not in current.response:
-                current.response[key] = output[key]
-                continue
+                current.response[key]["columns"].extend(output[key]["columns"])
 
-            current.response[key]["columns"].extend(output[key]["columns"])
+            await self.set(request_id, current)
 
     @observe(name="Generate Semantics Description")
     @trace_metadata
@@ -114,11 +126,13 @@ class SemanticsDescription:
 
             await asyncio.gather(*tasks)
 
-            self[request.id].status = "finished"
-            self[request.id].trace_id = trace_id
-            self[request.id].request_from = request.request_from
+            resource = await self.get(request.id)
+            resource.status = "finished"
+            resource.trace_id = trace_id
+            resource.request_from = request.request_from
+            await self.set(request.id, resource)
         except orjson.JSONDecodeError as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.id,
                 f"Failed to parse MDL: {str(e)}",
                 code="MDL_PARSE_ERROR",
@@ -126,17 +140,17 @@ class SemanticsDescription:
                 request_from=request.request_from,
             )
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.id,
                 f"An error occurred during semantics description generation: {str(e)}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self[request.id].with_metadata()
+        return (await self.get(request.id)).with_metadata()
 
-    def __getitem__(self, id: str) -> Resource:
-        response = self._cache.get(id)
+    async def get(self, id: str) -> Resource:
+        response = await self._cache.get(id)
 
         if response is None:
             message = f"Semantics Description Resource with ID '{id}' not found."
@@ -149,5 +163,5 @@ class SemanticsDescription:
 
         return response
 
-    def __setitem__(self, id: str, value: Resource):
-        self._cache[id] = value
+    async def set(self, id: str, value: Resource):
+        await self._cache.set(id, value)
@@ -2,11 +2,12 @@ import asyncio
 import logging
 from typing import Dict, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import AliasChoices, BaseModel, Field
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
+from src.pipelines.common import AnswerCache, DbSchemaCache
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -47,13 +48,23 @@ class SemanticsPreparationService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        db_schema_cache: Optional[DbSchemaCache] = None,
+        answer_cache: Optional[AnswerCache] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._prepare_semantics_statuses: Dict[
-            str, SemanticsPreparationStatusResponse
-        ] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._db_schema_cache = db_schema_cache
+        self._answer_cache = answer_cache
+        self._prepare_semantics_statuses: Results = (
+            result_store or InMemoryResultStore()
+        ).results(
+            "semantics_preparation",
+            maxsize=maxsize,
+            ttl=ttl,
+            model=SemanticsPreparationStatusResponse,
+        )
 
     @observe(name="Prepare Semantics")
     @trace_metadata
@@ -73,15 +84,23 @@ class SemanticsPreparationService:
         try:
             logger.info(f"MDL: {prepare_semantics_request.mdl}")
 
+            # the answers cached for the previous MDL of the project are stale once it's re-deployed
+            if self._answer_cache is not None:
+                self._answer_cache.invalidate(prepare_semantics_request.project_id)
+
             input = {
                 "mdl_str": prepare_semantics_request.mdl,
                 "project_id": prepare_semantics_request.project_id,
             }
 
             tasks = [
+                self._pipelines["db_schema"].run(
+                    **input,
+                    mdl_hash=prepare_semantics_request.mdl_hash,
+                )
+            ] + [
                 self._pipelines[name].run(**input)
                 for name in [
-                    "db_schema",
                     "historical_question",
                     "table_description",
                     "sql_pairs",
@@ -89,23 +108,39 @@ class SemanticsPreparationService:
                 ]
             ]
 
-            await asyncio.gather(*tasks)
+            pipeline_results = await asyncio.gather(*tasks)
 
-            self._prepare_semantics_statuses[
-                prepare_semantics_request.mdl_hash
-            ] = SemanticsPreparationStatusResponse(
-                status="finished",
+            # unchanged chunks keep their content hash ids and aren't embedded again
+            reused_chunks = sum(
+                (result or {}).get("write", {}).get("documents_reused", 0)
+                for result in pipeline_results
+            )
+            results["metadata"]["reused_chunks"] = reused_chunks
+            logger.info(
+                f"Project ID: {prepare_semantics_request.project_id}, Reused {reused_chunks} chunks"
+            )
+
+            await self._prepare_semantics_statuses.set(
+                prepare_semantics_request.mdl_hash,
+                SemanticsPreparationStatusResponse(
+                    status="finished",
+                ),
             )
         except Exception as e:
             logger.exception(f"Failed to prepare semantics: {e}")
 
-            self._prepare_semantics_statuses[
-                prepare_semantics_request.mdl_hash
-            ] = SemanticsPreparationStatusResponse(
-                status="failed",
-                error=SemanticsPreparationStatusResponse.SemanticsPreparationError(
-                    code="OTHERS",
-                    message=f"Failed to prepare semantics: {e}",
+            # the documents may be partially written, fall back to the document store
+            if self._db_schema_cache is not None:
+                self._db_schema_cache.invalidate(prepare_semantics_request.project_id)
+
+            await self._prepare_semantics_statuses.set(
+                prepare_semantics_request.mdl_hash,
+                SemanticsPreparationStatusResponse(
+                    status="failed",
+                    error=SemanticsPreparationStatusResponse.SemanticsPreparationError(
+                        code="OTHERS",
+                        message=f"Failed to prepare semantics: {e}",
+                    ),
                 ),
             )
 
@@ -114,11 +149,11 @@ class SemanticsPreparationService:
 
         return results
 
-    def get_prepare_semantics_status(
+    async def get_prepare_semantics_status(
         self, prepare_semantics_status_request: SemanticsPreparationStatusRequest
     ) -> SemanticsPreparationStatusResponse:
         if (
-            result := self._prepare_semantics_statuses.get(
+            result := await self._prepare_semantics_statuses.get(
                 prepare_semantics_status_request.mdl_hash
             )
         ) is None:
@@ -157,3 +192,6 @@ class SemanticsPreparationService:
         ]
 
         await asyncio.gather(*tasks)
+
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(project_id)
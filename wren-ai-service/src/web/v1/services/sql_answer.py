@@ -2,11 +2,11 @@ import asyncio
 import logging
 from typing import Dict, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, SSEEvent
 
@@ -47,11 +47,12 @@ class SqlAnswerService:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._sql_answer_results: Dict[str, SqlAnswerResultResponse] = TTLCache(
-            maxsize=maxsize, ttl=ttl
-        )
+        self._sql_answer_results: Results = (
+            result_store or InMemoryResultStore()
+        ).results("sql_answer", maxsize=maxsize, ttl=ttl, model=SqlAnswerResultResponse)
 
     @observe(name="SQL Answer")
     @trace_metadata
@@ -74,23 +75,33 @@ class SqlAnswerService:
         try:
             query_id = sql_answer_request.query_id
 
-            self._sql_answer_results[query_id] = SqlAnswerResultResponse(
-                status="preprocessing",
-                trace_id=trace_id,
+            await self._sql_answer_results.set(
+                query_id,
+                SqlAnswerResultResponse(
+                    status="preprocessing",
+                    trace_id=trace_id,
+                ),
             )
 
-            preprocessed_sql_data = self._pipelines["preprocess_sql_data"].run(
-                sql_data=sql_answer_request.sql_data,
+            preprocessed_sql_data = (
+                await self._pipelines["preprocess_sql_data"].run(
+                    sql_data=sql_answer_request.sql_data,
+                )
             )["preprocess"]
 
             if preprocessed_sql_data.get("num_rows_used_in_llm") == 0:
                 results["metadata"]["error_type"] = "NO_DATA"
                 results["metadata"]["error_message"] = "No data to answer"
 
-            self._sql_answer_results[query_id] = SqlAnswerResultResponse(
-                status="succeeded",
-                num_rows_used_in_llm=preprocessed_sql_data.get("num_rows_used_in_llm"),
-                trace_id=trace_id,
+            await self._sql_answer_results.set(
+                query_id,
+                SqlAnswerResultResponse(
+                    status="succeeded",
+                    num_rows_used_in_llm=preprocessed_sql_data.get(
+                        "num_rows_used_in_llm"
+                    ),
+                    trace_id=trace_id,
+                ),
             )
 
             asyncio.create_task(
@@ -109,27 +120,30 @@ class SqlAnswerService:
         except Exception as e:
             logger.exception(f"sql answer pipeline - OTHERS: {e}")
 
-            self._sql_answer_results[
-                sql_answer_request.query_id
-            ] = SqlAnswerResultResponse(
-                status="failed",
-                error=SqlAnswerResultResponse.SqlAnswerError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._sql_answer_results.set(
+                sql_answer_request.query_id,
+                SqlAnswerResultResponse(
+                    status="failed",
+                    error=SqlAnswerResultResponse.SqlAnswerError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
                 ),
-                trace_id=trace_id,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             return results
 
-    def get_sql_answer_result(
+    async def get_sql_answer_result(
         self,
         sql_answer_result_request: SqlAnswerResultRequest,
     ) -> SqlAnswerResultResponse:
         if (
-            result := self._sql_answer_results.get(sql_answer_result_request.query_id)
+            result := await self._sql_answer_results.get(
+                sql_answer_result_request.query_id
+            )
         ) is None:
             logger.exception(
                 f"sql answer pipeline - OTHERS: {sql_answer_result_request.query_id} is not found"
@@ -149,9 +163,8 @@ class SqlAnswerService:
         query_id: str,
     ):
         if (
-            self._sql_answer_results.get(query_id)
-            and self._sql_answer_results.get(query_id).status == "succeeded"
-        ):
+            result := await self._sql_answer_results.get(query_id)
+        ) and result.status == "succeeded":
             async for chunk in self._pipelines["sql_answer"].get_streaming_results(
                 query_id
             ):
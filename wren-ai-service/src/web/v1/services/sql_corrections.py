@@ -1,11 +1,11 @@
 import logging
 from typing import List, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -31,11 +31,14 @@ class SqlCorrectionService:
         pipelines: dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: dict[str, self.Event] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "sql_corrections", maxsize=maxsize, ttl=ttl, model=self.Event
+        )
 
-    def _handle_exception(
+    async def _handle_exception(
         self,
         event_id: str,
         error_message: str,
@@ -44,13 +47,16 @@ class SqlCorrectionService:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self._cache[event_id] = self.Event(
-            event_id=event_id,
-            status="failed",
-            error=self.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            invalid_sql=invalid_sql,
-            request_from=request_from,
+        await self._cache.set(
+            event_id,
+            self.Event(
+                event_id=event_id,
+                status="failed",
+                error=self.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                invalid_sql=invalid_sql,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -118,7 +124,7 @@ class SqlCorrectionService:
 
             if not valid:
                 error_message = invalid["error"]
-                self._handle_exception(
+                await self._handle_exception(
                     event_id,
                     f"An error occurred during SQL correction: {error_message}",
                     trace_id=trace_id,
@@ -127,26 +133,29 @@ class SqlCorrectionService:
                 )
             else:
                 corrected = valid["sql"]
-                self._cache[event_id] = self.Event(
-                    event_id=event_id,
-                    status="finished",
-                    trace_id=trace_id,
-                    response=corrected,
-                    request_from=request.request_from,
+                await self._cache.set(
+                    event_id,
+                    self.Event(
+                        event_id=event_id,
+                        status="finished",
+                        trace_id=trace_id,
+                        response=corrected,
+                        request_from=request.request_from,
+                    ),
                 )
 
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 event_id,
                 f"An error occurred during SQL correction: {str(e)}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self._cache[event_id].with_metadata()
+        return (await self._cache.get(event_id)).with_metadata()
 
-    def __getitem__(self, event_id: str) -> Event:
-        response = self._cache.get(event_id)
+    async def get(self, event_id: str) -> Event:
+        response = await self._cache.get(event_id)
 
         if response is None:
             message = f"SQL Correction Event with ID '{event_id}' not found."
@@ -159,5 +168,5 @@ class SqlCorrectionService:
 
         return response
 
-    def __setitem__(self, event_id: str, value: Event):
-        self._cache[event_id] = value
+    async def set(self, event_id: str, value: Event):
+        await self._cache.set(event_id, value)
@@ -1,11 +1,12 @@
 import logging
 from typing import Dict, List, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
+from src.pipelines.common import AnswerCache
 from src.pipelines.indexing.sql_pairs import SqlPair
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
@@ -28,13 +29,18 @@ class SqlPairsService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        answer_cache: Optional[AnswerCache] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._cache: Dict[str, self.Event] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._answer_cache = answer_cache
+        self._cache: Results = (result_store or InMemoryResultStore()).results(
+            "sql_pairs", maxsize=maxsize, ttl=ttl, model=self.Event
+        )
 
-    def _handle_exception(
+    async def _handle_exception(
         self,
         id: str,
         error_message: str,
@@ -42,12 +48,15 @@ class SqlPairsService:
         trace_id: Optional[str] = None,
         request_from: Literal["ui", "api"] = "ui",
     ):
-        self._cache[id] = self.Event(
-            id=id,
-            status="failed",
-            error=self.Event.Error(code=code, message=error_message),
-            trace_id=trace_id,
-            request_from=request_from,
+        await self._cache.set(
+            id,
+            self.Event(
+                id=id,
+                status="failed",
+                error=self.Event.Error(code=code, message=error_message),
+                trace_id=trace_id,
+                request_from=request_from,
+            ),
         )
         logger.error(error_message)
 
@@ -77,22 +86,29 @@ class SqlPairsService:
             }
             await self._pipelines["sql_pairs"].run(**input)
 
-            self._cache[request.id] = self.Event(
-                id=request.id,
-                status="finished",
-                trace_id=trace_id,
-                request_from=request.request_from,
+            await self._cache.set(
+                request.id,
+                self.Event(
+                    id=request.id,
+                    status="finished",
+                    trace_id=trace_id,
+                    request_from=request.request_from,
+                ),
             )
 
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.id,
                 f"An error occurred during SQL pairs indexing: {str(e)}",
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
 
-        return self._cache[request.id].with_metadata()
+        # the answers cached for the project were generated with the previous SQL pairs
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(request.project_id)
+
+        return (await self._cache.get(request.id)).with_metadata()
 
     class DeleteRequest(BaseRequest):
         id: str
@@ -113,22 +129,29 @@ class SqlPairsService:
                 sql_pairs=sql_pairs, project_id=request.project_id
             )
 
-            self._cache[request.id] = self.Event(
-                id=request.id,
-                status="finished",
-                request_from=request.request_from,
+            await self._cache.set(
+                request.id,
+                self.Event(
+                    id=request.id,
+                    status="finished",
+                    request_from=request.request_from,
+                ),
             )
         except Exception as e:
-            self._handle_exception(
+            await self._handle_exception(
                 request.id,
                 f"Failed to delete SQL pairs: {e}",
                 request_from=request.request_from,
             )
 
-        return self._cache[request.id].with_metadata()
+        # the answers cached for the project were generated with the previous SQL pairs
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(request.project_id)
+
+        return (await self._cache.get(request.id)).with_metadata()
 
-    def __getitem__(self, id: str) -> Event:
-        response = self._cache.get(id)
+    async def get(self, id: str) -> Event:
+        response = await self._cache.get(id)
 
         if response is None:
             message = f"SQL Pairs Event with ID '{id}' not found."
@@ -141,5 +164,5 @@ class SqlPairsService:
 
         return response
 
-    def __setitem__(self, id: str, value: Event):
-        self._cache[id] = value
+    async def set(self, id: str, value: Event):
+        await self._cache.set(id, value)
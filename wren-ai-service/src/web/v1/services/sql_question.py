@@ -2,11 +2,11 @@ import asyncio
 import logging
 from typing import Dict, Literal, Optional
 
-from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.result_store import InMemoryResultStore, Results, ResultStore
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -44,10 +44,13 @@ class SqlQuestionService:
         pipelines: Dict[str, BasicPipeline],
         maxsize: int = 1_000_000,
         ttl: int = 120,
+        result_store: Optional[ResultStore] = None,
     ):
         self._pipelines = pipelines
-        self._sql_question_results: Dict[str, SqlQuestionResultResponse] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+        self._sql_question_results: Results = (
+            result_store or InMemoryResultStore()
+        ).results(
+            "sql_question", maxsize=maxsize, ttl=ttl, model=SqlQuestionResultResponse
         )
 
     @observe(name="SQL Question")
@@ -70,9 +73,12 @@ class SqlQuestionService:
         try:
             query_id = sql_question_request.query_id
 
-            self._sql_question_results[query_id] = SqlQuestionResultResponse(
-                status="generating",
-                trace_id=trace_id,
+            await self._sql_question_results.set(
+                query_id,
+                SqlQuestionResultResponse(
+                    status="generating",
+                    trace_id=trace_id,
+                ),
             )
 
             tasks = [
@@ -85,10 +91,13 @@ class SqlQuestionService:
             sql_questions_results = await asyncio.gather(*tasks)
             sql_questions = [res["post_process"] for res in sql_questions_results]
 
-            self._sql_question_results[query_id] = SqlQuestionResultResponse(
-                status="succeeded",
-                questions=sql_questions,
-                trace_id=trace_id,
+            await self._sql_question_results.set(
+                query_id,
+                SqlQuestionResultResponse(
+                    status="succeeded",
+                    questions=sql_questions,
+                    trace_id=trace_id,
+                ),
             )
 
             results["sql_question_result"] = sql_questions
@@ -96,27 +105,28 @@ class SqlQuestionService:
         except Exception as e:
             logger.exception(f"sql question pipeline - OTHERS: {e}")
 
-            self._sql_question_results[
-                sql_question_request.query_id
-            ] = SqlQuestionResultResponse(
-                status="failed",
-                error=SqlQuestionResultResponse.SqlQuestionError(
-                    code="OTHERS",
-                    message=str(e),
+            await self._sql_question_results.set(
+                sql_question_request.query_id,
+                SqlQuestionResultResponse(
+                    status="failed",
+                    error=SqlQuestionResultResponse.SqlQuestionError(
+                        code="OTHERS",
+                        message=str(e),
+                    ),
+                    trace_id=trace_id,
                 ),
-                trace_id=trace_id,
             )
 
             results["metadata"]["error_type"] = "OTHERS"
             results["metadata"]["error_message"] = str(e)
             return results
 
-    def get_sql_question_result(
+    async def get_sql_question_result(
         self,
         sql_question_result_request: SqlQuestionResultRequest,
     ) -> SqlQuestionResultResponse:
         if (
-            result := self._sql_question_results.get(
+            result := await self._sql_question_results.get(
                 sql_question_result_request.query_id
             )
         ) is None:
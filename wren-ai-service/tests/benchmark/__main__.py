@@ -0,0 +1,406 @@
+import argparse
+import asyncio
+import inspect
+import os
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+import numpy as np
+import orjson
+
+# the semantics preparations run last, the projects they add slow down the searches of
+# the in-memory Qdrant for the other flows
+FLOWS = ["ask", "chart", "sql_answer", "semantics_preparation"]
+FLOW_SERVICES = {
+    "semantics_preparation": "semantics_preparation_service",
+    "ask": "ask_service",
+    "chart": "chart_service",
+    "sql_answer": "sql_answer_service",
+}
+PROJECT_ID = "benchmark"
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """
+    Returns the count and the mean, p50, p95, p99 and max of `samples`, unit: seconds.
+    """
+    if not samples:
+        return {"count": 0}
+
+    values = np.asarray(samples)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(values.max()), 4),
+    }
+
+
+class StageRecorder:
+    def __init__(self):
+        self._samples: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+
+    def add(self, flow: str, stage: str, seconds: float) -> None:
+        self._samples[flow][stage].append(seconds)
+
+    def reset(self) -> None:
+        self._samples.clear()
+
+    def summary(self, flow: str) -> Dict[str, Dict[str, Any]]:
+        return {
+            stage: summarize(samples)
+            for stage, samples in sorted(self._samples[flow].items())
+        }
+
+
+class TimedPipeline:
+    """
+    Records the duration of each run of `pipeline` as a stage of `flow`.
+    """
+
+    def __init__(self, pipeline: Any, flow: str, stage: str, recorder: StageRecorder):
+        self._pipeline = pipeline
+        self._flow = flow
+        self._stage = stage
+        self._recorder = recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pipeline, name)
+
+    async def run(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self._pipeline.run(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            self._recorder.add(self._flow, self._stage, time.perf_counter() - start)
+
+
+def generate_mdl(tables: int, columns: int) -> Dict[str, Any]:
+    """
+    Returns an MDL of `tables` models of `columns` columns, each related to the next one,
+    with a view per ten models for the historical questions.
+    """
+    models = [
+        {
+            "name": f"table_{i}",
+            "properties": {"description": f"Benchmark table {i}"},
+            "refSql": f'select * from "benchmark"."table_{i}"',
+            "columns": [
+                {
+                    "name": "id",
+                    "type": "INTEGER",
+                    "notNull": True,
+                    "isCalculated": False,
+                    "expression": "id",
+                    "properties": {},
+                },
+                {
+                    "name": "next_id",
+                    "type": "INTEGER",
+                    "notNull": False,
+                    "isCalculated": False,
+                    "expression": "next_id",
+                    "properties": {},
+                },
+            ]
+            + [
+                {
+                    "name": f"column_{j}",
+                    "type": "VARCHAR" if j % 2 else "INTEGER",
+                    "notNull": False,
+                    "isCalculated": False,
+                    "expression": f"column_{j}",
+                    "properties": {"description": f"Column {j} of table {i}"},
+                }
+                for j in range(max(columns - 2, 0))
+            ],
+            "primaryKey": "id",
+        }
+        for i in range(tables)
+    ]
+    relationships = [
+        {
+            "name": f"table_{i}_table_{i + 1}",
+            "models": [f"table_{i}", f"table_{i + 1}"],
+            "joinType": "MANY_TO_ONE",
+            "condition": f"table_{i}.next_id = table_{i + 1}.id",
+            "properties": {},
+        }
+        for i in range(tables - 1)
+    ]
+    views = [
+        {
+            "name": f"view_{i}",
+            "statement": f"SELECT * FROM table_{i}",
+            "properties": {
+                "question": f"What are the rows of table {i}?",
+                "summary": f"Retrieve the rows of table {i}",
+                "viewId": f"view-{i}",
+            },
+        }
+        for i in range(0, tables, 10)
+    ]
+    return {
+        "catalog": "benchmark",
+        "schema": "benchmark",
+        "models": models,
+        "relationships": relationships,
+        "metrics": [],
+        "cumulativeMetrics": [],
+        "enumDefinitions": [],
+        "views": views,
+    }
+
+
+def _sql_data(rows: int) -> Dict[str, Any]:
+    return {
+        "columns": ["category", "amount"],
+        "data": [[f"category {i % 20}", i] for i in range(rows)],
+        "dtypes": {"category": "object", "amount": "int64"},
+    }
+
+
+async def _poll(
+    client: httpx.AsyncClient, url: str, statuses: List[str], interval: float
+) -> Dict[str, Any]:
+    while True:
+        result = (await client.get(url)).json()
+        if result.get("status") in statuses:
+            return result
+        await asyncio.sleep(interval)
+
+
+class Benchmark:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: StageRecorder,
+        mdl: str,
+        sql: str,
+        args: argparse.Namespace,
+    ):
+        self._client = client
+        self._recorder = recorder
+        self._mdl = mdl
+        self._sql = sql
+        self._mdl_hash = str(uuid.uuid4())
+        self._args = args
+
+    async def prepare(self, mdl_hash: str, project_id: str) -> bool:
+        await self._client.post(
+            "/v1/semantics-preparations",
+            json={"mdl": self._mdl, "mdl_hash": mdl_hash, "project_id": project_id},
+        )
+        result = await _poll(
+            self._client,
+            f"/v1/semantics-preparations/{mdl_hash}/status",
+            ["finished", "failed"],
+            self._args.poll_interval,
+        )
+        return result["status"] == "finished"
+
+    async def setup(self) -> None:
+        # the project asked by the other flows
+        if not await self.prepare(self._mdl_hash, PROJECT_ID):
+            raise RuntimeError("Failed to prepare the semantics of the benchmark MDL")
+
+    async def semantics_preparation(self, i: int) -> bool:
+        return await self.prepare(str(uuid.uuid4()), f"{PROJECT_ID}-{i}")
+
+    async def ask(self, i: int) -> bool:
+        response = await self._client.post(
+            "/v1/asks",
+            json={
+                # distinct questions, so no ask is answered by a cache or another ask
+                "query": f"What is the total amount of category {i}?",
+                "mdl_hash": self._mdl_hash,
+                "project_id": PROJECT_ID,
+            },
+        )
+        result = await _poll(
+            self._client,
+            f"/v1/asks/{response.json()['query_id']}/result",
+            ["finished", "failed", "stopped"],
+            self._args.poll_interval,
+        )
+        return result["status"] == "finished"
+
+    async def chart(self, i: int) -> bool:
+        response = await self._client.post(
+            "/v1/charts",
+            json={
+                "query": f"Show the amount of each category {i}",
+                "sql": f"{self._sql} -- {i}",
+                "project_id": PROJECT_ID,
+            },
+        )
+        result = await _poll(
+            self._client,
+            f"/v1/charts/{response.json()['query_id']}",
+            ["finished", "failed", "stopped"],
+            self._args.poll_interval,
+        )
+        return result["status"] == "finished"
+
+    async def sql_answer(self, i: int) -> bool:
+        response = await self._client.post(
+            "/v1/sql-answers",
+            json={
+                "query": f"What is the amount of each category {i}?",
+                "sql": self._sql,
+                "sql_data": _sql_data(self._args.sql_answer_rows),
+                "project_id": PROJECT_ID,
+            },
+        )
+        query_id = response.json()["query_id"]
+        result = await _poll(
+            self._client,
+            f"/v1/sql-answers/{query_id}",
+            ["succeeded", "failed"],
+            self._args.poll_interval,
+        )
+        if result["status"] != "succeeded":
+            return False
+
+        # the in-process transport returns the stream once it's complete
+        response = await self._client.get(f"/v1/sql-answers/{query_id}/streaming")
+        return bool(response.text)
+
+
+async def _run_flow(
+    request: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    pending = iter(range(requests))
+    latencies: List[float] = []
+    failed = 0
+
+    async def _worker():
+        nonlocal failed
+        # workers share the iterator, so at most `concurrency` requests are in flight
+        for i in pending:
+            start = time.perf_counter()
+            try:
+                succeeded = await request(i)
+            except Exception:
+                succeeded = False
+            if succeeded:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(concurrency)])
+    duration = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "succeeded": len(latencies),
+        "failed": failed,
+        "duration": round(duration, 4),
+        "throughput": round(len(latencies) / duration, 4) if duration else 0.0,
+        "latency": summarize(latencies),
+    }
+
+
+def _configure_providers(settings: Any, args: argparse.Namespace) -> None:
+    overrides = {
+        "llm": {
+            "latency": args.llm_latency,
+            "tokens_per_second": args.llm_tokens_per_second,
+            "text_reply_tokens": args.llm_text_reply_tokens,
+        },
+        "embedder": {"latency": args.embedder_latency},
+        "engine": {"latency": args.engine_latency},
+    }
+    for component in settings.components:
+        component.update(overrides.get(component.get("type"), {}))
+
+
+async def _benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    # the settings are loaded on import, so the config must be set before
+    os.environ["CONFIG_PATH"] = args.config
+
+    from src.__main__ import app
+    from src.config import settings
+    from tests.benchmark.providers import BENCHMARK_SQL  # registers the stand-ins
+
+    _configure_providers(settings, args)
+    recorder = StageRecorder()
+    mdl = orjson.dumps(generate_mdl(args.tables, args.columns)).decode()
+    report = {"args": vars(args), "flows": {}}
+
+    async with app.router.lifespan_context(app):
+        service_container = app.state.service_container
+        for flow, service_name in FLOW_SERVICES.items():
+            service = getattr(service_container, service_name)
+            service._pipelines = {
+                name: TimedPipeline(pipeline, flow, name, recorder)
+                for name, pipeline in service._pipelines.items()
+            }
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark",
+            timeout=None,
+        ) as client:
+            benchmark = Benchmark(client, recorder, mdl, BENCHMARK_SQL, args)
+            await benchmark.setup()
+            # leave the setup out of the semantics preparation stages
+            recorder.reset()
+
+            for flow in [flow for flow in FLOWS if flow in args.flows]:
+                report["flows"][flow] = {
+                    **await _run_flow(
+                        getattr(benchmark, flow), args.requests, args.concurrency
+                    ),
+                    "stages": recorder.summary(flow),
+                }
+
+        report["loop_lag"] = app.state.loop_lag_monitor.get_metrics()
+
+    return report
+
+
+def _args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the service offline with stand-in providers"
+    )
+    parser.add_argument(
+        "-f", "--flows", nargs="+", choices=FLOWS, default=FLOWS, help="flows to run"
+    )
+    parser.add_argument("-n", "--requests", type=int, default=50, help="per flow")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--sql-answer-rows", type=int, default=500)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--llm-text-reply-tokens", type=int, default=100)
+    parser.add_argument("--embedder-latency", type=float, default=0.05)
+    parser.add_argument("--engine-latency", type=float, default=0.05)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--config", default="tests/benchmark/config.benchmark.yaml")
+    parser.add_argument("-o", "--output", help="also write the report to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _args()
+    report = orjson.dumps(asyncio.run(_benchmark(args)), option=orjson.OPT_INDENT_2)
+    if args.output:
+        with open(args.output, "wb") as f:
+            f.write(report)
+    print(report.decode())
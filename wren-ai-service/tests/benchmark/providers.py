@@ -0,0 +1,348 @@
+"""
+Deterministic stand-ins for the LLM, embedder, engine and document store, registered
+with the provider loader so the benchmark config can refer to them by name.
+"""
+
+import asyncio
+import hashlib
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+import orjson
+from haystack import Document, component
+
+from src.core.engine import Engine
+from src.core.provider import (
+    PROMPT_CACHE_BREAKPOINT,
+    EmbedderProvider,
+    EmbeddingScheduler,
+    LLMProvider,
+    estimate_tokens,
+)
+from src.providers.document_store.qdrant import QdrantProvider
+from src.providers.llm import ChatMessage, StreamingChunk
+from src.providers.loader import provider
+
+BENCHMARK_SQL = "SELECT category, SUM(amount) AS amount FROM table_0 GROUP BY category"
+BENCHMARK_COLUMNS = [
+    {"name": "category", "type": "VARCHAR"},
+    {"name": "amount", "type": "INTEGER"},
+]
+
+_BAR_CHART = {
+    "reasoning": "A bar chart compares the amount of each category.",
+    "chart_type": "bar",
+    "chart_schema": {
+        "title": "Amount by category",
+        "mark": {"type": "bar"},
+        "encoding": {
+            "x": {"field": "category", "type": "nominal", "title": "Category"},
+            "y": {"field": "amount", "type": "quantitative", "title": "Amount"},
+            "color": {"field": "category", "type": "nominal", "title": "Category"},
+        },
+    },
+}
+
+
+def _retrieval_schema(prompt: str, max_tables: int = 3) -> dict:
+    # keep every column of the first tables in the prompt, as a column pruning reply would
+    tables = list(dict.fromkeys(re.findall(r"CREATE TABLE (\w+)", prompt)))
+    return {
+        "results": [
+            {
+                "table_name": table,
+                "table_contents": {
+                    "chain_of_thought_reasoning": ["The table answers the question."],
+                    "columns": [],
+                },
+                "table_selection_reason": "The table answers the question.",
+            }
+            for table in tables[:max_tables]
+        ]
+    }
+
+
+# replies of the pipelines asking for structured output, by the name of their json schema
+JSON_REPLIES: Dict[str, Callable[[str], dict]] = {
+    "intent_classification": lambda _: {
+        "rephrased_question": "What is the total amount of each category?",
+        "results": "TEXT_TO_SQL",
+        "reasoning": "The question asks for an aggregation over the tables.",
+    },
+    "retrieval_schema": _retrieval_schema,
+    "sql_generation_result": lambda _: {"sql": BENCHMARK_SQL},
+    "chart_generation_schema": lambda _: _BAR_CHART,
+    "chart_adjustment_results": lambda _: _BAR_CHART,
+}
+
+
+def _text_reply(tokens: int) -> str:
+    return " ".join(f"word{i % 100}" for i in range(tokens))
+
+
+@provider("benchmark_llm")
+class BenchmarkLLMProvider(LLMProvider):
+    """
+    Replies after `latency` seconds plus the time to decode the reply at `tokens_per_second`.
+
+    Pipelines asking for a json schema listed in `JSON_REPLIES` get a reply they can parse,
+    others get `text_reply_tokens` tokens of text, streamed token by token when they
+    pass a streaming callback.
+    """
+
+    def __init__(
+        self,
+        model: str = "benchmark-llm",
+        kwargs: Optional[Dict[str, Any]] = None,
+        context_window_size: int = 100000,
+        latency: float = 0.5,  # unit: seconds
+        tokens_per_second: float = 100.0,
+        text_reply_tokens: int = 100,
+        **_,
+    ):
+        self._model = model
+        self._model_kwargs = kwargs or {}
+        self._context_window_size = context_window_size
+        self._latency = latency
+        self._tokens_per_second = tokens_per_second
+        self._text_reply_tokens = text_reply_tokens
+
+    def _reply(self, prompt: str, generation_kwargs: Dict[str, Any]) -> str:
+        response_format = generation_kwargs.get("response_format") or {}
+        schema_name = response_format.get("json_schema", {}).get("name")
+        if schema_name in JSON_REPLIES:
+            return orjson.dumps(JSON_REPLIES[schema_name](prompt)).decode()
+        if response_format.get("type") in ("json_object", "json_schema"):
+            return "{}"
+        return _text_reply(self._text_reply_tokens)
+
+    def _meta(self, index: int, prompt: str, reply: str) -> Dict[str, Any]:
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(reply)
+        return {
+            "model": self._model,
+            "index": index,
+            "finish_reason": "stop",
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def get_generator(
+        self,
+        system_prompt: Optional[str] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None,
+        streaming_callback: Optional[Callable[[StreamingChunk], None]] = None,
+    ):
+        combined_generation_kwargs = {
+            **(generation_kwargs or {}),
+            **(self._model_kwargs or {}),
+        }
+
+        async def _run(
+            prompt: str,
+            image_url: Optional[str] = None,
+            history_messages: Optional[List[ChatMessage]] = None,
+            generation_kwargs: Optional[Dict[str, Any]] = None,
+            query_id: Optional[str] = None,
+        ):
+            generation_kwargs = {
+                **combined_generation_kwargs,
+                **(generation_kwargs or {}),
+            }
+            full_prompt = "\n".join(
+                [system_prompt or ""]
+                + [message.content for message in history_messages or []]
+                + [prompt]
+            ).replace(PROMPT_CACHE_BREAKPOINT, "")
+            reply = self._reply(full_prompt, generation_kwargs)
+
+            await asyncio.sleep(self._latency)
+
+            if streaming_callback is not None:
+                tokens = reply.split(" ")
+                for i, token in enumerate(tokens):
+                    await asyncio.sleep(1 / self._tokens_per_second)
+                    last = i == len(tokens) - 1
+                    streaming_callback(
+                        StreamingChunk(
+                            token if last else f"{token} ",
+                            meta={
+                                "model": self._model,
+                                "index": 0,
+                                "finish_reason": "stop" if last else None,
+                            },
+                        ),
+                        query_id,
+                    )
+                replies = [reply]
+            else:
+                await asyncio.sleep(estimate_tokens(reply) / self._tokens_per_second)
+                replies = [reply] * generation_kwargs.get("n", 1)
+
+            return {
+                "replies": replies,
+                "meta": [
+                    self._meta(i, full_prompt, reply) for i, reply in enumerate(replies)
+                ],
+            }
+
+        return _run
+
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """
+    Returns a unit vector seeded by the hash of `text`, the same for the same text.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@component
+class BenchmarkTextEmbedder:
+    def __init__(self, model: str, dimension: int, latency: float):
+        self._model = model
+        self._dimension = dimension
+        self._latency = latency
+
+    @component.output_types(embedding=List[float], meta=Dict[str, Any])
+    async def run(self, text: str):
+        await asyncio.sleep(self._latency)
+        return {
+            "embedding": fake_embedding(text.replace("\n", " "), self._dimension),
+            "meta": {"model": self._model, "usage": {}},
+        }
+
+
+@component
+class BenchmarkDocumentEmbedder:
+    def __init__(
+        self,
+        model: str,
+        dimension: int,
+        latency: float,
+        batch_size: int,
+        embedding_scheduler: EmbeddingScheduler,
+    ):
+        self._model = model
+        self._dimension = dimension
+        self._latency = latency
+        self._batch_size = batch_size
+        self._embedding_scheduler = embedding_scheduler
+
+    @component.output_types(documents=List[Document], meta=Dict[str, Any])
+    async def run(self, documents: List[Document]):
+        async def _embed(texts: List[str]) -> List[List[float]]:
+            await asyncio.sleep(self._latency)
+            return [fake_embedding(text, self._dimension) for text in texts]
+
+        batches = await self._embedding_scheduler.run(
+            [(document.content or "").replace("\n", " ") for document in documents],
+            _embed,
+            max_batch_size=self._batch_size,
+        )
+        embeddings = [embedding for batch in batches for embedding in batch]
+        for document, embedding in zip(documents, embeddings):
+            document.embedding = embedding
+
+        return {"documents": documents, "meta": {"model": self._model, "usage": {}}}
+
+
+@provider("benchmark_embedder")
+class BenchmarkEmbedderProvider(EmbedderProvider):
+    """
+    Embeds texts into deterministic unit vectors after `latency` seconds per request.
+    """
+
+    def __init__(
+        self,
+        model: str = "benchmark-embedder",
+        dimension: int = 64,
+        latency: float = 0.05,  # unit: seconds
+        batch_size: int = 32,
+        max_in_flight: int = 4,
+        **_,
+    ):
+        self._embedding_model = model
+        self._dimension = dimension
+        self._latency = latency
+        self._batch_size = batch_size
+        self._embedding_scheduler = EmbeddingScheduler(max_in_flight=max_in_flight)
+
+    def get_text_embedder(self):
+        return BenchmarkTextEmbedder(
+            model=self._embedding_model,
+            dimension=self._dimension,
+            latency=self._latency,
+        )
+
+    def get_document_embedder(self):
+        return BenchmarkDocumentEmbedder(
+            model=self._embedding_model,
+            dimension=self._dimension,
+            latency=self._latency,
+            batch_size=self._batch_size,
+            embedding_scheduler=self._embedding_scheduler,
+        )
+
+
+@provider("benchmark_engine")
+class BenchmarkEngine(Engine):
+    """
+    Accepts every SQL after `latency` seconds and returns `rows` rows of `BENCHMARK_COLUMNS`.
+    """
+
+    def __init__(self, latency: float = 0.05, rows: int = 100, **_):
+        self._latency = latency
+        self._data = {
+            "columns": BENCHMARK_COLUMNS,
+            "data": [[f"category {i % 20}", i] for i in range(rows)],
+            "dtypes": {"category": "object", "amount": "int64"},
+        }
+
+    async def execute_sql(
+        self,
+        sql: str,
+        session: aiohttp.ClientSession,
+        dry_run: bool = True,
+        limit: int = 500,
+        **kwargs,
+    ):
+        await asyncio.sleep(self._latency)
+        if dry_run:
+            return True, {}, {"correlation_id": ""}
+        return (
+            True,
+            {**self._data, "data": self._data["data"][:limit]},
+            {"correlation_id": ""},
+        )
+
+    async def dry_plan(self, session: aiohttp.ClientSession, sql: str, **kwargs):
+        await asyncio.sleep(self._latency)
+        return True, ""
+
+    async def get_func_list(self, session: aiohttp.ClientSession, **kwargs):
+        await asyncio.sleep(self._latency)
+        return []
+
+
+@provider("benchmark_qdrant")
+class BenchmarkQdrantProvider(QdrantProvider):
+    """
+    Qdrant in local in-memory mode, shared by all stores of the provider.
+
+    Every `:memory:` client has a storage of its own, so the collections of the async
+    client are pointed at the ones of the sync client; otherwise the retrieval pipelines
+    wouldn't see the documents written by the indexing pipelines.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**{**kwargs, "location": ":memory:"})
+        local = self._async_client._client
+        local.collections = self._client._client.collections
+        local.aliases = self._client._client.aliases
@@ -0,0 +1,96 @@
+import orjson
+import pytest
+
+from src.pipelines.generation.utils.chart import ChartGenerationPostProcessor
+
+BAR_CHART = {
+    "title": "Sales by region",
+    "mark": {"type": "bar"},
+    "encoding": {
+        "x": {"field": "region", "type": "nominal", "title": "Region"},
+        "y": {"field": "sales", "type": "quantitative", "title": "Sales"},
+        "color": {"field": "region", "type": "nominal", "title": "Region"},
+    },
+}
+SAMPLE_DATA = [{"region": "EU", "sales": 10}, {"region": "US", "sales": 20}]
+
+
+def _replies(chart_schema: dict, chart_type: str = "bar") -> list[str]:
+    return [
+        orjson.dumps(
+            {
+                "reasoning": "compare the regions",
+                "chart_type": chart_type,
+                "chart_schema": chart_schema,
+            }
+        ).decode()
+    ]
+
+
+@pytest.fixture(scope="module")
+def post_processor():
+    return ChartGenerationPostProcessor()
+
+
+def test_chart_model_fast_path(post_processor: ChartGenerationPostProcessor):
+    output = post_processor.run(
+        _replies(BAR_CHART), SAMPLE_DATA, remove_data_from_chart_schema=False
+    )
+
+    assert output["results"]["chart_schema"]["data"] == {"values": SAMPLE_DATA}
+    assert list(output["validation_timings"]) == ["chart_model"]
+
+
+def test_falls_back_to_the_vega_lite_schema(
+    post_processor: ChartGenerationPostProcessor,
+):
+    # a valid Vega-Lite chart the bar chart model doesn't describe
+    chart_schema = {
+        **BAR_CHART,
+        "encoding": {
+            "x": BAR_CHART["encoding"]["x"],
+            "y": BAR_CHART["encoding"]["y"],
+        },
+    }
+    output = post_processor.run(_replies(chart_schema), SAMPLE_DATA)
+
+    assert output["results"]["chart_schema"]["encoding"] == chart_schema["encoding"]
+    assert output["results"]["chart_schema"]["data"] == {"values": []}
+    assert set(output["validation_timings"]) == {"chart_model", "vega_lite_schema"}
+
+
+def test_keys_outside_the_chart_model_are_validated(
+    post_processor: ChartGenerationPostProcessor,
+):
+    # the bar chart model ignores the keys it doesn't declare
+    chart_schema = {
+        **BAR_CHART,
+        "encoding": {
+            **BAR_CHART["encoding"],
+            "x": {**BAR_CHART["encoding"]["x"], "sort": "-y"},
+        },
+    }
+    output = post_processor.run(_replies(chart_schema), SAMPLE_DATA)
+
+    assert output["results"]["chart_schema"]["encoding"] == chart_schema["encoding"]
+    assert set(output["validation_timings"]) == {"chart_model", "vega_lite_schema"}
+
+    chart_schema = {**BAR_CHART, "width": "not-a-width"}
+    output = post_processor.run(_replies(chart_schema), SAMPLE_DATA)
+
+    assert output["results"]["chart_schema"] == {}
+
+
+def test_invalid_chart_schema(post_processor: ChartGenerationPostProcessor):
+    chart_schema = {**BAR_CHART, "mark": {"type": "not-a-mark"}}
+    output = post_processor.run(_replies(chart_schema), SAMPLE_DATA)
+
+    assert output["results"]["chart_schema"] == {}
+
+
+def test_full_schema_only():
+    post_processor = ChartGenerationPostProcessor(use_chart_models=False)
+    output = post_processor.run(_replies(BAR_CHART), SAMPLE_DATA)
+
+    assert output["results"]["chart_schema"]
+    assert list(output["validation_timings"]) == ["vega_lite_schema"]
@@ -0,0 +1,153 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.pipelines.generation.utils.sql import SQLGenPostProcessor
+from src.providers.engine.wren import WrenUI
+
+
+def _engine(*results) -> WrenUI:
+    engine = WrenUI(endpoint="http://localhost:3000")
+    engine.get_session = lambda: None
+    engine.execute_sql = AsyncMock(side_effect=list(results))
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_dry_run_outcomes_are_cached():
+    engine = _engine(
+        (True, {}, {"correlation_id": "1"}),
+        (False, {}, {"error_message": "column x not found", "correlation_id": "2"}),
+    )
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    for _ in range(2):
+        result = await post_processor.run(["SELECT 1"], project_id="project")
+        assert result["valid_generation_result"]["sql"] == "SELECT 1"
+
+        result = await post_processor.run(["SELECT  x FROM t"], project_id="project")
+        assert result["invalid_generation_result"]["error"] == "column x not found"
+
+    assert engine.execute_sql.await_count == 2
+    assert engine.get_validation_cache().get_metrics()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_previews_are_not_cached():
+    engine = _engine(
+        (False, {}, {"error_message": "Request timed out: 30 seconds"}),
+        (True, {}, {"correlation_id": ""}),
+        (True, {"data": [[1]]}, {"correlation_id": ""}),
+        (True, {"data": [[1]]}, {"correlation_id": ""}),
+    )
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    result = await post_processor.run(["SELECT 1"], project_id="project")
+    assert result["invalid_generation_result"]["type"] == "TIME_OUT"
+    result = await post_processor.run(["SELECT 1"], project_id="project")
+    assert result["valid_generation_result"]
+
+    for _ in range(2):
+        await post_processor.run(
+            ["SELECT 1"], project_id="project", allow_data_preview=True
+        )
+
+    assert engine.execute_sql.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_validation_cache_is_scoped_by_project():
+    engine = _engine(
+        (True, {}, {"correlation_id": ""}),
+        (False, {}, {"error_message": "table t not found"}),
+    )
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    result = await post_processor.run(["SELECT * FROM t"], project_id="a")
+    assert result["valid_generation_result"]
+    result = await post_processor.run(["SELECT * FROM t"], project_id="b")
+    assert result["invalid_generation_result"]
+
+
+@pytest.mark.asyncio
+async def test_validation_cache_keys_on_the_exact_sql_and_mdl():
+    engine = _engine(*[(True, {}, {"correlation_id": ""})] * 3)
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    # the outcomes hold the SQL verbatim, so SQL differing in whitespace isn't shared
+    result = await post_processor.run(['{"sql": "SELECT x\\nFROM t"}'], project_id="a")
+    assert result["valid_generation_result"]["sql"] == "SELECT x\nFROM t"
+    result = await post_processor.run(["SELECT x FROM t"], project_id="a")
+    assert result["valid_generation_result"]["sql"] == "SELECT x FROM t"
+
+    await post_processor.run(["SELECT x FROM t"], project_id="a", mdl_hash="1")
+    await post_processor.run(["SELECT x FROM t"], project_id="a", mdl_hash="1")
+    assert engine.execute_sql.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_validation_cache_can_be_disabled():
+    engine = WrenUI(endpoint="http://localhost:3000", validation_cache={"ttl": 0})
+    engine.get_session = lambda: None
+    engine.execute_sql = AsyncMock(return_value=(True, {}, {"correlation_id": ""}))
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    for _ in range(2):
+        await post_processor.run(["SELECT 1"], project_id="project")
+
+    assert engine.execute_sql.await_count == 2
+
+
+def _delayed_engine(
+    outcomes: dict[str, tuple[float, bool]],
+) -> tuple[WrenUI, list[str]]:
+    engine = WrenUI(endpoint="http://localhost:3000", validation_cache={"ttl": 0})
+    engine.get_session = lambda: None
+    cancelled = []
+
+    async def execute_sql(sql: str, *args, **kwargs):
+        delay, success = outcomes[sql]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(sql)
+            raise
+        if success:
+            return True, {}, {"correlation_id": sql}
+        return False, {}, {"error_message": f"{sql} failed"}
+
+    engine.execute_sql = execute_sql
+    return engine, cancelled
+
+
+@pytest.mark.asyncio
+async def test_first_valid_candidate_wins():
+    engine, cancelled = _delayed_engine(
+        {
+            "SELECT 1": (0.01, False),
+            "SELECT 2": (0.02, True),
+            "SELECT 3": (0.5, True),
+        }
+    )
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    result = await post_processor.run(
+        ["SELECT 1", '{"sql": "SELECT 2"}', "SELECT 3", "SELECT 1"]
+    )
+
+    assert result["valid_generation_result"]["sql"] == "SELECT 2"
+    await asyncio.sleep(0)
+    assert cancelled == ["SELECT 3"]
+
+
+@pytest.mark.asyncio
+async def test_all_candidates_invalid():
+    engine, _ = _delayed_engine({"SELECT 1": (0.02, False), "SELECT 2": (0.01, False)})
+    post_processor = SQLGenPostProcessor(engine=engine)
+
+    result = await post_processor.run(["SELECT 1", "not json {", "SELECT 2"])
+
+    # the correction starts from the first candidate, as with a single reply
+    assert result["valid_generation_result"] == {}
+    assert result["invalid_generation_result"]["error"] == "SELECT 1 failed"
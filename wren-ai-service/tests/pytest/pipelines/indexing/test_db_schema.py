@@ -5,6 +5,7 @@ import pytest
 from haystack import Document
 from pytest_mock import MockFixture
 
+from src.pipelines.common import dump_ddl_payload, load_ddl_payload
 from src.pipelines.indexing.db_schema import DBSchema, DDLChunker
 
 
@@ -39,8 +40,12 @@ async def test_single_model():
     assert len(actual["documents"]) == 1
 
     document: Document = actual["documents"][0]
-    assert document.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document.content == str(
+    assert document.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document.content) == (
         {
             "type": "TABLE",
             "comment": "\n/* {'alias': 'user', 'description': 'A table containing user information.'} */\n",
@@ -78,8 +83,12 @@ async def test_multiple_models():
     assert len(actual["documents"]) == 2
 
     document_1: Document = actual["documents"][0]
-    assert document_1.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_1.content == str(
+    assert document_1.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_1.content) == (
         {
             "type": "TABLE",
             "comment": "\n/* {'alias': 'user', 'description': 'A table containing user information.'} */\n",
@@ -88,8 +97,12 @@ async def test_multiple_models():
     )
 
     document_2: Document = actual["documents"][1]
-    assert document_2.meta == {"type": "TABLE_SCHEMA", "name": "order"}
-    assert document_2.content == str(
+    assert document_2.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "order",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_2.content) == (
         {
             "type": "TABLE",
             "comment": "\n/* {'alias': 'order', 'description': 'A table containing order details.'} */\n",
@@ -123,8 +136,12 @@ async def test_column_is_primary_key():
     assert len(actual["documents"]) == 2
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -168,8 +185,12 @@ async def test_column_with_properties():
     assert len(actual["documents"]) == 2
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -185,8 +206,12 @@ async def test_column_with_properties():
     )
 
     document_1: Document = actual["documents"][1]
-    assert document_1.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_1.content == str(
+    assert document_1.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_1.content) == (
         {
             "type": "TABLE",
             "comment": "\n/* {'alias': '', 'description': ''} */\n",
@@ -225,8 +250,12 @@ async def test_column_with_nested_columns():
     assert len(actual["documents"]) == 2
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -268,8 +297,12 @@ async def test_column_with_calculated_property():
     assert len(actual["documents"]) == 2
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -332,8 +365,12 @@ async def test_column_with_relationship():
     assert len(actual["documents"]) == 6
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -349,8 +386,12 @@ async def test_column_with_relationship():
     )
 
     document_1: Document = actual["documents"][1]
-    assert document_1.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_1.content == str(
+    assert document_1.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_1.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -365,8 +406,12 @@ async def test_column_with_relationship():
     )
 
     document_4: Document = actual["documents"][4]
-    assert document_4.meta == {"type": "TABLE_SCHEMA", "name": "order"}
-    assert document_4.content == str(
+    assert document_4.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "order",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_4.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -403,8 +448,12 @@ async def test_column_batch_size():
     assert len(actual["documents"]) == 3
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -427,8 +476,12 @@ async def test_column_batch_size():
     )
 
     document_1: Document = actual["documents"][1]
-    assert document_1.meta == {"type": "TABLE_SCHEMA", "name": "user"}
-    assert document_1.content == str(
+    assert document_1.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "user",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_1.content) == (
         {
             "type": "TABLE_COLUMNS",
             "columns": [
@@ -457,8 +510,12 @@ async def test_view():
     assert len(actual["documents"]) == 1
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "view_1"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "view_1",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "VIEW",
             "comment": "",
@@ -487,8 +544,12 @@ async def test_view_with_properties():
     assert len(actual["documents"]) == 1
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "view_1"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "view_1",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "VIEW",
             "comment": "/* {'description': 'A view containing user information.'} */\n",
@@ -522,8 +583,12 @@ async def test_metric():
     assert len(actual["documents"]) == 1
 
     document_0: Document = actual["documents"][0]
-    assert document_0.meta == {"type": "TABLE_SCHEMA", "name": "metric_1"}
-    assert document_0.content == str(
+    assert document_0.meta == {
+        "type": "TABLE_SCHEMA",
+        "name": "metric_1",
+        "payload_version": 2,
+    }
+    assert orjson.loads(document_0.content) == (
         {
             "type": "METRIC",
             "comment": "\n/* This table is a metric */\n/* Metric Base Object: user */\n",
@@ -597,12 +662,16 @@ async def test_pipeline_run(mocker: MockFixture):
         side_effect=lambda documents: {"documents": documents},
     )
     embedder_provider.get_document_embedder.return_value = embedder
+    embedder_provider.get_model.return_value = "text-embedding-3-large"
 
     # Mock document store provider
     document_store = mocker.Mock()
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store,
         "write_documents",
@@ -618,4 +687,28 @@ async def test_pipeline_run(mocker: MockFixture):
     )
     result = await pipe.run(orjson.dumps(test_mdl), project_id="test-project")
     assert result is not None
-    assert result == {"write": {"documents_written": 6}}
+    assert result == {
+        "write": {
+            "documents_written": 6,
+            "documents_reused": 0,
+            "documents_deleted": 0,
+        }
+    }
+
+
+def test_load_legacy_ddl_payload():
+    payload = {
+        "type": "TABLE_COLUMNS",
+        "columns": [
+            {
+                "type": "COLUMN",
+                "comment": "-- {'alias': 'id'}\n  ",
+                "name": "id",
+                "data_type": "INTEGER",
+                "is_primary_key": True,
+            }
+        ],
+    }
+
+    assert load_ddl_payload(str(payload)) == payload
+    assert load_ddl_payload(dump_ddl_payload(payload)) == payload
@@ -293,12 +293,16 @@ async def test_pipeline_run(mocker: MockFixture):
         side_effect=lambda documents: {"documents": documents},
     )
     embedder_provider.get_document_embedder.return_value = embedder
+    embedder_provider.get_model.return_value = "text-embedding-3-large"
 
     # Mock document store provider
     document_store = mocker.Mock()
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store,
         "write_documents",
@@ -332,7 +336,13 @@ async def test_pipeline_run(mocker: MockFixture):
 
     result = await pipeline.run(json.dumps(test_mdl), project_id="test-project")
     assert result is not None
-    assert result == {"write": {"documents_written": 1}}
+    assert result == {
+        "write": {
+            "documents_written": 1,
+            "documents_reused": 0,
+            "documents_deleted": 0,
+        }
+    }
 
 
 @pytest.mark.asyncio
@@ -344,12 +354,16 @@ async def test_pipeline_run_embedder_error(mocker: MockFixture):
         embedder, "run", new_callable=AsyncMock, side_effect=Exception("Embedder error")
     )
     embedder_provider.get_document_embedder.return_value = embedder
+    embedder_provider.get_model.return_value = "text-embedding-3-large"
 
     # Mock document store provider
     document_store = mocker.Mock()
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store,
         "write_documents",
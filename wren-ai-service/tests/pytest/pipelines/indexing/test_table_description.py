@@ -5,6 +5,7 @@ import pytest
 from haystack import Document
 from pytest_mock import MockFixture
 
+from src.pipelines.common import dump_ddl_payload, load_ddl_payload
 from src.pipelines.indexing.table_description import (
     TableDescription,
     TableDescriptionChunker,
@@ -38,7 +39,7 @@ def test_single_table_description():
 
     document: Document = actual["documents"][0]
     assert document.meta == {"type": "TABLE_DESCRIPTION", "name": "user"}
-    assert document.content == str(
+    assert document.content == dump_ddl_payload(
         {
             "name": "user",
             "description": "A table containing user information.",
@@ -47,6 +48,30 @@ def test_single_table_description():
     )
 
 
+def test_table_description_is_json():
+    chunker = TableDescriptionChunker()
+    mdl = {
+        "models": [
+            {
+                "name": "user",
+                "columns": [{"name": "id"}, {"name": "name"}],
+                "properties": {"description": 'The user\'s "profile"'},
+            }
+        ],
+        "views": [],
+        "relationships": [],
+        "metrics": [],
+    }
+
+    document: Document = chunker.run(mdl)["documents"][0]
+    assert orjson.loads(document.content) == load_ddl_payload(document.content)
+    assert load_ddl_payload(document.content) == {
+        "name": "user",
+        "description": 'The user\'s "profile"',
+        "columns": "id, name",
+    }
+
+
 def test_multiple_table_descriptions():
     chunker = TableDescriptionChunker()
     mdl = {
@@ -73,7 +98,7 @@ def test_multiple_table_descriptions():
         "type": "TABLE_DESCRIPTION",
         "name": "user",
     }
-    assert document_1.content == str(
+    assert document_1.content == dump_ddl_payload(
         {
             "name": "user",
             "description": "A table containing user information.",
@@ -83,7 +108,7 @@ def test_multiple_table_descriptions():
 
     document_2: Document = actual["documents"][1]
     assert document_2.meta == {"type": "TABLE_DESCRIPTION", "name": "order"}
-    assert document_2.content == str(
+    assert document_2.content == dump_ddl_payload(
         {
             "name": "order",
             "description": "A table containing order details.",
@@ -123,7 +148,9 @@ def test_table_description_missing_description():
 
     document: Document = actual["documents"][0]
     assert document.meta == {"type": "TABLE_DESCRIPTION", "name": "user"}
-    assert document.content == str({"name": "user", "description": "", "columns": ""})
+    assert document.content == dump_ddl_payload(
+        {"name": "user", "description": "", "columns": ""}
+    )
 
 
 @pytest.mark.asyncio
@@ -154,12 +181,16 @@ async def test_pipeline_run(mocker: MockFixture):
         side_effect=lambda documents: {"documents": documents},
     )
     embedder_provider.get_document_embedder.return_value = embedder
+    embedder_provider.get_model.return_value = "text-embedding-3-large"
 
     # Mock document store provider
     document_store = mocker.Mock()
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store,
         "write_documents",
@@ -176,4 +207,94 @@ async def test_pipeline_run(mocker: MockFixture):
 
     result = await pipeline.run(orjson.dumps(test_mdl), project_id="test-project")
     assert result is not None
-    assert result == {"write": {"documents_written": 2}}
+    assert result == {
+        "write": {
+            "documents_written": 2,
+            "documents_reused": 0,
+            "documents_deleted": 0,
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_pipeline_run_reuses_unchanged_chunks(mocker: MockFixture):
+    test_mdl = {
+        "models": [
+            {
+                "name": "user",
+                "properties": {"description": "A table containing user information."},
+            },
+            {
+                "name": "order",
+                "properties": {"description": "A table containing order details."},
+            },
+        ],
+        "views": [],
+        "relationships": [],
+        "metrics": [],
+    }
+
+    # the user table was indexed before, the order table is new
+    stored = TableDescriptionChunker(embedding_model="text-embedding-3-large").run(
+        {**test_mdl, "models": test_mdl["models"][:1]}, project_id="test-project"
+    )["documents"]
+
+    # Mock embedder provider
+    embedder_provider = mocker.patch("src.core.provider.EmbedderProvider")
+    embedder = mocker.Mock()
+    mocker.patch.object(
+        embedder,
+        "run",
+        new_callable=AsyncMock,
+        side_effect=lambda documents: {"documents": documents},
+    )
+    embedder_provider.get_document_embedder.return_value = embedder
+    embedder_provider.get_model.return_value = "text-embedding-3-large"
+
+    # Mock document store provider
+    document_store = mocker.Mock()
+    mocker.patch.object(
+        document_store,
+        "get_document_ids",
+        new_callable=AsyncMock,
+        return_value=[stored[0].id, "stale-id"],
+    )
+    mocker.patch.object(
+        document_store, "delete_documents_by_ids", new_callable=AsyncMock
+    )
+    mocker.patch.object(
+        document_store,
+        "write_documents",
+        new_callable=AsyncMock,
+        side_effect=lambda documents, *_, **__: len(documents),
+    )
+    document_store_provider = mocker.patch("src.core.provider.DocumentStoreProvider")
+    document_store_provider.get_store.return_value = document_store
+
+    pipeline = TableDescription(
+        embedder_provider=embedder_provider,
+        document_store_provider=document_store_provider,
+    )
+
+    result = await pipeline.run(orjson.dumps(test_mdl), project_id="test-project")
+    assert result == {
+        "write": {
+            "documents_written": 1,
+            "documents_reused": 1,
+            "documents_deleted": 1,
+        }
+    }
+
+    embedded = embedder.run.await_args.kwargs["documents"]
+    assert [document.meta["name"] for document in embedded] == ["order"]
+    document_store.delete_documents_by_ids.assert_awaited_once_with(["stale-id"])
+
+    # the chunks embedded by another model, even of the same dimension, are embedded again
+    embedder_provider.get_model.return_value = "text-embedding-3-small"
+    pipeline = TableDescription(
+        embedder_provider=embedder_provider,
+        document_store_provider=document_store_provider,
+    )
+    result = await pipeline.run(orjson.dumps(test_mdl), project_id="test-project")
+    assert result["write"]["documents_written"] == 2
+    assert result["write"]["documents_reused"] == 0
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.pipelines.common import DbSchemaCache, build_table_ddl
+from src.pipelines.indexing.db_schema import DDLChunker
+from src.pipelines.indexing.utils import helper
+
+MDL = {
+    "models": [
+        {
+            "name": "user",
+            "columns": [
+                {"name": "id", "type": "INTEGER"},
+                {"name": "name", "type": "VARCHAR"},
+            ],
+            "primaryKey": "id",
+        },
+        {
+            "name": "order",
+            "columns": [{"name": "user_id", "type": "INTEGER"}],
+            "primaryKey": "user_id",
+        },
+    ],
+    "views": [{"name": "view_1", "statement": "SELECT * FROM user"}],
+    "relationships": [],
+    "metrics": [
+        {
+            "name": "metric_1",
+            "baseObject": "user",
+            "measure": [{"name": "age", "type": "INTEGER", "expression": "SUM(age)"}],
+            "dimension": [{"name": "gender", "type": "VARCHAR"}],
+        }
+    ],
+}
+
+
+async def _documents():
+    helper.load_helpers()
+    result = await DDLChunker().run(MDL, column_batch_size=1, project_id="p1")
+    return result["documents"]
+
+
+@pytest.mark.asyncio
+async def test_put_and_get():
+    documents = await _documents()
+    cache = DbSchemaCache()
+    entry = cache.put(documents, project_id="p1", mdl_hash="hash-1")
+
+    assert set(entry.table_schemas.keys()) == {"user", "order"}
+    assert len(entry.table_schemas["user"]["columns"]) == 2
+    assert (
+        entry.ddls["user"]["table_ddl"]
+        == build_table_ddl(entry.table_schemas["user"])[0]
+    )
+    assert entry.ddls["metric_1"]["type"] == "METRIC"
+    assert entry.ddls["view_1"]["type"] == "VIEW"
+
+    assert cache.get("p1", "hash-1") is entry
+    assert cache.get("p1", "hash-2") is None
+    assert cache.get("p2", "hash-1") is None
+    # the MDL the request is for is unknown, it may not be the cached one
+    assert cache.get("p1") is None
+
+    cache.put(documents, project_id="p2")
+    assert cache.get("p2") is None
+
+
+@pytest.mark.asyncio
+async def test_retrieval_results_order_and_tokens():
+    documents = await _documents()
+    cache = DbSchemaCache()
+    entry = cache.put(documents, project_id="p1", mdl_hash="hash-1")
+
+    results = entry.retrieval_results(["view_1", "user", "missing", "metric_1"])
+    assert [result["table_name"] for result in results] == [
+        "user",
+        "view_1",
+        "metric_1",
+    ]
+
+    encoding = MagicMock()
+    encoding.name = "whitespace"
+    encoding.encode.side_effect = lambda text: text.split()
+
+    tokens = entry.count_tokens(encoding, ["user"])
+    assert tokens == len(entry.ddls["user"]["table_ddl"].split())
+    assert entry.count_tokens(encoding, ["user"]) == tokens
+    encoding.encode.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_invalidate():
+    documents = await _documents()
+    cache = DbSchemaCache()
+    cache.put(documents, project_id="p1", mdl_hash="hash-1")
+    cache.put(documents, mdl_hash="hash-1")
+
+    cache.invalidate("p1")
+    assert cache.get("p1", "hash-1") is None
+    assert cache.get(mdl_hash="hash-1") is not None
@@ -0,0 +1,66 @@
+from unittest.mock import MagicMock
+
+import pytest
+import tiktoken
+
+from src.pipelines.retrieval.preprocess_sql_data import PreprocessSqlData
+
+
+@pytest.fixture(autouse=True)
+def byte_encoding(mocker):
+    # one token per byte without merges, so the token counts are easy to reason about
+    mocker.patch(
+        "tiktoken.get_encoding",
+        return_value=tiktoken.Encoding(
+            name="bytes",
+            pat_str=r".",
+            mergeable_ranks={bytes([i]): i for i in range(256)},
+            special_tokens={},
+        ),
+    )
+
+
+def _pipeline(context_window_size: int) -> PreprocessSqlData:
+    llm_provider = MagicMock()
+    llm_provider.get_model.return_value = "gpt-4o-mini"
+    llm_provider.get_context_window_size.return_value = context_window_size
+    return PreprocessSqlData(llm_provider=llm_provider)
+
+
+def _sql_data(rows: int) -> dict:
+    return {
+        "columns": ["id", "name"],
+        "data": [[i, f"name {i}"] for i in range(rows)],
+    }
+
+
+@pytest.mark.asyncio
+async def test_keeps_the_most_rows_fitting_the_context_window():
+    context_window_size = 1_000
+    result = (await _pipeline(context_window_size).run(sql_data=_sql_data(500)))[
+        "preprocess"
+    ]
+
+    num_rows = result["num_rows_used_in_llm"]
+    assert 0 < num_rows < 500
+    assert result["tokens"] == len(str(result["sql_data"])) <= context_window_size
+    assert result["sql_data"]["data"] == _sql_data(500)["data"][:num_rows]
+
+    # one more row doesn't fit
+    assert len(str(_sql_data(num_rows + 1))) > context_window_size
+
+
+@pytest.mark.asyncio
+async def test_small_results_are_untouched():
+    result = (await _pipeline(10_000).run(sql_data=_sql_data(10)))["preprocess"]
+
+    assert result["num_rows_used_in_llm"] == 10
+    assert result["sql_data"] == _sql_data(10)
+
+
+@pytest.mark.asyncio
+async def test_no_rows_fit():
+    result = (await _pipeline(10).run(sql_data=_sql_data(10)))["preprocess"]
+
+    assert result["num_rows_used_in_llm"] == 0
+    assert result["sql_data"]["data"] == []
@@ -0,0 +1,39 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.pipelines.retrieval import QueryEmbedding
+from src.web.v1.services.ask import AskHistory
+
+
+def _pipeline():
+    embedder = MagicMock()
+    embedder.run = AsyncMock(side_effect=lambda text: {"embedding": [len(text)]})
+    embedder_provider = MagicMock()
+    embedder_provider.get_text_embedder.return_value = embedder
+    return QueryEmbedding(embedder_provider=embedder_provider), embedder
+
+
+@pytest.mark.asyncio
+async def test_query_without_histories_is_embedded_once():
+    pipeline, embedder = _pipeline()
+
+    result = await pipeline.run(query="how many users?")
+
+    assert result["embedding"] == {"embedding": [15]}
+    assert result["histories_embedding"] == result["embedding"]
+    embedder.run.assert_awaited_once_with("how many users?")
+
+
+@pytest.mark.asyncio
+async def test_query_with_histories():
+    pipeline, embedder = _pipeline()
+
+    result = await pipeline.run(
+        query="and orders?",
+        histories=[AskHistory(question="how many users?", sql="SELECT 1")],
+    )
+
+    assert result["embedding"] == {"embedding": [11]}
+    assert result["histories_embedding"] == {"embedding": [27]}
+    embedder.run.assert_any_await("how many users?\nand orders?")
@@ -0,0 +1,208 @@
+import pytest
+from haystack import Document
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+
+from src.providers.document_store.embedded import (
+    EmbeddedDocumentStore,
+    EmbeddedProvider,
+)
+
+
+def _project(project_id: str) -> dict:
+    return {
+        "operator": "AND",
+        "conditions": [{"field": "project_id", "operator": "==", "value": project_id}],
+    }
+
+
+def _documents() -> list[Document]:
+    return [
+        Document(
+            id="orders",
+            content="orders",
+            meta={"project_id": "1", "type": "TABLE_SCHEMA", "name": "orders"},
+            embedding=[1.0, 0.0],
+        ),
+        Document(
+            id="customers",
+            content="customers",
+            meta={"project_id": "1", "type": "TABLE_SCHEMA", "name": "customers"},
+            embedding=[0.6, 0.8],
+        ),
+        Document(
+            id="payments",
+            content="payments",
+            meta={"project_id": "2", "type": "TABLE_SCHEMA", "name": "payments"},
+            embedding=[0.0, 1.0],
+        ),
+        Document(
+            id="meta",
+            content="meta",
+            meta={"project_id": "1", "type": "PROJECT_META"},
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_by_embedding():
+    store = EmbeddedDocumentStore(embedding_dim=2)
+    assert await store.write_documents(_documents()) == 4
+
+    documents = await store._query_by_embedding([1.0, 0.0], top_k=2)
+    assert [document.id for document in documents] == ["orders", "customers"]
+    assert documents[0].score == pytest.approx(1.0)
+    assert documents[1].score == pytest.approx(0.8)
+
+    # the documents without embeddings aren't searched
+    documents = await store._query_by_embedding([1.0, 0.0], filters=_project("1"))
+    assert [document.id for document in documents] == ["orders", "customers"]
+    assert documents[0].meta == {
+        "project_id": "1",
+        "type": "TABLE_SCHEMA",
+        "name": "orders",
+    }
+
+    filters = {
+        "operator": "AND",
+        "conditions": [
+            {"field": "project_id", "operator": "==", "value": "1"},
+            {"field": "name", "operator": "in", "value": ["customers", "payments"]},
+        ],
+    }
+    documents = await store._query_by_embedding([0.0, 1.0], filters=filters)
+    assert [document.id for document in documents] == ["customers"]
+
+
+@pytest.mark.asyncio
+async def test_query_by_filters():
+    store = EmbeddedDocumentStore(embedding_dim=2)
+    await store.write_documents(_documents())
+
+    # conditions on fields that aren't indexed are evaluated on the payloads
+    filters = {
+        "operator": "OR",
+        "conditions": [
+            {"field": "type", "operator": "==", "value": "PROJECT_META"},
+            {"field": "content", "operator": "==", "value": "payments"},
+        ],
+    }
+    documents = await store._query_by_filters(filters)
+    assert [document.id for document in documents] == ["payments", "meta"]
+    assert await store.count_documents(_project("1")) == 3
+    assert sorted(await store.get_document_ids(_project("2"))) == ["payments"]
+
+
+@pytest.mark.asyncio
+async def test_write_and_delete_documents():
+    store = EmbeddedDocumentStore(embedding_dim=2)
+    await store.write_documents(_documents())
+
+    with pytest.raises(DuplicateDocumentError):
+        await store.write_documents(_documents()[:1])
+    assert await store.write_documents(_documents()[:1], DuplicatePolicy.SKIP) == 0
+
+    updated = Document(
+        id="orders", content="orders", meta={"project_id": "2"}, embedding=[0.0, 1.0]
+    )
+    await store.write_documents([updated], DuplicatePolicy.OVERWRITE)
+    assert await store.count_documents(_project("2")) == 2
+
+    await store.delete_documents(_project("2"))
+    await store.delete_documents_by_ids(["meta", "unknown"])
+    assert await store.get_document_ids() == ["customers"]
+
+    documents = await store._query_by_embedding([0.6, 0.8])
+    assert [document.id for document in documents] == ["customers"]
+
+    await store.delete_documents()
+    assert await store.count_documents() == 0
+
+
+@pytest.mark.asyncio
+async def test_collections_are_persisted(tmp_path):
+    provider = EmbeddedProvider(path=str(tmp_path))
+    store = provider.get_store("table_descriptions")
+    assert provider.get_store("table_descriptions") is store
+    await store.write_documents(_documents())
+    await store.delete_documents_by_ids(["customers"])
+    await provider.close()
+
+    # a restarted service reads the collection back from the memory-mapped files
+    provider = EmbeddedProvider(path=str(tmp_path))
+    store = provider.get_store("table_descriptions")
+    documents = await store._query_by_embedding([1.0, 0.0], filters=_project("1"))
+    assert [document.id for document in documents] == ["orders"]
+    assert await store.count_documents() == 3
+    await provider.close()
+
+    store = EmbeddedProvider(path=str(tmp_path), recreate_index=True).get_store(
+        "table_descriptions"
+    )
+    assert await store.count_documents() == 0
+
+
+@pytest.mark.asyncio
+async def test_changes_are_journaled(tmp_path):
+    store = EmbeddedDocumentStore(index="sql_pairs", path=str(tmp_path))
+    await store.write_documents(_documents())
+    snapshot = (tmp_path / "sql_pairs" / "documents.json").read_bytes()
+
+    # a small change is appended to the journal instead of rewriting the snapshot
+    updated = Document(
+        id="orders", content="orders", meta={"project_id": "2"}, embedding=[0.0, 1.0]
+    )
+    await store.write_documents([updated], DuplicatePolicy.OVERWRITE)
+    await store.delete_documents_by_ids(["customers"])
+    assert (tmp_path / "sql_pairs" / "documents.json").read_bytes() == snapshot
+    assert (tmp_path / "sql_pairs" / "documents.1.log").exists()
+
+    store = EmbeddedDocumentStore(index="sql_pairs", path=str(tmp_path))
+    assert sorted(await store.get_document_ids(_project("2"))) == [
+        "orders",
+        "payments",
+    ]
+    # the overwritten document was appended, after the documents it didn't replace
+    documents = await store._query_by_embedding([0.0, 1.0])
+    assert [document.id for document in documents] == ["payments", "orders"]
+    assert await store.count_documents() == 3
+
+    # the snapshot is rewritten once the journal outgrows it
+    for _ in range(10):
+        await store.write_documents([updated], DuplicatePolicy.OVERWRITE)
+    assert (tmp_path / "sql_pairs" / "documents.json").read_bytes() != snapshot
+    assert not (tmp_path / "sql_pairs" / "documents.1.log").exists()
+
+    store = EmbeddedDocumentStore(index="sql_pairs", path=str(tmp_path))
+    assert await store.count_documents() == 3
+
+
+@pytest.mark.asyncio
+async def test_changes_lost_in_a_crash_keep_the_saved_vectors(tmp_path):
+    store = EmbeddedDocumentStore(index="sql_pairs", path=str(tmp_path))
+    await store.write_documents(_documents())
+
+    # the vectors of an overwrite and a delete reach the disk, but not their journal entry
+    collection = store._collection
+    collection.upsert([Document(id="orders", content="orders", embedding=[0.0, 1.0])])
+    collection.delete([collection.rows["customers"]])
+    collection._vectors.flush()
+
+    store = EmbeddedDocumentStore(index="sql_pairs", path=str(tmp_path))
+    assert await store.count_documents() == 4
+    documents = await store._query_by_embedding([1.0, 0.0], scale_score=False)
+    assert [(document.id, document.score) for document in documents] == [
+        ("orders", pytest.approx(1.0)),
+        ("customers", pytest.approx(0.6)),
+        ("payments", pytest.approx(0.0)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_path_is_used_by_one_process(tmp_path):
+    provider = EmbeddedProvider(path=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        EmbeddedProvider(path=str(tmp_path))
+
+    await provider.close()
+    await EmbeddedProvider(path=str(tmp_path)).close()
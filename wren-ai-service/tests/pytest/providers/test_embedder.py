@@ -0,0 +1,174 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from haystack import Document
+
+from src.core.provider import EmbeddingCache, EmbeddingScheduler
+from src.providers.embedder.litellm import LitellmEmbedderProvider
+
+
+def _aembedding(mocker):
+    async def _response(model, input, **kwargs):
+        await asyncio.sleep(0.01)
+        response = MagicMock()
+        response.model = model
+        response.data = [{"embedding": [float(len(text))]} for text in input]
+        del response.usage
+        return response
+
+    return mocker.patch(
+        "src.providers.embedder.litellm.aembedding",
+        new_callable=AsyncMock,
+        side_effect=_response,
+    )
+
+
+@pytest.mark.asyncio
+async def test_text_embedder_embeds_question_once(mocker):
+    aembedding = _aembedding(mocker)
+    provider = LitellmEmbedderProvider(model="text-embedding-3-large")
+    embedders = [provider.get_text_embedder() for _ in range(3)]
+
+    results = await asyncio.gather(
+        *[embedder.run("how many users?") for embedder in embedders]
+    )
+    assert [result["embedding"] for result in results] == [[15.0]] * 3
+
+    await embedders[0].run("how many\nusers?")
+    assert aembedding.await_count == 1
+
+    metrics = provider.get_cache_metrics()
+    assert metrics["misses"] == 1
+    assert metrics["hits"] == 3
+    assert metrics["hit_rate"] == 0.75
+
+
+@pytest.mark.asyncio
+async def test_document_embedder_only_embeds_new_documents(mocker):
+    aembedding = _aembedding(mocker)
+    provider = LitellmEmbedderProvider(model="text-embedding-3-large")
+    embedder = provider.get_document_embedder()
+
+    await embedder.run([Document(content="a"), Document(content="bb")])
+    result = await embedder.run(
+        [Document(content="a"), Document(content="bb"), Document(content="ccc")]
+    )
+
+    assert [document.embedding for document in result["documents"]] == [
+        [1.0],
+        [2.0],
+        [3.0],
+    ]
+    assert aembedding.await_args_list[-1].kwargs["input"] == ["ccc"]
+    assert aembedding.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_disk_tier(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embed = AsyncMock(side_effect=lambda texts: [[float(len(text))] for text in texts])
+
+    cache = EmbeddingCache(path=path)
+    assert await cache.embed("model", ["a", "bb", "a"], embed) == [[1.0], [2.0], [1.0]]
+    assert embed.await_args.args[0] == ["a", "bb"]
+    cache.close()
+
+    # a new process reads the embeddings back from disk
+    cache = EmbeddingCache(path=path)
+    assert await cache.embed("model", ["bb"], embed) == [[2.0]]
+    assert await cache.embed("other-model", ["bb"], embed) == [[2.0]]
+    assert embed.await_count == 2
+    assert cache.get_metrics()["disk_hits"] == 1
+    cache.close()
+
+
+def test_embedding_scheduler_batches_by_tokens():
+    scheduler = EmbeddingScheduler(max_batch_tokens=10)
+
+    # each 16 character text is estimated as 5 tokens
+    batches = scheduler.batches(["a" * 16] * 5 + ["b" * 100], max_batch_size=32)
+
+    assert [len(batch) for batch, _ in batches] == [2, 2, 1, 1]
+    assert [tokens for _, tokens in batches] == [10, 10, 5, 26]
+    assert [len(batch) for batch, _ in scheduler.batches(["a"] * 5, 2)] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_embedding_scheduler_bounds_in_flight_and_retries_per_batch():
+    scheduler = EmbeddingScheduler(
+        max_in_flight=2, max_batch_tokens=1, retry_base_delay=0.0
+    )
+    in_flight = 0
+    max_in_flight = 0
+    calls = []
+
+    async def _embed(batch):
+        nonlocal in_flight, max_in_flight
+        calls.append(batch[0])
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if batch[0] == "c" and calls.count("c") == 1:
+            raise RuntimeError("rate limited")
+        return batch[0]
+
+    results = await scheduler.run(["a", "b", "c", "d", "e"], _embed)
+
+    assert results == ["a", "b", "c", "d", "e"]
+    assert max_in_flight == 2
+    # only the failed batch is retried
+    assert sorted(calls) == ["a", "b", "c", "c", "d", "e"]
+
+    metrics = scheduler.get_metrics()
+    assert metrics["batches"] == 5
+    assert metrics["retries"] == 1
+    assert metrics["texts_per_second"] > 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_cancellation():
+    started = asyncio.Event()
+
+    async def _embed(texts):
+        started.set()
+        await asyncio.sleep(0.05)
+        return [[float(len(text))] for text in texts]
+
+    embed = AsyncMock(side_effect=_embed)
+    cache = EmbeddingCache()
+
+    # a cancelled waiter leaves the embedding of the caller it waits for alone
+    owner = asyncio.create_task(cache.embed("model", ["a"], embed))
+    await started.wait()
+    waiter = asyncio.create_task(cache.embed("model", ["a"], embed))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    assert await owner == [[1.0]]
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    # the waiters of a cancelled caller embed the text themselves
+    started.clear()
+    owner = asyncio.create_task(cache.embed("model", ["bb"], embed))
+    await started.wait()
+    waiter = asyncio.create_task(cache.embed("model", ["bb"], embed))
+    await asyncio.sleep(0)
+    owner.cancel()
+    assert await waiter == [[2.0]]
+    assert embed.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_is_bounded_by_bytes():
+    embed = AsyncMock(side_effect=lambda texts: [[0.5] * 4 for _ in texts])
+    # room for two embeddings of 4 float32
+    cache = EmbeddingCache(max_bytes=32)
+
+    assert await cache.embed("model", ["a", "b", "c"], embed) == [[0.5] * 4] * 3
+    assert len(cache._memory) == 2
+    assert cache._memory.currsize == 32
+
+    await cache.embed("model", ["a"], embed)
+    assert embed.await_count == 2
@@ -0,0 +1,54 @@
+import pytest
+
+from src.core.engine import EngineSessionMetrics
+from src.providers.engine.wren import WrenIbis, WrenUI
+
+
+@pytest.mark.asyncio
+async def test_engine_session_is_shared():
+    engine = WrenUI(endpoint="http://localhost:3000")
+
+    session = engine.get_session()
+    assert engine.get_session() is session
+    assert not session.closed
+
+    await engine.close()
+    assert session.closed
+
+    # a new session is lazily created after closing
+    new_session = engine.get_session()
+    assert new_session is not session
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_engine_session_pool_config():
+    engine = WrenIbis(
+        endpoint="http://localhost:8000",
+        session_pool={
+            "connection_limit": 10,
+            "connection_limit_per_host": 5,
+            "keepalive_timeout": 30.0,
+            "dns_cache_ttl": 0,
+        },
+    )
+
+    connector = engine.get_session().connector
+    assert connector.limit == 10
+    assert connector.limit_per_host == 5
+    assert connector.use_dns_cache is False
+
+    await engine.close()
+
+
+def test_engine_session_metrics():
+    metrics = EngineSessionMetrics(
+        connections_created=1,
+        connections_reused=3,
+        queued_requests=2,
+        total_wait_time=1.0,
+    ).to_dict()
+
+    assert metrics["reuse_ratio"] == 0.75
+    assert metrics["avg_wait_time"] == 0.5
+    assert EngineSessionMetrics().to_dict()["reuse_ratio"] == 0.0
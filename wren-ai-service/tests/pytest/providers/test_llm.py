@@ -0,0 +1,143 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.core.metrics import current_pipeline
+from src.core.provider import PROMPT_CACHE_BREAKPOINT, CompletionCache
+from src.providers.llm import get_prompt_cache_usage
+from src.providers.llm.litellm import LitellmLLMProvider
+
+
+def _acompletion(mocker):
+    async def _response(model, messages, **kwargs):
+        return SimpleNamespace(
+            model=model,
+            usage={"prompt_tokens": 100, "completion_tokens": 10, "total_tokens": 110},
+            choices=[
+                SimpleNamespace(
+                    index=0,
+                    finish_reason="stop",
+                    message=SimpleNamespace(content=f'{{"reply": "{len(messages)}"}}'),
+                )
+            ],
+        )
+
+    return mocker.patch(
+        "src.providers.llm.litellm.acompletion",
+        new_callable=AsyncMock,
+        side_effect=_response,
+    )
+
+
+def _provider(**completion_cache) -> LitellmLLMProvider:
+    return LitellmLLMProvider(
+        model="gpt-4.1-mini",
+        kwargs={"temperature": 0},
+        completion_cache=completion_cache,
+    )
+
+
+@pytest.mark.asyncio
+async def test_deterministic_completions_are_cached(mocker):
+    acompletion = _acompletion(mocker)
+    provider = _provider()
+    generator = provider.get_generator(system_prompt="You are a helpful assistant.")
+
+    first = await generator(prompt="which tables?")
+    second = await generator(prompt="which tables?")
+    assert first == second
+    assert first is not second
+    assert acompletion.await_count == 1
+
+    await generator(prompt="which columns?")
+    # sampled completions aren't deterministic
+    await generator(prompt="which tables?", generation_kwargs={"temperature": 0.7})
+    assert acompletion.await_count == 3
+
+    metrics = provider.get_cache_metrics()
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 2
+    assert metrics["prompt_tokens_saved"] == 100
+    assert metrics["completion_tokens_saved"] == 10
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_is_scoped_by_pipeline(mocker):
+    acompletion = _acompletion(mocker)
+    generator = _provider(pipelines=["intent_classification"]).get_generator()
+
+    for pipeline in ["IntentClassification", "SQLGeneration"]:
+        token = current_pipeline.set(pipeline)
+        try:
+            for _ in range(2):
+                await generator(prompt="what is the intent?")
+        finally:
+            current_pipeline.reset(token)
+
+    assert acompletion.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_disk_tier(tmp_path, mocker):
+    path = str(tmp_path / "completions.sqlite3")
+    key = CompletionCache.key("model", [{"role": "user", "content": "hi"}], {})
+    result = {"replies": ["hello"], "meta": [{"usage": {}}]}
+
+    cache = CompletionCache(path=path)
+    await cache.put(key, result)
+    cache.close()
+
+    # a new process reads the completion back from disk
+    cache = CompletionCache(path=path)
+    assert await cache.get(key) == result
+    assert cache.get_metrics()["disk_hits"] == 1
+    cache.close()
+
+    # expired completions aren't read back
+    mocker.patch("src.core.provider.time.time", return_value=time.time() + 3600)
+    cache = CompletionCache(path=path, ttl=60)
+    assert await cache.get(key) is None
+    cache.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model,cache_control",
+    [("gpt-4.1-mini", False), ("anthropic/claude-sonnet-4", True)],
+)
+async def test_prompt_cache_breakpoints(mocker, model, cache_control):
+    acompletion = _acompletion(mocker)
+    provider = LitellmLLMProvider(model=model, kwargs={"temperature": 0})
+    generator = provider.get_generator(system_prompt="You write SQL.")
+
+    await generator(prompt=f"CREATE TABLE t (a int)\n{PROMPT_CACHE_BREAKPOINT}\nq?")
+
+    system, user = acompletion.await_args.kwargs["messages"]
+    if cache_control:
+        assert system["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert user["content"] == [
+            {
+                "type": "text",
+                "text": "CREATE TABLE t (a int)\n",
+                "cache_control": {"type": "ephemeral"},
+            },
+            {"type": "text", "text": "\nq?"},
+        ]
+    else:
+        assert system["content"] == "You write SQL."
+        assert user["content"] == "CREATE TABLE t (a int)\n\nq?"
+
+
+def test_prompt_cache_usage():
+    assert get_prompt_cache_usage(
+        {"prompt_tokens": 100, "prompt_tokens_details": {"cached_tokens": 80}}
+    ) == {"cached_prompt": 80, "cache_write": 0}
+    assert get_prompt_cache_usage(
+        {
+            "prompt_tokens": 100,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 90,
+        }
+    ) == {"cached_prompt": 0, "cache_write": 90}
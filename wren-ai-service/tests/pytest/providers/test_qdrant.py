@@ -0,0 +1,151 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from haystack import Document
+from qdrant_client.http import models as rest
+
+from src.providers.document_store.qdrant import (
+    AsyncQdrantDocumentStore,
+    QdrantProvider,
+    SearchBatcher,
+)
+
+
+def _request(limit: int) -> rest.SearchRequest:
+    return rest.SearchRequest(vector=[0.1, 0.2], limit=limit)
+
+
+@pytest.mark.asyncio
+async def test_search_batcher_coalesces_concurrent_searches():
+    async_client = MagicMock()
+    async_client.search_batch = AsyncMock(
+        side_effect=lambda collection_name, requests: [
+            [request.limit] for request in requests
+        ]
+    )
+    batcher = SearchBatcher(async_client, "table_descriptions", window=0.01)
+
+    results = await asyncio.gather(*[batcher.search(_request(i)) for i in range(3)])
+
+    assert results == [[0], [1], [2]]
+    async_client.search_batch.assert_awaited_once()
+    assert async_client.search_batch.await_args.kwargs["collection_name"] == (
+        "table_descriptions"
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_batcher_propagates_errors():
+    async_client = MagicMock()
+    async_client.search_batch = AsyncMock(side_effect=RuntimeError("unavailable"))
+    batcher = SearchBatcher(async_client, "Document", window=0.0, max_batch_size=2)
+
+    results = await asyncio.gather(
+        *[batcher.search(_request(i)) for i in range(2)], return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # the batch and then each of its searches
+    assert async_client.search_batch.await_count == 3
+    assert not batcher._tasks
+
+
+@pytest.mark.asyncio
+async def test_search_batcher_retries_a_failed_batch_one_by_one():
+    async def _search_batch(collection_name, requests):
+        if any(request.limit == 0 for request in requests):
+            raise RuntimeError("bad request")
+        return [[request.limit] for request in requests]
+
+    async_client = MagicMock()
+    async_client.search_batch = AsyncMock(side_effect=_search_batch)
+    batcher = SearchBatcher(async_client, "Document", window=0.01)
+
+    results = await asyncio.gather(
+        *[batcher.search(_request(i)) for i in range(3)], return_exceptions=True
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert results[1:] == [[1], [2]]
+
+
+def _store(**kwargs) -> AsyncQdrantDocumentStore:
+    store = AsyncQdrantDocumentStore(
+        location=":memory:",
+        embedding_dim=2,
+        write_batch_size=2,
+        progress_bar=False,
+        **kwargs,
+    )
+    store._set_up_collection = MagicMock()
+    store.async_client = MagicMock()
+    return store
+
+
+def _documents(count: int) -> list[Document]:
+    return [
+        Document(id=f"doc-{i}", content=str(i), embedding=[0.1, 0.2])
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_write_documents_bounds_in_flight_upserts():
+    store = _store(write_concurrency=2)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _upsert(**kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    store.async_client.upsert = AsyncMock(side_effect=_upsert)
+
+    assert await store.write_documents(_documents(5)) == 5
+    assert await store.write_documents(_documents(5)) == 5
+
+    assert store.async_client.upsert.await_count == 6
+    assert max_in_flight == 2
+    # the collection is only set up by the first write
+    store._set_up_collection.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_write_documents_without_wait_ends_with_a_barrier():
+    store = _store(wait_result_from_api=False)
+    store.async_client.upsert = AsyncMock()
+
+    await store.write_documents(_documents(5))
+
+    waits = [call.kwargs["wait"] for call in store.async_client.upsert.await_args_list]
+    assert waits == [False, False, True]
+
+
+def test_to_dict_with_runtime_parameters():
+    # the cleaners read the index of a store from its serialized init parameters
+    store = _store(search_batcher=MagicMock(), write_concurrency=2, index="sql_pairs")
+
+    assert store.to_dict()["init_parameters"]["index"] == "sql_pairs"
+
+
+@pytest.mark.asyncio
+async def test_stores_share_the_clients_of_the_provider():
+    provider = QdrantProvider(location=":memory:", embedding_model_dim=2)
+    store = provider.get_store("sql_pairs")
+
+    assert provider.get_store("sql_pairs") is store
+    assert provider.get_store().client is store.client is provider._client
+    assert provider.get_store().async_client is store.async_client
+    assert store._search_batcher is provider._search_batchers["sql_pairs"]
+
+    # recreating the collection builds a new store on the same clients
+    recreated = provider.get_store("sql_pairs", recreate_index=True)
+    assert recreated is not store
+    assert recreated.client is provider._client
+    assert provider.get_store("sql_pairs") is recreated
+
+    await provider.close()
@@ -1,13 +1,18 @@
+import asyncio
 import json
+import time
 import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import orjson
 import pytest
 
 from src.config import settings
 from src.pipelines import generation, indexing, retrieval
+from src.pipelines.common import AnswerCache
 from src.providers import generate_components
 from src.utils import fetch_wren_ai_docs
+from src.web.v1.services import Configuration
 from src.web.v1.services.ask import (
     AskRequest,
     AskResultRequest,
@@ -43,6 +48,9 @@ def ask_service():
             "retrieval": retrieval.DbSchemaRetrieval(
                 **pipe_components["db_schema_retrieval"],
             ),
+            "query_embedding": retrieval.QueryEmbedding(
+                **pipe_components["db_schema_retrieval"],
+            ),
             "historical_question": retrieval.HistoricalQuestionRetrieval(
                 **pipe_components["historical_question_retrieval"],
             ),
@@ -128,7 +136,7 @@ async def test_ask_with_successful_query(
     await ask_service.ask(ask_request, service_metadata=service_metadata)
 
     # getting ask result
-    ask_result_response = ask_service.get_ask_result(
+    ask_result_response = await ask_service.get_ask_result(
         AskResultRequest(
             query_id=query_id,
         )
@@ -141,7 +149,7 @@ async def test_ask_with_successful_query(
         ask_result_response.status != "finished"
         and ask_result_response.status != "failed"
     ):
-        ask_result_response = ask_service.get_ask_result(
+        ask_result_response = await ask_service.get_ask_result(
             AskResultRequest(
                 query_id=query_id,
             )
@@ -153,3 +161,196 @@ async def test_ask_with_successful_query(
     # assert ask_result_response.response[0].sql != ""
     # assert ask_result_response.response[0].summary != ""
     # assert ask_result_response.response[0].type == "llm" or "view"
+
+
+def _mock_pipelines(intent: str, db_schema_retrieval_delay: float = 0.0) -> dict:
+    def _pipeline(result: dict, delay: float = 0.0):
+        async def _run(**kwargs):
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                pipeline.cancelled = True
+                raise
+            return result
+
+        pipeline = MagicMock()
+        pipeline.run = AsyncMock(side_effect=_run)
+        pipeline.cancelled = False
+        return pipeline
+
+    return {
+        "query_embedding": _pipeline(
+            {
+                "embedding": {"embedding": [0.1]},
+                "histories_embedding": {"embedding": [0.1]},
+            }
+        ),
+        "historical_question": _pipeline({"formatted_output": {"documents": []}}),
+        "sql_pairs_retrieval": _pipeline({"formatted_output": {"documents": []}}),
+        "instructions_retrieval": _pipeline({"formatted_output": {"documents": []}}),
+        "intent_classification": _pipeline(
+            {"post_process": {"intent": intent, "rephrased_question": ""}},
+            delay=0.05,
+        ),
+        "db_schema_retrieval": _pipeline(
+            {"construct_retrieval_results": {"retrieval_results": []}},
+            delay=db_schema_retrieval_delay,
+        ),
+        "data_assistance": _pipeline({}),
+    }
+
+
+@pytest.mark.asyncio
+async def test_ask_speculative_db_schema_retrieval():
+    pipelines = _mock_pipelines("TEXT_TO_SQL", db_schema_retrieval_delay=0.05)
+    ask_service = AskService(pipelines)
+
+    results = await ask_service.ask(
+        AskRequest(query="How many books are there?", mdl_hash="hash")
+    )
+
+    assert results["metadata"]["error_type"] == "NO_RELEVANT_DATA"
+    pipelines["db_schema_retrieval"].run.assert_awaited_once()
+    assert pipelines["db_schema_retrieval"].run.await_args.kwargs[
+        "query_embedding"
+    ] == [0.1]
+
+    stage_timings = results["metadata"]["stage_timings"]
+    assert "speculative_db_schema_retrieval" in stage_timings
+    assert "intent_classification" in stage_timings
+    # the schema retrieval overlaps with the intent classification
+    assert stage_timings["speculative_db_schema_retrieval"] < 0.1
+
+
+@pytest.mark.asyncio
+async def test_ask_shares_the_query_embedding_with_pipelines_of_the_same_model():
+    pipelines = _mock_pipelines("TEXT_TO_SQL")
+    ask_service = AskService(
+        pipelines, query_embedding_pipelines={"sql_pairs_retrieval"}
+    )
+
+    await ask_service.ask(
+        AskRequest(query="How many books are there?", mdl_hash="hash")
+    )
+
+    def _query_embedding(pipeline: str):
+        return pipelines[pipeline].run.await_args.kwargs["query_embedding"]
+
+    assert _query_embedding("sql_pairs_retrieval") == [0.1]
+    # the pipelines embedding the question with another model embed it themselves
+    assert _query_embedding("historical_question") is None
+    assert _query_embedding("instructions_retrieval") is None
+    assert _query_embedding("intent_classification") is None
+
+
+@pytest.mark.asyncio
+async def test_ask_cancels_speculative_retrieval_for_general_intent():
+    pipelines = _mock_pipelines("GENERAL", db_schema_retrieval_delay=10)
+    ask_service = AskService(pipelines)
+
+    results = await asyncio.wait_for(
+        ask_service.ask(AskRequest(query="What can you do?", mdl_hash="hash")),
+        timeout=1,
+    )
+    await asyncio.sleep(0)
+
+    assert results["metadata"]["type"] == "GENERAL"
+    assert "db_schema_retrieval" not in results["metadata"]["stage_timings"]
+    assert pipelines["db_schema_retrieval"].cancelled
+
+
+def test_answer_cache_matches_similar_questions_of_the_same_mdl():
+    cache = AnswerCache(maxsize=2, similarity_threshold=0.95)
+    cache.put(
+        "Total revenue last month?",
+        [1.0, 0.0],
+        "SELECT 1",
+        project_id="project",
+        mdl_hash="hash",
+    )
+
+    assert (
+        cache.get("total  revenue last month?", None, "project", "hash") == "SELECT 1"
+    )
+    assert cache.get("Revenue of last month", [0.99, 0.05], "project", "hash") == (
+        "SELECT 1"
+    )
+    assert cache.get("Number of orders", [0.0, 1.0], "project", "hash") is None
+    assert cache.get("Total revenue last month?", [1.0, 0.0], "project", "new") is None
+
+    # the least recently used question is evicted
+    cache.put("Q2", [0.0, 1.0], "SELECT 2", project_id="project", mdl_hash="hash")
+    cache.get("Total revenue last month?", None, "project", "hash")
+    cache.put("Q3", [0.6, 0.8], "SELECT 3", project_id="project", mdl_hash="hash")
+    assert cache.get("Q2", None, "project", "hash") is None
+    assert cache.get("Total revenue last month?", None, "project", "hash")
+
+    cache.invalidate("project")
+    assert cache.get("Total revenue last month?", None, "project", "hash") is None
+
+
+def test_answer_cache_expiry_and_asks_without_mdl_hash():
+    cache = AnswerCache(ttl=60)
+    cache.put("Q1", [1.0, 0.0], "SELECT 1", project_id="project", mdl_hash="hash")
+    cache.put("Q2", [0.0, 1.0], "SELECT 2", project_id="project")
+
+    # the sql of an ask without an mdl hash may be for another deployment
+    assert cache.get("Q2", [0.0, 1.0], "project") is None
+    assert cache.get("Q1", [1.0, 0.0], "project") is None
+
+    with patch("time.monotonic", return_value=time.monotonic() + 61):
+        assert cache.get("Q1", None, "project", "hash") is None
+        assert cache.get("Q", [1.0, 0.0], "project", "hash") is None
+    assert not cache._cache and not cache._scopes
+
+
+@pytest.mark.asyncio
+async def test_ask_answered_from_answer_cache():
+    pipelines = _mock_pipelines("TEXT_TO_SQL")
+    answer_cache = AnswerCache()
+    answer_cache.put(
+        "How many books are there?",
+        [0.1],
+        "SELECT COUNT(*) FROM book",
+        mdl_hash="hash",
+        configurations=Configuration().model_dump_json(),
+    )
+    ask_service = AskService(pipelines, answer_cache=answer_cache)
+
+    ask_request = AskRequest(query="How many books are there?", mdl_hash="hash")
+    ask_request.query_id = "query-id"
+    results = await ask_service.ask(ask_request)
+
+    assert results["metadata"]["answer_cache_hit"]
+    assert results["ask_result"][0].sql == "SELECT COUNT(*) FROM book"
+    ask_result_response = await ask_service.get_ask_result(
+        AskResultRequest(query_id="query-id")
+    )
+    assert ask_result_response.status == "finished"
+    pipelines["historical_question"].run.assert_not_awaited()
+    pipelines["intent_classification"].run.assert_not_awaited()
+
+    # another mdl of the project goes through the pipelines
+    results = await ask_service.ask(
+        AskRequest(query="How many books are there?", mdl_hash="new-hash")
+    )
+    assert "answer_cache_hit" not in results["metadata"]
+    pipelines["historical_question"].run.assert_awaited_once()
+
+    # so does an ask in another language
+    results = await ask_service.ask(
+        AskRequest(
+            query="How many books are there?",
+            mdl_hash="hash",
+            configurations=Configuration(language="German"),
+        )
+    )
+    assert "answer_cache_hit" not in results["metadata"]
+
+    # and an ask without an mdl hash, which may be for any deployment of the project
+    answer_cache.get = MagicMock(return_value="SELECT COUNT(*) FROM book")
+    results = await ask_service.ask(
+        AskRequest(query="How many books are there?", mdl_hash=None)
+    )
+    assert "answer_cache_hit" not in results["metadata"]
+    answer_cache.get.assert_not_called()
@@ -1,10 +1,12 @@
 import uuid
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from src.config import settings
 from src.core.provider import DocumentStoreProvider
 from src.globals import create_service_container
+from src.pipelines.common import AnswerCache
 from src.providers import generate_components
 from src.web.v1.services.instructions import InstructionsService
 
@@ -52,7 +54,7 @@ async def test_preparation(
     )
     await instructions_service.index(request)
 
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
 
     assert response.status == "finished"
 
@@ -86,7 +88,7 @@ async def test_with_empty_questions(
     )
 
     await instructions_service.index(request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
 
     assert response.status == "finished"
     # No documents should be indexed since there were no questions
@@ -113,7 +115,7 @@ async def test_with_empty_instructions(
     )
 
     await instructions_service.index(request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
 
     assert response.status == "finished"
 
@@ -145,7 +147,7 @@ async def test_deletion(
     )
 
     await instructions_service.index(index_request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
 
     assert response.status == "finished"
 
@@ -157,7 +159,7 @@ async def test_deletion(
     )
 
     await instructions_service.delete(delete_request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
 
     assert response.status == "finished"
 
@@ -198,7 +200,7 @@ async def test_delete_single_instruction(
     )
 
     await instructions_service.index(index_request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
     assert response.status == "finished"
 
     id = str(uuid.uuid4())
@@ -209,7 +211,7 @@ async def test_delete_single_instruction(
     )
 
     await instructions_service.delete(delete_request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
     assert response.status == "finished"
 
     pipe_components = generate_components(settings.components)
@@ -242,7 +244,7 @@ async def test_delete_cross_project_instruction(
             project_id=project_id,
         )
         await instructions_service.index(index_request)
-        response = instructions_service[id]
+        response = await instructions_service.get(id)
         assert response.status == "finished"
 
     await index_instructions("project-a")
@@ -255,7 +257,7 @@ async def test_delete_cross_project_instruction(
         project_id="project-a",
     )
     await instructions_service.delete(delete_request)
-    response = instructions_service[id]
+    response = await instructions_service.get(id)
     assert response.status == "finished"
 
     pipe_components = generate_components(settings.components)
@@ -265,3 +267,30 @@ async def test_delete_cross_project_instruction(
 
     store = document_store_provider.get_store(dataset_name="instructions")
     assert await store.count_documents() == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_invalidated_on_index_and_delete():
+    answer_cache = AnswerCache()
+    pipeline = MagicMock(run=AsyncMock(), clean=AsyncMock())
+    service = InstructionsService(
+        {"instructions_indexing": pipeline}, answer_cache=answer_cache
+    )
+
+    for run, request in [
+        (
+            service.index,
+            InstructionsService.IndexRequest(
+                event_id="1", instructions=[], project_id="project"
+            ),
+        ),
+        (
+            service.delete,
+            InstructionsService.DeleteRequest(
+                event_id="2", instruction_ids=["1"], project_id="project"
+            ),
+        ),
+    ]:
+        answer_cache.put("Q", [1.0], "SELECT 1", project_id="project", mdl_hash="hash")
+        await run(request)
+        assert answer_cache.get("Q", None, "project", "hash") is None
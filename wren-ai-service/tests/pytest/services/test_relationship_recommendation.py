@@ -22,7 +22,7 @@ async def test_recommend_success(relationship_recommendation_service, mock_pipel
     mock_pipeline.run.return_value = {"validated": {"test": "data"}}
 
     await relationship_recommendation_service.recommend(request)
-    response = relationship_recommendation_service[request.id]
+    response = await relationship_recommendation_service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "finished"
@@ -35,7 +35,7 @@ async def test_recommend_invalid_mdl(relationship_recommendation_service):
     request = RelationshipRecommendation.Input(id="test_id", mdl="invalid_json")
 
     await relationship_recommendation_service.recommend(request)
-    response = relationship_recommendation_service[request.id]
+    response = await relationship_recommendation_service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "failed"
@@ -51,7 +51,7 @@ async def test_recommend_pipeline_error(
     mock_pipeline.run.side_effect = Exception("Pipeline error")
 
     await relationship_recommendation_service.recommend(request)
-    response = relationship_recommendation_service[request.id]
+    response = await relationship_recommendation_service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "failed"
@@ -62,24 +62,26 @@ async def test_recommend_pipeline_error(
     )
 
 
-def test_getitem_existing(relationship_recommendation_service):
+@pytest.mark.asyncio
+async def test_get_existing(relationship_recommendation_service):
     test_id = "test_id"
     expected_response = RelationshipRecommendation.Resource(
         id=test_id, status="finished"
     )
-    relationship_recommendation_service._cache[test_id] = expected_response
+    await relationship_recommendation_service._cache.set(test_id, expected_response)
 
-    response = relationship_recommendation_service[test_id]
+    response = await relationship_recommendation_service.get(test_id)
 
     assert response == expected_response
     assert response.id == test_id
     assert response.status == "finished"
 
 
-def test_getitem_not_found(relationship_recommendation_service):
+@pytest.mark.asyncio
+async def test_get_not_found(relationship_recommendation_service):
     id = "non_existent_id"
 
-    response = relationship_recommendation_service[id]
+    response = await relationship_recommendation_service.get(id)
 
     assert response.id == "non_existent_id"
     assert response.status == "failed"
@@ -87,10 +89,11 @@ def test_getitem_not_found(relationship_recommendation_service):
     assert "not found" in response.error.message
 
 
-def test_setitem(relationship_recommendation_service):
+@pytest.mark.asyncio
+async def test_set(relationship_recommendation_service):
     id = "test_id"
     value = RelationshipRecommendation.Resource(id="test_id", status="finished")
 
-    relationship_recommendation_service[id] = value
+    await relationship_recommendation_service.set(id, value)
 
-    assert relationship_recommendation_service._cache["test_id"] == value
+    assert await relationship_recommendation_service._cache.get("test_id") == value
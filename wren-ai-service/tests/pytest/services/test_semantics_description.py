@@ -27,7 +27,7 @@ def service():
 async def test_generate_semantics_description(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
+    await service.set("test_id", SemanticsDescription.Resource(id="test_id"))
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the model",
@@ -36,7 +36,7 @@ async def test_generate_semantics_description(
     )
 
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "finished"
@@ -53,7 +53,7 @@ async def test_generate_semantics_description(
 async def test_generate_semantics_description_with_invalid_mdl(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
+    await service.set("test_id", SemanticsDescription.Resource(id="test_id"))
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the model",
@@ -62,7 +62,7 @@ async def test_generate_semantics_description_with_invalid_mdl(
     )
 
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "failed"
@@ -75,7 +75,7 @@ async def test_generate_semantics_description_with_invalid_mdl(
 async def test_generate_semantics_description_with_exception(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
+    await service.set("test_id", SemanticsDescription.Resource(id="test_id"))
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the model",
@@ -88,7 +88,7 @@ async def test_generate_semantics_description_with_exception(
     )
 
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "failed"
@@ -100,7 +100,8 @@ async def test_generate_semantics_description_with_exception(
     )
 
 
-def test_get_semantics_description_result(
+@pytest.mark.asyncio
+async def test_get_semantics_description_result(
     service: SemanticsDescription,
 ):
     expected_response = SemanticsDescription.Resource(
@@ -108,17 +109,18 @@ def test_get_semantics_description_result(
         status="finished",
         response={"model1": {"description": "Test description"}},
     )
-    service["test_id"] = expected_response
+    await service.set("test_id", expected_response)
 
-    result = service["test_id"]
+    result = await service.get("test_id")
 
     assert result == expected_response
 
 
-def test_get_non_existent_semantics_description_result(
+@pytest.mark.asyncio
+async def test_get_non_existent_semantics_description_result(
     service: SemanticsDescription,
 ):
-    result = service["non_existent_id"]
+    result = await service.get("non_existent_id")
 
     assert result.id == "non_existent_id"
     assert result.status == "failed"
@@ -131,7 +133,7 @@ def test_get_non_existent_semantics_description_result(
 async def test_batch_processing_with_multiple_models(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
+    await service.set("test_id", SemanticsDescription.Resource(id="test_id"))
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the models",
@@ -147,7 +149,7 @@ async def test_batch_processing_with_multiple_models(
     ]
 
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "finished"
@@ -167,7 +169,6 @@ async def test_batch_processing_with_multiple_models(
 def test_batch_processing_with_custom_chunk_size(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the models",
@@ -190,7 +191,7 @@ def test_batch_processing_with_custom_chunk_size(
 async def test_batch_processing_partial_failure(
     service: SemanticsDescription,
 ):
-    service["test_id"] = SemanticsDescription.Resource(id="test_id")
+    await service.set("test_id", SemanticsDescription.Resource(id="test_id"))
     request = SemanticsDescription.GenerateRequest(
         id="test_id",
         user_prompt="Describe the models",
@@ -205,7 +206,7 @@ async def test_batch_processing_partial_failure(
     ]
 
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.id == "test_id"
     assert response.status == "failed"
@@ -218,7 +219,7 @@ async def test_concurrent_updates_no_race_condition(
     service: SemanticsDescription,
 ):
     test_id = "concurrent_test"
-    service[test_id] = SemanticsDescription.Resource(id=test_id)
+    await service.set(test_id, SemanticsDescription.Resource(id=test_id))
 
     request = SemanticsDescription.GenerateRequest(
         id=test_id,
@@ -244,7 +245,7 @@ async def test_concurrent_updates_no_race_condition(
 
     # Generate response which will process chunks concurrently
     await service.generate(request)
-    response = service[request.id]
+    response = await service.get(request.id)
 
     assert response.status == "finished"
     assert response.response is not None
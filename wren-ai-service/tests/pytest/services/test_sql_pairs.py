@@ -1,10 +1,12 @@
 import uuid
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from src.config import settings
 from src.core.provider import DocumentStoreProvider
 from src.globals import create_service_container
+from src.pipelines.common import AnswerCache
 from src.providers import generate_components
 from src.web.v1.services.sql_pairs import SqlPair, SqlPairsService
 
@@ -42,7 +44,7 @@ async def test_preparation(
     )
     await sql_pairs_service.index(request)
 
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
 
     assert response.status == "finished"
 
@@ -69,7 +71,7 @@ async def test_with_empty_question(
     )
 
     await sql_pairs_service.index(request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
 
     assert response.status == "failed"
     assert response.error is not None
@@ -99,7 +101,7 @@ async def test_with_empty_sql_pairs(
     )
 
     await sql_pairs_service.index(request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
 
     assert response.status == "finished"
 
@@ -121,7 +123,7 @@ async def test_deletion(
     )
 
     await sql_pairs_service.index(index_request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
 
     assert response.status == "finished"
 
@@ -133,7 +135,7 @@ async def test_deletion(
     )
 
     await sql_pairs_service.delete(delete_request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
 
     assert response.status == "finished"
 
@@ -164,7 +166,7 @@ async def test_delete_single_sql_pair(
     )
 
     await sql_pairs_service.index(index_request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
     assert response.status == "finished"
 
     id = str(uuid.uuid4())
@@ -175,7 +177,7 @@ async def test_delete_single_sql_pair(
     )
 
     await sql_pairs_service.delete(delete_request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
     assert response.status == "finished"
 
     pipe_components = generate_components(settings.components)
@@ -203,7 +205,7 @@ async def test_delete_cross_project_sql_pair(
             project_id=project_id,
         )
         await sql_pairs_service.index(index_request)
-        response = sql_pairs_service[id]
+        response = await sql_pairs_service.get(id)
         assert response.status == "finished"
 
     await index_sql_pairs("project-a")
@@ -216,7 +218,7 @@ async def test_delete_cross_project_sql_pair(
         project_id="project-a",
     )
     await sql_pairs_service.delete(delete_request)
-    response = sql_pairs_service[id]
+    response = await sql_pairs_service.get(id)
     assert response.status == "finished"
 
     pipe_components = generate_components(settings.components)
@@ -226,3 +228,26 @@ async def test_delete_cross_project_sql_pair(
 
     store = document_store_provider.get_store(dataset_name="sql_pairs")
     assert await store.count_documents() == 1
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_invalidated_on_index_and_delete():
+    answer_cache = AnswerCache()
+    pipeline = MagicMock(run=AsyncMock(), clean=AsyncMock())
+    service = SqlPairsService({"sql_pairs": pipeline}, answer_cache=answer_cache)
+
+    for run, request in [
+        (
+            service.index,
+            SqlPairsService.IndexRequest(id="1", sql_pairs=[], project_id="project"),
+        ),
+        (
+            service.delete,
+            SqlPairsService.DeleteRequest(
+                id="2", sql_pair_ids=["1"], project_id="project"
+            ),
+        ),
+    ]:
+        answer_cache.put("Q", [1.0], "SELECT 1", project_id="project", mdl_hash="hash")
+        await run(request)
+        assert answer_cache.get("Q", None, "project", "hash") is None
@@ -1,5 +1,6 @@
 from unittest.mock import mock_open, patch
 
+import pytest
 import yaml
 
 from src.config import Settings
@@ -128,3 +129,20 @@ def test_settings_components():
         assert len(settings._components) == 1
         assert settings._components[0]["type"] == "llm"
         assert settings._components[0]["provider"] == "openai_llm"
+
+
+def test_settings_check_workers():
+    with patch("src.config.Settings.config_loader", return_value=[]):
+        settings = Settings()
+        settings.check_workers()
+
+        settings.workers = 4
+        with pytest.raises(ValueError):
+            settings.check_workers()
+
+        settings.result_store_backend = "redis"
+        settings.check_workers()
+
+        settings.enable_answer_cache = True
+        with pytest.raises(ValueError):
+            settings.check_workers()
@@ -0,0 +1,47 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from src.core.executor import CPUExecutor, LoopLagMonitor
+
+
+async def _max_lag(blocking_step) -> float:
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await blocking_step()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return monitor.get_metrics()["max_lag"]
+
+
+@pytest.mark.asyncio
+async def test_executor_keeps_the_event_loop_responsive():
+    executor = CPUExecutor(thread_workers=1)
+
+    async def _inline():
+        time.sleep(0.3)
+
+    async def _offloaded():
+        await executor.run_in_thread(time.sleep, 0.3)
+
+    inline_lag = await _max_lag(_inline)
+    offloaded_lag = await _max_lag(_offloaded)
+    executor.close()
+
+    assert inline_lag >= 0.25
+    assert offloaded_lag < 0.1
+
+
+@pytest.mark.asyncio
+async def test_run_in_process():
+    executor = CPUExecutor(process_workers=1)
+    assert await executor.run_in_process(math.factorial, 10) == 3628800
+    executor.close()
+
+    # without process workers the step runs in the thread pool
+    executor = CPUExecutor(process_workers=0)
+    assert await executor.run_in_process(math.factorial, 5) == 120
+    executor.close()
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from src.core.job_scheduler import (
+    JobPriority,
+    JobScheduler,
+    JobType,
+    QueueFullError,
+)
+from src.globals import ServiceMetadata
+from src.web.v1.routers.ask import ask
+from src.web.v1.services.ask import AskRequest, AskService
+
+JOB_TYPES = {
+    "ask": JobType(JobPriority.INTERACTIVE, 2),
+    "chart": JobType(JobPriority.CHART, 2),
+    "semantics_preparation": JobType(JobPriority.BACKGROUND, 1),
+}
+
+
+@pytest.mark.asyncio
+async def test_jobs_start_by_priority():
+    scheduler = JobScheduler(max_concurrency=1, job_types=JOB_TYPES)
+    started = []
+    release = asyncio.Event()
+
+    async def _job(name: str):
+        started.append(name)
+        await release.wait()
+
+    scheduler.submit("semantics_preparation", _job, "indexing-1")
+    scheduler.submit("semantics_preparation", _job, "indexing-2")
+    scheduler.submit("chart", _job, "chart")
+    scheduler.submit("ask", _job, "ask")
+    await asyncio.sleep(0)
+    assert started == ["indexing-1"]
+
+    release.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    # the queued interactive ask overtakes the chart and the background job
+    assert started == ["indexing-1", "ask", "chart", "indexing-2"]
+
+
+@pytest.mark.asyncio
+async def test_job_type_concurrency_limit():
+    scheduler = JobScheduler(max_concurrency=10, job_types=JOB_TYPES)
+    release = asyncio.Event()
+
+    async def _job():
+        await release.wait()
+
+    for _ in range(3):
+        scheduler.submit("semantics_preparation", _job)
+    scheduler.submit("ask", _job)
+    await asyncio.sleep(0)
+
+    metrics = scheduler.get_metrics()
+    assert metrics["running"] == 2
+    assert metrics["job_types"]["semantics_preparation"]["running"] == 1
+    assert metrics["job_types"]["semantics_preparation"]["queued"] == 2
+    assert metrics["job_types"]["ask"]["running"] == 1
+
+    release.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    metrics = scheduler.get_metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["job_types"]["semantics_preparation"]["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_only_its_job_type():
+    scheduler = JobScheduler(max_concurrency=1, max_queue_depth=1, job_types=JOB_TYPES)
+    release = asyncio.Event()
+
+    async def _job():
+        await release.wait()
+
+    scheduler.submit("semantics_preparation", _job)
+    scheduler.submit("semantics_preparation", _job)
+
+    with pytest.raises(QueueFullError) as excinfo:
+        scheduler.submit("semantics_preparation", _job)
+    assert excinfo.value.retry_after >= 1
+
+    scheduler.submit("ask", _job)
+    assert (
+        scheduler.get_metrics()["job_types"]["semantics_preparation"]["rejected"] == 1
+    )
+
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_frees_its_slot():
+    scheduler = JobScheduler(max_concurrency=1, job_types=JOB_TYPES)
+    done = asyncio.Event()
+
+    async def _failing_job():
+        raise RuntimeError("llm unavailable")
+
+    async def _job():
+        done.set()
+
+    scheduler.submit("ask", _failing_job)
+    scheduler.submit("ask", _job)
+
+    await asyncio.wait_for(done.wait(), timeout=1)
+    assert scheduler.get_metrics()["job_types"]["ask"]["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_job_leaves_no_status():
+    service_container = SimpleNamespace(
+        ask_service=AskService({}),
+        job_scheduler=JobScheduler(max_queue_depth=0),
+    )
+    # the router's uuid of the ask
+    query_id = "00000000-0000-0000-0000-000000000000"
+
+    with (
+        patch("uuid.uuid4", return_value=query_id),
+        pytest.raises(QueueFullError),
+    ):
+        await ask(
+            AskRequest(query="How many books are there?", mdl_hash="hash"),
+            service_container=service_container,
+            service_metadata=ServiceMetadata(pipes_metadata={}, service_version=""),
+        )
+    assert await service_container.ask_service._ask_results.get(query_id) is None
+
+    await service_container.job_scheduler.close()
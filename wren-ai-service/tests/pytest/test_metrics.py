@@ -0,0 +1,110 @@
+import aiohttp
+import pytest
+
+from src.core.engine import Engine
+from src.core.metrics import (
+    ENGINE_DURATION,
+    PIPELINE_DURATION,
+    Histogram,
+    MetricsRegistry,
+    current_pipeline,
+)
+from src.core.pipeline import BasicPipeline
+
+
+class _MetricsEngine(Engine):
+    async def execute_sql(
+        self,
+        sql: str,
+        session: aiohttp.ClientSession,
+        dry_run: bool = True,
+        **kwargs,
+    ):
+        return sql != "invalid", {}, {"pipeline": current_pipeline.get()}
+
+    async def dry_plan(self, session: aiohttp.ClientSession, sql: str, **kwargs):
+        return True, sql
+
+    async def get_func_list(self, session: aiohttp.ClientSession, **kwargs):
+        return []
+
+
+class _EnginePipeline(BasicPipeline):
+    def __init__(self, engine: Engine):
+        self._engine = engine
+        super().__init__(None)
+
+    async def run(self, sql: str):
+        if sql == "raise":
+            raise ValueError("engine unavailable")
+        return await self._engine.execute_sql(sql, None, dry_run=False)
+
+
+def _samples(histogram: Histogram) -> dict[str, str]:
+    return dict(line.rsplit(" ", 1) for line in histogram._samples())
+
+
+def test_histogram_rendering():
+    registry = MetricsRegistry()
+    histogram = registry.histogram(
+        "test_duration_seconds", "Duration", ["stage"], buckets=[0.1, 1.0]
+    )
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_duration_seconds Duration",
+        "# TYPE test_duration_seconds histogram",
+        'test_duration_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_duration_seconds_bucket{stage="a",le="1.0"} 2',
+        'test_duration_seconds_bucket{stage="a",le="+Inf"} 3',
+        'test_duration_seconds_sum{stage="a"} 5.55',
+        'test_duration_seconds_count{stage="a"} 3',
+    ]
+
+
+def test_disabled_registry():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Total", ["stage"])
+    registry.set_enabled(False)
+    counter.inc(stage="a")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_total Total",
+        "# TYPE test_total counter",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_labels_its_provider_calls():
+    pipeline = _EnginePipeline(_MetricsEngine())
+
+    _, _, meta = await pipeline.run("SELECT 1")
+    assert meta == {"pipeline": "_EnginePipeline"}
+    assert current_pipeline.get() == ""
+
+    with pytest.raises(ValueError):
+        await pipeline.run("raise")
+
+    samples = _samples(PIPELINE_DURATION)
+    prefix = 'wren_pipeline_duration_seconds_count{pipeline="_EnginePipeline"'
+    assert samples[f'{prefix},status="ok"}}'] == "1"
+    assert samples[f'{prefix},status="error"}}'] == "1"
+
+
+@pytest.mark.asyncio
+async def test_engine_operations():
+    engine = _MetricsEngine()
+
+    await engine.execute_sql("SELECT 1", None)
+    await engine.execute_sql("invalid", None, False)
+    await engine.dry_plan(None, "SELECT 1")
+
+    samples = _samples(ENGINE_DURATION)
+    prefix = (
+        'wren_engine_request_duration_seconds_count{pipeline="",engine="_MetricsEngine"'
+    )
+    assert samples[f'{prefix},operation="dry_run",status="ok"}}'] == "1"
+    assert samples[f'{prefix},operation="execute",status="failed"}}'] == "1"
+    assert samples[f'{prefix},operation="dry_plan",status="ok"}}'] == "1"
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from src.core.result_store import RedisResultStore, create_result_store
+from src.web.v1.services.ask import (
+    AskResultRequest,
+    AskResultResponse,
+    AskService,
+    StopAskRequest,
+)
+
+
+class FakeRedis:
+    """
+    Keeps the data of the fake clients, like a Redis server shared by several workers.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+
+class FakeAsyncRedis:
+    def __init__(self, server: FakeRedis):
+        self._values = server.values
+        self._lists = server.lists
+
+    async def get(self, key):
+        return self._values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._values[key] = value
+
+    async def rpush(self, key, value):
+        self._lists.setdefault(key, []).append(value.encode())
+
+    async def expire(self, key, ttl):
+        pass
+
+    async def blpop(self, keys, timeout):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            for key in keys:
+                if self._lists.get(key):
+                    return key, self._lists[key].pop(0)
+            await asyncio.sleep(0.01)
+        return None
+
+    async def delete(self, key):
+        self._values.pop(key, None)
+        self._lists.pop(key, None)
+
+    async def aclose(self):
+        pass
+
+
+def _result_store(server: FakeRedis) -> RedisResultStore:
+    return RedisResultStore(client=FakeAsyncRedis(server))
+
+
+@pytest.mark.asyncio
+async def test_redis_results_are_shared_across_workers():
+    server = FakeRedis()
+    worker_a = _result_store(server).results(
+        "ask", maxsize=10, ttl=60, model=AskResultResponse
+    )
+    worker_b = _result_store(server).results(
+        "ask", maxsize=10, ttl=60, model=AskResultResponse
+    )
+
+    result = AskResultResponse(
+        status="finished",
+        type="GENERAL",
+        is_followup=True,
+        general_type="USER_GUIDE",
+    )
+    await worker_a.set("query-id", result)
+
+    # the values are stored as JSON, including the fields excluded from the API response
+    assert server.values["wren-ai-service:results:ask:query-id"].startswith(b"{")
+    assert await worker_b.get("query-id") == result
+    assert (await worker_b.get("query-id")).general_type == "USER_GUIDE"
+    assert await worker_b.get("unknown") is None
+
+    await worker_b.delete("query-id")
+    assert await worker_a.get("query-id") is None
+
+
+@pytest.mark.asyncio
+async def test_ask_service_result_polled_on_another_worker():
+    server = FakeRedis()
+    worker_a = AskService({}, result_store=_result_store(server))
+    worker_b = AskService({}, result_store=_result_store(server))
+
+    await worker_a._ask_results.set("query-id", AskResultResponse(status="searching"))
+    assert (
+        await worker_b.get_ask_result(AskResultRequest(query_id="query-id"))
+    ).status == "searching"
+
+    stop_ask_request = StopAskRequest(status="stopped")
+    stop_ask_request.query_id = "query-id"
+    await worker_b.stop_ask(stop_ask_request)
+    assert await worker_a._is_stopped("query-id", worker_a._ask_results)
+
+
+@pytest.mark.asyncio
+async def test_redis_streams_keep_chunk_order():
+    server = FakeRedis()
+    producer = _result_store(server).streams("sql_answer")
+    consumer = _result_store(server).streams("sql_answer")
+
+    for chunk in ["The", " answer", "<DONE>"]:
+        asyncio.create_task(producer.put("query-id", chunk))
+
+    chunks = [await consumer.get("query-id", timeout=1) for _ in range(3)]
+    assert chunks == ["The", " answer", "<DONE>"]
+
+    with pytest.raises(TimeoutError):
+        await consumer.get("query-id", timeout=0.05)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_streams():
+    streams = create_result_store("memory").streams("sql_answer")
+
+    await streams.put("query-id", "chunk")
+    assert await streams.get("query-id", timeout=1) == "chunk"
+
+    with pytest.raises(TimeoutError):
+        await streams.get("query-id", timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_in_memory_results():
+    results = create_result_store("memory").results(
+        "ask", maxsize=10, ttl=60, model=AskResultResponse
+    )
+
+    await results.set("query-id", AskResultResponse(status="understanding"))
+    assert (await results.get("query-id")).status == "understanding"
+    assert await results.get("unknown", "default") == "default"
+
+    await results.delete("query-id")
+    await results.delete("query-id")
+    assert await results.get("query-id") is None
+
+
+def test_unknown_result_store_backend():
+    with pytest.raises(ValueError):
+        create_result_store("memcached")
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from src.core.pipeline import BasicPipeline, singleflight
+from src.web.v1.services.ask import AskHistory
+
+
+class _Pipeline(BasicPipeline):
+    def __init__(self, delay: float = 0.05):
+        self.executions = 0
+        self._delay = delay
+        super().__init__(None)
+
+    @singleflight
+    async def run(self, query: str, histories: list[AskHistory] | None = None):
+        self.executions += 1
+        await asyncio.sleep(self._delay)
+        if query == "fail":
+            raise ValueError("llm unavailable")
+        return {"query": query}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_are_coalesced():
+    pipeline = _Pipeline()
+    histories = [AskHistory(sql="SELECT 1", question="q")]
+
+    results = await asyncio.gather(
+        pipeline.run("q", histories),
+        pipeline.run(query="q", histories=[AskHistory(sql="SELECT 1", question="q")]),
+        pipeline.run("q", histories=histories),
+        pipeline.run("other"),
+    )
+
+    assert results[0] is results[1] is results[2]
+    assert results[3] == {"query": "other"}
+    assert pipeline.executions == 2
+    assert pipeline.get_coalescing_metrics() == {
+        "calls": 4,
+        "executions": 2,
+        "coalesced": 2,
+        "coalesce_ratio": 0.5,
+    }
+
+    # the next call after completion runs again
+    await pipeline.run("q", histories)
+    assert pipeline.executions == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesced_calls_share_the_exception():
+    pipeline = _Pipeline()
+
+    results = await asyncio.gather(
+        pipeline.run("fail"), pipeline.run("fail"), return_exceptions=True
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert pipeline.executions == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    pipeline = _Pipeline()
+
+    first = asyncio.create_task(pipeline.run("q"))
+    second = asyncio.create_task(pipeline.run("q"))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == {"query": "q"}
+    assert first.cancelled()
+    assert pipeline.executions == 1
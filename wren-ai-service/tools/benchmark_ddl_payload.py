@@ -0,0 +1,90 @@
+import argparse
+import ast
+import asyncio
+import time
+from typing import Callable, List
+
+from haystack import Document
+
+from src.pipelines.common import load_ddl_payload
+from src.pipelines.indexing.db_schema import DDLChunker
+from src.pipelines.indexing.utils import helper
+
+
+def _mdl(columns: int, columns_per_model: int = 100) -> dict:
+    models = [
+        {
+            "name": f"table_{i}",
+            "properties": {"displayName": f"table_{i}", "description": "benchmark"},
+            "columns": [
+                {
+                    "name": f"column_{j}",
+                    "type": "VARCHAR",
+                    "properties": {"displayName": f"column_{j}"},
+                }
+                for j in range(min(columns_per_model, columns - i * columns_per_model))
+            ],
+            "primaryKey": "column_0",
+        }
+        for i in range((columns + columns_per_model - 1) // columns_per_model)
+    ]
+    return {"models": models, "views": [], "relationships": [], "metrics": []}
+
+
+def _legacy(documents: List[Document]) -> List[Document]:
+    # documents indexed before the JSON payload format hold a Python repr
+    return [
+        Document(
+            id=document.id,
+            meta=document.meta,
+            content=str(load_ddl_payload(document.content)),
+        )
+        for document in documents
+    ]
+
+
+def _timeit(decode: Callable[[str], dict], documents: List[Document], rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for document in documents:
+            decode(document.content)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def _benchmark(sizes: List[int], column_batch_size: int, rounds: int):
+    helper.load_helpers()
+    chunker = DDLChunker()
+
+    print(
+        f"{'columns':>8} {'documents':>10} {'literal_eval':>14} {'json':>10} {'speedup':>8}"
+    )
+    for size in sizes:
+        documents = (
+            await chunker.run(_mdl(size), column_batch_size=column_batch_size)
+        )["documents"]
+        legacy = _legacy(documents)
+
+        literal_eval_ms = _timeit(ast.literal_eval, legacy, rounds)
+        json_ms = _timeit(load_ddl_payload, documents, rounds)
+
+        print(
+            f"{size:>8} {len(documents):>10} {literal_eval_ms:>12.2f}ms "
+            f"{json_ms:>8.2f}ms {literal_eval_ms / json_ms:>7.1f}x"
+        )
+
+
+def _args():
+    parser = argparse.ArgumentParser(
+        description="Compare the decode cost per ask of legacy and JSON DDL payloads"
+    )
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+", default=[100, 1_000, 10_000]
+    )
+    parser.add_argument("-b", "--column-batch-size", type=int, default=50)
+    parser.add_argument("-r", "--rounds", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _args()
+    asyncio.run(_benchmark(args.sizes, args.column_batch_size, args.rounds))
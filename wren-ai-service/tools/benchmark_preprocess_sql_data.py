@@ -0,0 +1,102 @@
+import argparse
+import copy
+import time
+from typing import Callable, Dict, List
+
+import tiktoken
+
+from src.pipelines.retrieval.preprocess_sql_data import preprocess
+
+
+def _sql_data(rows: int, columns: int) -> Dict:
+    return {
+        "columns": [f"column_{j}" for j in range(columns)],
+        "data": [
+            [f"value {i}-{j}" if j % 2 else i * j for j in range(columns)]
+            for i in range(rows)
+        ],
+        "dtypes": {
+            f"column_{j}": "object" if j % 2 else "int64" for j in range(columns)
+        },
+    }
+
+
+def _legacy(sql_data: Dict, encoding: tiktoken.Encoding, context_window_size: int):
+    # the previous implementation: drop 50 rows and re-encode the whole result
+    _token_count = len(encoding.encode(str(sql_data)))
+    iteration = 0
+    while _token_count > context_window_size and iteration <= 1000:
+        iteration += 1
+        data = sql_data.get("data", [])
+        sql_data["data"] = data[: max(0, len(data) - 50)]
+        _token_count = len(encoding.encode(str(sql_data)))
+
+    return {
+        "sql_data": sql_data,
+        "num_rows_used_in_llm": len(sql_data.get("data", [])),
+        "tokens": _token_count,
+    }
+
+
+def _timeit(
+    fn: Callable[..., Dict],
+    sql_data: Dict,
+    encoding: tiktoken.Encoding,
+    context_window_size: int,
+    rounds: int,
+):
+    elapsed = 0.0
+    for _ in range(rounds):
+        data = copy.deepcopy(sql_data)
+        start = time.perf_counter()
+        result = fn(data, encoding, context_window_size)
+        elapsed += time.perf_counter() - start
+    return elapsed / rounds * 1000, result["num_rows_used_in_llm"]
+
+
+def _benchmark(
+    sizes: List[int],
+    columns: int,
+    context_window_size: int,
+    encoding_name: str,
+    rounds: int,
+) -> None:
+    encoding = tiktoken.get_encoding(encoding_name)
+    # the langfuse decorator isn't part of the cost being measured
+    _preprocess = getattr(preprocess, "__wrapped__", preprocess)
+
+    print(
+        f"{'rows':>6} {'legacy':>12} {'kept':>6} {'prefix_sum':>12} {'kept':>6} {'speedup':>8}"
+    )
+    for size in sizes:
+        sql_data = _sql_data(size, columns)
+        legacy_ms, legacy_rows = _timeit(
+            _legacy, sql_data, encoding, context_window_size, rounds
+        )
+        new_ms, new_rows = _timeit(
+            _preprocess, sql_data, encoding, context_window_size, rounds
+        )
+
+        print(
+            f"{size:>6} {legacy_ms:>10.1f}ms {legacy_rows:>6} {new_ms:>10.1f}ms "
+            f"{new_rows:>6} {legacy_ms / new_ms:>7.1f}x"
+        )
+
+
+def _args():
+    parser = argparse.ArgumentParser(
+        description="Compare the latency of trimming SQL results to the context window"
+    )
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[100, 500, 5_000])
+    parser.add_argument("-c", "--columns", type=int, default=30)
+    parser.add_argument("-w", "--context-window-size", type=int, default=20_000)
+    parser.add_argument("-e", "--encoding", default="o200k_base")
+    parser.add_argument("-r", "--rounds", type=int, default=3)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _args()
+    _benchmark(
+        args.sizes, args.columns, args.context_window_size, args.encoding, args.rounds
+    )